@@ -1,18 +1,21 @@
 #!/usr/bin/env python3
 
 from abc import ABC, abstractmethod
-from collections import UserDict, UserList
+from collections.abc import Mapping, MutableMapping, MutableSequence
 from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from string import ascii_letters, digits, whitespace
+from string import ascii_letters, digits
 from types import ModuleType
 from typing import (
     Any,
     Callable,
     ClassVar,
+    Generator,
     Iterable,
+    Iterator,
     Optional,
+    Sequence,
     SupportsFloat,
     Tuple,
     Type,
@@ -20,11 +23,15 @@ from typing import (
     Union,
     final,
 )
+import array
 import code
 import decimal
 import enum
+import functools
+import itertools
 import json
 import math
+import operator
 import os
 import random
 import re
@@ -54,6 +61,21 @@ MIN_SAFE_INTEGER = -9007199254740991  # -(2**53 - 1)
 MAX_RUNE = 0x10FFFF
 
 
+# Returns the NumPy module used for vectorized arithmetic over array values, or
+# None if NumPy is not installed or is disabled by setting MELLIFERA_NUMPY to 0.
+# NumPy is imported on first use rather than at startup, as importing NumPy
+# would otherwise dominate the startup time of programs that never use arrays.
+@functools.cache
+def numpy_module() -> Optional[ModuleType]:
+    if os.getenv("MELLIFERA_NUMPY") == "0":
+        return None
+    try:
+        import numpy  # type: ignore
+    except ImportError:
+        return None
+    return numpy
+
+
 def copy(value):
     """
     Mellifera-specific implementation of copy with low overhead.
@@ -124,17 +146,530 @@ def suppress_stderr():
         os.close(stderr)
 
 
+# Raised on access into a value with a missing field. Formatting the accessed
+# value takes time proportional to the size of the value, so the message is
+# only constructed if the exception is actually displayed.
 class InvalidFieldAccess(KeyError):
     def __init__(self, value: "Value", field: "Value"):
-        self.value = copy(value)
-        self.field = copy(field)
-        super().__init__(str(self))
+        super().__init__()
+        self.value = value
+        self.field = field
 
     def __str__(self):
         return f"invalid access into value {self.value} with field {self.field}"
 
 
-class SharedVectorData(UserList["Value"]):
+# Backing storage of the shared data held by vector, map, and set values. With
+# the builtin storage the shared data is held in Python lists and dicts, and a
+# copy-on-write copies every element of the shared data. With the persistent
+# storage (selected with the --storage flag or a non-empty MELLIFERA_STORAGE
+# environment variable) the shared data is held in the persistent structures
+# below, and a copy-on-write shares the nodes of the structure between both
+# copies so that a copy followed by a single update costs O(log n) time and
+# memory.
+persistent_storage: bool = False
+
+
+# Node of a persistent structure. Nodes are owned by the edit token of the
+# structure that created them, and a structure may only modify the nodes that
+# it owns in place. Copying a structure assigns fresh edit tokens to both the
+# original and the copy, after which any modification of a shared node first
+# copies that node.
+class PersistentNode:
+    __slots__ = ("edit", "array")
+
+    def __init__(self, edit: object, array: list):
+        self.edit = edit
+        self.array = array
+
+
+# Persistent vector implemented as a 32-way trie of leaf arrays with a tail
+# array holding the last (up to) 32 elements, giving O(log32 n) indexing and
+# update and amortized O(1) push and pop. Insertion and removal at any position
+# other than the end of the vector rebuild the trie in O(n).
+class PersistentVector(MutableSequence):
+    BITS = 5
+    WIDTH = 1 << BITS
+    MASK = WIDTH - 1
+
+    def __init__(self, data: Optional[Iterable] = None):
+        self.clear()
+        if data is not None:
+            for element in data:
+                self.append(element)
+
+    def clear(self) -> None:
+        self.edit = object()
+        self.length = 0
+        self.shift = PersistentVector.BITS
+        self.root = PersistentNode(self.edit, [])
+        self.tail = PersistentNode(self.edit, [])
+
+    def copy(self) -> "PersistentVector":
+        result = PersistentVector.__new__(PersistentVector)
+        result.edit = object()
+        result.length = self.length
+        result.shift = self.shift
+        result.root = self.root
+        result.tail = self.tail
+        self.edit = object()
+        return result
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)!r})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        if len(self) != len(other):
+            return False
+        return all(a == b for a, b in zip(self, other))
+
+    def __add__(self, other: Iterable) -> list:
+        return list(self) + list(other)
+
+    def __radd__(self, other: Iterable) -> list:
+        return list(other) + list(self)
+
+    def __mul__(self, n: int) -> list:
+        return list(self) * n
+
+    def __iter__(self) -> Iterator:
+        for index in range(0, self.tailoff(), PersistentVector.WIDTH):
+            yield from self.leaf(index)
+        yield from self.tail.array
+
+    def tailoff(self) -> int:
+        return self.length - len(self.tail.array)
+
+    def editable(self, node: PersistentNode) -> PersistentNode:
+        if node.edit is self.edit:
+            return node
+        return PersistentNode(self.edit, list(node.array))
+
+    def index_of(self, index: int) -> int:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("list index out of range")
+        return index
+
+    # Returns the leaf array holding the element at the provided index.
+    def leaf(self, index: int) -> list:
+        if index >= self.tailoff():
+            return self.tail.array
+        node = self.root
+        level = self.shift
+        while level > 0:
+            node = node.array[(index >> level) & PersistentVector.MASK]
+            level -= PersistentVector.BITS
+        return node.array
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.length))]
+        index = self.index_of(index)
+        return self.leaf(index)[index & PersistentVector.MASK]
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            elements = list(self)
+            elements[index] = value
+            self.rebuild(elements)
+            return
+        index = self.index_of(index)
+        if index >= self.tailoff():
+            self.tail = self.editable(self.tail)
+            self.tail.array[index & PersistentVector.MASK] = value
+            return
+        self.root = self.assoc(self.shift, self.root, index, value)
+
+    def assoc(
+        self, level: int, node: PersistentNode, index: int, value
+    ) -> PersistentNode:
+        result = self.editable(node)
+        if level == 0:
+            result.array[index & PersistentVector.MASK] = value
+        else:
+            child = (index >> level) & PersistentVector.MASK
+            result.array[child] = self.assoc(
+                level - PersistentVector.BITS, node.array[child], index, value
+            )
+        return result
+
+    def __delitem__(self, index) -> None:
+        elements = list(self)
+        del elements[index]
+        self.rebuild(elements)
+
+    def insert(self, index: int, value) -> None:
+        if index >= self.length:
+            self.append(value)
+            return
+        elements = list(self)
+        elements.insert(index, value)
+        self.rebuild(elements)
+
+    def rebuild(self, elements: Iterable) -> None:
+        self.clear()
+        for element in elements:
+            self.append(element)
+
+    def append(self, value) -> None:
+        if len(self.tail.array) < PersistentVector.WIDTH:
+            self.tail = self.editable(self.tail)
+            self.tail.array.append(value)
+            self.length += 1
+            return
+        # The tail is full and is pushed into the trie as a new leaf.
+        if (self.length >> PersistentVector.BITS) > (1 << self.shift):
+            self.root = PersistentNode(
+                self.edit, [self.root, self.new_path(self.shift, self.tail)]
+            )
+            self.shift += PersistentVector.BITS
+        else:
+            self.root = self.push_tail(self.shift, self.root, self.tail)
+        self.tail = PersistentNode(self.edit, [value])
+        self.length += 1
+
+    def new_path(self, level: int, node: PersistentNode) -> PersistentNode:
+        if level == 0:
+            return node
+        return PersistentNode(
+            self.edit, [self.new_path(level - PersistentVector.BITS, node)]
+        )
+
+    def push_tail(
+        self, level: int, parent: PersistentNode, tail: PersistentNode
+    ) -> PersistentNode:
+        result = self.editable(parent)
+        child = ((self.length - 1) >> level) & PersistentVector.MASK
+        if level == PersistentVector.BITS:
+            node = tail
+        elif child < len(parent.array):
+            node = self.push_tail(
+                level - PersistentVector.BITS, parent.array[child], tail
+            )
+        else:
+            node = self.new_path(level - PersistentVector.BITS, tail)
+        if child < len(result.array):
+            result.array[child] = node
+        else:
+            result.array.append(node)
+        return result
+
+    def pop(self, index: int = -1):
+        if self.length == 0:
+            raise IndexError("pop from empty list")
+        if index not in (-1, self.length - 1):
+            value = self[index]
+            del self[index]
+            return value
+        if len(self.tail.array) > 1 or self.length == 1:
+            self.tail = self.editable(self.tail)
+            self.length -= 1
+            return self.tail.array.pop()
+        # The tail is emptied and replaced by the last leaf of the trie.
+        value = self.tail.array[0]
+        tail = PersistentNode(self.edit, list(self.leaf(self.length - 2)))
+        root = self.pop_tail(self.shift, self.root)
+        if root is None:
+            root = PersistentNode(self.edit, [])
+        if self.shift > PersistentVector.BITS and len(root.array) == 1:
+            root = root.array[0]
+            self.shift -= PersistentVector.BITS
+        self.root = root
+        self.tail = tail
+        self.length -= 1
+        return value
+
+    def pop_tail(self, level: int, node: PersistentNode) -> Optional[PersistentNode]:
+        child = ((self.length - 2) >> level) & PersistentVector.MASK
+        if level > PersistentVector.BITS:
+            popped = self.pop_tail(level - PersistentVector.BITS, node.array[child])
+            if popped is None and child == 0:
+                return None
+            result = self.editable(node)
+            if popped is None:
+                result.array.pop()
+            else:
+                result.array[child] = popped
+            return result
+        if child == 0:
+            return None
+        result = self.editable(node)
+        result.array.pop()
+        return result
+
+    def extend(self, values: Iterable) -> None:
+        for value in list(values):
+            self.append(value)
+
+    def reverse(self) -> None:
+        self.rebuild(reversed(list(self)))
+
+    def sort(self, *, key=None, reverse: bool = False) -> None:
+        self.rebuild(sorted(self, key=key, reverse=reverse))
+
+
+# Node of a persistent map holding entries and child nodes for the 5-bit hash
+# chunks marked in the node bitmap. Entries are tuples of (hash, key, position,
+# value), where position is the index of the key in the insertion order of the
+# map.
+class PersistentMapNode:
+    __slots__ = ("edit", "bitmap", "array")
+
+    def __init__(self, edit: object, bitmap: int, array: list):
+        self.edit = edit
+        self.bitmap = bitmap
+        self.array = array
+
+
+# Node of a persistent map holding entries with keys of identical hash.
+class PersistentCollisionNode:
+    __slots__ = ("edit", "hash", "array")
+
+    def __init__(self, edit: object, hash: int, array: list):
+        self.edit = edit
+        self.hash = hash
+        self.array = array
+
+
+# Persistent insertion-ordered map implemented as a hash array mapped trie
+# (HAMT) with O(log32 n) lookup, insertion, update, and removal. The insertion
+# order of keys is recorded in a persistent vector, with removed keys replaced
+# by a tombstone until the vector is compacted.
+class PersistentMap(MutableMapping):
+    BITS = 5
+    MASK = (1 << BITS) - 1
+    REMOVED = object()
+
+    def __init__(self, data=None):
+        self.clear()
+        if data is not None:
+            self.update(data)
+
+    def clear(self) -> None:
+        self.edit = object()
+        self.root: Union[PersistentMapNode, PersistentCollisionNode]
+        self.root = PersistentMapNode(self.edit, 0, [])
+        self.size = 0
+        self.order = PersistentVector()
+        self.removed = 0
+
+    def copy(self) -> "PersistentMap":
+        result = PersistentMap.__new__(PersistentMap)
+        result.edit = object()
+        result.root = self.root
+        result.size = self.size
+        result.order = self.order.copy()
+        result.removed = self.removed
+        self.edit = object()
+        return result
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+    def __iter__(self) -> Iterator:
+        for key in self.order:
+            if key is not PersistentMap.REMOVED:
+                yield key
+
+    def __contains__(self, key) -> bool:
+        return self.find(hash(key), key) is not None
+
+    def __getitem__(self, key):
+        entry = self.find(hash(key), key)
+        if entry is None:
+            raise KeyError(key)
+        return entry[3]
+
+    def __setitem__(self, key, value) -> None:
+        hashed = hash(key)
+        entry = self.find(hashed, key)
+        if entry is None:
+            entry = (hashed, key, len(self.order), value)
+            self.order.append(key)
+            self.size += 1
+        else:
+            entry = (hashed, key, entry[2], value)
+        self.root = self.assoc(self.root, 0, entry)
+
+    def __delitem__(self, key) -> None:
+        hashed = hash(key)
+        entry = self.find(hashed, key)
+        if entry is None:
+            raise KeyError(key)
+        root = self.dissoc(self.root, 0, hashed, key)
+        self.root = root if root is not None else PersistentMapNode(self.edit, 0, [])
+        self.size -= 1
+        self.order[entry[2]] = PersistentMap.REMOVED
+        self.removed += 1
+        if self.removed > PersistentVector.WIDTH and self.removed > self.size:
+            self.compact()
+
+    # Rebuild the insertion order vector without tombstones.
+    def compact(self) -> None:
+        entries = [self.find(hash(key), key) for key in self]
+        self.order = PersistentVector()
+        self.removed = 0
+        for position, entry in enumerate(entries):
+            assert entry is not None
+            self.order.append(entry[1])
+            self.root = self.assoc(
+                self.root, 0, (entry[0], entry[1], position, entry[3])
+            )
+
+    def editable(self, node):
+        if node.edit is self.edit:
+            return node
+        if isinstance(node, PersistentCollisionNode):
+            return PersistentCollisionNode(self.edit, node.hash, list(node.array))
+        return PersistentMapNode(self.edit, node.bitmap, list(node.array))
+
+    def find(self, hashed: int, key) -> Optional[tuple]:
+        node = self.root
+        shift = 0
+        while True:
+            if isinstance(node, PersistentCollisionNode):
+                for entry in node.array:
+                    if entry[1] == key:
+                        return entry
+                return None
+            bit = 1 << ((hashed >> shift) & PersistentMap.MASK)
+            if not node.bitmap & bit:
+                return None
+            child = node.array[(node.bitmap & (bit - 1)).bit_count()]
+            if type(child) is tuple:
+                if child[0] == hashed and (child[1] is key or child[1] == key):
+                    return child
+                return None
+            node = child
+            shift += PersistentMap.BITS
+
+    def assoc(self, node, shift: int, entry: tuple):
+        hashed = entry[0]
+        if isinstance(node, PersistentCollisionNode):
+            if node.hash != hashed:
+                bit = 1 << ((node.hash >> shift) & PersistentMap.MASK)
+                node = PersistentMapNode(self.edit, bit, [node])
+                return self.assoc(node, shift, entry)
+            result = self.editable(node)
+            for index, existing in enumerate(result.array):
+                if existing[1] == entry[1]:
+                    result.array[index] = entry
+                    return result
+            result.array.append(entry)
+            return result
+        bit = 1 << ((hashed >> shift) & PersistentMap.MASK)
+        index = (node.bitmap & (bit - 1)).bit_count()
+        result = self.editable(node)
+        if not node.bitmap & bit:
+            result.bitmap |= bit
+            result.array.insert(index, entry)
+            return result
+        child = node.array[index]
+        if type(child) is not tuple:
+            result.array[index] = self.assoc(child, shift + PersistentMap.BITS, entry)
+        elif child[0] == hashed and (child[1] is entry[1] or child[1] == entry[1]):
+            result.array[index] = entry
+        else:
+            result.array[index] = self.merge(child, entry, shift + PersistentMap.BITS)
+        return result
+
+    def merge(self, a: tuple, b: tuple, shift: int):
+        if a[0] == b[0]:
+            return PersistentCollisionNode(self.edit, a[0], [a, b])
+        a_chunk = (a[0] >> shift) & PersistentMap.MASK
+        b_chunk = (b[0] >> shift) & PersistentMap.MASK
+        if a_chunk == b_chunk:
+            return PersistentMapNode(
+                self.edit, 1 << a_chunk, [self.merge(a, b, shift + PersistentMap.BITS)]
+            )
+        entries = [a, b] if a_chunk < b_chunk else [b, a]
+        return PersistentMapNode(self.edit, (1 << a_chunk) | (1 << b_chunk), entries)
+
+    def dissoc(self, node, shift: int, hashed: int, key):
+        if isinstance(node, PersistentCollisionNode):
+            if len(node.array) == 1:
+                return None
+            result = self.editable(node)
+            result.array = [entry for entry in result.array if entry[1] != key]
+            return result
+        bit = 1 << ((hashed >> shift) & PersistentMap.MASK)
+        index = (node.bitmap & (bit - 1)).bit_count()
+        child = node.array[index]
+        if type(child) is not tuple:
+            child = self.dissoc(child, shift + PersistentMap.BITS, hashed, key)
+            if child is not None:
+                result = self.editable(node)
+                result.array[index] = child
+                return result
+        if node.bitmap == bit:
+            return None
+        result = self.editable(node)
+        result.bitmap ^= bit
+        del result.array[index]
+        return result
+
+
+# Read-only window into the storage of a shared vector data instance. Vector
+# slices hold a window as their storage so that slicing is O(1) rather than
+# copying each sliced element. Shared vector data holding a window is created
+# with an extra use (as is the windowed data), so every vector holding either
+# data copies that data into storage of its own before its first modification.
+class SharedVectorWindow(Sequence):
+    def __init__(self, storage: Sequence, start: int, stop: int):
+        self.storage = storage
+        self.start = start
+        self.stop = stop
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)!r})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        if len(self) != len(other):
+            return False
+        return all(a == b for a, b in zip(self, other))
+
+    def __add__(self, other: Iterable) -> list:
+        return list(self) + list(other)
+
+    def __radd__(self, other: Iterable) -> list:
+        return list(other) + list(self)
+
+    def __iter__(self) -> Iterator:
+        storage = self.storage
+        for index in range(self.start, self.stop):
+            yield storage[index]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("list index out of range")
+        return self.storage[self.start + index]
+
+
+# Shared data of vector values. The elements are held in a plain list (or the
+# persistent or windowed storage described above) to which the sequence
+# operations of the shared data are directly delegated.
+class SharedVectorData(MutableSequence["Value"]):
+    __slots__ = ("data", "uses", "refs", "aliased")
+
     def __init__(self, data: Optional[Iterable["Value"]] = None):
         self.uses: int = 0
         self.refs: int = 0
@@ -144,14 +679,101 @@ class SharedVectorData(UserList["Value"]):
                     raise Exception(
                         f"invalid vector construction with element {element}"
                     )
-        super().__init__(data)
+        # True if the elements of this data may be shared with the persistent
+        # storage of another shared data instance.
+        self.aliased: bool = False
+        self.data: list["Value"]
+        if persistent_storage:
+            self.data = PersistentVector(data)  # type: ignore[assignment]
+        else:
+            self.data = list(data) if data is not None else list()
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, index):
+        return self.data[index]
+
+    def __setitem__(self, index, value) -> None:
+        self.data[index] = value
+
+    def __delitem__(self, index) -> None:
+        del self.data[index]
+
+    def __iter__(self) -> Iterator["Value"]:
+        return iter(self.data)
+
+    def __contains__(self, value) -> bool:
+        return value in self.data
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SharedVectorData):
+            other = other.data
+        return self.data == other
+
+    def __repr__(self) -> str:
+        return repr(self.data)
+
+    def insert(self, index: int, value: "Value") -> None:
+        self.data.insert(index, value)
+
+    def append(self, value: "Value") -> None:
+        self.data.append(value)
+
+    def extend(self, values: Iterable["Value"]) -> None:
+        self.data.extend(values)
+
+    def pop(self, index: int = -1) -> "Value":
+        return self.data.pop(index)
+
+    def index(self, value: Any, start: int = 0, stop: int = sys.maxsize) -> int:
+        return self.data.index(value, start, stop)
+
+    def clear(self) -> None:
+        self.data.clear()
+
+    def reverse(self) -> None:
+        self.data.reverse()
+
+    def sort(self, *args, **kwargs) -> None:
+        self.data.sort(*args, **kwargs)
 
     def __copy__(self) -> "SharedVectorData":
+        if isinstance(self.data, PersistentVector):
+            result = SharedVectorData()
+            result.data = self.data.copy()
+            result.aliased = self.aliased = True
+            return result
         return SharedVectorData([copy(x) for x in self])
 
+    # Returns shared data holding the elements of this data in the range
+    # [start, stop) without copying those elements.
+    def window(self, start: int, stop: int) -> "SharedVectorData":
+        storage: Sequence = self.data
+        if isinstance(storage, SharedVectorWindow):
+            start += storage.start
+            stop += storage.start
+            storage = storage.storage
+        result = SharedVectorData()
+        result.data = SharedVectorWindow(storage, start, stop)  # type: ignore[assignment]
+        result.uses += 1
+        self.uses += 1
+        return result
+
+    def unalias(self) -> None:
+        if self.aliased:
+            for index in range(len(self.data)):
+                self.data[index] = copy(self.data[index])
+            self.aliased = False
 
-class SharedMapData(UserDict["Value", "Value"]):
-    def __init__(self, data: Optional[dict["Value", "Value"]] = None):
+
+# Shared data of map values. The entries are held in a plain dict (or the
+# persistent storage described above) to which the mapping operations of the
+# shared data are directly delegated.
+class SharedMapData(MutableMapping["Value", "Value"]):
+    __slots__ = ("data", "uses", "refs", "aliased")
+
+    def __init__(self, data: Optional[Mapping["Value", "Value"]] = None):
         self.uses: int = 0
         self.refs: int = 0
         if data is not None:
@@ -165,13 +787,77 @@ class SharedMapData(UserDict["Value", "Value"]):
                     raise Exception(
                         f"invalid map construction with key {key} and value {value}"
                     )
-        super().__init__(data)
+        self.aliased: bool = False
+        self.data: dict["Value", "Value"]
+        if persistent_storage:
+            self.data = PersistentMap(data)  # type: ignore[assignment]
+        else:
+            self.data = dict(data) if data is not None else dict()
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, key: "Value") -> "Value":
+        return self.data[key]
+
+    def __setitem__(self, key: "Value", value: "Value") -> None:
+        self.data[key] = value
+
+    def __delitem__(self, key: "Value") -> None:
+        del self.data[key]
+
+    def __iter__(self) -> Iterator["Value"]:
+        return iter(self.data)
+
+    def __contains__(self, key) -> bool:
+        return key in self.data
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SharedMapData):
+            other = other.data
+        return self.data == other
+
+    def __repr__(self) -> str:
+        return repr(self.data)
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def pop(self, key, *default):
+        return self.data.pop(key, *default)
+
+    def keys(self):
+        return self.data.keys()
+
+    def values(self):
+        return self.data.values()
+
+    def items(self):
+        return self.data.items()
+
+    def clear(self) -> None:
+        self.data.clear()
 
     def __copy__(self) -> "SharedMapData":
+        if isinstance(self.data, PersistentMap):
+            result = SharedMapData()
+            result.data = self.data.copy()  # type: ignore[assignment]
+            result.aliased = self.aliased = True
+            return result
         return SharedMapData({copy(k): copy(v) for k, v in self.data.items()})
 
+    def unalias(self) -> None:
+        if self.aliased:
+            for key in list(self.data):
+                self.data[key] = copy(self.data[key])
+            self.aliased = False
+
+
+# Shared data of set values. The elements are held as the keys of a plain dict
+# (or the persistent storage described above) mapping each element to None.
+class SharedSetData(MutableMapping["Value", None]):
+    __slots__ = ("data", "uses", "refs")
 
-class SharedSetData(UserDict["Value", None]):
     def __init__(self, data: Optional[Iterable["Value"]] = None):
         self.uses: int = 0
         self.refs: int = 0
@@ -183,12 +869,50 @@ class SharedSetData(UserDict["Value", None]):
                     or isinstance(element, Reference)
                 ):
                     raise Exception(f"invalid set construction with element {element}")
-            super().__init__({k: None for k in data})
+        self.data: dict["Value", None]
+        if persistent_storage:
+            self.data = PersistentMap()  # type: ignore[assignment]
+            if data is not None:
+                self.data.update((k, None) for k in data)
+        elif data is not None:
+            self.data = {k: None for k in data}
         else:
-            super().__init__()
+            self.data = dict()
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, element: "Value") -> None:
+        return self.data[element]
 
     def __setitem__(self, element: "Value", value: None) -> None:
-        super().__setitem__(element, None)
+        self.data[element] = None
+
+    def __delitem__(self, element: "Value") -> None:
+        del self.data[element]
+
+    def __iter__(self) -> Iterator["Value"]:
+        return iter(self.data)
+
+    def __contains__(self, element) -> bool:
+        return element in self.data
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SharedSetData):
+            other = other.data
+        return self.data == other
+
+    def __repr__(self) -> str:
+        return repr(self.data)
+
+    def keys(self):
+        return self.data.keys()
+
+    def items(self):
+        return self.data.items()
+
+    def clear(self) -> None:
+        self.data.clear()
 
     def insert(self, element: "Value") -> None:
         self.__setitem__(element, None)
@@ -197,13 +921,78 @@ class SharedSetData(UserDict["Value", None]):
         del self[element]
 
     def __copy__(self) -> "SharedSetData":
+        if isinstance(self.data, PersistentMap):
+            result = SharedSetData()
+            result.data = self.data.copy()  # type: ignore[assignment]
+            return result
         return SharedSetData([copy(k) for k in self.data.keys()])
 
 
+# Shared data of array values. An array.array of doubles provided as data is
+# held directly rather than copied.
+class SharedArrayData:
+    __slots__ = ("data", "uses", "refs")
+
+    def __init__(self, data: Optional[Iterable[float]] = None):
+        self.uses: int = 0
+        self.refs: int = 0
+        if isinstance(data, array.array) and data.typecode == "d":
+            self.data = data
+        else:
+            self.data = array.array("d", data if data is not None else ())
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __copy__(self) -> "SharedArrayData":
+        return SharedArrayData(array.array("d", self.data))
+
+
+# Shared data of bitset values. Bits are packed into a bytearray, with bit i of
+# the bitset stored as bit i % 8 of byte i // 8. Padding bits of the last byte
+# are always clear.
+class SharedBitsetData:
+    __slots__ = ("data", "uses", "refs", "count")
+
+    def __init__(self, count: int = 0, data: Optional[bytearray] = None):
+        self.uses: int = 0
+        self.refs: int = 0
+        self.count: int = count
+        self.data: bytearray = data if data is not None else bytearray((count + 7) // 8)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __copy__(self) -> "SharedBitsetData":
+        return SharedBitsetData(self.count, bytearray(self.data))
+
+
+# Shared data of buffer values. A bytearray provided as data is held directly
+# rather than copied.
+class SharedBufferData:
+    __slots__ = ("data", "uses", "refs")
+
+    def __init__(self, data: Optional[Iterable[int]] = None):
+        self.uses: int = 0
+        self.refs: int = 0
+        if isinstance(data, bytearray):
+            self.data = data
+        else:
+            self.data = bytearray(data if data is not None else ())
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __copy__(self) -> "SharedBufferData":
+        return SharedBufferData(bytearray(self.data))
+
+
 ValueType = TypeVar("ValueType", bound="Value")
 
 
 class Value(ABC):
+    __slots__ = ()
+
     meta: Optional["Map"]
 
     @staticmethod
@@ -235,6 +1024,13 @@ class Value(ABC):
     def __getitem__(self, key: "Value") -> "Value":
         raise NotImplementedError()  # optionally overridden by subclasses
 
+    # Returns the field of the value accessed by the provided key, or None if
+    # the value has no such field. Unlike __getitem__, a missing field is not
+    # an exceptional case, so interpreter paths probing several candidate
+    # fields (the value, its metamap, a dereferenced value) use this method.
+    def lookup(self, key: "Value") -> Optional["Value"]:
+        return None  # optionally overridden by subclasses
+
     def __delitem__(self, key: "Value") -> None:
         raise NotImplementedError()  # optionally overridden by subclasses
 
@@ -259,16 +1055,12 @@ class Value(ABC):
     def metavalue(self, name: "Value") -> Optional["Value"]:
         if self.meta is None:
             return None
-        if name not in self.meta:
-            return None
-        return self.meta[name]
+        return self.meta.lookup(name)
 
     def metafunction(self, name: "Value") -> Optional[Union["Function", "Builtin"]]:
         if self.meta is None:
             return None
-        if name not in self.meta:
-            return None
-        function = self.meta[name]
+        function = self.meta.lookup(name)
         if not isinstance(function, (Builtin, Function)):
             return None
         return function
@@ -286,8 +1078,28 @@ def value_as_index(value: Value) -> int:
     return value.as_index()
 
 
+# Returns the integer index of an element of a sequence with the provided count
+# accessed by the provided key, or None if the key does not access an element.
+def lookup_index(key: Value, count: int) -> Optional[int]:
+    if not isinstance(key, Number):
+        return None
+    index = float(key.data)
+    if not index.is_integer() or not 0 <= index < count:
+        return None
+    return int(index)
+
+
+def value_as_byte(value: Value) -> int:
+    if not isinstance(value, Number):
+        raise Exception(f"cannot convert {value.typename()} into a byte")
+    byte = float(value.data)
+    if not byte.is_integer() or not 0 <= byte <= 255:
+        raise Exception(f"cannot convert {value} into a byte")
+    return int(byte)
+
+
 @final
-@dataclass
+@dataclass(slots=True)
 class Null(Value):
     meta: Optional["Map"] = None
 
@@ -324,7 +1136,7 @@ class Null(Value):
 
 
 @final
-@dataclass
+@dataclass(slots=True)
 class Boolean(Value):
     data: bool
     meta: Optional["Map"] = None
@@ -362,7 +1174,7 @@ class Boolean(Value):
 
 
 @final
-@dataclass
+@dataclass(slots=True)
 class Number(Value):
     data: SupportsFloat
     meta: Optional["Map"]
@@ -373,6 +1185,12 @@ class Number(Value):
 
     @staticmethod
     def new(data: SupportsFloat) -> "Number":
+        # Numbers are immutable, so boxes of small integers are shared rather
+        # than allocated for every result. Negative zero compares equal to zero
+        # and is never produced from the shared boxes.
+        boxed = _NUMBER_BOXES.get(data)
+        if boxed is not None and (data or math.copysign(1.0, data) > 0):
+            return boxed
         return Number(data, _NUMBER_META)
 
     def __init__(self, data: SupportsFloat, meta: Optional["Map"] = None):
@@ -460,8 +1278,23 @@ class Number(Value):
         return True
 
 
+# Shared boxes of the small integers, filled once the number metamap exists.
+_NUMBER_BOXES: dict[SupportsFloat, Number] = dict()
+
+
 @final
 class String(Value):
+    # Strings produced by concatenation share an append-only rope holding the
+    # bytes of each string as a prefix of the rope. Concatenating onto the
+    # string whose bytes span the entire rope extends the rope in place, so
+    # building a string through repeated concatenation takes linear rather
+    # than quadratic time. The bytes of a string built on a rope are flattened
+    # into an immutable bytes object on first byte-level access.
+    __slots__ = ("flat", "rope", "size", "meta", "hash")
+
+    # Concatenations producing fewer bytes than this are performed eagerly.
+    ROPE_THRESHOLD: ClassVar[int] = 256
+
     @staticmethod
     def typename() -> str:
         return "string"
@@ -473,19 +1306,42 @@ class String(Value):
     def __init__(self, data: Union[bytes, str], meta: Optional["Map"] = None):
         match data:
             case bytes():
-                self.data = data
+                self.flat: Optional[bytes] = data
             case str():
-                self.data = data.encode("utf-8")
+                self.flat = data.encode("utf-8")
+        self.rope: Optional[bytearray] = None
+        self.size: int = len(self.data)
         self.meta = meta
         self.hash: Optional[int] = None
 
+    def concat(self, data: bytes) -> "String":
+        if len(data) == 0:
+            return self
+        if self.size + len(data) < String.ROPE_THRESHOLD:
+            return String.new(self.bytes + data)
+        rope = self.rope
+        if rope is None or len(rope) != self.size:
+            # Either this string is not built on a rope or the rope has been
+            # extended past the end of this string by another concatenation.
+            rope = self.rope = bytearray(self.bytes)
+        rope += data
+        result = String.new(b"")
+        result.flat = None
+        result.rope = rope
+        result.size = len(rope)
+        return result
+
     def __hash__(self):
         if self.hash is None:
             self.hash = hash(self.bytes)
         return self.hash
 
     def __eq__(self, other):
-        return self is other or isinstance(other, String) and self.data == other.data
+        if self is other:
+            return True
+        if not isinstance(other, String) or self.size != other.size:
+            return False
+        return self.bytes == other.bytes
 
     def __str__(self):
         return f'"{escape(self.bytes)}"'
@@ -513,9 +1369,16 @@ class String(Value):
     def is_immutable(self) -> bool:
         return True
 
+    @property
+    def data(self) -> bytes:
+        return self.bytes
+
     @property
     def bytes(self) -> bytes:
-        return self.data
+        if self.flat is None:
+            assert self.rope is not None
+            self.flat = bytes(self.rope[: self.size])
+        return self.flat
 
     @property
     def runes(self) -> str:
@@ -524,6 +1387,8 @@ class String(Value):
 
 @final
 class Regexp(Value):
+    __slots__ = ("pattern", "text", "meta")
+
     @staticmethod
     def typename() -> str:
         return "regexp"
@@ -577,7 +1442,7 @@ class Regexp(Value):
 
 
 @final
-@dataclass
+@dataclass(slots=True)
 class Vector(Value):
     data: SharedVectorData
     meta: Optional["Map"]
@@ -603,6 +1468,7 @@ class Vector(Value):
         self.data = data if data is not None else SharedVectorData()
         self.data.uses += 1
         self.meta = meta
+        self.frozen = False
 
     def __hash__(self):
         result = 0
@@ -681,6 +1547,12 @@ class Vector(Value):
             raise KeyError(f"attempted vector access using a negative index {index}")
         return self.data.__getitem__(index)
 
+    def lookup(self, key: Value) -> Optional[Value]:
+        index = lookup_index(key, len(self.data))
+        if index is None:
+            return None
+        return self.data[index]
+
     def insert(self, index: int, value: Value) -> None:
         if self.is_immutable():
             raise Exception(f"attempted to modify immutable vector {self}")
@@ -729,6 +1601,16 @@ class Vector(Value):
             self.data = copy(self.data)  # copy-on-write
             self.data.uses += 1
 
+    # Returns the element accessed by the provided key for modification in
+    # place, first replacing an element that may be shared with the persistent
+    # storage of another vector with a copy of that element.
+    def owned(self, key: Value) -> Value:
+        element = self[key]
+        if self.data.aliased:
+            element = copy(element)
+            self[key] = element
+        return element
+
     def freeze(self) -> "Vector":
         if self.is_immutable():
             return self
@@ -744,7 +1626,7 @@ class Vector(Value):
         return self.frozen
 
 
-@dataclass
+@dataclass(slots=True)
 class Map(Value):
     data: SharedMapData
     meta: Optional["Map"]
@@ -796,6 +1678,7 @@ class Map(Value):
         self.data.uses += 1
         self.meta = meta
         self.name = name
+        self.frozen = False
 
     def __hash__(self):
         result = 0
@@ -881,6 +1764,9 @@ class Map(Value):
         except KeyError:
             raise InvalidFieldAccess(self, key)
 
+    def lookup(self, key: Value) -> Optional[Value]:
+        return self.data.get(key)
+
     def __delitem__(self, key: Value) -> None:
         if self.is_immutable():
             raise Exception(f"attempted to modify immutable map {self}")
@@ -916,6 +1802,19 @@ class Map(Value):
             self.data = copy(self.data)  # copy-on-write
             self.data.uses += 1
 
+    # Returns the element accessed by the provided key for modification in
+    # place, first replacing an element that may be shared with the persistent
+    # storage of another map with a copy of that element. Returns None if the
+    # map does not contain the key.
+    def owned(self, key: Value) -> Optional[Value]:
+        element = self.data.get(key)
+        if element is None:
+            return None
+        if self.data.aliased:
+            element = copy(element)
+            self[key] = element
+        return element
+
     def freeze(self) -> "Map":
         if self.is_immutable():
             return self
@@ -934,7 +1833,7 @@ class Map(Value):
 
 
 @final
-@dataclass
+@dataclass(slots=True)
 class Set(Value):
     data: SharedSetData
     meta: Optional["Map"]
@@ -960,6 +1859,7 @@ class Set(Value):
         self.data = data if data is not None else SharedSetData()
         self.data.uses += 1
         self.meta = meta
+        self.frozen = False
 
     def __hash__(self):
         result = 0
@@ -1068,341 +1968,1215 @@ class Set(Value):
 
 
 @final
-@dataclass
-class Reference(Value):
-    data: Value
-    meta: Optional["Map"] = None
+@dataclass(slots=True)
+class Array(Value):
+    data: SharedArrayData
+    meta: Optional["Map"]
+    frozen: bool = False
 
     @staticmethod
     def typename() -> str:
-        return "reference"
-
-    @staticmethod
-    def new(data: Value) -> "Reference":
-        data.cow()
-        Reference.mark_referenced(data)
-        return Reference(data, _REFERENCE_META)
+        return "array"
 
-    # Increment the reference count of the underlying shared data held by this
-    # value to signal that there is an access path to that data through a
-    # reference.
     @staticmethod
-    def mark_referenced(value: Value) -> None:
-        if isinstance(value, (Vector, Map, Set)):
-            value.data.refs += 1
+    def new(data: Optional[Union[SharedArrayData, Iterable[float]]] = None) -> "Array":
+        return Array(data, _ARRAY_META)
 
-    # Decrement the reference count of the underlying shared data held by this
-    # value. This operation is only valid when it is known that the referenced
-    # value was previously marked with Reference.mark_referenced(), and that
-    # all references to the value are *guaranteed* to be currently unreachable.
-    @staticmethod
-    def unmark_referenced(value: Value) -> None:
-        if isinstance(value, (Vector, Map, Set)):
-            value.data.refs -= 1
+    def __init__(
+        self,
+        data: Optional[Union[SharedArrayData, Iterable[float]]] = None,
+        meta: Optional["Map"] = None,
+    ):
+        if data is not None and not isinstance(data, SharedArrayData):
+            data = SharedArrayData(data)
+        self.data = data if data is not None else SharedArrayData()
+        self.data.uses += 1
+        self.meta = meta
+        self.frozen = False
 
     def __hash__(self):
-        return hash(id(self.data))
+        return hash(tuple(self.data.data))
 
     def __eq__(self, other):
-        return isinstance(other, Reference) and id(self.data) == id(other.data)
+        return isinstance(other, Array) and self.data.data == other.data.data
 
     def __str__(self):
-        return f"reference@{hex(id(self.data))}"
+        elements = ", ".join([str(Number(x)) for x in self.data.data])
+        return f"array([{elements}])"
 
     def comb_encode(
         self, indent: Optional[str] = None, separator: str = "", indent_level: int = 0
     ) -> str:
-        raise ValueError(f"invalid comb value {self}")
-
-    def __copy__(self) -> "Reference":
-        return self  # immutable value
+        return Vector([Number(x) for x in self.data.data]).comb_encode(
+            indent=indent, separator=separator, indent_level=indent_level
+        )
 
-    def freeze(self) -> "Reference":
-        return self  # immutable value
+    def __contains__(self, item) -> bool:
+        return isinstance(item, Number) and float(item.data) in self.data.data
 
-    def is_immutable(self) -> bool:
-        return True
-
-    def cow(self) -> None:
-        # We explicitly do *not* copy `self.data` as the copied data should
-        # still point to the original referenced Python `Value` object.
-        pass
+    def index(self, key: Value) -> int:
+        if not isinstance(key, Number):
+            raise KeyError(f"attempted array access using non-number key {key}")
+        index = float(key.data)
+        if not index.is_integer():
+            raise KeyError(f"attempted array access using non-integer number {index}")
+        if index < 0:
+            raise KeyError(f"attempted array access using a negative index {index}")
+        return int(index)
 
+    def __setitem__(self, key: Value, value: Value) -> None:
+        if self.is_immutable():
+            raise Exception(f"attempted to modify immutable array {self}")
+        if not isinstance(value, Number):
+            raise Exception(
+                f"attempted array element assignment with element type {typename(value)}"
+            )
+        index = self.index(key)
+        self.cow()  # copy-on-write
+        self.data.data[index] = float(value.data)
 
-@final
-@dataclass
-class Function(Value):
-    ast: "AstExpressionFunction"
-    env: "Environment"
-    meta: Optional["Map"] = None
+    def __getitem__(self, key: Value) -> Value:
+        return Number.new(self.data.data[self.index(key)])
 
-    @staticmethod
-    def typename() -> str:
-        return "function"
+    def lookup(self, key: Value) -> Optional[Value]:
+        index = lookup_index(key, len(self.data))
+        if index is None:
+            return None
+        return Number.new(self.data.data[index])
 
-    @staticmethod
-    def new(ast: "AstExpressionFunction", env: "Environment") -> "Function":
-        return Function(ast, env, _FUNCTION_META)
+    def owned(self, key: Value) -> Value:
+        return self[key]  # immutable elements
 
-    def __hash__(self):
-        return hash(id(self.ast)) + hash(id(self.env))
+    def push(self, value: Value) -> None:
+        if self.is_immutable():
+            raise Exception(f"attempted to modify immutable array {self}")
+        if not isinstance(value, Number):
+            raise Exception(
+                f"attempted array element push with element type {typename(value)}"
+            )
+        self.cow()  # copy-on-write
+        self.data.data.append(float(value.data))
 
-    def __eq__(self, other):
-        return (
-            isinstance(other, Function)
-            and id(self.ast) == id(other.ast)
-            and id(self.env) == id(other.env)
-        )
+    def pop(self) -> Value:
+        if self.is_immutable():
+            raise Exception(f"attempted to modify immutable array {self}")
+        self.cow()  # copy-on-write
+        return Number.new(self.data.data.pop())
 
-    def __str__(self):
-        name = self.ast.name.runes if self.ast.name is not None else "function"
-        ugly = any(c not in ascii_letters + digits + "_" + ":" for c in name)
-        name = f'"{escape(name)}"' if ugly else name
-        if self.ast.location is not None:
-            return f"{name}@[{self.ast.location}]"
-        return name
+    def __copy__(self) -> "Array":
+        if self.is_immutable():
+            return self  # immutable value
+        return Array(self.data, self.meta)
 
-    def comb_encode(
-        self, indent: Optional[str] = None, separator: str = "", indent_level: int = 0
-    ) -> str:
-        raise ValueError(f"invalid comb value {self}")
+    def cow(self) -> None:
+        if self.data.uses > 1:
+            self.data.uses -= 1
+            self.data = copy(self.data)  # copy-on-write
+            self.data.uses += 1
 
-    def __copy__(self) -> "Function":
-        return self  # immutable value
+    def freeze(self) -> "Array":
+        if self.is_immutable():
+            return self
 
-    def freeze(self) -> "Function":
-        return self  # immutable value
+        value = copy(self)
+        value.cow()
+        value.frozen = True
+        return value
 
     def is_immutable(self) -> bool:
-        return True
+        return self.frozen
 
+    # Returns the elements of this array as a NumPy array sharing the storage
+    # of this array. Only valid when NumPy is available.
+    def ndarray(self) -> Any:
+        numpy = numpy_module()
+        assert numpy is not None
+        return numpy.frombuffer(self.data.data, dtype=numpy.float64)
 
-@dataclass
-class Builtin(Value):
-    meta: Optional["Map"] = None
-    # Whether the builtin takes an implicit `self` argument by reference. When
-    # True, the `self` argument *must* not escape, as the Mellifera runtime
-    # treats the self reference as temporary.
-    self_by_reference: ClassVar[bool] = False
+    @staticmethod
+    def from_ndarray(ndarray: Any) -> "Array":
+        numpy = numpy_module()
+        assert numpy is not None
+        return Array.new(array.array("d", ndarray.astype(numpy.float64).tobytes()))
+
+    # Returns the array produced by applying the provided Python function of
+    # one float argument to each element of this array, or the NumPy ufunc
+    # with the provided name when NumPy is available. Python functions that
+    # raise for some elements, e.g. math.sqrt for negative numbers, are
+    # applied per element through the provided fallback function instead.
+    # Floating point errors raised by the ufunc, e.g. overflow, also defer to
+    # the Python function so that results and errors do not depend on NumPy.
+    def apply(
+        self,
+        function: Optional[Callable[[float], Any]],
+        ufunc: Optional[str],
+        fallback: Callable[[float], Union[Value, "Error"]],
+    ) -> Union[Value, "Error"]:
+        numpy = numpy_module()
+        if numpy is not None and ufunc is not None:
+            try:
+                with numpy.errstate(all="raise", under="ignore"):
+                    return Array.from_ndarray(getattr(numpy, ufunc)(self.ndarray()))
+            except FloatingPointError:
+                pass
+        if function is not None:
+            try:
+                return Array.new(array.array("d", map(function, self.data.data)))
+            except (ValueError, OverflowError, ZeroDivisionError):
+                pass
+        elements = array.array("d")
+        for element in self.data.data:
+            result = fallback(element)
+            if isinstance(result, Error):
+                return result
+            if not isinstance(result, Number):
+                return Error(
+                    None, f"expected number result for array element {Number(element)}"
+                )
+            elements.append(float(result.data))
+        return Array.new(elements)
+
+    # Returns the array produced by applying the provided Python function of
+    # two float arguments to each pair of corresponding elements of the provided
+    # arrays, or the NumPy ufunc with the provided name when NumPy is available,
+    # where a number operand is paired with every element of the other operand.
+    # Python functions that raise for some elements are applied per element
+    # through the provided fallback function instead. Floating point errors
+    # raised by the ufunc defer to the Python function as with Array.apply.
+    # Returns None if the operands are not an array and an array or number.
+    @staticmethod
+    def apply_binary(
+        name: str,
+        lhs: Value,
+        rhs: Value,
+        function: Optional[Callable[[float, float], Any]],
+        ufunc: Optional[str],
+        fallback: Callable[[float, float], Union[Value, "Error"]],
+    ) -> Optional[Union[Value, "Error"]]:
+        if not isinstance(lhs, Array) and not isinstance(rhs, Array):
+            return None
+        if not isinstance(lhs, (Array, Number)) or not isinstance(rhs, (Array, Number)):
+            return None
+        if isinstance(lhs, Array) and isinstance(rhs, Array):
+            if len(lhs.data.data) != len(rhs.data.data):
+                return Error(
+                    None,
+                    f"attempted {name} with arrays of count {len(lhs.data.data)} and {len(rhs.data.data)}",
+                )
+        numpy = numpy_module()
+        if numpy is not None and ufunc is not None:
+            try:
+                with numpy.errstate(all="raise", under="ignore"):
+                    return Array.from_ndarray(
+                        getattr(numpy, ufunc)(
+                            (
+                                lhs.ndarray()
+                                if isinstance(lhs, Array)
+                                else float(lhs.data)
+                            ),
+                            (
+                                rhs.ndarray()
+                                if isinstance(rhs, Array)
+                                else float(rhs.data)
+                            ),
+                        )
+                    )
+            except FloatingPointError:
+                pass
+        lhs_elements: Iterable[float] = (
+            lhs.data.data
+            if isinstance(lhs, Array)
+            else itertools.repeat(float(lhs.data))
+        )
+        rhs_elements: Iterable[float] = (
+            rhs.data.data
+            if isinstance(rhs, Array)
+            else itertools.repeat(float(rhs.data))
+        )
+        if function is not None:
+            try:
+                return Array.new(
+                    array.array("d", map(function, lhs_elements, rhs_elements))
+                )
+            except (ValueError, OverflowError, ZeroDivisionError):
+                pass
+        elements = array.array("d")
+        for x, y in zip(lhs_elements, rhs_elements):
+            result = fallback(x, y)
+            if isinstance(result, Error):
+                return result
+            if not isinstance(result, Number):
+                return Error(
+                    None,
+                    f"expected number result for array elements {Number(x)} and {Number(y)}",
+                )
+            elements.append(float(result.data))
+        return Array.new(elements)
 
-    def __post_init__(self):
-        if self.meta is None:
-            self.meta = _FUNCTION_META
+    # Returns an iterator over the elements of this array as of the call.
+    def elements(self) -> Iterator[Value]:
+        return map(Number.new, array.array("d", self.data.data))
 
-    @property
-    @abstractmethod
-    def name(self) -> str:
-        """
-        Name associated with the builtin.
-        Builtin subclasses should add the builtin name as a class property.
-        """
-        raise NotImplementedError()
+
+@final
+@dataclass(slots=True)
+class Bitset(Value):
+    data: SharedBitsetData
+    meta: Optional["Map"]
+    frozen: bool = False
 
     @staticmethod
     def typename() -> str:
-        return "function"
+        return "bitset"
+
+    @staticmethod
+    def new(data: Optional[SharedBitsetData] = None) -> "Bitset":
+        return Bitset(data, _BITSET_META)
+
+    def __init__(
+        self,
+        data: Optional[SharedBitsetData] = None,
+        meta: Optional["Map"] = None,
+    ):
+        self.data = data if data is not None else SharedBitsetData()
+        self.data.uses += 1
+        self.meta = meta
+        self.frozen = False
 
     def __hash__(self):
-        return hash(self.name)
+        return hash((self.data.count, bytes(self.data.data)))
 
     def __eq__(self, other):
         return (
-            isinstance(other, Builtin)
-            and self.name == other.name
-            and self.function == other.function
+            isinstance(other, Bitset)
+            and self.data.count == other.data.count
+            and self.data.data == other.data.data
         )
 
     def __str__(self):
-        return f"{self.name}@builtin"
+        indices = ", ".join([str(x) for x in self.indices()])
+        return f"bitset({self.data.count}, [{indices}])"
 
     def comb_encode(
         self, indent: Optional[str] = None, separator: str = "", indent_level: int = 0
     ) -> str:
-        raise ValueError(f"invalid comb value {self}")
+        return Vector(
+            [Boolean(self.test(i)) for i in range(self.data.count)]
+        ).comb_encode(indent=indent, separator=separator, indent_level=indent_level)
 
-    def __copy__(self) -> "Builtin":
-        return self  # immutable value
-
-    def freeze(self) -> "Builtin":
-        return self  # immutable value
-
-    def is_immutable(self) -> bool:
-        return True
-
-    @staticmethod
-    def expect_argument_count(arguments: list[Value], count: int) -> None:
-        if len(arguments) != count:
-            raise Exception(
-                f"invalid function argument count (expected {count}, received {len(arguments)})"
+    def index(self, key: Value) -> int:
+        if not isinstance(key, Number):
+            raise KeyError(f"attempted bitset access using non-number key {key}")
+        index = float(key.data)
+        if not index.is_integer():
+            raise KeyError(f"attempted bitset access using non-integer number {index}")
+        if index < 0:
+            raise KeyError(f"attempted bitset access using a negative index {index}")
+        if index >= self.data.count:
+            raise IndexError(
+                f"attempted bitset access using out-of-bounds index {index}"
             )
+        return int(index)
 
-    @staticmethod
-    def typed_argument(
-        arguments: list[Value], index: int, ty: Type[ValueType]
-    ) -> ValueType:
-        argument = arguments[index]
-        if ty == Function and isinstance(argument, Builtin):
-            # Built-in functions are treated as function types for argument
-            # checking purposes, as the difference between these types is
-            # opaque to the end-user.
-            return argument  # type: ignore
-        if not isinstance(argument, ty):
-            raise Exception(
-                f"expected {ty.typename()} value for argument {index + 1}, received {typename(argument)}"
-            )
-        return argument
+    def test(self, index: int) -> bool:
+        return bool(self.data.data[index >> 3] & (1 << (index & 7)))
 
-    @staticmethod
-    def typed_argument_reference(
-        arguments: list[Value], index: int, ty: Type[ValueType]
-    ) -> Tuple[Reference, ValueType]:
-        argument = arguments[index]
-        if (
-            isinstance(argument, Reference)
-            and ty == Function
-            and isinstance(argument.data, Builtin)
-        ):
-            # Built-in functions are treated as function types for argument
-            # checking purposes, as the difference between these types is
-            # opaque to the end-user.
-            return (argument, argument.data)  # type: ignore
-        if not isinstance(argument, Reference):
-            raise Exception(
-                f"expected reference to {ty.typename()} value for argument {index + 1}, received {typename(argument)}"
-            )
-        if not isinstance(argument.data, ty):
+    def __setitem__(self, key: Value, value: Value) -> None:
+        if self.is_immutable():
+            raise Exception(f"attempted to modify immutable bitset {self}")
+        if not isinstance(value, Boolean):
             raise Exception(
-                f"expected reference to {ty.typename()} value for argument {index + 1}, received reference to {typename(argument.data)}"
+                f"attempted bitset element assignment with element type {typename(value)}"
             )
-        return (argument, argument.data)
+        index = self.index(key)
+        self.cow()  # copy-on-write
+        if value.data:
+            self.data.data[index >> 3] |= 1 << (index & 7)
+        else:
+            self.data.data[index >> 3] &= ~(1 << (index & 7)) & 0xFF
 
-    @abstractmethod
-    def function(self, arguments: list[Value]) -> Union[Value, "Error"]:
-        raise NotImplementedError()
+    def __getitem__(self, key: Value) -> Value:
+        return Boolean.new(self.test(self.index(key)))
 
+    def lookup(self, key: Value) -> Optional[Value]:
+        index = lookup_index(key, len(self.data))
+        if index is None:
+            return None
+        return Boolean.new(self.test(index))
 
-# Special builtin intended for use as a sentinel value and placeholder.
-class BuiltinImplicitUninitialized(Builtin):
-    name = "IMPLICIT-UNINITIALIZED"
+    def owned(self, key: Value) -> Value:
+        return self[key]  # immutable elements
 
-    def __post_init__(self):
-        pass  # Explicitly do not set self.meta.
+    # Sets (or clears) the bits begin, begin + step, begin + 2 * step, ... below
+    # end. Large selections are updated through an integer mask over the
+    # affected bytes, so the cost of the update is proportional to the number
+    # of affected bytes rather than the number of selected bits.
+    def fill(self, begin: int, end: int, step: int, value: bool) -> None:
+        if self.is_immutable():
+            raise Exception(f"attempted to modify immutable bitset {self}")
+        selected = range(begin, end, step)
+        if len(selected) == 0:
+            return
+        self.cow()  # copy-on-write
+        data = self.data.data
+        lo = begin >> 3
+        hi = (selected[-1] >> 3) + 1
+        if len(selected) < (hi - lo) // 8:
+            for index in selected:
+                if value:
+                    data[index >> 3] |= 1 << (index & 7)
+                else:
+                    data[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+            return
+        # Bits 0, step, 2 * step, ... of the geometric series sum.
+        mask = ((1 << (step * len(selected))) - 1) // ((1 << step) - 1)
+        mask <<= begin - lo * 8
+        bits = int.from_bytes(data[lo:hi], "little")
+        bits = bits | mask if value else bits & ~mask
+        data[lo:hi] = bits.to_bytes(hi - lo, "little")
+
+    def count_ones(self) -> int:
+        return int.from_bytes(self.data.data, "little").bit_count()
+
+    # Returns an iterator over the indices of the set bits of this bitset as
+    # of the call, in increasing order.
+    def indices(self) -> Iterator[int]:
+        data = bytes(self.data.data)
+
+        def indices() -> Iterator[int]:
+            for offset, byte in enumerate(data):
+                while byte:
+                    low = byte & -byte
+                    yield offset * 8 + low.bit_length() - 1
+                    byte ^= low
+
+        return indices()
+
+    def elements(self) -> Iterator[Value]:
+        return map(Number.new, self.indices())
+
+    def __copy__(self) -> "Bitset":
+        if self.is_immutable():
+            return self  # immutable value
+        return Bitset(self.data, self.meta)
 
-    def function(self, arguments: list[Value]) -> Union[Value, "Error"]:
-        return Error(None, "IMPLICIT-UNINITIALIZED")
+    def cow(self) -> None:
+        if self.data.uses > 1:
+            self.data.uses -= 1
+            self.data = copy(self.data)  # copy-on-write
+            self.data.uses += 1
 
+    def freeze(self) -> "Bitset":
+        if self.is_immutable():
+            return self
 
-# Special builtin intended for use as a sentinel value and placeholder.
-class BuiltinExplicitUninitialized(Builtin):
-    name = "EXPLICIT-UNINITIALIZED"
+        value = copy(self)
+        value.cow()
+        value.frozen = True
+        return value
 
-    def __post_init__(self):
-        pass  # Explicitly do not set self.meta.
+    def is_immutable(self) -> bool:
+        return self.frozen
 
-    def function(self, arguments: list[Value]) -> Union[Value, "Error"]:
-        return Error(None, "EXPLICIT-UNINITIALIZED")
 
+@final
+@dataclass(slots=True)
+class Buffer(Value):
+    data: SharedBufferData
+    meta: Optional["Map"]
+    frozen: bool = False
 
-@dataclass
-class BuiltinFromSource(Builtin):
-    evaluated: Union[Function, Builtin] = BuiltinImplicitUninitialized()
+    @staticmethod
+    def typename() -> str:
+        return "buffer"
 
-    def __post_init__(self):
-        super().__post_init__()
-        if not isinstance(self.evaluated, BuiltinExplicitUninitialized):
-            self.initialize()
+    @staticmethod
+    def new(data: Optional[Union[SharedBufferData, Iterable[int]]] = None) -> "Buffer":
+        return Buffer(data, _BUFFER_META)
 
-    def __hash__(self):
-        return hash(id(self.evaluated))
+    def __init__(
+        self,
+        data: Optional[Union[SharedBufferData, Iterable[int]]] = None,
+        meta: Optional["Map"] = None,
+    ):
+        if data is not None and not isinstance(data, SharedBufferData):
+            data = SharedBufferData(data)
+        self.data = data if data is not None else SharedBufferData()
+        self.data.uses += 1
+        self.meta = meta
+        self.frozen = False
+
+    def __hash__(self):
+        return hash(bytes(self.data.data))
 
     def __eq__(self, other):
-        return type(self) is type(other) and self.evaluated == other.evaluated
+        return isinstance(other, Buffer) and self.data.data == other.data.data
 
-    def initialize(self):
-        env = Environment(BASE_ENVIRONMENT)
-        location = SourceLocation(str(self), 1)
-        evaluated = eval_source(self.source(), env, location)
-        if not isinstance(evaluated, (Function, Builtin)):
-            raise Exception(f"invalid builtin from source {quote(evaluated)}")
-        self.evaluated = evaluated
+    def __str__(self):
+        return f'buffer("{escape(bytes(self.data.data))}")'
 
-    def function(self, arguments: list[Value]) -> Union[Value, "Error"]:
-        result = call(None, self.evaluated, arguments)
-        if isinstance(result, Error):
-            # Remove internal trace elements so that the trace appears to start
-            # from the builtin, similar to builtins defined using host code.
-            result.trace = list()
-        return result
+    def comb_encode(
+        self, indent: Optional[str] = None, separator: str = "", indent_level: int = 0
+    ) -> str:
+        return f'"{escape(bytes(self.data.data))}"'
+
+    def index(self, key: Value) -> int:
+        if not isinstance(key, Number):
+            raise KeyError(f"attempted buffer access using non-number key {key}")
+        index = float(key.data)
+        if not index.is_integer():
+            raise KeyError(f"attempted buffer access using non-integer number {index}")
+        if index < 0:
+            raise KeyError(f"attempted buffer access using a negative index {index}")
+        return int(index)
+
+    def __setitem__(self, key: Value, value: Value) -> None:
+        if self.is_immutable():
+            raise Exception(f"attempted to modify immutable buffer {self}")
+        byte = value_as_byte(value)
+        index = self.index(key)
+        self.cow()  # copy-on-write
+        self.data.data[index] = byte
+
+    def __getitem__(self, key: Value) -> Value:
+        return Number.new(self.data.data[self.index(key)])
+
+    def lookup(self, key: Value) -> Optional[Value]:
+        index = lookup_index(key, len(self.data))
+        if index is None:
+            return None
+        return Number.new(self.data.data[index])
+
+    def owned(self, key: Value) -> Value:
+        return self[key]  # immutable elements
+
+    def push(self, value: Value) -> None:
+        if self.is_immutable():
+            raise Exception(f"attempted to modify immutable buffer {self}")
+        byte = value_as_byte(value)
+        self.cow()  # copy-on-write
+        self.data.data.append(byte)
+
+    def pop(self) -> Value:
+        if self.is_immutable():
+            raise Exception(f"attempted to modify immutable buffer {self}")
+        self.cow()  # copy-on-write
+        return Number.new(self.data.data.pop())
+
+    def extend(self, data: bytes) -> None:
+        if self.is_immutable():
+            raise Exception(f"attempted to modify immutable buffer {self}")
+        self.cow()  # copy-on-write
+        self.data.data.extend(data)
+
+    # Returns an iterator over the bytes of this buffer as of the call.
+    def elements(self) -> Iterator[Value]:
+        return map(Number.new, bytes(self.data.data))
+
+    def __copy__(self) -> "Buffer":
+        if self.is_immutable():
+            return self  # immutable value
+        return Buffer(self.data, self.meta)
+
+    def cow(self) -> None:
+        if self.data.uses > 1:
+            self.data.uses -= 1
+            self.data = copy(self.data)  # copy-on-write
+            self.data.uses += 1
+
+    def freeze(self) -> "Buffer":
+        if self.is_immutable():
+            return self
+
+        value = copy(self)
+        value.cow()
+        value.frozen = True
+        return value
+
+    def is_immutable(self) -> bool:
+        return self.frozen
+
+
+# Incremental builder of a string. Appended bytes are concatenated onto the
+# string built so far, which shares its rope with the strings produced by
+# earlier appends, so appending takes amortized time proportional to the
+# length of the appended bytes and copies of a builder share storage until
+# either copy is appended to.
+@final
+@dataclass(slots=True)
+class StringBuilder(Value):
+    data: String
+    meta: Optional["Map"]
+    frozen: bool = False
 
     @staticmethod
-    @abstractmethod
-    def source() -> str:
-        raise NotImplementedError()
+    def typename() -> str:
+        return "builder"
 
+    @staticmethod
+    def new(data: Optional[String] = None) -> "StringBuilder":
+        return StringBuilder(data, _BUILDER_META)
 
-@dataclass
-class External(Value):
-    data: Any
+    def __init__(self, data: Optional[String] = None, meta: Optional["Map"] = None):
+        self.data = data if data is not None else String.new(b"")
+        self.meta = meta
+        self.frozen = False
+
+    def __hash__(self):
+        return hash(self.data)
+
+    def __eq__(self, other):
+        return isinstance(other, StringBuilder) and self.data == other.data
+
+    def __str__(self):
+        return f"builder({self.data})"
+
+    def comb_encode(
+        self, indent: Optional[str] = None, separator: str = "", indent_level: int = 0
+    ) -> str:
+        return self.data.comb_encode(indent, separator, indent_level)
+
+    def append(self, data: bytes) -> None:
+        if self.is_immutable():
+            raise Exception(f"attempted to modify immutable builder {self}")
+        self.data = self.data.concat(data)
+
+    def __copy__(self) -> "StringBuilder":
+        if self.is_immutable():
+            return self  # immutable value
+        return StringBuilder(self.data, self.meta)
+
+    def freeze(self) -> "StringBuilder":
+        if self.is_immutable():
+            return self
+
+        value = copy(self)
+        value.frozen = True
+        return value
+
+    def is_immutable(self) -> bool:
+        return self.frozen
+
+
+# Mellifera division of numbers, where division by zero produces an infinity of
+# the sign of the quotient (or NaN if the dividend is zero or NaN) rather than
+# an error.
+def number_div(lhs: float, rhs: float) -> float:
+    if rhs == 0.0:
+        if lhs > 0.0:
+            return math.copysign(1, rhs) * +math.inf
+        if lhs < 0.0:
+            return math.copysign(1, rhs) * -math.inf
+        return math.nan
+    return lhs / rhs
+
+
+# Mellifera remainder of numbers, where a remainder with a NaN or infinite
+# dividend or a zero divisor produces NaN rather than an error.
+def number_rem(lhs: float, rhs: float) -> float:
+    if math.isnan(lhs) or math.isnan(rhs):
+        return math.nan
+    if math.isinf(lhs):
+        return math.nan
+    if math.isinf(rhs):
+        return lhs
+    if rhs == 0.0:
+        return math.nan
+    # The remainder will have the same sign as the dividend.
+    # This behavior is identical to C's remainder operator.
+    #   +7 % +3 => +1
+    #   +7 % -3 => +1
+    #   -7 % +3 => -1
+    #   -7 % -3 => -1
+    return math.fmod(lhs, rhs)
+
+
+# Python functions and NumPy ufuncs implementing the elementwise application of
+# binary operators to arrays. Comparison operators produce arrays of ones and
+# zeros used as masks.
+ARRAY_OPERATORS: dict[str, Tuple[Callable[[float, float], Any], str]] = {
+    "+": (operator.add, "add"),
+    "-": (operator.sub, "subtract"),
+    "*": (operator.mul, "multiply"),
+    "/": (number_div, "divide"),
+    "<": (operator.lt, "less"),
+    "<=": (operator.le, "less_equal"),
+    ">": (operator.gt, "greater"),
+    ">=": (operator.ge, "greater_equal"),
+}
+
+
+# Applies the provided binary operator elementwise to array operands, where a
+# number operand is applied to every element of the other operand. Floating
+# point errors raised by the NumPy ufunc defer to the Python function as with
+# Array.apply. Returns None if the operands are not an array and an array or
+# number.
+def array_operate(
+    location: Optional["SourceLocation"], op: str, lhs: Value, rhs: Value
+) -> Optional[Union[Value, "Error"]]:
+    function, ufunc = ARRAY_OPERATORS[op]
+    if isinstance(lhs, Array) and isinstance(rhs, Array):
+        if len(lhs.data.data) != len(rhs.data.data):
+            return Error(
+                location,
+                f"attempted {op} operation with arrays of count {len(lhs.data.data)} and {len(rhs.data.data)}",
+            )
+    elif not (
+        (isinstance(lhs, Array) and isinstance(rhs, Number))
+        or (isinstance(lhs, Number) and isinstance(rhs, Array))
+    ):
+        return None
+    numpy = numpy_module()
+    if numpy is not None:
+        try:
+            with numpy.errstate(all="raise", under="ignore"):
+                return Array.from_ndarray(
+                    getattr(numpy, ufunc)(
+                        lhs.ndarray() if isinstance(lhs, Array) else float(lhs.data),
+                        rhs.ndarray() if isinstance(rhs, Array) else float(rhs.data),
+                    )
+                )
+        except FloatingPointError:
+            pass
+    lhs_elements: Iterable[float] = (
+        lhs.data.data if isinstance(lhs, Array) else itertools.repeat(float(lhs.data))
+    )
+    rhs_elements: Iterable[float] = (
+        rhs.data.data if isinstance(rhs, Array) else itertools.repeat(float(rhs.data))
+    )
+    if function is number_div:
+        # Division of floats only differs from Mellifera division when the
+        # divisor is zero, which raises ZeroDivisionError.
+        try:
+            return Array.new(
+                array.array("d", map(operator.truediv, lhs_elements, rhs_elements))
+            )
+        except ZeroDivisionError:
+            pass
+    return Array.new(array.array("d", map(function, lhs_elements, rhs_elements)))
+
+
+@final
+@dataclass(slots=True)
+class Reference(Value):
+    data: Value
     meta: Optional["Map"] = None
 
     @staticmethod
     def typename() -> str:
-        return "external"
+        return "reference"
 
     @staticmethod
-    def new(data: Any) -> "External":
-        return External(data, meta=None)
+    def new(data: Value) -> "Reference":
+        data.cow()
+        Reference.mark_referenced(data)
+        return Reference(data, _REFERENCE_META)
+
+    # Increment the reference count of the underlying shared data held by this
+    # value to signal that there is an access path to that data through a
+    # reference.
+    @staticmethod
+    def mark_referenced(value: Value) -> None:
+        if isinstance(value, (Vector, Map, Set)):
+            value.data.refs += 1
+
+    # Decrement the reference count of the underlying shared data held by this
+    # value. This operation is only valid when it is known that the referenced
+    # value was previously marked with Reference.mark_referenced(), and that
+    # all references to the value are *guaranteed* to be currently unreachable.
+    @staticmethod
+    def unmark_referenced(value: Value) -> None:
+        if isinstance(value, (Vector, Map, Set)):
+            value.data.refs -= 1
 
     def __hash__(self):
         return hash(id(self.data))
 
     def __eq__(self, other):
-        return isinstance(other, External) and id(self.data) == id(other.data)
+        return isinstance(other, Reference) and id(self.data) == id(other.data)
 
     def __str__(self):
-        return f"external({repr(self.data)})"
+        return f"reference@{hex(id(self.data))}"
 
     def comb_encode(
         self, indent: Optional[str] = None, separator: str = "", indent_level: int = 0
     ) -> str:
         raise ValueError(f"invalid comb value {self}")
 
-    def __copy__(self) -> "External":
+    def __copy__(self) -> "Reference":
         return self  # immutable value
 
-    def freeze(self) -> "External":
+    def freeze(self) -> "Reference":
         return self  # immutable value
 
     def is_immutable(self) -> bool:
         return True
 
     def cow(self) -> None:
-        # We explicitly do *not* copy self.data as the copied data should still
-        # point to the original external Python object.
+        # We explicitly do *not* copy `self.data` as the copied data should
+        # still point to the original referenced Python `Value` object.
         pass
 
 
-@dataclass
-class SourceLocation:
-    file: str
-    line: int
+@final
+@dataclass(slots=True)
+class Function(Value):
+    ast: "AstExpressionFunction"
+    env: "Environment"
+    meta: Optional["Map"] = None
+
+    @staticmethod
+    def typename() -> str:
+        return "function"
+
+    @staticmethod
+    def new(ast: "AstExpressionFunction", env: "Environment") -> "Function":
+        return Function(ast, env, _FUNCTION_META)
+
+    def __hash__(self):
+        return hash(id(self.ast)) + hash(id(self.env))
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Function)
+            and id(self.ast) == id(other.ast)
+            and id(self.env) == id(other.env)
+        )
 
     def __str__(self):
-        return f"{self.file}, line {self.line}"
+        name = self.ast.name.runes if self.ast.name is not None else "function"
+        ugly = any(c not in ascii_letters + digits + "_" + ":" for c in name)
+        name = f'"{escape(name)}"' if ugly else name
+        if self.ast.location is not None:
+            return f"{name}@[{self.ast.location}]"
+        return name
 
-    def __copy__(self) -> "SourceLocation":
-        return SourceLocation(self.file, self.line)
+    def comb_encode(
+        self, indent: Optional[str] = None, separator: str = "", indent_level: int = 0
+    ) -> str:
+        raise ValueError(f"invalid comb value {self}")
+
+    def __copy__(self) -> "Function":
+        return self  # immutable value
+
+    def freeze(self) -> "Function":
+        return self  # immutable value
+
+    def is_immutable(self) -> bool:
+        return True
+
+
+@dataclass
+class Builtin(Value):
+    meta: Optional["Map"] = None
+    # Whether the builtin takes an implicit `self` argument by reference. When
+    # True, the `self` argument *must* not escape, as the Mellifera runtime
+    # treats the self reference as temporary.
+    self_by_reference: ClassVar[bool] = False
+
+    def __post_init__(self):
+        if self.meta is None:
+            self.meta = _FUNCTION_META
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """
+        Name associated with the builtin.
+        Builtin subclasses should add the builtin name as a class property.
+        """
+        raise NotImplementedError()
 
     @staticmethod
-    def optional_into_value(location: Optional["SourceLocation"]) -> Value:
-        if location is None:
-            return null
-        return Map.new(
-            {
-                String.new("file"): String.new(location.file),
-                String.new("line"): Number.new(location.line),
-            }
-        )
+    def typename() -> str:
+        return "function"
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Builtin)
+            and self.name == other.name
+            and self.function == other.function
+        )
+
+    def __str__(self):
+        return f"{self.name}@builtin"
+
+    def comb_encode(
+        self, indent: Optional[str] = None, separator: str = "", indent_level: int = 0
+    ) -> str:
+        raise ValueError(f"invalid comb value {self}")
+
+    def __copy__(self) -> "Builtin":
+        return self  # immutable value
+
+    def freeze(self) -> "Builtin":
+        return self  # immutable value
+
+    def is_immutable(self) -> bool:
+        return True
+
+    @staticmethod
+    def expect_argument_count(arguments: list[Value], count: int) -> None:
+        if len(arguments) != count:
+            raise Exception(
+                f"invalid function argument count (expected {count}, received {len(arguments)})"
+            )
+
+    @staticmethod
+    def expect_argument_count_between(
+        arguments: list[Value], minimum: int, maximum: int
+    ) -> None:
+        if minimum == maximum:
+            Builtin.expect_argument_count(arguments, minimum)
+        elif not minimum <= len(arguments) <= maximum:
+            raise Exception(
+                f"invalid function argument count (expected {minimum} to {maximum}, received {len(arguments)})"
+            )
+
+    @staticmethod
+    def typed_argument(
+        arguments: list[Value], index: int, ty: Type[ValueType]
+    ) -> ValueType:
+        argument = arguments[index]
+        if ty == Function and isinstance(argument, Builtin):
+            # Built-in functions are treated as function types for argument
+            # checking purposes, as the difference between these types is
+            # opaque to the end-user.
+            return argument  # type: ignore
+        if not isinstance(argument, ty):
+            raise Exception(
+                f"expected {ty.typename()} value for argument {index + 1}, received {typename(argument)}"
+            )
+        return argument
+
+    @staticmethod
+    def typed_argument_reference(
+        arguments: list[Value], index: int, ty: Type[ValueType]
+    ) -> Tuple[Reference, ValueType]:
+        argument = arguments[index]
+        if (
+            isinstance(argument, Reference)
+            and ty == Function
+            and isinstance(argument.data, Builtin)
+        ):
+            # Built-in functions are treated as function types for argument
+            # checking purposes, as the difference between these types is
+            # opaque to the end-user.
+            return (argument, argument.data)  # type: ignore
+        if not isinstance(argument, Reference):
+            raise Exception(
+                f"expected reference to {ty.typename()} value for argument {index + 1}, received {typename(argument)}"
+            )
+        if not isinstance(argument.data, ty):
+            raise Exception(
+                f"expected reference to {ty.typename()} value for argument {index + 1}, received reference to {typename(argument.data)}"
+            )
+        return (argument, argument.data)
+
+    @abstractmethod
+    def function(self, arguments: list[Value]) -> Union[Value, "Error"]:
+        raise NotImplementedError()
+
+
+# Special builtin intended for use as a sentinel value and placeholder.
+class BuiltinImplicitUninitialized(Builtin):
+    name = "IMPLICIT-UNINITIALIZED"
+
+    def __post_init__(self):
+        pass  # Explicitly do not set self.meta.
+
+    def function(self, arguments: list[Value]) -> Union[Value, "Error"]:
+        return Error(None, "IMPLICIT-UNINITIALIZED")
+
+
+# Special builtin intended for use as a sentinel value and placeholder.
+class BuiltinExplicitUninitialized(Builtin):
+    name = "EXPLICIT-UNINITIALIZED"
+
+    def __post_init__(self):
+        pass  # Explicitly do not set self.meta.
+
+    def function(self, arguments: list[Value]) -> Union[Value, "Error"]:
+        return Error(None, "EXPLICIT-UNINITIALIZED")
+
+
+@dataclass
+class BuiltinFromSource(Builtin):
+    evaluated: Union[Function, Builtin] = BuiltinImplicitUninitialized()
+
+    def __post_init__(self):
+        super().__post_init__()
+        if not isinstance(self.evaluated, BuiltinExplicitUninitialized):
+            self.initialize()
+
+    def __hash__(self):
+        return hash(id(self.evaluated))
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.evaluated == other.evaluated
+
+    def initialize(self):
+        env = Environment(BASE_ENVIRONMENT)
+        location = SourceLocation(str(self), 1)
+        evaluated = eval_source(self.source(), env, location)
+        if not isinstance(evaluated, (Function, Builtin)):
+            raise Exception(f"invalid builtin from source {quote(evaluated)}")
+        self.evaluated = evaluated
+
+    def function(self, arguments: list[Value]) -> Union[Value, "Error"]:
+        result = call(None, self.evaluated, arguments)
+        if isinstance(result, Error):
+            # Remove internal trace elements so that the trace appears to start
+            # from the builtin, similar to builtins defined using host code.
+            result.trace = list()
+        return result
+
+    @staticmethod
+    @abstractmethod
+    def source() -> str:
+        raise NotImplementedError()
+
+
+@dataclass(slots=True)
+class External(Value):
+    data: Any
+    meta: Optional["Map"] = None
+
+    @staticmethod
+    def typename() -> str:
+        return "external"
+
+    @staticmethod
+    def new(data: Any) -> "External":
+        return External(data, meta=None)
+
+    def __hash__(self):
+        return hash(id(self.data))
+
+    def __eq__(self, other):
+        return isinstance(other, External) and id(self.data) == id(other.data)
+
+    def __str__(self):
+        return f"external({repr(self.data)})"
+
+    def comb_encode(
+        self, indent: Optional[str] = None, separator: str = "", indent_level: int = 0
+    ) -> str:
+        raise ValueError(f"invalid comb value {self}")
+
+    def __copy__(self) -> "External":
+        return self  # immutable value
+
+    def freeze(self) -> "External":
+        return self  # immutable value
+
+    def is_immutable(self) -> bool:
+        return True
+
+    def cow(self) -> None:
+        # We explicitly do *not* copy self.data as the copied data should still
+        # point to the original external Python object.
+        pass
+
+
+# Iterator implemented natively by the interpreter. A native iterator is a lazy
+# pipeline of a source producing elements followed by a sequence of map and
+# filter stages, all of which are applied to each element within a single loop.
+# The source is a factory producing a fresh Python iterator over the source
+# elements, so every traversal of a native iterator starts from the beginning
+# of the source, matching the value semantics of copying an iterator written
+# in Mellifera. Once a native iterator is advanced with iterator::next, the
+# iterator holds the state of its traversal. Copying an advanced iterator
+# splits that state with itertools.tee, so the copy and the original continue
+# independently from the same position without re-running the pipeline for
+# elements already produced. Elements produced from a split traversal state
+# are copied, as they are shared by every iterator split from that state.
+#
+# The origin of a native iterator is the value from which the source elements
+# are produced (e.g. the vector of vector::into_iterator), and is used to
+# compare and display native iterators. Two native iterators are equal if they
+# have equal origins, equal stages, and have been advanced the same number of
+# times with iterator::next.
+@final
+@dataclass(slots=True)
+class NativeIterator(Value):
+    # Each stage is a (is_filter, function) pair.
+    Stage = Tuple[bool, Value]
+
+    source: Callable[[], Iterator[Union[Value, "Error"]]]
+    origin: Value
+    stages: Tuple[Stage, ...] = ()
+    meta: Optional["Map"] = None
+    state: Optional[Iterator[Union[Value, "Error"]]] = None
+    position: int = 0
+    shared: bool = False
+
+    @staticmethod
+    def typename() -> str:
+        return "iterator"
+
+    @staticmethod
+    def new(
+        source: Callable[[], Iterator[Union[Value, "Error"]]],
+        origin: Value,
+        stages: Tuple[Stage, ...] = (),
+        meta: Optional["Map"] = None,
+    ) -> "NativeIterator":
+        return NativeIterator(
+            source, origin, stages, meta if meta is not None else _ITERATOR_META
+        )
+
+    def __hash__(self):
+        return hash((typename(self), self.position, len(self.stages)))
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, NativeIterator)
+            and typename(self) == typename(other)
+            and self.position == other.position
+            and self.stages == other.stages
+            and self.origin == other.origin
+        )
+
+    def __str__(self):
+        return f"{typename(self)}({self.origin})"
+
+    def comb_encode(
+        self, indent: Optional[str] = None, separator: str = "", indent_level: int = 0
+    ) -> str:
+        raise ValueError(f"invalid comb value {self}")
+
+    def __copy__(self) -> "NativeIterator":
+        if self.state is None:
+            return NativeIterator(self.source, self.origin, self.stages, self.meta)
+        self.state, state = itertools.tee(self.state)
+        self.shared = True
+        return NativeIterator(
+            self.source,
+            self.origin,
+            self.stages,
+            self.meta,
+            state,
+            self.position,
+            True,
+        )
+
+    def freeze(self) -> "NativeIterator":
+        return self  # immutable value
+
+    def is_immutable(self) -> bool:
+        return True
+
+    # Returns a Python iterator over the elements produced by this iterator.
+    # Iteration stops after an error is produced. Errors produced by a stage
+    # are traced through the stages wrapping it, with the outermost stage
+    # traced as called from the provided location.
+    def iterate(
+        self, location: Optional["SourceLocation"] = None
+    ) -> Iterator[Union[Value, "Error"]]:
+        if self.state is not None:
+            if self.shared:
+                return map(NativeIterator.copied, self.state)
+            return self.state
+        if len(self.stages) == 0:
+            return self.source()
+        return NativeIterator.pipeline(self.source(), self.stages, location)
+
+    # Advances the traversal state of this iterator, returning None on
+    # end-of-iteration.
+    def advance(self) -> Optional[Union[Value, "Error"]]:
+        if self.state is None:
+            self.state = self.iterate()
+        iterated = next(self.state, None)
+        if iterated is None:
+            return None
+        self.position += 1
+        if self.shared:
+            return NativeIterator.copied(iterated)
+        return iterated
+
+    @staticmethod
+    def copied(element: Union[Value, "Error"]) -> Union[Value, "Error"]:
+        if isinstance(element, Error):
+            result = Error(element.location, element.message)
+            result.trace = list(element.trace)
+            return result
+        return copy(element)
+
+    @staticmethod
+    def pipeline(
+        source: Iterator[Union[Value, "Error"]],
+        stages: Tuple[Stage, ...],
+        location: Optional["SourceLocation"] = None,
+    ) -> Iterator[Union[Value, "Error"]]:
+        # Trace an error produced at the provided stage index through that
+        # stage and every stage wrapping it, as would be done by the nested
+        # next metafunctions of iterators written in Mellifera.
+        def traced(error: Error, index: int) -> Error:
+            for i in range(index, len(stages)):
+                error.trace.append(
+                    Error.TraceElement(
+                        location if i == len(stages) - 1 else None,
+                        (
+                            "filter_iterator::next"
+                            if stages[i][0]
+                            else "map_iterator::next"
+                        ),
+                    )
+                )
+            return error
+
+        for element in source:
+            if isinstance(element, Error):
+                yield traced(element, 0)
+                return
+            for index, (is_filter, function) in enumerate(stages):
+                result = call(None, function, [copy(element)])
+                if isinstance(result, Error):
+                    yield traced(result, index)
+                    return
+                if not is_filter:
+                    element = result
+                    continue
+                if not isinstance(result, Boolean):
+                    yield traced(
+                        Error(
+                            None,
+                            f"expected function {function} to return a boolean (received {typename(result)} {result})",
+                        ),
+                        index,
+                    )
+                    return
+                if not result.data:
+                    break
+            else:
+                yield element
+
+
+@dataclass
+class SourceLocation:
+    file: str
+    line: int
+
+    def __str__(self):
+        return f"{self.file}, line {self.line}"
+
+    def __copy__(self) -> "SourceLocation":
+        return SourceLocation(self.file, self.line)
+
+    @staticmethod
+    def optional_into_value(location: Optional["SourceLocation"]) -> Value:
+        if location is None:
+            return null
+        return Map.new(
+            {
+                String.new("file"): String.new(location.file),
+                String.new("line"): Number.new(location.line),
+            }
+        )
 
 
 class TokenKind(enum.Enum):
@@ -1470,6 +3244,7 @@ class TokenKind(enum.Enum):
     CATCH = "catch"
     ERROR = "error"
     RETURN = "return"
+    YIELD = "yield"
     FREEZE = "freeze"
 
     def __str__(self):
@@ -1505,10 +3280,43 @@ class Token:
         str(TokenKind.CATCH):    TokenKind.CATCH,
         str(TokenKind.ERROR):    TokenKind.ERROR,
         str(TokenKind.RETURN):   TokenKind.RETURN,
+        str(TokenKind.YIELD):    TokenKind.YIELD,
         str(TokenKind.FREEZE):   TokenKind.FREEZE,
         # fmt: on
     }
 
+    OPERATORS = {
+        # fmt: off
+        str(TokenKind.ADD):       TokenKind.ADD,
+        str(TokenKind.SUB):       TokenKind.SUB,
+        str(TokenKind.MUL):       TokenKind.MUL,
+        str(TokenKind.DIV):       TokenKind.DIV,
+        str(TokenKind.REM):       TokenKind.REM,
+        str(TokenKind.EQ):        TokenKind.EQ,
+        str(TokenKind.NE):        TokenKind.NE,
+        str(TokenKind.LE):        TokenKind.LE,
+        str(TokenKind.GE):        TokenKind.GE,
+        str(TokenKind.LT):        TokenKind.LT,
+        str(TokenKind.GT):        TokenKind.GT,
+        str(TokenKind.EQ_RE):     TokenKind.EQ_RE,
+        str(TokenKind.NE_RE):     TokenKind.NE_RE,
+        str(TokenKind.MKREF):     TokenKind.MKREF,
+        str(TokenKind.DEREF):     TokenKind.DEREF,
+        str(TokenKind.DOT):       TokenKind.DOT,
+        str(TokenKind.SCOPE):     TokenKind.SCOPE,
+        str(TokenKind.ASSIGN):    TokenKind.ASSIGN,
+        str(TokenKind.COMMA):     TokenKind.COMMA,
+        str(TokenKind.COLON):     TokenKind.COLON,
+        str(TokenKind.SEMICOLON): TokenKind.SEMICOLON,
+        str(TokenKind.LPAREN):    TokenKind.LPAREN,
+        str(TokenKind.RPAREN):    TokenKind.RPAREN,
+        str(TokenKind.LBRACE):    TokenKind.LBRACE,
+        str(TokenKind.RBRACE):    TokenKind.RBRACE,
+        str(TokenKind.LBRACKET):  TokenKind.LBRACKET,
+        str(TokenKind.RBRACKET):  TokenKind.RBRACKET,
+        # fmt: on
+    }
+
     kind: TokenKind
     literal: str
     location: Optional[SourceLocation] = None
@@ -1539,21 +3347,60 @@ class Token:
 
 class Lexer:
     EOF_LITERAL = ""
-    RE_IDENTIFIER = re.compile(r"^[a-zA-Z_]\w*", re.ASCII)
     RE_NUMBER_DEC = re.compile(r"^\d+(\.\d+)?", re.ASCII)
     RE_NUMBER_HEX = re.compile(r"^0x[0-9a-fA-F]+", re.ASCII)
-    RE_INTEGER_DEC = re.compile(r"^\d+", re.ASCII)
+    RE_INTEGER_DEC = re.compile(r"\d+", re.ASCII)
+    # Runs of whitespace and comments between tokens, skipped in bulk.
+    RE_SKIP = re.compile(r"(?:[ \t\n\r\v\f]+|#[^\n]*\n?)*")
+    # Master token regular expression. The name of the matched group selects
+    # how the token is lexed: numbers, identifiers, keywords, and operators
+    # are produced directly from the match, while string, template, regexp,
+    # and regexp group literals are handed off to their own lexing functions
+    # starting from the beginning of the match. Multi-rune operators appear
+    # before the single-rune operators they start with.
+    RE_TOKEN = re.compile(
+        r"""
+        (?P<number>0x[0-9a-fA-F]+|\d+(?:\.\d+)?)
+        |(?P<string>")
+        |(?P<raw>`)
+        |(?P<template>\$["`])
+        |(?P<regexp>r["`])
+        |(?P<group>\$\d)
+        |(?P<identifier>[a-zA-Z_]\w*)
+        |(?P<operator>==|!=|<=|>=|=~|!~|\.&|\.\*|::|[-+*/%<>.=,:;(){}\[\]])
+        """,
+        re.ASCII | re.VERBOSE,
+    )
+    # Runs of string literal text containing no escape sequences, closing
+    # delimiters, newlines, or template braces. These runs are lexed in bulk
+    # rather than one rune at a time.
+    RE_ESC_STRING_TEXT = re.compile(r'[^"\\\n{}]+')
+    RE_RAW_STRING_TEXT = re.compile(r"[^`{}]+")
 
-    def __init__(self, source: str, location: Optional[SourceLocation] = None):
+    def __init__(
+        self,
+        source: str,
+        location: Optional[SourceLocation] = None,
+        position: int = 0,
+    ):
         self.source = source
         # What position does the source "start" being parsed from.
         # None if the source is being lexed in a location-independent manner.
-        self.location = location
-        self.position = 0
+        self._location = location
+        self.position = position
+        # Offset up to which newlines have been counted into the line of the
+        # location. Line numbers are computed from source offsets on demand
+        # instead of being tracked as each rune is consumed.
+        self._line_position = position
 
-    @staticmethod
-    def _is_letter(ch: str) -> bool:
-        return ch.isalpha() or ch == "_"
+    @property
+    def location(self) -> Optional[SourceLocation]:
+        if self._location is not None and self._line_position < self.position:
+            self._location.line += self.source.count(
+                "\n", self._line_position, self.position
+            )
+            self._line_position = self.position
+        return self._location
 
     def _current_rune(self) -> str:
         if self.position >= len(self.source):
@@ -1568,14 +3415,12 @@ class Lexer:
     def _is_eof(self) -> bool:
         return self.position >= len(self.source)
 
-    def _remaining(self) -> str:
-        return self.source[self.position :]
+    def _startswith(self, prefix: str) -> bool:
+        return self.source.startswith(prefix, self.position)
 
     def _advance_rune(self) -> None:
         if self._is_eof():
             return
-        if self.location is not None and self._current_rune() == "\n":
-            self.location.line += 1
         self.position += 1
 
     def _expect_rune(self, r: str) -> None:
@@ -1593,48 +3438,19 @@ class Lexer:
             )
         self._advance_rune()
 
-    def _skip_whitespace(self) -> None:
-        while not self._is_eof() and self._current_rune() in whitespace:
-            self._advance_rune()
-
-    def _skip_comment(self) -> None:
-        if self._current_rune() != "#":
-            return
-        while not self._is_eof() and self._current_rune() != "\n":
-            self._advance_rune()
-        self._advance_rune()
-
     def _skip_whitespace_and_comments(self) -> None:
-        while not self._is_eof() and (
-            self._current_rune() in whitespace or self._current_rune() == "#"
-        ):
-            self._skip_whitespace()
-            self._skip_comment()
+        match = Lexer.RE_SKIP.match(self.source, self.position)
+        assert match is not None  # guaranteed by regexp
+        self.position = match.end()
 
     def _new_token(self, kind: TokenKind, literal: str, **kwargs) -> Token:
-        location = (
-            SourceLocation(self.location.file, self.location.line)
-            if self.location is not None
-            else None
-        )
+        location = self.location
+        if location is not None:
+            location = SourceLocation(location.file, location.line)
         return Token(kind, literal, location, **kwargs)
 
-    def _lex_keyword_or_identifier(self) -> Token:
-        assert Lexer._is_letter(self._current_rune())
-        match = Lexer.RE_IDENTIFIER.match(self.source[self.position :])
-        assert match is not None  # guaranteed by regexp
-        text = match[0]
-        self.position += len(text)
-        if text in Token.KEYWORDS:
-            return self._new_token(Token.KEYWORDS[text], text)
-        return self._new_token(TokenKind.IDENTIFIER, text)
-
-    def _lex_number(self) -> Token:
-        assert self._current_rune() in digits
-        match = Lexer.RE_NUMBER_HEX.match(self.source[self.position :])
-        if match is not None:
-            text = match[0]
-            self.position += len(text)
+    def _lex_number(self, text: str) -> Token:
+        if Lexer.RE_NUMBER_HEX.match(text) is not None:
             integer = int(text, 16)
             if integer < MIN_SAFE_INTEGER or integer > MAX_SAFE_INTEGER:
                 raise ParseError(
@@ -1642,15 +3458,16 @@ class Lexer:
                     f"hexadecimal integer {text} is outside the safe integer range",
                 )
             return self._new_token(
-                TokenKind.NUMBER, text, value=Number.new(float(int(text, 16)))
+                TokenKind.NUMBER, text, value=Number.new(float(integer))
             )
-        match = Lexer.RE_NUMBER_DEC.match(self.source[self.position :])
-        assert match is not None  # guaranteed by regexp
-        text = match[0]
-        self.position += len(text)
         return self._new_token(TokenKind.NUMBER, text, value=Number.new(float(text)))
 
     def _lex_esc_string_part(self) -> bytes:
+        match = Lexer.RE_ESC_STRING_TEXT.match(self.source, self.position)
+        if match is not None and match[0].isprintable():
+            self.position = match.end()
+            return match[0].encode("utf-8")
+
         if self._is_eof():
             raise ParseError(
                 self.location,
@@ -1742,14 +3559,21 @@ class Lexer:
     def _lex_esc_string(self) -> Token:
         start = self.position
         self._expect_rune('"')
-        string = b""
+        parts: list[bytes] = list()
         while not self._is_eof() and self._current_rune() != '"':
-            string += self._lex_esc_string_part()
+            parts.append(self._lex_esc_string_part())
         self._expect_rune('"')
         literal = self.source[start : self.position]
-        return self._new_token(TokenKind.STRING, literal, value=String.new(string))
+        return self._new_token(
+            TokenKind.STRING, literal, value=String.new(b"".join(parts))
+        )
 
     def _lex_raw_string_part(self) -> bytes:
+        match = Lexer.RE_RAW_STRING_TEXT.match(self.source, self.position)
+        if match is not None:
+            self.position = match.end()
+            return match[0].encode("utf-8")
+
         if self._is_eof():
             raise ParseError(
                 self.location,
@@ -1762,14 +3586,15 @@ class Lexer:
     def _lex_raw_string(self) -> Token:
         location = copy(self.location)
         start = self.position
-        string = b""
-        if self._remaining().startswith("```"):
+        if self._startswith("```"):
             self._expect_rune("`")
             self._expect_rune("`")
             self._expect_rune("`")
-            while not self._is_eof() and not self._remaining().startswith("```"):
-                string += self._current_rune().encode("utf-8")
-                self._advance_rune()
+            end = self.source.find("```", self.position)
+            if end == -1:
+                end = len(self.source)
+            string = self.source[self.position : end].encode("utf-8")
+            self.position = end
             self._expect_rune("`")
             self._expect_rune("`")
             self._expect_rune("`")
@@ -1783,9 +3608,11 @@ class Lexer:
                 )
         else:
             self._expect_rune("`")
-            while not self._is_eof() and self._current_rune() != "`":
-                string += self._current_rune().encode("utf-8")
-                self._advance_rune()
+            end = self.source.find("`", self.position)
+            if end == -1:
+                end = len(self.source)
+            string = self.source[self.position : end].encode("utf-8")
+            self.position = end
             self._expect_rune("`")
             literal = self.source[start : self.position]
         return Token(
@@ -1802,15 +3629,15 @@ class Lexer:
 
         def lex_template_element(default_func):
             nonlocal string
-            if self._remaining().startswith("{{"):
+            if self._startswith("{{"):
                 string += "{"
                 self.position += len("{{")
                 return
-            if self._remaining().startswith("}}"):
+            if self._startswith("}}"):
                 string += "}"
                 self.position += len("}}")
                 return
-            if self._remaining().startswith("{"):
+            if self._startswith("{"):
                 if len(string) != 0:
                     template.append(
                         AstExpressionString(
@@ -1820,7 +3647,7 @@ class Lexer:
                     string = str()
                 self.position += len("{")
                 try:
-                    lexer = Lexer(self._remaining(), copy(self.location))
+                    lexer = Lexer(self.source, copy(self.location), self.position)
                     parser = Parser(lexer)
                     expression = parser.parse_expression()
                 except Exception as e:
@@ -1831,15 +3658,15 @@ class Lexer:
                         location,
                         f"expected `}}` to close template expression, found {quote(parser.current_token.kind)}",
                     )
-                self.position += self._remaining().rfind(lexer._remaining())
+                self.position = lexer.position
                 return
             string += default_func()
 
-        if self._remaining().startswith("```"):
+        if self._startswith("```"):
             self._expect_rune("`")
             self._expect_rune("`")
             self._expect_rune("`")
-            while not self._is_eof() and not self._remaining().startswith("```"):
+            while not self._is_eof() and not self._startswith("```"):
                 lex_template_element(
                     lambda: self._lex_raw_string_part().decode("utf-8")
                 )
@@ -1913,7 +3740,7 @@ class Lexer:
     def _lex_regexp_group(self) -> Token:
         start = self.position
         self._expect_rune("$")
-        match = Lexer.RE_INTEGER_DEC.match(self.source[self.position :])
+        match = Lexer.RE_INTEGER_DEC.match(self.source, self.position)
         if match is None:
             raise ParseError(copy(self.location), "invalid regexp capture group")
         text = match[0]
@@ -1930,129 +3757,40 @@ class Lexer:
         return self._new_token(TokenKind.REGEXP_GROUP, literal, group=int(text))
 
     def next_token(self) -> Token:
-        if self.location is not None:
-            file = self.location.file
-            line = self.location.line
-            self.location = SourceLocation(file, line)
-
         self._skip_whitespace_and_comments()
         if self._is_eof():
             return self._new_token(TokenKind.EOF, Lexer.EOF_LITERAL)
 
+        match = Lexer.RE_TOKEN.match(self.source, self.position)
+        if match is None:
+            raise ParseError(
+                self.location,
+                f"unknown token {quote(self._current_rune())}",
+            )
+        kind = match.lastgroup
+
         # Literals, Identifiers, and Keywords
-        if self._current_rune() in digits:
-            return self._lex_number()
-        if self._current_rune() == '"':
+        if kind == "number":
+            self.position = match.end()
+            return self._lex_number(match[0])
+        if kind == "string":
             return self._lex_esc_string()
-        if self._current_rune() == "`":
+        if kind == "raw":
             return self._lex_raw_string()
-        if self._remaining().startswith('$"') or self._remaining().startswith("$`"):
+        if kind == "template":
             return self._lex_template()
-        if self._remaining().startswith('r"') or self._remaining().startswith("r`"):
+        if kind == "regexp":
             return self._lex_regexp()
-        if self._remaining().startswith("$") and self._peek_rune().isdigit():
+        if kind == "group":
             return self._lex_regexp_group()
-        if Lexer._is_letter(self._current_rune()):
-            return self._lex_keyword_or_identifier()
-
-        # Operators
-        if self._current_rune() == "+":
-            self._advance_rune()
-            return self._new_token(TokenKind.ADD, str(TokenKind.ADD))
-        if self._current_rune() == "-":
-            self._advance_rune()
-            return self._new_token(TokenKind.SUB, str(TokenKind.SUB))
-        if self._current_rune() == "*":
-            self._advance_rune()
-            return self._new_token(TokenKind.MUL, str(TokenKind.MUL))
-        if self._current_rune() == "/":
-            self._advance_rune()
-            return self._new_token(TokenKind.DIV, str(TokenKind.DIV))
-        if self._current_rune() == "%":
-            self._advance_rune()
-            return self._new_token(TokenKind.REM, str(TokenKind.REM))
-        if self._current_rune() == "=" and self._peek_rune() == "=":
-            self._advance_rune()
-            self._advance_rune()
-            return self._new_token(TokenKind.EQ, str(TokenKind.EQ))
-        if self._current_rune() == "!" and self._peek_rune() == "=":
-            self._advance_rune()
-            self._advance_rune()
-            return self._new_token(TokenKind.NE, str(TokenKind.NE))
-        if self._current_rune() == "<" and self._peek_rune() == "=":
-            self._advance_rune()
-            self._advance_rune()
-            return self._new_token(TokenKind.LE, str(TokenKind.LE))
-        if self._current_rune() == ">" and self._peek_rune() == "=":
-            self._advance_rune()
-            self._advance_rune()
-            return self._new_token(TokenKind.GE, str(TokenKind.GE))
-        if self._current_rune() == "<":
-            self._advance_rune()
-            return self._new_token(TokenKind.LT, str(TokenKind.LT))
-        if self._current_rune() == ">":
-            self._advance_rune()
-            return self._new_token(TokenKind.GT, str(TokenKind.GT))
-        if self._current_rune() == "=" and self._peek_rune() == "~":
-            self._advance_rune()
-            self._advance_rune()
-            return self._new_token(TokenKind.EQ_RE, str(TokenKind.EQ_RE))
-        if self._current_rune() == "!" and self._peek_rune() == "~":
-            self._advance_rune()
-            self._advance_rune()
-            return self._new_token(TokenKind.NE_RE, str(TokenKind.NE_RE))
-        if self._current_rune() == "." and self._peek_rune() == "&":
-            self._advance_rune()
-            self._advance_rune()
-            return self._new_token(TokenKind.MKREF, str(TokenKind.MKREF))
-        if self._current_rune() == "." and self._peek_rune() == "*":
-            self._advance_rune()
-            self._advance_rune()
-            return self._new_token(TokenKind.DEREF, str(TokenKind.DEREF))
-        if self._current_rune() == ".":
-            self._advance_rune()
-            return self._new_token(TokenKind.DOT, str(TokenKind.DOT))
-        if self._current_rune() == ":" and self._peek_rune() == ":":
-            self._advance_rune()
-            self._advance_rune()
-            return self._new_token(TokenKind.SCOPE, str(TokenKind.SCOPE))
-        if self._current_rune() == "=":
-            self._advance_rune()
-            return self._new_token(TokenKind.ASSIGN, str(TokenKind.ASSIGN))
-
-        # Delimiters
-        if self._current_rune() == ",":
-            self._advance_rune()
-            return self._new_token(TokenKind.COMMA, str(TokenKind.COMMA))
-        if self._current_rune() == ":":
-            self._advance_rune()
-            return self._new_token(TokenKind.COLON, str(TokenKind.COLON))
-        if self._current_rune() == ";":
-            self._advance_rune()
-            return self._new_token(TokenKind.SEMICOLON, str(TokenKind.SEMICOLON))
-        if self._current_rune() == "(":
-            self._advance_rune()
-            return self._new_token(TokenKind.LPAREN, str(TokenKind.LPAREN))
-        if self._current_rune() == ")":
-            self._advance_rune()
-            return self._new_token(TokenKind.RPAREN, str(TokenKind.RPAREN))
-        if self._current_rune() == "{":
-            self._advance_rune()
-            return self._new_token(TokenKind.LBRACE, str(TokenKind.LBRACE))
-        if self._current_rune() == "}":
-            self._advance_rune()
-            return self._new_token(TokenKind.RBRACE, str(TokenKind.RBRACE))
-        if self._current_rune() == "[":
-            self._advance_rune()
-            return self._new_token(TokenKind.LBRACKET, str(TokenKind.LBRACKET))
-        if self._current_rune() == "]":
-            self._advance_rune()
-            return self._new_token(TokenKind.RBRACKET, str(TokenKind.RBRACKET))
+        if kind == "identifier":
+            self.position = match.end()
+            return self._new_token(Token.lookup_identifier(match[0]), match[0])
 
-        raise ParseError(
-            self.location,
-            f"unknown token {quote(self._current_rune())}",
-        )
+        # Operators and Delimiters
+        assert kind == "operator"
+        self.position = match.end()
+        return self._new_token(Token.OPERATORS[match[0]], match[0])
 
 
 @dataclass
@@ -2073,10 +3811,22 @@ class EnvRefInfo:
     value: Value
 
 
+# Lexical address of a binding as produced by the resolver. The depth is the
+# number of environments to walk outward from the environment in which an
+# identifier is evaluated, and the slot is the index of the binding within the
+# slots of that environment. A slot of None indicates that the binding should
+# be looked up by name starting from that environment, which is the case for
+# bindings introduced at the top level of a program or by the base environment.
+Address = Tuple[int, Optional[int]]
+
+
 class Environment:
-    def __init__(self, outer: Optional["Environment"] = None):
+    __slots__ = ("outer", "store", "slots", "match", "refs", "nref")
+
+    def __init__(self, outer: Optional["Environment"] = None, size: int = 0):
         self.outer: Optional["Environment"] = outer
         self.store: dict[String, Value] = dict()
+        self.slots: list[Optional[Value]] = [None] * size
         self.match = None
         self.refs: list[EnvRefInfo] = []
         self.nref: int = outer.nref if outer is not None else 0
@@ -2089,6 +3839,59 @@ class Environment:
             self.nref += 1
         self.store[name] = value
 
+    def let_slot(
+        self,
+        slot: int,
+        name: String,
+        value: Value,
+        location: Optional[SourceLocation] = None,
+    ) -> None:
+        if isinstance(value, Reference):
+            self.refs.append(EnvRefInfo(location, name, value))
+            self.nref += 1
+        self.slots[slot] = value
+
+    def at(self, depth: int) -> "Environment":
+        env = self
+        while depth > 0:
+            assert env.outer is not None
+            env = env.outer
+            depth -= 1
+        return env
+
+    # Lookup of a resolved identifier. Each address is tried in order, and an
+    # address referring to a slot that has not been bound yet (e.g. a function
+    # referring to a let binding declared after that function in the same
+    # scope) falls through to the next address, mirroring the behavior of
+    # walking the chain of environments by name.
+    def get_address(self, address: Optional[list[Address]], name: String) -> Value:
+        if address is None:
+            return self.get(name)
+        for depth, slot in address:
+            env = self.at(depth)
+            if slot is None:
+                return env.get(name)
+            value = env.slots[slot]
+            if value is not None:
+                return value
+        raise Exception(f"identifier {quote(name.runes)} is not defined")
+
+    def set_address(
+        self, address: Optional[list[Address]], name: String, value: Value
+    ) -> None:
+        if address is None:
+            return self.set(name, value)
+        if isinstance(value, Reference):
+            raise Exception("attempted assignment with a reference value")
+        for depth, slot in address:
+            env = self.at(depth)
+            if slot is None:
+                return env.set(name, value)
+            if env.slots[slot] is not None:
+                env.slots[slot] = value
+                return
+        raise Exception(f"identifier {quote(name.runes)} is not defined")
+
     def set(self, name: String, value: Value) -> None:
         # References *should* only ever be introduced to a lexical scope via a
         # call to Environment.let() from within the Mellifera runtime.
@@ -2138,22 +3941,44 @@ class Continue:
     location: Optional[SourceLocation]
 
 
+# Errors are frequently produced and discarded without ever being displayed
+# (e.g. within a try-catch probing for a missing key), so the value of an error
+# may be provided as a function producing the error message, and the names of
+# the functions in the trace of an error are only formatted when displayed.
 @dataclass
 class Error:
     @dataclass
     class TraceElement:
         location: Optional[SourceLocation]
-        funcname: str
+        function: Union[Value, str]
+
+        @property
+        def funcname(self) -> str:
+            return str(self.function)
 
     location: Optional[SourceLocation]
-    value: Value
+    message: Union[str, Value, Callable[[], str]]
     trace: list[TraceElement]
 
-    def __init__(self, location: Optional[SourceLocation], value: Union[str, Value]):
+    def __init__(
+        self,
+        location: Optional[SourceLocation],
+        value: Union[str, Value, Callable[[], str]],
+    ):
         self.location = location
-        self.value = String.new(value) if isinstance(value, str) else value
+        self.message = value
         self.trace = list()
 
+    @property
+    def value(self) -> Value:
+        if isinstance(self.message, Value):
+            return self.message
+        if isinstance(self.message, str):
+            self.message = String.new(self.message)
+        else:
+            self.message = String.new(self.message())
+        return self.message
+
     def __str__(self):
         if isinstance(self.value, String):
             return f"{self.value.runes}"
@@ -2207,6 +4032,9 @@ class AstNode(ABC):
 
 class AstExpression(AstNode):
     location: Optional[SourceLocation]
+    # Assigned by the liveness analysis for expressions producing a value that
+    # is owned by the consumer of that value and need not be copied.
+    moved: bool = False
 
     @abstractmethod
     def eval(self, env: Environment) -> Union[Value, Error]:
@@ -2293,6 +4121,11 @@ class AstExpressionIdentifier(AstExpression):
 
     location: Optional[SourceLocation]
     name: String  # cached
+    # Lexical address assigned by the resolver. The depth and slot fields
+    # duplicate the first element of the address for fast-path lookup.
+    address: Optional[list[Address]] = None
+    depth: int = 0
+    slot: Optional[int] = None
 
     def into_value(self) -> Value:
         return Map.new(
@@ -2306,12 +4139,38 @@ class AstExpressionIdentifier(AstExpression):
         )
 
     def eval(self, env: Environment) -> Union[Value, Error]:
+        if self.slot is not None:
+            frame = env if self.depth == 0 else env.at(self.depth)
+            value = frame.slots[self.slot]
+            if value is not None:
+                return value
         try:
-            return env.get(self.name)
+            return env.get_address(self.address, self.name)
         except Exception as e:
             return Error(self.location, str(e))
 
 
+# Returns the bytes of a value as interpolated into a template string, using
+# the into_string metafunction of the value if one exists.
+def template_bytes(
+    location: Optional[SourceLocation], value: Value
+) -> Union[bytes, Error]:
+    metafunction = value.metafunction(CONST_STRING_INTO_STRING)
+    if metafunction is not None:
+        result = call_meta_with_self(location, metafunction, value)
+        if isinstance(result, Error):
+            return result
+        if not isinstance(result, String):
+            return Error(
+                location,
+                f"metafunction {quote(CONST_STRING_INTO_STRING.runes)} returned {result}",
+            )
+        return result.bytes
+    if isinstance(value, String):
+        return value.bytes
+    return str(value).encode("utf-8")
+
+
 @final
 @dataclass
 class AstExpressionTemplate(AstExpression):
@@ -2332,28 +4191,16 @@ class AstExpressionTemplate(AstExpression):
         )
 
     def eval(self, env: Environment) -> Union[Value, Error]:
-        output = bytes()
+        output: list[bytes] = list()
         for element in self.template:
             result = element.eval(env)
             if isinstance(result, Error):
                 return result
-            metafunction = result.metafunction(CONST_STRING_INTO_STRING)
-            if metafunction is not None:
-                result = call_meta_with_self(element.location, metafunction, result)
-                if isinstance(result, Error):
-                    return result
-                if not isinstance(result, String):
-                    return Error(
-                        element.location,
-                        f"metafunction {quote(CONST_STRING_INTO_STRING.runes)} returned {result}",
-                    )
-                output += result.bytes
-                continue
-            if isinstance(result, String):
-                output += result.bytes
-                continue
-            output += str(result).encode("utf-8")
-        return String.new(output)
+            data = template_bytes(element.location, result)
+            if isinstance(data, Error):
+                return data
+            output.append(data)
+        return String.new(b"".join(output))
 
 
 @final
@@ -2601,9 +4448,11 @@ class AstExpressionFunction(AstExpression):
     body: "AstBlock"
     name: Optional[String] = None
     self_by_reference: bool = False
+    generator: bool = False  # function body contains a yield statement
+    compiled: Any = None  # assigned by the execution engine
 
     def into_value(self) -> Value:
-        return Map.new(
+        result = Map.new(
             {
                 String.new("kind"): String.new(self.__class__.__name__),
                 String.new("location"): SourceLocation.optional_into_value(
@@ -2617,6 +4466,13 @@ class AstExpressionFunction(AstExpression):
                 String.new("self_by_reference"): Boolean.new(self.self_by_reference),
             }
         )
+        # Generator functions are an extension of the Python reference
+        # interpreter, so only generator functions dump the generator field,
+        # keeping the dumps of other functions compatible with the Go
+        # interpreter.
+        if self.generator:
+            result[String.new("generator")] = Boolean.new(True)
+        return result
 
     def eval(self, env: Environment) -> Union[Value, Error]:
         if env.nref > 0:
@@ -2842,6 +4698,9 @@ class AstExpressionPositive(AstExpression):
         result = self.expression.eval(env)
         if isinstance(result, Error):
             return result
+        return self.operate(result)
+
+    def operate(self, result: Value) -> Union[Value, Error]:
         if isinstance(result, Number):
             return Number.new(+float(result.data))
         return Error(
@@ -2871,6 +4730,11 @@ class AstExpressionNegative(AstExpression):
         result = self.expression.eval(env)
         if isinstance(result, Error):
             return result
+        return self.operate(result)
+
+    def operate(self, result: Value) -> Union[Value, Error]:
+        if isinstance(result, Array):
+            return result.apply(operator.neg, "negative", lambda x: Number.new(-x))
         if not isinstance(result, Number):
             return Error(
                 self.location,
@@ -2900,6 +4764,9 @@ class AstExpressionNot(AstExpression):
         result = self.expression.eval(env)
         if isinstance(result, Error):
             return result
+        return self.operate(result)
+
+    def operate(self, result: Value) -> Union[Value, Error]:
         if isinstance(result, Boolean):
             return Boolean.new(not result.data)
         return Error(
@@ -2998,12 +4865,92 @@ class AstExpressionOr(AstExpression):
         return Boolean.new(False)
 
 
+# Binary expressions that quicken, i.e. replace their own generic eval method
+# with a specialization for the operand types observed when first evaluated.
+# Each node declares the kernel applied to each pair of specialized operand
+# types. The specialization guards on the types of its operands and deoptimizes
+# back to the generic eval method when that guard fails, after which the node is
+# considered polymorphic and is never specialized again.
+class AstExpressionQuickening(AstExpression):
+    lhs: AstExpression
+    rhs: AstExpression
+    polymorphic: bool
+    # Kernel applied to the operands for each pair of specialized operand types.
+    SPECIALIZATIONS: ClassVar[
+        dict[Tuple[type, type], Callable[[Any, Any], Union[Value, Error]]]
+    ] = dict()
+
+    @abstractmethod
+    def operate(self, lhs: Value, rhs: Value) -> Union[Value, Error]:
+        raise NotImplementedError()
+
+    def eval(self, env: Environment) -> Union[Value, Error]:
+        lhs = self.lhs.eval(env)
+        if isinstance(lhs, Error):
+            return lhs
+        rhs = self.rhs.eval(env)
+        if isinstance(rhs, Error):
+            return rhs
+        self.quicken(lhs, rhs)
+        return self.operate(lhs, rhs)
+
+    def quicken(self, lhs: Value, rhs: Value) -> None:
+        if self.polymorphic:
+            return
+        kernel = self.SPECIALIZATIONS.get((type(lhs), type(rhs)))
+        if kernel is not None:
+            specialization = self.specialize(type(lhs), type(rhs), kernel)
+            self.eval = specialization  # type: ignore[method-assign, assignment]
+
+    # Specialized eval method applying kernel to operands of exactly the types
+    # lhs_type and rhs_type.
+    def specialize(
+        self,
+        lhs_type: type,
+        rhs_type: type,
+        kernel: Callable[[Any, Any], Union[Value, Error]],
+    ) -> Callable[[Environment], Union[Value, Error]]:
+        def eval(env: Environment) -> Union[Value, Error]:
+            lhs = self.lhs.eval(env)
+            if type(lhs) is lhs_type:
+                rhs = self.rhs.eval(env)
+                if type(rhs) is rhs_type:
+                    return kernel(lhs, rhs)
+                return self.deoptimize(env, lhs, rhs)
+            return self.deoptimize(env, lhs)
+
+        return eval
+
+    # Reverts to the generic eval method and completes evaluation with the
+    # already evaluated operand(s).
+    def deoptimize(
+        self,
+        env: Environment,
+        lhs: Union[Value, Error],
+        rhs: Optional[Union[Value, Error]] = None,
+    ) -> Union[Value, Error]:
+        self.__dict__.pop("eval", None)
+        self.polymorphic = True
+        if isinstance(lhs, Error):
+            return lhs
+        if rhs is None:
+            rhs = self.rhs.eval(env)
+        if isinstance(rhs, Error):
+            return rhs
+        return self.operate(lhs, rhs)
+
+
 @final
 @dataclass
-class AstExpressionEq(AstExpression):
+class AstExpressionEq(AstExpressionQuickening):
     location: Optional[SourceLocation]
     lhs: AstExpression
     rhs: AstExpression
+    polymorphic: bool = False
+    SPECIALIZATIONS = {
+        (Number, Number): lambda lhs, rhs: Boolean.new(lhs == rhs),
+        (String, String): lambda lhs, rhs: Boolean.new(lhs == rhs),
+    }
 
     def into_value(self) -> Value:
         return Map.new(
@@ -3017,22 +4964,21 @@ class AstExpressionEq(AstExpression):
             }
         )
 
-    def eval(self, env: Environment) -> Union[Value, Error]:
-        lhs = self.lhs.eval(env)
-        if isinstance(lhs, Error):
-            return lhs
-        rhs = self.rhs.eval(env)
-        if isinstance(rhs, Error):
-            return rhs
+    def operate(self, lhs: Value, rhs: Value) -> Union[Value, Error]:
         return Boolean.new(lhs == rhs)
 
 
 @final
 @dataclass
-class AstExpressionNe(AstExpression):
+class AstExpressionNe(AstExpressionQuickening):
     location: Optional[SourceLocation]
     lhs: AstExpression
     rhs: AstExpression
+    polymorphic: bool = False
+    SPECIALIZATIONS = {
+        (Number, Number): lambda lhs, rhs: Boolean.new(lhs != rhs),
+        (String, String): lambda lhs, rhs: Boolean.new(lhs != rhs),
+    }
 
     def into_value(self) -> Value:
         return Map.new(
@@ -3046,22 +4992,23 @@ class AstExpressionNe(AstExpression):
             }
         )
 
-    def eval(self, env: Environment) -> Union[Value, Error]:
-        lhs = self.lhs.eval(env)
-        if isinstance(lhs, Error):
-            return lhs
-        rhs = self.rhs.eval(env)
-        if isinstance(rhs, Error):
-            return rhs
+    def operate(self, lhs: Value, rhs: Value) -> Union[Value, Error]:
         return Boolean.new(lhs != rhs)
 
 
 @final
 @dataclass
-class AstExpressionLe(AstExpression):
+class AstExpressionLe(AstExpressionQuickening):
     location: Optional[SourceLocation]
     lhs: AstExpression
     rhs: AstExpression
+    polymorphic: bool = False
+    SPECIALIZATIONS = {
+        (Number, Number): lambda lhs, rhs: Boolean.new(
+            float(lhs.data) <= float(rhs.data)
+        ),
+        (String, String): lambda lhs, rhs: Boolean.new(lhs.bytes <= rhs.bytes),
+    }
 
     def into_value(self) -> Value:
         return Map.new(
@@ -3075,17 +5022,13 @@ class AstExpressionLe(AstExpression):
             }
         )
 
-    def eval(self, env: Environment) -> Union[Value, Error]:
-        lhs = self.lhs.eval(env)
-        if isinstance(lhs, Error):
-            return lhs
-        rhs = self.rhs.eval(env)
-        if isinstance(rhs, Error):
-            return rhs
+    def operate(self, lhs: Value, rhs: Value) -> Union[Value, Error]:
         if isinstance(lhs, Number) and isinstance(rhs, Number):
             return Boolean.new(float(lhs.data) <= float(rhs.data))
         if isinstance(lhs, String) and isinstance(rhs, String):
             return Boolean.new(lhs.bytes <= rhs.bytes)
+        if (result := array_operate(self.location, "<=", lhs, rhs)) is not None:
+            return result
         return Error(
             self.location,
             f"attempted <= operation with types {quote(typename(lhs))} and {quote(typename(rhs))}",
@@ -3094,10 +5037,17 @@ class AstExpressionLe(AstExpression):
 
 @final
 @dataclass
-class AstExpressionGe(AstExpression):
+class AstExpressionGe(AstExpressionQuickening):
     location: Optional[SourceLocation]
     lhs: AstExpression
     rhs: AstExpression
+    polymorphic: bool = False
+    SPECIALIZATIONS = {
+        (Number, Number): lambda lhs, rhs: Boolean.new(
+            float(lhs.data) >= float(rhs.data)
+        ),
+        (String, String): lambda lhs, rhs: Boolean.new(lhs.bytes >= rhs.bytes),
+    }
 
     def into_value(self) -> Value:
         return Map.new(
@@ -3111,17 +5061,13 @@ class AstExpressionGe(AstExpression):
             }
         )
 
-    def eval(self, env: Environment) -> Union[Value, Error]:
-        lhs = self.lhs.eval(env)
-        if isinstance(lhs, Error):
-            return lhs
-        rhs = self.rhs.eval(env)
-        if isinstance(rhs, Error):
-            return rhs
+    def operate(self, lhs: Value, rhs: Value) -> Union[Value, Error]:
         if isinstance(lhs, Number) and isinstance(rhs, Number):
             return Boolean.new(float(lhs.data) >= float(rhs.data))
         if isinstance(lhs, String) and isinstance(rhs, String):
             return Boolean.new(lhs.bytes >= rhs.bytes)
+        if (result := array_operate(self.location, ">=", lhs, rhs)) is not None:
+            return result
         return Error(
             self.location,
             f"attempted >= operation with types {quote(typename(lhs))} and {quote(typename(rhs))}",
@@ -3130,10 +5076,17 @@ class AstExpressionGe(AstExpression):
 
 @final
 @dataclass
-class AstExpressionLt(AstExpression):
+class AstExpressionLt(AstExpressionQuickening):
     location: Optional[SourceLocation]
     lhs: AstExpression
     rhs: AstExpression
+    polymorphic: bool = False
+    SPECIALIZATIONS = {
+        (Number, Number): lambda lhs, rhs: Boolean.new(
+            float(lhs.data) < float(rhs.data)
+        ),
+        (String, String): lambda lhs, rhs: Boolean.new(lhs.bytes < rhs.bytes),
+    }
 
     def into_value(self) -> Value:
         return Map.new(
@@ -3147,17 +5100,13 @@ class AstExpressionLt(AstExpression):
             }
         )
 
-    def eval(self, env: Environment) -> Union[Value, Error]:
-        lhs = self.lhs.eval(env)
-        if isinstance(lhs, Error):
-            return lhs
-        rhs = self.rhs.eval(env)
-        if isinstance(rhs, Error):
-            return rhs
+    def operate(self, lhs: Value, rhs: Value) -> Union[Value, Error]:
         if isinstance(lhs, Number) and isinstance(rhs, Number):
             return Boolean.new(float(lhs.data) < float(rhs.data))
         if isinstance(lhs, String) and isinstance(rhs, String):
             return Boolean.new(lhs.bytes < rhs.bytes)
+        if (result := array_operate(self.location, "<", lhs, rhs)) is not None:
+            return result
         return Error(
             self.location,
             f"attempted < operation with types {quote(typename(lhs))} and {quote(typename(rhs))}",
@@ -3166,10 +5115,17 @@ class AstExpressionLt(AstExpression):
 
 @final
 @dataclass
-class AstExpressionGt(AstExpression):
+class AstExpressionGt(AstExpressionQuickening):
     location: Optional[SourceLocation]
     lhs: AstExpression
     rhs: AstExpression
+    polymorphic: bool = False
+    SPECIALIZATIONS = {
+        (Number, Number): lambda lhs, rhs: Boolean.new(
+            float(lhs.data) > float(rhs.data)
+        ),
+        (String, String): lambda lhs, rhs: Boolean.new(lhs.bytes > rhs.bytes),
+    }
 
     def into_value(self) -> Value:
         return Map.new(
@@ -3183,17 +5139,13 @@ class AstExpressionGt(AstExpression):
             }
         )
 
-    def eval(self, env: Environment) -> Union[Value, Error]:
-        lhs = self.lhs.eval(env)
-        if isinstance(lhs, Error):
-            return lhs
-        rhs = self.rhs.eval(env)
-        if isinstance(rhs, Error):
-            return rhs
+    def operate(self, lhs: Value, rhs: Value) -> Union[Value, Error]:
         if isinstance(lhs, Number) and isinstance(rhs, Number):
             return Boolean.new(float(lhs.data) > float(rhs.data))
         if isinstance(lhs, String) and isinstance(rhs, String):
             return Boolean.new(lhs.bytes > rhs.bytes)
+        if (result := array_operate(self.location, ">", lhs, rhs)) is not None:
+            return result
         return Error(
             self.location,
             f"attempted > operation with types {quote(typename(lhs))} and {quote(typename(rhs))}",
@@ -3274,10 +5226,20 @@ class AstExpressionNeRe(AstExpression):
 
 @final
 @dataclass
-class AstExpressionAdd(AstExpression):
+class AstExpressionAdd(AstExpressionQuickening):
     location: Optional[SourceLocation]
     lhs: AstExpression
     rhs: AstExpression
+    polymorphic: bool = False
+    SPECIALIZATIONS = {
+        (Number, Number): lambda lhs, rhs: Number.new(
+            float(lhs.data) + float(rhs.data)
+        ),
+        (String, String): lambda lhs, rhs: lhs.concat(rhs.bytes),
+        (Vector, Vector): lambda lhs, rhs: Vector.new(
+            [copy(x) for x in lhs.data] + [copy(x) for x in rhs.data]
+        ),
+    }
 
     def into_value(self) -> Value:
         return Map.new(
@@ -3291,19 +5253,15 @@ class AstExpressionAdd(AstExpression):
             }
         )
 
-    def eval(self, env: Environment) -> Union[Value, Error]:
-        lhs = self.lhs.eval(env)
-        if isinstance(lhs, Error):
-            return lhs
-        rhs = self.rhs.eval(env)
-        if isinstance(rhs, Error):
-            return rhs
+    def operate(self, lhs: Value, rhs: Value) -> Union[Value, Error]:
         if isinstance(lhs, Number) and isinstance(rhs, Number):
             return Number.new(float(lhs.data) + float(rhs.data))
         if isinstance(lhs, String) and isinstance(rhs, String):
-            return String.new(lhs.bytes + rhs.bytes)
+            return lhs.concat(rhs.bytes)
         if isinstance(lhs, Vector) and isinstance(rhs, Vector):
             return Vector.new([copy(x) for x in lhs.data] + [copy(x) for x in rhs.data])
+        if (result := array_operate(self.location, "+", lhs, rhs)) is not None:
+            return result
         return Error(
             self.location,
             f"attempted + operation with types {quote(typename(lhs))} and {quote(typename(rhs))}",
@@ -3312,10 +5270,16 @@ class AstExpressionAdd(AstExpression):
 
 @final
 @dataclass
-class AstExpressionSub(AstExpression):
+class AstExpressionSub(AstExpressionQuickening):
     location: Optional[SourceLocation]
     lhs: AstExpression
     rhs: AstExpression
+    polymorphic: bool = False
+    SPECIALIZATIONS = {
+        (Number, Number): lambda lhs, rhs: Number.new(
+            float(lhs.data) - float(rhs.data)
+        ),
+    }
 
     def into_value(self) -> Value:
         return Map.new(
@@ -3329,14 +5293,10 @@ class AstExpressionSub(AstExpression):
             }
         )
 
-    def eval(self, env: Environment) -> Union[Value, Error]:
-        lhs = self.lhs.eval(env)
-        if isinstance(lhs, Error):
-            return lhs
-        rhs = self.rhs.eval(env)
-        if isinstance(rhs, Error):
-            return rhs
+    def operate(self, lhs: Value, rhs: Value) -> Union[Value, Error]:
         if not (isinstance(lhs, Number) and isinstance(rhs, Number)):
+            if (result := array_operate(self.location, "-", lhs, rhs)) is not None:
+                return result
             return Error(
                 self.location,
                 f"attempted - operation with types {quote(typename(lhs))} and {quote(typename(rhs))}",
@@ -3346,10 +5306,16 @@ class AstExpressionSub(AstExpression):
 
 @final
 @dataclass
-class AstExpressionMul(AstExpression):
+class AstExpressionMul(AstExpressionQuickening):
     location: Optional[SourceLocation]
     lhs: AstExpression
     rhs: AstExpression
+    polymorphic: bool = False
+    SPECIALIZATIONS = {
+        (Number, Number): lambda lhs, rhs: Number.new(
+            float(lhs.data) * float(rhs.data)
+        ),
+    }
 
     def into_value(self) -> Value:
         return Map.new(
@@ -3363,14 +5329,10 @@ class AstExpressionMul(AstExpression):
             }
         )
 
-    def eval(self, env: Environment) -> Union[Value, Error]:
-        lhs = self.lhs.eval(env)
-        if isinstance(lhs, Error):
-            return lhs
-        rhs = self.rhs.eval(env)
-        if isinstance(rhs, Error):
-            return rhs
+    def operate(self, lhs: Value, rhs: Value) -> Union[Value, Error]:
         if not (isinstance(lhs, Number) and isinstance(rhs, Number)):
+            if (result := array_operate(self.location, "*", lhs, rhs)) is not None:
+                return result
             return Error(
                 self.location,
                 f"attempted * operation with types {quote(typename(lhs))} and {quote(typename(rhs))}",
@@ -3404,20 +5366,17 @@ class AstExpressionDiv(AstExpression):
         rhs = self.rhs.eval(env)
         if isinstance(rhs, Error):
             return rhs
+        return self.operate(lhs, rhs)
+
+    def operate(self, lhs: Value, rhs: Value) -> Union[Value, Error]:
         if not (isinstance(lhs, Number) and isinstance(rhs, Number)):
+            if (result := array_operate(self.location, "/", lhs, rhs)) is not None:
+                return result
             return Error(
                 self.location,
                 f"attempted / operation with types {quote(typename(lhs))} and {quote(typename(rhs))}",
             )
-        lhs_float = float(lhs.data)
-        rhs_float = float(rhs.data)
-        if rhs_float == 0.0:
-            if lhs_float > 0.0:
-                return Number.new(math.copysign(1, rhs_float) * +math.inf)
-            if lhs_float < 0.0:
-                return Number.new(math.copysign(1, rhs_float) * -math.inf)
-            return Number.new(math.nan)
-        return Number.new(lhs_float / rhs_float)
+        return Number.new(number_div(float(lhs.data), float(rhs.data)))
 
 
 @final
@@ -3446,26 +5405,15 @@ class AstExpressionRem(AstExpression):
         rhs = self.rhs.eval(env)
         if isinstance(rhs, Error):
             return rhs
+        return self.operate(lhs, rhs)
+
+    def operate(self, lhs: Value, rhs: Value) -> Union[Value, Error]:
         if not (isinstance(lhs, Number) and isinstance(rhs, Number)):
             return Error(
                 self.location,
                 f"attempted % operation with types {quote(typename(lhs))} and {quote(typename(rhs))}",
             )
-        if math.isnan(float(lhs.data)) or math.isnan(float(rhs.data)):
-            return Number.new(math.nan)
-        if math.isinf(float(lhs.data)):
-            return Number.new(math.nan)
-        if math.isinf(float(rhs.data)):
-            return Number.new(lhs.data)
-        if float(rhs.data) == 0.0:
-            return Number.new(math.nan)
-        # The remainder will have the same sign as the dividend.
-        # This behavior is identical to C's remainder operator.
-        #   +7 % +3 => +1
-        #   +7 % -3 => +1
-        #   -7 % +3 => -1
-        #   -7 % -3 => -1
-        return Number.new(math.fmod(float(lhs.data), float(rhs.data)))
+        return Number.new(number_rem(float(lhs.data), float(rhs.data)))
 
 
 @final
@@ -3474,6 +5422,11 @@ class AstExpressionFunctionCall(AstExpression):
     location: Optional[SourceLocation]
     function: AstExpression
     arguments: list[AstExpression]
+    # Inline cache of the metamap used by the most recent method lookup
+    # performed with dot access syntax, and the function found within that
+    # metamap (or None if the metamap does not contain the method).
+    cached_meta: Optional["Map"] = None
+    cached_function: Optional[Value] = None
 
     def into_value(self) -> Value:
         arguments = Vector.new([x.into_value() for x in self.arguments])
@@ -3488,90 +5441,105 @@ class AstExpressionFunctionCall(AstExpression):
             }
         )
 
-    def eval(self, env: Environment) -> Union[Value, Error]:
-        self_argument: Optional[Value] = None
+    # Lookup of the function and implicit `self` argument of a function call
+    # made using dot access syntax. On success, returns the function, the
+    # `self` argument, and the list of values marked as referenced that must
+    # be unmarked after control returns from the invoked function.
+    def method(
+        self, env: Environment
+    ) -> Union[Tuple[Value, Value, list[Value]], Error]:
+        assert isinstance(self.function, AstExpressionAccessDot)
+        self_argument: Value
         referenced: list[Value] = list()
-        if isinstance(self.function, AstExpressionAccessDot):
-            # Special case when dot access is used for a function call. An
-            # implicit `self` argument is passed to the function, either by
-            # value or by reference, depending on whether the function was
-            # declared with:
-            #
-            #   function(self) { ... }   # pass by value
-            #   function.&(self) { ... } # pass by reference
-            chain: list[Value] = []
-            store = eval_lvalue(self.function.store, env, chain)
-            if isinstance(store, Error):
-                return store
-            store_is_self_reference = False
-            # When making a function call using dot access syntax, perform
-            # function lookup using the value's metamap *before* looking at the
-            # fields of the value itself. This is done so that expressions such
-            # as:
-            #
-            #   somemap.foo()
-            #
-            # will find the metafunction `foo` rather than some key "foo" in
-            # the map, which is almost certainly *not* the desired behavior.
-            function = None
-            try:
-                # Value meta lookup.
-                if store.meta is not None:
-                    function = store.meta[self.function.field.name]
-            except KeyError:
-                pass
-            try:
-                # Map field lookup.
-                if function is None:
-                    function = store[self.function.field.name]
-            except (NotImplementedError, IndexError, KeyError):
-                pass
-            try:
-                # Implicit value dereference meta lookup.
-                if (
-                    function is None
-                    and isinstance(store, Reference)
-                    and store.data.meta is not None
-                ):
-                    store_is_self_reference = True
-                    function = store.data.meta[self.function.field.name]
-            except (NotImplementedError, IndexError, KeyError):
-                function = None
-            if function is None:
-                return Error(
-                    self.location,
-                    f"invalid method access with name {self.function.field.name}",
-                )
+        # Special case when dot access is used for a function call. An
+        # implicit `self` argument is passed to the function, either by
+        # value or by reference, depending on whether the function was
+        # declared with:
+        #
+        #   function(self) { ... }   # pass by value
+        #   function.&(self) { ... } # pass by reference
+        chain: list[Value] = []
+        store = eval_lvalue(self.function.store, env, chain)
+        if isinstance(store, Error):
+            return store
+        store_is_self_reference = False
+        # When making a function call using dot access syntax, perform
+        # function lookup using the value's metamap *before* looking at the
+        # fields of the value itself. This is done so that expressions such
+        # as:
+        #
+        #   somemap.foo()
+        #
+        # will find the metafunction `foo` rather than some key "foo" in
+        # the map, which is almost certainly *not* the desired behavior.
+        function = None
+        meta = store.meta
+        if meta is not None and meta is self.cached_meta:
+            # Inline cache hit. Cached metamaps are immutable, so the result of
+            # the lookup is identical to the result of the cached lookup.
+            function = self.cached_function
+        elif meta is not None:
+            # Value meta lookup.
+            function = meta.lookup(self.function.field.name)
+            if meta.is_immutable():
+                self.cached_meta = meta
+                self.cached_function = function
+        if function is None:
+            # Map field lookup.
+            function = store.lookup(self.function.field.name)
+        # Implicit value dereference meta lookup.
+        if (
+            function is None
+            and isinstance(store, Reference)
+            and store.data.meta is not None
+        ):
+            store_is_self_reference = True
+            function = store.data.meta.lookup(self.function.field.name)
+        if function is None:
+            return Error(
+                self.location,
+                f"invalid method access with name {self.function.field.name}",
+            )
 
-            # Construct the implicit `self` argument, which is either going to
-            # be the lhs store by copy (value -> pass by value), the lhs store
-            # by new reference (value.& -> pass by reference), the dereferenced
-            # lhs store by copy (value.* -> pass by value), or a passthrough of
-            # the existing reference (pass by reference).
-            if callable_self_is_passed_by_reference(function):
-                for value in chain:
-                    Reference.mark_referenced(value)
-                if store_is_self_reference:
-                    # Reference passthrough (auto-deref)
-                    self_argument = store
-                else:
-                    # value.& -> pass by reference
-                    self_argument = Reference.new(store)
-
-                # The implicit `self` reference is guaranteed not to escape the
-                # lexical environment of the callee, and can be safely unmarked
-                # after control returns from the invoked function.
-                referenced.extend(chain)
-                if not store_is_self_reference:
-                    referenced.append(store)
+        # Construct the implicit `self` argument, which is either going to
+        # be the lhs store by copy (value -> pass by value), the lhs store
+        # by new reference (value.& -> pass by reference), the dereferenced
+        # lhs store by copy (value.* -> pass by value), or a passthrough of
+        # the existing reference (pass by reference).
+        if callable_self_is_passed_by_reference(function):
+            for value in chain:
+                Reference.mark_referenced(value)
+            if store_is_self_reference:
+                # Reference passthrough (auto-deref)
+                self_argument = store
             else:
-                if store_is_self_reference:
-                    # value.* -> pass by value (auto-deref)
-                    assert isinstance(store, Reference)
-                    self_argument = copy(store.data)
-                else:
-                    # value -> pass by value
-                    self_argument = copy(store)
+                # value.& -> pass by reference
+                self_argument = Reference.new(store)
+
+            # The implicit `self` reference is guaranteed not to escape the
+            # lexical environment of the callee, and can be safely unmarked
+            # after control returns from the invoked function.
+            referenced.extend(chain)
+            if not store_is_self_reference:
+                referenced.append(store)
+        else:
+            if store_is_self_reference:
+                # value.* -> pass by value (auto-deref)
+                assert isinstance(store, Reference)
+                self_argument = copy(store.data)
+            else:
+                # value -> pass by value
+                self_argument = copy(store)
+        return (function, self_argument, referenced)
+
+    def eval(self, env: Environment) -> Union[Value, Error]:
+        self_argument: Optional[Value] = None
+        referenced: list[Value] = list()
+        if isinstance(self.function, AstExpressionAccessDot):
+            method = self.method(env)
+            if isinstance(method, Error):
+                return method
+            function, self_argument, referenced = method
         else:
             result = self.function.eval(env)
             if isinstance(result, Error):
@@ -3598,8 +5566,16 @@ class AstExpressionFunctionCall(AstExpression):
                 result = argument.eval(env)
                 if isinstance(result, Error):
                     return result
-                arguments.append(copy(result))
-            return call(self.location, function, arguments)
+                arguments.append(result if argument.moved else copy(result))
+            if self_argument is not None:
+                result = call_method(self.location, function, arguments)
+            else:
+                result = call(self.location, function, arguments)
+            # Values returned from functions are owned by the caller, but
+            # builtins may return values shared with their arguments.
+            if self.moved and not isinstance(function, Function):
+                return copy(result)
+            return result
         finally:
             for value in referenced:
                 Reference.unmark_referenced(value)
@@ -3649,21 +5625,42 @@ class AstExpressionAccessIndex(AstExpression):
                 )
 
         def access_map(store: Map):
+            value = store.lookup(field)
+            if value is None:
+                return Error(
+                    self.location, lambda: f"invalid map access with field {field}"
+                )
+            return value
+
+        def access_packed(store: Union[Array, Bitset, Buffer]):
             try:
+                index = value_as_index(field)
+                if index >= len(store.data):
+                    return Error(
+                        self.location,
+                        f"invalid {store.typename()} access with index {field} ({store.typename()} has a count of {len(store.data)})",
+                    )
                 return store[field]
-            except (NotImplementedError, IndexError, KeyError):
-                return Error(self.location, f"invalid map access with field {field}")
+            except Exception as e:
+                return Error(
+                    self.location,
+                    f"invalid {store.typename()} access with index {field} ({str(e)})",
+                )
 
         if isinstance(store, Vector):
             return access_vector(store)
         if isinstance(store, Map):
             return access_map(store)
+        if isinstance(store, (Array, Bitset, Buffer)):
+            return access_packed(store)
         if isinstance(store, Reference):
             store_deref = store.data
             if isinstance(store_deref, Vector):
                 return access_vector(store_deref)
             if isinstance(store_deref, Map):
                 return access_map(store_deref)
+            if isinstance(store_deref, (Array, Bitset, Buffer)):
+                return access_packed(store_deref)
             return Error(
                 self.location,
                 f"invalid {store.typename()} to {store_deref.typename()} access with field {field}",
@@ -3702,10 +5699,12 @@ class AstExpressionAccessScope(AstExpression):
         field = self.field.name
 
         def access_map(store: Map):
-            try:
-                return store[field]
-            except KeyError:
-                return Error(self.location, f"invalid map access with field {field}")
+            value = store.lookup(field)
+            if value is None:
+                return Error(
+                    self.location, lambda: f"invalid map access with field {field}"
+                )
+            return value
 
         if isinstance(store, Map):
             return access_map(store)
@@ -3758,15 +5757,13 @@ class AstExpressionAccessDot(AstExpression):
         # will find the field "foo" rather than a metafunction `foo` in the
         # map, which is almost certainly the desired behavior for nominal
         # property lookup.
-        try:
-            return store[field]
-        except (NotImplementedError, IndexError, KeyError):
-            pass
-        try:
-            if store.meta is not None:
-                return store.meta[field]
-        except KeyError:
-            pass
+        value = store.lookup(field)
+        if value is not None:
+            return value
+        if store.meta is not None:
+            value = store.meta.lookup(field)
+            if value is not None:
+                return value
 
         # Special case where a reference value is implicitly dereferenced when
         # accessing the target field.
@@ -3775,15 +5772,13 @@ class AstExpressionAccessDot(AstExpression):
 
             # Prioritize fields of the value itself *before* looking at the
             # fields of the value's metamap.
-            try:
-                return store_deref[field]
-            except (NotImplementedError, IndexError, KeyError):
-                pass
-            try:
-                if store_deref.meta is not None:
-                    return store_deref.meta[field]
-            except KeyError:
-                pass
+            value = store_deref.lookup(field)
+            if value is not None:
+                return value
+            if store_deref.meta is not None:
+                value = store_deref.meta.lookup(field)
+                if value is not None:
+                    return value
 
             return Error(
                 self.location,
@@ -3882,6 +5877,10 @@ class AstExpressionDeref(AstExpression):
 class AstBlock(AstNode):
     location: Optional[SourceLocation]
     statements: list[AstStatement]
+    # Assigned by the resolver. Elided blocks execute within the environment
+    # of the enclosing scope rather than within a new environment.
+    size: int = 0
+    elided: bool = False
 
     def into_value(self) -> Value:
         statements = Vector.new([x.into_value() for x in self.statements])
@@ -3895,14 +5894,22 @@ class AstBlock(AstNode):
             }
         )
 
-    def eval(self, env: Environment) -> Optional[ControlFlow]:
-        env = Environment(env)  # Blocks execute with a new lexical scope.
+    def environment(self, env: Environment) -> Environment:
+        if self.elided:
+            return env
+        return Environment(env, self.size)
+
+    def exec(self, env: Environment) -> Optional[ControlFlow]:
         for statement in self.statements:
             result = statement.eval(env)
             if result is not None:
                 return result
         return None
 
+    def eval(self, env: Environment) -> Optional[ControlFlow]:
+        # Blocks execute with a new lexical scope.
+        return self.exec(self.environment(env))
+
 
 @final
 @dataclass
@@ -3936,7 +5943,7 @@ class AstConditional(AstNode):
                 False,
             )
         if result.data:
-            return (self.body.eval(Environment(env)), True)
+            return (self.body.eval(env), True)
         return (None, False)
 
     def eval(self, env: Environment) -> Optional[ControlFlow]:
@@ -3950,6 +5957,7 @@ class AstStatementLet(AstStatement):
     location: Optional[SourceLocation]
     identifier: AstIdentifier
     expression: AstExpression
+    slot: Optional[int] = None  # assigned by the resolver
 
     def into_value(self) -> Value:
         return Map.new(
@@ -3972,7 +5980,12 @@ class AstStatementLet(AstStatement):
                 self.location,
                 f"attempted assignment statement with type reference to {typename(result)}",
             )
-        env.let(self.identifier.name, copy(result), self.identifier.location)
+        if not self.expression.moved:
+            result = copy(result)
+        if self.slot is not None:
+            env.slots[self.slot] = result
+            return None
+        env.let(self.identifier.name, result, self.identifier.location)
         return None
 
 
@@ -4023,6 +6036,12 @@ class AstStatementFor(AstStatement):
     v_is_reference: bool
     collection: AstExpression
     block: AstBlock
+    # Assigned by the resolver. If fresh is true, then each iteration of the
+    # loop executes within a new environment. Otherwise, every iteration of
+    # the loop executes within the same environment.
+    slot_k: int = 0
+    slot_v: int = 1
+    fresh: bool = True
 
     def into_value(self) -> Value:
         return Map.new(
@@ -4059,6 +6078,8 @@ class AstStatementFor(AstStatement):
             # since updates through referenced values should be observed in
             # that original collection.
             collection.cow()
+            if isinstance(collection, (Vector, Map)):
+                collection.data.unalias()
             Reference.mark_referenced(collection)
             collection_marked = True
         else:
@@ -4067,6 +6088,9 @@ class AstStatementFor(AstStatement):
             # modification of that original collection during iteration.
             collection = copy(collection)
 
+        # Environment of every iteration when a fresh environment is not
+        # required for each iteration.
+        loop_env = env if self.fresh else self.block.environment(env)
         try:
             if metafunction := collection.metafunction(CONST_STRING_NEXT):
                 if self.identifier_v is not None:
@@ -4079,26 +6103,29 @@ class AstStatementFor(AstStatement):
                         self.location,
                         f"cannot use a key-reference over iterator {quote(typename(collection))}",
                     )
-                if not callable_self_is_passed_by_reference(metafunction):
-                    return Error(
-                        self.location,
-                        "iterator next must receive self by reference (declared with function.&(self))",
-                    )
-                reference = Reference.new(collection)
-                collection_marked = True
-                while True:
-                    iterated = call(self.location, metafunction, [reference])
+                elements: Iterator[Union[Value, Error]]
+                if isinstance(collection, NativeIterator):
+                    elements = collection.iterate(self.location)
+                else:
+                    if not callable_self_is_passed_by_reference(metafunction):
+                        return Error(
+                            self.location,
+                            "iterator next must receive self by reference (declared with function.&(self))",
+                        )
+                    reference = Reference.new(collection)
+                    collection_marked = True
+                    elements = iterate_next(self.location, metafunction, reference)
+                for iterated in elements:
                     if isinstance(iterated, Error):
-                        if isinstance(iterated.value, Null):
-                            break  # end-of-iteration
                         return iterated
-                    loop_env = Environment(env)
-                    loop_env.let(
+                    iter_env = self.block.environment(env) if self.fresh else loop_env
+                    iter_env.let_slot(
+                        self.slot_k,
                         self.identifier_k.name,
-                        copy(iterated),
+                        iterated,
                         self.identifier_k.location,
                     )
-                    result = self.block.eval(loop_env)
+                    result = self.block.exec(iter_env)
                     if isinstance(result, Return):
                         return result
                     if isinstance(result, Break):
@@ -4128,13 +6155,14 @@ class AstStatementFor(AstStatement):
                 except Exception as e:
                     return Error(self.location, str(e))
                 for i in range(collection_integer):
-                    loop_env = Environment(env)
-                    loop_env.let(
+                    iter_env = self.block.environment(env) if self.fresh else loop_env
+                    iter_env.let_slot(
+                        self.slot_k,
                         self.identifier_k.name,
                         Number.new(i),
                         self.identifier_k.location,
                     )
-                    result = self.block.eval(loop_env)
+                    result = self.block.exec(iter_env)
                     if isinstance(result, Return):
                         return result
                     if isinstance(result, Break):
@@ -4150,18 +6178,22 @@ class AstStatementFor(AstStatement):
                         f"attempted key-value iteration over type {quote(typename(collection))}",
                     )
                 for x in list(collection.data):
-                    loop_env = Environment(env)
+                    iter_env = self.block.environment(env) if self.fresh else loop_env
                     if self.k_is_reference:
-                        loop_env.let(
+                        iter_env.let_slot(
+                            self.slot_k,
                             self.identifier_k.name,
                             Reference.new(x),
                             self.identifier_k.location,
                         )
                     else:
-                        loop_env.let(
-                            self.identifier_k.name, copy(x), self.identifier_k.location
+                        iter_env.let_slot(
+                            self.slot_k,
+                            self.identifier_k.name,
+                            copy(x),
+                            self.identifier_k.location,
                         )
-                    result = self.block.eval(loop_env)
+                    result = self.block.exec(iter_env)
                     if self.k_is_reference:
                         Reference.unmark_referenced(x)
                     if isinstance(result, Return):
@@ -4179,24 +6211,29 @@ class AstStatementFor(AstStatement):
                         f"cannot use a key-reference over type {quote(typename(collection))}",
                     )
                 for k, v in dict(collection.data).items():
-                    loop_env = Environment(env)
-                    loop_env.let(
-                        self.identifier_k.name, copy(k), self.identifier_k.location
+                    iter_env = self.block.environment(env) if self.fresh else loop_env
+                    iter_env.let_slot(
+                        self.slot_k,
+                        self.identifier_k.name,
+                        copy(k),
+                        self.identifier_k.location,
                     )
                     if self.identifier_v is not None:
                         if self.v_is_reference:
-                            loop_env.let(
+                            iter_env.let_slot(
+                                self.slot_v,
                                 self.identifier_v.name,
                                 Reference.new(v),
                                 self.identifier_v.location,
                             )
                         else:
-                            loop_env.let(
+                            iter_env.let_slot(
+                                self.slot_v,
                                 self.identifier_v.name,
                                 copy(v),
                                 self.identifier_v.location,
                             )
-                    result = self.block.eval(loop_env)
+                    result = self.block.exec(iter_env)
                     if self.v_is_reference:
                         Reference.unmark_referenced(v)
                     if isinstance(result, Return):
@@ -4219,11 +6256,42 @@ class AstStatementFor(AstStatement):
                         f"cannot use a key-reference over type {quote(typename(collection))}",
                     )
                 for x in dict(collection.data).keys():
-                    loop_env = Environment(env)
-                    loop_env.let(
-                        self.identifier_k.name, copy(x), self.identifier_k.location
+                    iter_env = self.block.environment(env) if self.fresh else loop_env
+                    iter_env.let_slot(
+                        self.slot_k,
+                        self.identifier_k.name,
+                        copy(x),
+                        self.identifier_k.location,
+                    )
+                    result = self.block.exec(iter_env)
+                    if isinstance(result, Return):
+                        return result
+                    if isinstance(result, Break):
+                        return None
+                    if isinstance(result, Continue):
+                        continue
+                    if isinstance(result, Error):
+                        return result
+            elif isinstance(collection, (Array, Bitset, Buffer)):
+                if self.identifier_v is not None:
+                    return Error(
+                        self.location,
+                        f"attempted key-value iteration over type {quote(typename(collection))}",
+                    )
+                if self.k_is_reference:
+                    return Error(
+                        self.location,
+                        f"cannot use a key-reference over type {quote(typename(collection))}",
+                    )
+                for element in collection.elements():
+                    iter_env = self.block.environment(env) if self.fresh else loop_env
+                    iter_env.let_slot(
+                        self.slot_k,
+                        self.identifier_k.name,
+                        element,
+                        self.identifier_k.location,
                     )
-                    result = self.block.eval(loop_env)
+                    result = self.block.exec(iter_env)
                     if isinstance(result, Return):
                         return result
                     if isinstance(result, Break):
@@ -4249,6 +6317,10 @@ class AstStatementWhile(AstStatement):
     location: Optional[SourceLocation]
     expression: AstExpression
     block: AstBlock
+    # Assigned by the resolver. If fresh is true, then each iteration of the
+    # loop executes within a new environment. Otherwise, every iteration of
+    # the loop executes within the same environment.
+    fresh: bool = True
 
     def into_value(self) -> Value:
         return Map.new(
@@ -4263,6 +6335,7 @@ class AstStatementWhile(AstStatement):
         )
 
     def eval(self, env: Environment) -> Optional[ControlFlow]:
+        loop_env = env if self.fresh else self.block.environment(env)
         while True:
             expression = self.expression.eval(env)
             if isinstance(expression, Error):
@@ -4274,7 +6347,8 @@ class AstStatementWhile(AstStatement):
                 )
             if not expression.data:
                 break
-            result = self.block.eval(Environment(env))
+            iter_env = self.block.environment(env) if self.fresh else loop_env
+            result = self.block.exec(iter_env)
             if isinstance(result, Return):
                 return result
             if isinstance(result, Break):
@@ -4331,6 +6405,7 @@ class AstStatementTry(AstStatement):
     try_block: AstBlock
     catch_identifier: Optional[AstIdentifier]
     catch_block: AstBlock
+    catch_slot: int = 0  # assigned by the resolver
 
     def into_value(self) -> Value:
         return Map.new(
@@ -4358,14 +6433,15 @@ class AstStatementTry(AstStatement):
         if isinstance(result, Continue):
             return result
         if isinstance(result, Error):
-            env = Environment(env)
+            env = self.catch_block.environment(env)
             if self.catch_identifier is not None:
-                env.let(
+                env.let_slot(
+                    self.catch_slot,
                     self.catch_identifier.name,
                     copy(result.value),
                     self.catch_identifier.location,
                 )
-            return self.catch_block.eval(env)
+            return self.catch_block.exec(env)
         return None
 
 
@@ -4430,7 +6506,32 @@ class AstStatementReturn(AstStatement):
                 self.location,
                 f"attempted return statement with type reference to {typename(result)}",
             )
-        return Return(copy(result))
+        return Return(result if self.expression.moved else copy(result))
+
+
+@final
+@dataclass
+class AstStatementYield(AstStatement):
+    location: Optional[SourceLocation]
+    expression: AstExpression
+
+    def into_value(self) -> Value:
+        return Map.new(
+            {
+                String.new("kind"): String.new(self.__class__.__name__),
+                String.new("location"): SourceLocation.optional_into_value(
+                    self.location
+                ),
+                String.new("expression"): self.expression.into_value(),
+            }
+        )
+
+    def eval(self, env: Environment) -> Optional[ControlFlow]:
+        # Generator function bodies are executed by the virtual machine, which
+        # suspends execution at each yield statement. A yield statement is
+        # only evaluated by the tree-walking interpreter if the statement was
+        # constructed outside of the parser.
+        return Error(self.location, "attempted yield outside of a generator function")
 
 
 # The eval_lvalue() function is similar to the eval() method associated with
@@ -4468,7 +6569,7 @@ def eval_lvalue(
                         expr.location,
                         f"invalid vector access with index {field} (vector has a count of {len(store.data)})",
                     )
-                return store[field]
+                return store.owned(field)
             except Exception as e:
                 return Error(
                     expr.location,
@@ -4476,15 +6577,34 @@ def eval_lvalue(
                 )
 
         def access_map(store: Map):
+            element = store.owned(field)
+            if element is None:
+                return Error(
+                    expr.location, lambda: f"invalid map access with field {field}"
+                )
+            return element
+
+        def access_packed(store: Union[Array, Bitset, Buffer]):
             try:
-                return store[field]
-            except (NotImplementedError, IndexError, KeyError):
-                return Error(expr.location, f"invalid map access with field {field}")
+                index = value_as_index(field)
+                if index >= len(store.data):
+                    return Error(
+                        expr.location,
+                        f"invalid {store.typename()} access with index {field} ({store.typename()} has a count of {len(store.data)})",
+                    )
+                return store.owned(field)
+            except Exception as e:
+                return Error(
+                    expr.location,
+                    f"invalid {store.typename()} access with index {field} ({str(e)})",
+                )
 
         if isinstance(inner_store, Vector):
             return access_vector(inner_store)
         if isinstance(inner_store, Map):
             return access_map(inner_store)
+        if isinstance(inner_store, (Array, Bitset, Buffer)):
+            return access_packed(inner_store)
         if isinstance(inner_store, Reference):
             store_deref = inner_store.data
             store_deref.cow()
@@ -4494,6 +6614,8 @@ def eval_lvalue(
                 return access_vector(store_deref)
             if isinstance(store_deref, Map):
                 return access_map(store_deref)
+            if isinstance(store_deref, (Array, Bitset, Buffer)):
+                return access_packed(store_deref)
             return Error(
                 expr.location,
                 f"invalid {inner_store.typename()} to {store_deref.typename()} access with field {field}",
@@ -4514,10 +6636,12 @@ def eval_lvalue(
         field = expr.field.name
 
         def access_map(store: Map):
-            try:
-                return store[field]
-            except KeyError:
-                return Error(expr.location, f"invalid map access with field {field}")
+            element = store.owned(field)
+            if element is None:
+                return Error(
+                    expr.location, lambda: f"invalid map access with field {field}"
+                )
+            return element
 
         if isinstance(inner_store, Map):
             return access_map(inner_store)
@@ -4549,10 +6673,12 @@ def eval_lvalue(
         field = expr.field.name
 
         def access_map(store: Map):
-            try:
-                return store[field]
-            except KeyError:
-                return Error(expr.location, f"invalid map access with field {field}")
+            element = store.owned(field)
+            if element is None:
+                return Error(
+                    expr.location, lambda: f"invalid map access with field {field}"
+                )
+            return element
 
         if isinstance(inner_store, Map):
             return access_map(inner_store)
@@ -4607,8 +6733,10 @@ class AstStatementAssignment(AstStatement):
                     self.location,
                     f"attempted assignment statement with type reference to {rhs.data.typename()}",
                 )
+            if not self.rhs.moved:
+                rhs = copy(rhs)
             try:
-                env.set(self.lhs.name, copy(rhs))
+                env.set_address(self.lhs.address, self.lhs.name, rhs)
             except Exception as e:
                 return Error(self.location, str(e))
             return None
@@ -4671,10 +6799,30 @@ class AstStatementAssignment(AstStatement):
                     f"invalid map assignment with key {field} ({str(e)})",
                 )
 
+        def assign_packed(store: Union[Array, Bitset, Buffer]) -> Optional[Error]:
+            try:
+                index = value_as_index(field)
+                if index >= len(store.data):
+                    return Error(
+                        self.location,
+                        f"invalid {store.typename()} assignment with index {field} ({store.typename()} has a count of {len(store.data)})",
+                    )
+                store[field] = rhs
+                return None
+            except Exception as e:
+                return Error(
+                    self.location,
+                    f"invalid {store.typename()} assignment with index {field} ({str(e)})",
+                )
+
         if isinstance(store, Vector):
             return assign_vector(store)
         if isinstance(store, Map):
             return assign_map(store)
+        if isinstance(store, (Array, Bitset, Buffer)) and isinstance(
+            self.lhs, AstExpressionAccessIndex
+        ):
+            return assign_packed(store)
 
         # Special case where a reference value is implicitly dereferenced when
         # accessing the target field.
@@ -4684,6 +6832,10 @@ class AstStatementAssignment(AstStatement):
                 self.lhs, AstExpressionAccessIndex
             ):
                 return assign_vector(store_deref)
+            if isinstance(store_deref, (Array, Bitset, Buffer)) and isinstance(
+                self.lhs, AstExpressionAccessIndex
+            ):
+                return assign_packed(store_deref)
             if isinstance(store_deref, Map):
                 return assign_map(store_deref)
             return Error(
@@ -4721,1884 +6873,4800 @@ class AstStatementExpression(AstStatement):
         return None
 
 
-class Precedence(enum.IntEnum):
-    # fmt: off
-    LOWEST  = enum.auto()
-    OR      = enum.auto()  # or
-    AND     = enum.auto()  # and
-    COMPARE = enum.auto()  # == != <= >= < > =~ !~
-    ADD_SUB = enum.auto()  # + -
-    MUL_DIV = enum.auto()  # * / %
-    PREFIX  = enum.auto()  # +x -x
-    POSTFIX = enum.auto()  # foo(bar, 123) foo[42] .& .*
-    # fmt: on
+# The resolver is a post-parse pass over a program that assigns each binding
+# introduced within a block, function, for-loop, or catch clause a slot within
+# an array-backed environment, and annotates each identifier expression with
+# the lexical address of the binding it refers to. Bindings introduced at the
+# top level of a program are still looked up by name, since the top-level
+# environment is shared with the REPL, imported modules, and the base
+# environment, all of which may introduce bindings that the resolver has no
+# knowledge of.
+#
+# The resolver also decides which lexical scopes require an environment of
+# their own at runtime. Scopes that execute at most once per execution of
+# their enclosing environment (e.g. the body of a conditional) have their
+# bindings placed in the slots of that enclosing environment, since no
+# closure or reference can observe the difference. Loop bodies execute many
+# times per execution of their enclosing environment, and are only placed in
+# the enclosing environment if nothing within the body could observe that each
+# iteration does not receive a fresh set of bindings, i.e. if the loop body
+# does not create functions (which may close over per-iteration bindings) and
+# does not bind references. Scopes that perform regular expression matches
+# always receive their own environment, since the most recent match is stored
+# in the environment in which the match was performed.
+class Resolver:
+    class Frame:
+        """
+        Runtime environment into which the slots of one or more lexical
+        scopes are allocated.
+        """
 
+        def __init__(self, dynamic: bool = False):
+            self.size: int = 0
+            # Dynamic frames correspond to top-level environments in which
+            # bindings are introduced and looked up by name.
+            self.dynamic: bool = dynamic
 
-class ParseMode(enum.Enum):
-    MELLIFERA = "mellifera"
-    COMB = "comb"
+    class Scope:
+        def __init__(
+            self, outer: Optional["Resolver.Scope"], level: int, frame: "Resolver.Frame"
+        ):
+            self.outer: Optional["Resolver.Scope"] = outer
+            # Number of function expressions enclosing this scope.
+            self.level: int = level
+            self.frame: "Resolver.Frame" = frame
+            # Slot of every binding introduced anywhere within this scope.
+            self.slots: dict[String, int] = dict()
+            # Bindings that are guaranteed to have been introduced at the
+            # current point of resolution within this scope.
+            self.declared: set[String] = set()
+
+        def reserve(self, name: String) -> int:
+            if name not in self.slots:
+                self.slots[name] = self.frame.size
+                self.frame.size += 1
+            return self.slots[name]
+
+        def declare(self, name: String) -> int:
+            self.declared.add(name)
+            return self.reserve(name)
+
+    def __init__(self):
+        self.root: Resolver.Frame = Resolver.Frame(dynamic=True)
+        self.scope: Optional[Resolver.Scope] = None
+        self.level: int = 0
 
+    @property
+    def frame(self) -> "Resolver.Frame":
+        return self.scope.frame if self.scope is not None else self.root
 
-# Mapping of identifier names to their unique string objects. Having a single
-# globally unique string for each identifier allows let and assignment
-# statements to take advantage of fast-path value identity comparision.
-identifier_cache: dict[str, String] = dict()
+    @staticmethod
+    def search(node: Any, types: tuple[type, ...], boundary: tuple[type, ...]) -> bool:
+        """
+        Returns true if a node of the provided types is found within the
+        provided node without descending into nodes of the boundary types.
+        """
+        if isinstance(node, (list, tuple)):
+            return any(Resolver.search(x, types, boundary) for x in node)
+        if not isinstance(node, AstNode):
+            return False
+        if isinstance(node, types):
+            return True
+        if isinstance(node, boundary):
+            return False
+        return any(Resolver.search(x, types, boundary) for x in vars(node).values())
 
+    @staticmethod
+    def matches_regexp(block: AstBlock) -> bool:
+        return Resolver.search(
+            block.statements,
+            (AstExpressionEqRe, AstExpressionNeRe),
+            (AstBlock, AstExpressionFunction),
+        )
 
-class Parser:
-    ParseNud = Callable[["Parser"], AstExpression]
-    ParseLed = Callable[["Parser", AstExpression], AstExpression]
+    @staticmethod
+    def creates_function(block: AstBlock) -> bool:
+        return Resolver.search(block.statements, (AstExpressionFunction,), ())
 
-    PRECEDENCES: dict[TokenKind, Precedence] = {
-        # fmt: off
-        TokenKind.OR:       Precedence.OR,
-        TokenKind.AND:      Precedence.AND,
-        TokenKind.EQ:       Precedence.COMPARE,
-        TokenKind.NE:       Precedence.COMPARE,
-        TokenKind.LE:       Precedence.COMPARE,
-        TokenKind.GE:       Precedence.COMPARE,
-        TokenKind.LT:       Precedence.COMPARE,
-        TokenKind.GT:       Precedence.COMPARE,
-        TokenKind.EQ_RE:    Precedence.COMPARE,
-        TokenKind.NE_RE:    Precedence.COMPARE,
-        TokenKind.ADD:      Precedence.ADD_SUB,
-        TokenKind.SUB:      Precedence.ADD_SUB,
-        TokenKind.MUL:      Precedence.MUL_DIV,
-        TokenKind.DIV:      Precedence.MUL_DIV,
-        TokenKind.REM:      Precedence.MUL_DIV,
-        TokenKind.LPAREN:   Precedence.POSTFIX,
-        TokenKind.LBRACKET: Precedence.POSTFIX,
-        TokenKind.SCOPE:    Precedence.POSTFIX,
-        TokenKind.DOT:      Precedence.POSTFIX,
-        TokenKind.MKREF:    Precedence.POSTFIX,
-        TokenKind.DEREF:    Precedence.POSTFIX,
-        # fmt: on
-    }
+    @staticmethod
+    def declares(block: AstBlock, identifiers: list[Optional[AstIdentifier]]) -> bool:
+        return any(x is not None for x in identifiers) or any(
+            isinstance(x, AstStatementLet) for x in block.statements
+        )
 
-    def __init__(self, lexer: Lexer):
-        self.lexer = lexer
-        self.current_token = Token(TokenKind.EOF, "DEFAULT CURRENT TOKEN")
+    def resolve_program(self, program: AstProgram) -> None:
+        for statement in program.statements:
+            self.resolve(statement)
 
-        self._advance_token()
+    # Resolves the block within a new lexical scope, the bindings of which are
+    # placed within the slots of the provided frame. If the provided frame is
+    # not the frame of the enclosing scope, then the block is marked as
+    # requiring a new environment. Returns the slots of the provided
+    # identifiers, which are introduced at the start of the scope.
+    def resolve_block(
+        self,
+        block: AstBlock,
+        frame: "Resolver.Frame",
+        identifiers: list[Optional[AstIdentifier]],
+    ) -> list[int]:
+        scope = Resolver.Scope(self.scope, self.level, frame)
+        slots = [scope.declare(x.name) for x in identifiers if x is not None]
+        # Let bindings are assigned a slot up front so that identifiers within
+        # functions defined before a let statement in the same scope (e.g.
+        # recursive or mutually recursive functions) may refer to the slot of
+        # that binding, which will be populated by the time they are called.
+        for statement in block.statements:
+            if isinstance(statement, AstStatementLet):
+                scope.reserve(statement.identifier.name)
+        block.elided = frame is self.frame
+        self.scope = scope
+        for statement in block.statements:
+            self.resolve(statement)
+        self.scope = scope.outer
+        block.size = 0 if block.elided else frame.size
+        return slots
+
+    # Resolves a block that executes at most once per execution of the
+    # enclosing environment.
+    def resolve_block_once(
+        self, block: AstBlock, identifiers: list[Optional[AstIdentifier]]
+    ) -> list[int]:
+        frame = self.frame
+        if Resolver.matches_regexp(block):
+            frame = Resolver.Frame()
+        if frame.dynamic and Resolver.declares(block, identifiers):
+            frame = Resolver.Frame()
+        return self.resolve_block(block, frame, identifiers)
+
+    # Resolves the body of a loop, returning the slots of the provided
+    # identifiers and whether a fresh environment must be created for each
+    # iteration of the loop.
+    def resolve_block_loop(
+        self,
+        block: AstBlock,
+        identifiers: list[Optional[AstIdentifier]],
+        references: bool,
+    ) -> Tuple[list[int], bool]:
+        fresh = (
+            references
+            or Resolver.matches_regexp(block)
+            or Resolver.creates_function(block)
+        )
+        frame = self.frame
+        if fresh or (frame.dynamic and Resolver.declares(block, identifiers)):
+            # Loops that do not need a fresh environment per iteration, but
+            # are not within an environment with slots, receive a single
+            # environment that is reused for every iteration.
+            frame = Resolver.Frame()
+        return (self.resolve_block(block, frame, identifiers), fresh)
+
+    def address(self, name: String) -> list[Address]:
+        address: list[Address] = list()
+        depth = 0
+        frame = self.frame
+        scope = self.scope
+        while scope is not None:
+            if scope.frame is not frame:
+                frame = scope.frame
+                depth += 1
+            slot = scope.slots.get(name)
+            if slot is not None:
+                if name in scope.declared:
+                    address.append((depth, slot))
+                    return address
+                if self.level > scope.level:
+                    # The identifier is within a function that may be called
+                    # after the binding is introduced later in this scope.
+                    address.append((depth, slot))
+            scope = scope.outer
+        if self.root is not frame:
+            depth += 1
+        address.append((depth, None))
+        return address
+
+    def resolve(self, node: Any) -> None:
+        if isinstance(node, (list, tuple)):
+            for element in node:
+                self.resolve(element)
+            return
+        if not isinstance(node, AstNode):
+            return
 
-        self.parse_nud_functions: dict[TokenKind, Parser.ParseNud] = dict()
-        self.parse_led_functions: dict[TokenKind, Parser.ParseLed] = dict()
+        if isinstance(node, AstExpressionIdentifier):
+            node.address = self.address(node.name)
+            node.depth, node.slot = node.address[0]
+            return
 
-        self._register_nud(TokenKind.IDENTIFIER, Parser.parse_expression_identifier)
-        self._register_nud(TokenKind.TEMPLATE, Parser.parse_expression_template)
-        self._register_nud(TokenKind.NULL, Parser.parse_expression_null)
-        self._register_nud(TokenKind.TRUE, Parser.parse_expression_boolean)
-        self._register_nud(TokenKind.FALSE, Parser.parse_expression_boolean)
-        self._register_nud(TokenKind.NUMBER, Parser.parse_expression_number)
-        self._register_nud(TokenKind.STRING, Parser.parse_expression_string)
-        self._register_nud(TokenKind.REGEXP, Parser.parse_expression_regexp)
-        self._register_nud(TokenKind.REGEXP_GROUP, Parser.parse_expression_regexp_group)
-        self._register_nud(TokenKind.LBRACKET, Parser.parse_expression_vector)
-        self._register_nud(TokenKind.MAP, Parser.parse_expression_map_or_set)
-        self._register_nud(TokenKind.SET, Parser.parse_expression_map_or_set)
-        self._register_nud(TokenKind.LBRACE, Parser.parse_expression_map_or_set)
-        self._register_nud(TokenKind.FUNCTION, Parser.parse_expression_function)
-        self._register_nud(TokenKind.FREEZE, Parser.parse_expression_freeze)
-        self._register_nud(TokenKind.TYPE, Parser.parse_expression_type)
-        self._register_nud(TokenKind.NEW, Parser.parse_expression_new)
-        self._register_nud(TokenKind.LPAREN, Parser.parse_expression_grouped)
-        self._register_nud(TokenKind.ADD, Parser.parse_expression_positive)
-        self._register_nud(TokenKind.SUB, Parser.parse_expression_negative)
-        self._register_nud(TokenKind.NOT, Parser.parse_expression_not)
-
-        self._register_led(TokenKind.AND, Parser.parse_expression_and)
-        self._register_led(TokenKind.OR, Parser.parse_expression_or)
-        self._register_led(TokenKind.EQ, Parser.parse_expression_eq)
-        self._register_led(TokenKind.NE, Parser.parse_expression_ne)
-        self._register_led(TokenKind.LE, Parser.parse_expression_le)
-        self._register_led(TokenKind.GE, Parser.parse_expression_ge)
-        self._register_led(TokenKind.LT, Parser.parse_expression_lt)
-        self._register_led(TokenKind.GT, Parser.parse_expression_gt)
-        self._register_led(TokenKind.EQ_RE, Parser.parse_expression_eq_re)
-        self._register_led(TokenKind.NE_RE, Parser.parse_expression_ne_re)
-        self._register_led(TokenKind.ADD, Parser.parse_expression_add)
-        self._register_led(TokenKind.SUB, Parser.parse_expression_sub)
-        self._register_led(TokenKind.MUL, Parser.parse_expression_mul)
-        self._register_led(TokenKind.DIV, Parser.parse_expression_div)
-        self._register_led(TokenKind.REM, Parser.parse_expression_rem)
-        self._register_led(TokenKind.LPAREN, Parser.parse_expression_function_call)
-        self._register_led(TokenKind.LBRACKET, Parser.parse_expression_access_index)
-        self._register_led(TokenKind.SCOPE, Parser.parse_expression_access_scope)
-        self._register_led(TokenKind.DOT, Parser.parse_expression_access_dot)
-        self._register_led(TokenKind.DEREF, Parser.parse_expression_deref)
+        if isinstance(node, AstStatementLet):
+            self.resolve(node.expression)
+            if self.scope is not None:
+                node.slot = self.scope.declare(node.identifier.name)
+            return
 
-    def _identifier(self, name: str) -> String:
-        if name in identifier_cache:
-            return identifier_cache[name]
-        identifier_cache[name] = String(name)
-        return identifier_cache[name]
+        if isinstance(node, AstBlock):
+            self.resolve_block_once(node, [])
+            return
 
-    def _register_nud(self, kind: TokenKind, parse: "Parser.ParseNud") -> None:
-        self.parse_nud_functions[kind] = parse
+        if isinstance(node, AstExpressionFunction):
+            self.level += 1
+            self.resolve_block(node.body, Resolver.Frame(), list(node.parameters))
+            self.level -= 1
+            Liveness.function(node)
+            return
 
-    def _register_led(self, kind: TokenKind, parse: "Parser.ParseLed") -> None:
-        self.parse_led_functions[kind] = parse
+        if isinstance(node, AstStatementFor):
+            self.resolve(node.collection)
+            (slots, node.fresh) = self.resolve_block_loop(
+                node.block,
+                [node.identifier_k, node.identifier_v],
+                node.k_is_reference or node.v_is_reference,
+            )
+            node.slot_k = slots[0]
+            node.slot_v = slots[-1]
+            return
 
-    def _advance_token(self) -> Token:
-        current_token = self.current_token
-        self.current_token = self.lexer.next_token()
-        return current_token
+        if isinstance(node, AstStatementWhile):
+            self.resolve(node.expression)
+            (_, node.fresh) = self.resolve_block_loop(node.block, [], False)
+            return
 
-    def _check_current(self, kind: TokenKind) -> bool:
-        return self.current_token.kind == kind
+        if isinstance(node, AstStatementTry):
+            self.resolve_block_once(node.try_block, [])
+            slots = self.resolve_block_once(node.catch_block, [node.catch_identifier])
+            node.catch_slot = slots[0] if len(slots) != 0 else 0
+            return
 
-    def _expect_current(self, kind: TokenKind) -> Token:
-        current = self.current_token
-        if current.kind != kind:
-            raise ParseError(
-                current.location, f"expected {quote(kind)}, found {quote(current)}"
-            )
-        self._advance_token()
-        return current
+        for value in vars(node).values():
+            self.resolve(value)
 
-    def parse_program(self) -> AstProgram:
-        location = self.current_token.location
-        statements: list[AstStatement] = list()
-        while not self._check_current(TokenKind.EOF):
-            statements.append(self.parse_statement())
-        return AstProgram(location, statements)
 
-    def parse_identifier(self) -> AstIdentifier:
-        token = self._expect_current(TokenKind.IDENTIFIER)
-        return AstIdentifier(token.location, self._identifier(token.literal))
+# Liveness analysis of function bodies. A use of a local binding is the last
+# use of that binding if the value of the binding is never observed after the
+# use. The value of an identifier at its last use may be moved into the let,
+# assignment, or return statement or the function argument consuming that
+# value rather than being copied, so that the new binding of the value is the
+# only value using its shared data and a later modification of the value does
+# not perform a copy-on-write of the entire value. Expressions producing values
+# that are owned by their consumer are marked as moved by the analysis.
+#
+# Bindings are identified by the block introducing the environment containing
+# the binding and the slot of the binding within that environment. Bindings
+# captured by nested functions, and bindings observed by the catch block of an
+# enclosing try statement, are never moved.
+class Liveness:
+    Key = Tuple[int, int]
+
+    class Loop:
+        def __init__(self, exit: set["Liveness.Key"], head: set["Liveness.Key"]):
+            self.exit = exit  # bindings live after the loop
+            self.head = head  # bindings live at the start of an iteration
+
+    def __init__(self):
+        # Blocks executing within their own environment that enclose the
+        # current point of analysis.
+        self.frames: list[AstBlock] = list()
+        # Bindings that must never be moved.
+        self.pinned: set[Liveness.Key] = set()
+        self.loops: list[Liveness.Loop] = list()
 
-    def parse_expression(
-        self, precedence: Precedence = Precedence.LOWEST
-    ) -> AstExpression:
-        parse_nud = self.parse_nud_functions.get(self.current_token.kind)
-        if parse_nud is None:
-            raise ParseError(
-                self.current_token.location,
-                f"expected expression, found {self.current_token}",
-            )
-        expression = parse_nud(self)
+    @staticmethod
+    def function(node: AstExpressionFunction) -> None:
+        liveness = Liveness()
+        liveness.capture(node.body, None)
+        liveness.block(node.body, set())
 
-        def get_precedence(kind: TokenKind) -> Precedence:
-            return Parser.PRECEDENCES.get(kind, Precedence.LOWEST)
+    def key(self, node: AstExpressionIdentifier) -> Optional["Liveness.Key"]:
+        if node.slot is None or node.address is None or len(node.address) != 1:
+            return None
+        if node.depth >= len(self.frames):
+            return None  # binding outside of the function
+        return (id(self.frames[-1 - node.depth]), node.slot)
+
+    # Pins the bindings of the analyzed function referenced from within the
+    # nested functions of the provided node. The base is the number of frames
+    # belonging to the analyzed function, or None outside of nested functions.
+    def capture(self, node: Any, base: Optional[int]) -> None:
+        if isinstance(node, (list, tuple)):
+            for element in node:
+                self.capture(element, base)
+            return
+        if not isinstance(node, AstNode):
+            return
+        if isinstance(node, AstExpressionIdentifier):
+            if base is None or node.address is None:
+                return
+            for depth, slot in node.address:
+                index = len(self.frames) - 1 - depth
+                if slot is not None and 0 <= index < base:
+                    self.pinned.add((id(self.frames[index]), slot))
+            return
+        if isinstance(node, AstExpressionFunction) and base is None:
+            base = len(self.frames)
+        if isinstance(node, AstBlock) and not node.elided:
+            self.frames.append(node)
+            self.capture(node.statements, base)
+            self.frames.pop()
+            return
+        for value in vars(node).values():
+            self.capture(value, base)
+
+    # Collects the bindings used within the provided node.
+    def uses(self, node: Any, keys: list["Liveness.Key"]) -> None:
+        if isinstance(node, (list, tuple)):
+            for element in node:
+                self.uses(element, keys)
+            return
+        if not isinstance(node, AstNode) or isinstance(node, AstExpressionFunction):
+            return
+        if isinstance(node, AstExpressionIdentifier):
+            key = self.key(node)
+            if key is not None:
+                keys.append(key)
+            return
+        for value in vars(node).values():
+            self.uses(value, keys)
+
+    # Updates the provided set of bindings live after the evaluation of the
+    # provided node into the set of bindings live before its evaluation. A
+    # consumed expression is marked as moved if its value may be owned by its
+    # consumer without a copy.
+    def expression(self, node: Any, live: set["Liveness.Key"], consumed=False):
+        if isinstance(node, (list, tuple)):
+            for element in reversed(node):
+                self.expression(element, live)
+            return
+        if not isinstance(node, AstNode) or isinstance(node, AstExpressionFunction):
+            return
+        if isinstance(node, AstExpressionIdentifier):
+            key = self.key(node)
+            if key is None:
+                return
+            if consumed:
+                node.moved = key not in live and key not in self.pinned
+            live.add(key)
+            return
+        if isinstance(node, AstExpressionFunctionCall):
+            # An argument is never moved if its binding is used elsewhere
+            # within the call, e.g. as the self argument of a method call.
+            keys: list[Liveness.Key] = list()
+            self.uses(node, keys)
+            for argument in reversed(node.arguments):
+                moveable = not isinstance(argument, AstExpressionIdentifier) or (
+                    keys.count(self.key(argument)) <= 1  # type: ignore[arg-type]
+                )
+                self.expression(argument, live, moveable)
+            self.expression(node.function, live)
+            node.moved = consumed
+            return
+        if isinstance(node, (AstExpressionVector, AstExpressionMap, AstExpressionSet)):
+            node.moved = consumed
+        for value in reversed(list(vars(node).values())):
+            self.expression(value, live)
+
+    def statements(
+        self, statements: list[AstStatement], live: set["Liveness.Key"]
+    ) -> set["Liveness.Key"]:
+        for statement in reversed(statements):
+            live = self.statement(statement, live)
+        return live
+
+    def block(self, block: AstBlock, live: set["Liveness.Key"]) -> set["Liveness.Key"]:
+        if not block.elided:
+            self.frames.append(block)
+        live = self.statements(block.statements, live)
+        if not block.elided:
+            self.frames.pop()
+        return live
+
+    # Returns the set of bindings live before the execution of the provided
+    # statement given the set of bindings live after its execution.
+    def statement(
+        self, node: AstStatement, live: set["Liveness.Key"]
+    ) -> set["Liveness.Key"]:
+        live = set(live)
+        if isinstance(node, AstStatementLet):
+            if node.slot is not None:
+                live.discard((id(self.frames[-1]), node.slot))
+            self.expression(node.expression, live, True)
+        elif isinstance(node, AstStatementAssignment) and isinstance(
+            node.lhs, AstExpressionIdentifier
+        ):
+            key = self.key(node.lhs)
+            if key is not None:
+                live.discard(key)
+            self.expression(node.rhs, live, True)
+        elif isinstance(node, AstStatementReturn):
+            live = set()
+            self.expression(node.expression, live, True)
+        elif isinstance(node, AstStatementError):
+            live = set()
+            self.expression(node.expression, live)
+        elif isinstance(node, AstStatementBreak):
+            live = set(self.loops[-1].exit) if len(self.loops) != 0 else set()
+        elif isinstance(node, AstStatementContinue):
+            live = set(self.loops[-1].head) if len(self.loops) != 0 else set()
+        elif isinstance(node, AstStatementIfElifElse):
+            after = live
+            if node.else_block is not None:
+                live = self.block(node.else_block, after)
+            for conditional in reversed(node.conditionals):
+                live = self.block(conditional.body, after) | live
+                self.expression(conditional.condition, live)
+        elif isinstance(node, AstStatementFor):
+            live = self.statement_for(node, live)
+        elif isinstance(node, AstStatementWhile):
+            head: set[Liveness.Key] = set()
+            while True:
+                self.loops.append(Liveness.Loop(live, head))
+                update = self.block(node.block, head) | live
+                self.loops.pop()
+                self.expression(node.expression, update)
+                if update == head:
+                    break
+                head = update
+            live = head
+        elif isinstance(node, AstStatementTry):
+            if not node.catch_block.elided:
+                self.frames.append(node.catch_block)
+            catch = self.statements(node.catch_block.statements, live)
+            if node.catch_identifier is not None:
+                catch.discard((id(self.frames[-1]), node.catch_slot))
+            if not node.catch_block.elided:
+                self.frames.pop()
+            pinned = self.pinned
+            self.pinned = pinned | catch
+            live = self.block(node.try_block, live) | catch
+            self.pinned = pinned
+        else:
+            self.expression(node, live)
+        return live
+
+    def statement_for(
+        self, node: AstStatementFor, live: set["Liveness.Key"]
+    ) -> set["Liveness.Key"]:
+        pinned = self.pinned
+        if node.k_is_reference or node.v_is_reference:
+            # The collection is referenced by the iteration bindings.
+            keys: list[Liveness.Key] = list()
+            self.uses(node.collection, keys)
+            self.pinned = pinned | set(keys)
+        head: set[Liveness.Key] = set()
+        while True:
+            if not node.block.elided:
+                self.frames.append(node.block)
+            bindings = {(id(self.frames[-1]), node.slot_k)}
+            if node.identifier_v is not None:
+                bindings.add((id(self.frames[-1]), node.slot_v))
+            self.loops.append(Liveness.Loop(live, head))
+            body = self.statements(node.block.statements, head)
+            self.loops.pop()
+            if not node.block.elided:
+                self.frames.pop()
+            update = live | (body - bindings)
+            if update == head:
+                break
+            head = update
+        self.pinned = pinned
+        live = set(head)
+        self.expression(node.collection, live)
+        return live
+
+
+# The bytecode compiler translates the statements of a resolved program or
+# function body into a flat sequence of instructions that is executed by a
+# stack-based virtual machine. Each instruction is a tuple of an opcode and up
+# to three operands. Identifier loads, operators, function calls, let and
+# assignment statements, conditionals, loops, try-catch, and return statements
+# are compiled into dedicated instructions. All other constructs are compiled
+# into a single instruction that evaluates the corresponding AST node with the
+# tree-walking interpreter, so that both engines share the same semantics,
+# error messages, and error traces.
+OP_CONST = 0  # push a
+OP_LOAD_LOCAL = 1  # push slot a of the current environment (identifier b)
+OP_LOAD_OUTER = 2  # push slot b of the environment at depth a (identifier c)
+OP_EVAL = 3  # push the result of evaluating expression a
+OP_COPY = 4  # replace the top of the stack with a copy
+OP_BINARY = 5  # pop rhs and lhs, push the result of binary expression a
+OP_UNARY = 6  # pop a value, push the result of unary expression a
+OP_AND = 7  # left-hand-side of and expression b, short circuit to a
+OP_OR = 8  # left-hand-side of or expression b, short circuit to a
+OP_LOGICAL = 9  # right-hand-side of and/or expression a
+OP_CALL = 10  # call with a arguments (function call expression b, moved c)
+OP_METHOD = 11  # push the function, self, and references of method call a
+OP_CALL_METHOD = (
+    12  # method call with a arguments (function call expression b, moved c)
+)
+OP_POP = 13  # pop a value
+OP_RESULT = 14  # pop a value into the program result
+OP_CLEAR = 15  # clear the program result
+OP_LET_SLOT = 16  # pop a value into slot a (let statement b, moved c)
+OP_LET_NAME = 17  # pop a value into a named binding (let statement a)
+OP_STORE = 18  # pop a value into the identifier of assignment statement a (moved b)
+OP_JUMP = 19  # jump to a
+OP_JUMP_FALSE = 20  # pop a condition, jump to a if false (conditional node b)
+OP_ENTER = 21  # enter a new environment with a slots
+OP_LEAVE = 22  # leave the current environment
+OP_EXEC = 23  # execute statement a with the tree-walking interpreter
+OP_RETURN = 24  # pop a value and return it (return statement a, moved b)
+OP_RETURN_NULL = 25  # return null
+OP_RETURN_RESULT = 26  # return the program result
+OP_CONTROL = 27  # return break or continue a outside of a loop
+OP_ERROR = 28  # pop a value and produce an error (error statement a)
+OP_TRY = 29  # install an error handler that jumps to a
+OP_END_TRY = 30  # remove the innermost error handler and jump to a
+OP_CATCH = 31  # bind the caught error (try statement a)
+OP_FOR = 32  # pop a collection and push the loop state (for statement a)
+OP_FOR_NEXT = 33  # bind the next element or exit to a (for statement b)
+OP_WHILE = 34  # push the loop state (while statement a)
+OP_BODY = 35  # enter the body environment (while statement a)
+OP_CONTINUE = 36  # leave the loop body, remove handlers above b, jump to a
+OP_BREAK = 37  # pop the loop state, remove handlers above b, jump to a
+OP_END = 38  # return from the end of the compiled statements
+OP_YIELD = 39  # pop a value and suspend execution yielding it (yield statement a)
+OP_NUMBER = 40  # pop rhs and lhs, push the result of numeric expression a (see below)
+
+# Numeric operations performed directly on the data of two numbers, and whether
+# the operation produces a boolean. Both the virtual machine and the closure
+# compiler evaluate nested arithmetic over raw Python floats, e.g. the product
+# in `x * x + 1`, and box the result into a number value only at the outermost
+# operation, where the result becomes observable. The OP_NUMBER instruction
+# computes its result with the Python function b from operands that are either
+# numbers or raw floats, and boxes the result with c unless c is None. Operands
+# of any other type are boxed and passed to the operate method of expression a.
+NUMBER_OPERATIONS: dict[type, Tuple[Callable[[Any, Any], Any], bool]] = {
+    AstExpressionAdd: (operator.add, False),
+    AstExpressionSub: (operator.sub, False),
+    AstExpressionMul: (operator.mul, False),
+    AstExpressionDiv: (number_div, False),
+    AstExpressionRem: (number_rem, False),
+    AstExpressionLe: (operator.le, True),
+    AstExpressionGe: (operator.ge, True),
+    AstExpressionLt: (operator.lt, True),
+    AstExpressionGt: (operator.gt, True),
+}
+
+Instruction = Tuple[int, Any, Any, Any]
+
+
+# Runtime state of a loop. The virtual machine keeps loop states on the operand
+# stack for the duration of the loop so that the loop can be unwound when an
+# error or return statement transfers control out of the loop.
+class LoopState:
+    def __init__(
+        self,
+        outer: Environment,
+        env: Optional[Environment],
+        iterator: Optional[Iterator[Any]] = None,
+        marked: Optional[Value] = None,
+    ):
+        self.outer = outer  # environment enclosing the loop
+        self.env = env  # environment of every iteration, if not fresh
+        self.iterator = iterator
+        self.marked = marked  # collection marked as referenced
+
+    def release(self) -> None:
+        if self.marked is not None:
+            Reference.unmark_referenced(self.marked)
+            self.marked = None
+
+
+class Compiler:
+    class Loop:
+        def __init__(self, head: int, handlers: int):
+            self.head = head
+            self.handlers = handlers
+            self.breaks: list[int] = list()
+
+    # Literal expressions evaluate to immutable values that never need to be
+    # copied.
+    LITERALS = (
+        AstExpressionNull,
+        AstExpressionBoolean,
+        AstExpressionNumber,
+        AstExpressionString,
+    )
 
-        while precedence < get_precedence(self.current_token.kind):
-            parse_led = self.parse_led_functions.get(self.current_token.kind, None)
-            if parse_led is None:
-                return expression
-            expression = parse_led(self, expression)
-        return expression
+    def __init__(self):
+        self.code: list[Instruction] = list()
+        self.loops: list[Compiler.Loop] = list()
+        self.handlers: int = 0
 
-    def parse_expression_identifier(self) -> AstExpressionIdentifier:
-        token = self._expect_current(TokenKind.IDENTIFIER)
-        return AstExpressionIdentifier(token.location, self._identifier(token.literal))
+    def emit(self, op: int, a: Any = None, b: Any = None, c: Any = None) -> int:
+        self.code.append((op, a, b, c))
+        return len(self.code) - 1
 
-    def parse_expression_template(self) -> AstExpressionTemplate:
-        token = self._expect_current(TokenKind.TEMPLATE)
-        assert token.template is not None
-        return AstExpressionTemplate(token.location, token.template)
+    def patch(self, index: int, a: Any) -> None:
+        (op, _, b, c) = self.code[index]
+        self.code[index] = (op, a, b, c)
 
-    def parse_expression_null(self) -> AstExpressionNull:
-        location = self._expect_current(TokenKind.NULL).location
-        return AstExpressionNull(location)
+    @staticmethod
+    def program(program: AstProgram) -> list[Instruction]:
+        compiler = Compiler()
+        for statement in program.statements:
+            if isinstance(statement, AstStatementExpression):
+                compiler.expression(statement.expression)
+                compiler.emit(OP_RESULT)
+            else:
+                compiler.statement(statement)
+                compiler.emit(OP_CLEAR)
+        compiler.emit(OP_RETURN_RESULT)
+        return compiler.code
 
-    def parse_expression_boolean(self) -> AstExpressionBoolean:
-        if self._check_current(TokenKind.TRUE):
-            location = self._expect_current(TokenKind.TRUE).location
-            return AstExpressionBoolean(location, Boolean.new(True))
-        if self._check_current(TokenKind.FALSE):
-            location = self._expect_current(TokenKind.FALSE).location
-            return AstExpressionBoolean(location, Boolean.new(False))
-        raise ParseError(
-            self.current_token.location,
-            f"expected boolean, found {self.current_token}",
+    @staticmethod
+    def function(function: AstExpressionFunction) -> list[Instruction]:
+        compiler = Compiler()
+        compiler.statements(function.body.statements)
+        compiler.emit(OP_END)
+        return compiler.code
+
+    def expression(self, node: AstExpression) -> None:
+        if isinstance(node, AstExpressionIdentifier):
+            if node.slot is None or node.address is None or len(node.address) != 1:
+                self.emit(OP_EVAL, node)
+            elif node.depth == 0:
+                self.emit(OP_LOAD_LOCAL, node.slot, node)
+            else:
+                self.emit(OP_LOAD_OUTER, node.depth, node.slot, node)
+        elif isinstance(node, Compiler.LITERALS):
+            self.emit(
+                OP_CONST, null if isinstance(node, AstExpressionNull) else node.data
+            )
+        elif isinstance(node, AstExpressionGrouped):
+            self.expression(node.expression)
+        elif isinstance(
+            node,
+            (
+                AstExpressionEq,
+                AstExpressionNe,
+                AstExpressionLe,
+                AstExpressionGe,
+                AstExpressionLt,
+                AstExpressionGt,
+                AstExpressionAdd,
+                AstExpressionSub,
+                AstExpressionMul,
+                AstExpressionDiv,
+                AstExpressionRem,
+            ),
+        ):
+            if type(node) in NUMBER_OPERATIONS:
+                (function, boolean) = NUMBER_OPERATIONS[type(node)]
+                self.unboxed(node.lhs)
+                self.unboxed(node.rhs)
+                box = Boolean.new if boolean else Number.new
+                self.emit(OP_NUMBER, node, function, box)
+            else:
+                self.expression(node.lhs)
+                self.expression(node.rhs)
+                self.emit(OP_BINARY, node)
+        elif isinstance(
+            node, (AstExpressionPositive, AstExpressionNegative, AstExpressionNot)
+        ):
+            self.expression(node.expression)
+            self.emit(OP_UNARY, node)
+        elif isinstance(node, (AstExpressionAnd, AstExpressionOr)):
+            self.expression(node.lhs)
+            op = OP_AND if isinstance(node, AstExpressionAnd) else OP_OR
+            jump = self.emit(op, None, node)
+            self.expression(node.rhs)
+            self.emit(OP_LOGICAL, node, "and" if op == OP_AND else "or")
+            self.patch(jump, len(self.code))
+        elif isinstance(node, AstExpressionFunctionCall) and not any(
+            isinstance(x, AstExpressionMkref) for x in node.arguments
+        ):
+            method = isinstance(node.function, AstExpressionAccessDot)
+            if method:
+                self.emit(OP_METHOD, node)
+            else:
+                self.expression(node.function)
+            for argument in node.arguments:
+                self.expression(argument)
+                if not isinstance(argument, Compiler.LITERALS) and not argument.moved:
+                    self.emit(OP_COPY)
+            if method:
+                self.emit(OP_CALL_METHOD, len(node.arguments), node, node.moved)
+            else:
+                self.emit(OP_CALL, len(node.arguments), node, node.moved)
+        else:
+            self.emit(OP_EVAL, node)
+
+    # Compiles an operand of a numeric operation, leaving the result of nested
+    # arithmetic on the stack as a raw Python float.
+    def unboxed(self, node: AstExpression) -> None:
+        if isinstance(node, AstExpressionGrouped):
+            self.unboxed(node.expression)
+        elif isinstance(
+            node,
+            (
+                AstExpressionAdd,
+                AstExpressionSub,
+                AstExpressionMul,
+                AstExpressionDiv,
+                AstExpressionRem,
+            ),
+        ):
+            self.unboxed(node.lhs)
+            self.unboxed(node.rhs)
+            self.emit(OP_NUMBER, node, NUMBER_OPERATIONS[type(node)][0], None)
+        elif isinstance(node, AstExpressionNumber):
+            self.emit(OP_CONST, float(node.data.data))
+        else:
+            self.expression(node)
+
+    def statements(self, statements: list[AstStatement]) -> None:
+        for statement in statements:
+            self.statement(statement)
+
+    def block(self, block: AstBlock) -> None:
+        if not block.elided:
+            self.emit(OP_ENTER, block.size)
+        self.statements(block.statements)
+        if not block.elided:
+            self.emit(OP_LEAVE)
+
+    def statement(self, node: AstStatement) -> None:
+        if isinstance(node, AstStatementExpression):
+            self.expression(node.expression)
+            self.emit(OP_POP)
+        elif isinstance(node, AstStatementLet):
+            self.expression(node.expression)
+            if node.slot is not None:
+                self.emit(OP_LET_SLOT, node.slot, node, node.expression.moved)
+            else:
+                self.emit(OP_LET_NAME, node)
+        elif isinstance(node, AstStatementAssignment) and isinstance(
+            node.lhs, AstExpressionIdentifier
+        ):
+            self.expression(node.rhs)
+            self.emit(OP_STORE, node, node.rhs.moved)
+        elif isinstance(node, AstStatementIfElifElse):
+            ends: list[int] = list()
+            for conditional in node.conditionals:
+                self.expression(conditional.condition)
+                jump = self.emit(OP_JUMP_FALSE, None, conditional)
+                self.block(conditional.body)
+                ends.append(self.emit(OP_JUMP))
+                self.patch(jump, len(self.code))
+            if node.else_block is not None:
+                self.block(node.else_block)
+            for end in ends:
+                self.patch(end, len(self.code))
+        elif isinstance(node, AstStatementFor) and not (
+            node.k_is_reference or node.v_is_reference
+        ):
+            self.expression(node.collection)
+            self.emit(OP_FOR, node)
+            loop = self.loop()
+            self.emit(OP_FOR_NEXT, None, node)
+            self.statements(node.block.statements)
+            self.emit(OP_CONTINUE, loop.head, self.handlers)
+            self.end(loop, loop.head)
+        elif isinstance(node, AstStatementWhile):
+            self.emit(OP_WHILE, node)
+            loop = self.loop()
+            self.expression(node.expression)
+            jump = self.emit(OP_JUMP_FALSE, None, node)
+            self.emit(OP_BODY, node)
+            self.statements(node.block.statements)
+            self.emit(OP_CONTINUE, loop.head, self.handlers)
+            exit = self.emit(OP_BREAK, None, self.handlers)
+            self.patch(jump, exit)
+            self.end(loop, exit)
+        elif isinstance(node, AstStatementBreak):
+            if len(self.loops) == 0:
+                self.emit(OP_CONTROL, Break(node.location))
+            else:
+                loop = self.loops[-1]
+                loop.breaks.append(self.emit(OP_BREAK, None, loop.handlers))
+        elif isinstance(node, AstStatementContinue):
+            if len(self.loops) == 0:
+                self.emit(OP_CONTROL, Continue(node.location))
+            else:
+                loop = self.loops[-1]
+                self.emit(OP_CONTINUE, loop.head, loop.handlers)
+        elif isinstance(node, AstStatementTry):
+            handler = self.emit(OP_TRY)
+            self.handlers += 1
+            self.block(node.try_block)
+            self.handlers -= 1
+            end = self.emit(OP_END_TRY)
+            self.patch(handler, len(self.code))
+            self.emit(OP_CATCH, node)
+            self.statements(node.catch_block.statements)
+            if not node.catch_block.elided:
+                self.emit(OP_LEAVE)
+            self.patch(end, len(self.code))
+        elif isinstance(node, AstStatementError):
+            self.expression(node.expression)
+            self.emit(OP_ERROR, node)
+        elif isinstance(node, AstStatementReturn):
+            if node.expression is None:
+                self.emit(OP_RETURN_NULL)
+            else:
+                self.expression(node.expression)
+                self.emit(OP_RETURN, node, node.expression.moved)
+        elif isinstance(node, AstStatementYield):
+            self.expression(node.expression)
+            self.emit(OP_YIELD, node)
+        else:
+            self.emit(OP_EXEC, node)
+
+    def loop(self) -> "Compiler.Loop":
+        loop = Compiler.Loop(len(self.code), self.handlers)
+        self.loops.append(loop)
+        return loop
+
+    # Ends the provided loop, patching break and loop exit instructions to
+    # jump to the instruction following the loop.
+    def end(self, loop: "Compiler.Loop", exit: int) -> None:
+        self.loops.pop()
+        self.patch(exit, len(self.code))
+        for index in loop.breaks:
+            self.patch(index, len(self.code))
+
+
+# Creates the runtime state of a for loop over the provided collection, or
+# produces an error if the collection cannot be iterated over. Mirrors the
+# value (non-reference) iteration of AstStatementFor.eval.
+def for_loop_state(
+    node: AstStatementFor, collection: Value, env: Environment
+) -> Union[LoopState, Error]:
+    # Value iteration iterates over copies of each element, so we iterate over
+    # a shallow copy of the collection to allow modification of that original
+    # collection during iteration.
+    collection = copy(collection)
+    loop_env = None if node.fresh else node.block.environment(env)
+    if metafunction := collection.metafunction(CONST_STRING_NEXT):
+        if node.identifier_v is not None:
+            return Error(
+                node.location,
+                f"attempted key-value iteration over iterator {quote(typename(collection))}",
+            )
+        if isinstance(collection, NativeIterator):
+            return LoopState(env, loop_env, collection.iterate(node.location))
+        if not callable_self_is_passed_by_reference(metafunction):
+            return Error(
+                node.location,
+                "iterator next must receive self by reference (declared with function.&(self))",
+            )
+        reference = Reference.new(collection)
+        return LoopState(
+            env,
+            loop_env,
+            iterate_next(node.location, metafunction, reference),
+            collection,
         )
+    if isinstance(collection, Number):
+        if node.identifier_v is not None:
+            return Error(
+                node.location,
+                f"attempted key-value iteration over type {quote(typename(collection))}",
+            )
+        if not float(collection.data).is_integer():
+            return Error(
+                node.location,
+                f"attempted iteration over non-integer number {quote(collection)}",
+            )
+        try:
+            collection_integer = collection.as_index()
+        except Exception as e:
+            return Error(node.location, str(e))
+        return LoopState(env, loop_env, map(Number.new, range(collection_integer)))
+    if isinstance(collection, Vector):
+        if node.identifier_v is not None:
+            return Error(
+                node.location,
+                f"attempted key-value iteration over type {quote(typename(collection))}",
+            )
+        return LoopState(env, loop_env, map(copy, list(collection.data)))
+    if isinstance(collection, Map):
+        items = dict(collection.data).items()
+        if node.identifier_v is None:
+            return LoopState(env, loop_env, (copy(k) for k, _ in items))
+        return LoopState(env, loop_env, ((copy(k), copy(v)) for k, v in items))
+    if isinstance(collection, Set):
+        if node.identifier_v is not None:
+            return Error(
+                node.location,
+                f"attempted key-value iteration over type {quote(typename(collection))}",
+            )
+        return LoopState(env, loop_env, map(copy, list(dict(collection.data).keys())))
+    if isinstance(collection, (Array, Bitset, Buffer)):
+        if node.identifier_v is not None:
+            return Error(
+                node.location,
+                f"attempted key-value iteration over type {quote(typename(collection))}",
+            )
+        return LoopState(env, loop_env, collection.elements())
+    return Error(
+        node.location,
+        f"attempted iteration over type {quote(typename(collection))}",
+    )
 
-    def parse_expression_number(self) -> AstExpressionNumber:
-        token = self._expect_current(TokenKind.NUMBER)
-        assert isinstance(token.value, Number)
-        return AstExpressionNumber(token.location, token.value)
 
-    def parse_expression_string(self) -> AstExpressionString:
-        token = self._expect_current(TokenKind.STRING)
-        assert isinstance(token.value, String)
-        return AstExpressionString(token.location, token.value)
+# Executes compiled code within the provided environment. The result of
+# execution is equivalent to the result of AstBlock.exec for the compiled
+# statements.
+def vm_execute(code: list[Instruction], env: Environment) -> Optional[ControlFlow]:
+    try:
+        next(vm_run(code, env))
+    except StopIteration as stop:
+        return stop.value
+    raise Exception("encountered yield statement outside of a generator function")
+
+
+# Executes compiled code within the provided environment as a Python generator
+# that is suspended at every yield statement, producing the yielded value. The
+# result of execution is returned when the generator is exhausted. Closing the
+# generator while suspended releases the loop states of the operand stack.
+def vm_run(
+    code: list[Instruction], env: Environment
+) -> Generator[Value, None, Optional[ControlFlow]]:
+    stack: list[Any] = list()
+    handlers: list[Tuple[int, int, Environment]] = list()
+    result: Optional[Value] = None
+    pc = 0
+    while True:
+        (op, a, b, c) = code[pc]
+        pc += 1
+        value: Any
+        error: Optional[Error] = None
+        if op == OP_LOAD_LOCAL:
+            value = env.slots[a]
+            if value is None:
+                value = b.eval(env)
+                if isinstance(value, Error):
+                    error = value
+            stack.append(value)
+        elif op == OP_CONST:
+            stack.append(a)
+        elif op == OP_NUMBER:
+            rhs = stack.pop()
+            lhs = stack[-1]
+            lhs_type = type(lhs)
+            rhs_type = type(rhs)
+            if (lhs_type is float or lhs_type is Number) and (
+                rhs_type is float or rhs_type is Number
+            ):
+                value = b(
+                    lhs if lhs_type is float else lhs.data,
+                    rhs if rhs_type is float else rhs.data,
+                )
+                stack[-1] = value if c is None else c(value)
+            else:
+                value = a.operate(
+                    Number.new(lhs) if lhs_type is float else lhs,
+                    Number.new(rhs) if rhs_type is float else rhs,
+                )
+                if isinstance(value, Error):
+                    error = value
+                stack[-1] = value
+        elif op == OP_BINARY:
+            rhs = stack.pop()
+            value = a.operate(stack[-1], rhs)
+            if isinstance(value, Error):
+                error = value
+            stack[-1] = value
+        elif op == OP_COPY:
+            stack[-1] = copy(stack[-1])
+        elif op == OP_JUMP_FALSE:
+            value = stack.pop()
+            if not isinstance(value, Boolean):
+                error = Error(
+                    b.location,
+                    f"conditional with non-boolean type {quote(typename(value))}",
+                )
+            elif not value.data:
+                pc = a
+        elif op == OP_LOAD_OUTER:
+            frame = env
+            for _ in range(a):
+                frame = frame.outer  # type: ignore[assignment]
+            value = frame.slots[b]
+            if value is None:
+                value = c.eval(env)
+                if isinstance(value, Error):
+                    error = value
+            stack.append(value)
+        elif op == OP_CALL:
+            arguments = stack[len(stack) - a :]
+            del stack[len(stack) - a :]
+            value = call(b.location, stack[-1], arguments)
+            if isinstance(value, Error):
+                error = value
+            elif c and not isinstance(stack[-1], Function):
+                value = copy(value)  # owned result
+            stack[-1] = value
+        elif op == OP_EVAL:
+            value = a.eval(env)
+            if isinstance(value, Error):
+                error = value
+            stack.append(value)
+        elif op == OP_LET_SLOT:
+            value = stack.pop()
+            if isinstance(value, Reference):
+                error = Error(
+                    b.location,
+                    f"attempted assignment statement with type reference to {typename(value)}",
+                )
+            else:
+                env.slots[a] = value if c else copy(value)
+        elif op == OP_STORE:
+            value = stack.pop()
+            if isinstance(value, Reference):
+                error = Error(
+                    a.location,
+                    f"attempted assignment statement with type reference to {value.data.typename()}",
+                )
+            else:
+                try:
+                    env.set_address(
+                        a.lhs.address, a.lhs.name, value if b else copy(value)
+                    )
+                except Exception as e:
+                    error = Error(a.location, str(e))
+        elif op == OP_POP:
+            stack.pop()
+        elif op == OP_JUMP:
+            pc = a
+        elif op == OP_FOR_NEXT:
+            loop = stack[-1]
+            value = next(loop.iterator, None)
+            if value is None:
+                stack.pop()
+                loop.release()
+                pc = a
+                continue
+            if isinstance(value, Error):
+                error = value
+            else:
+                env = loop.env or b.block.environment(loop.outer)
+                if b.identifier_v is None:
+                    env.let_slot(
+                        b.slot_k, b.identifier_k.name, value, b.identifier_k.location
+                    )
+                else:
+                    env.let_slot(
+                        b.slot_k, b.identifier_k.name, value[0], b.identifier_k.location
+                    )
+                    env.let_slot(
+                        b.slot_v, b.identifier_v.name, value[1], b.identifier_v.location
+                    )
+        elif op == OP_CONTINUE:
+            del handlers[b:]
+            env = stack[-1].outer
+            pc = a
+        elif op == OP_METHOD:
+            value = a.method(env)
+            if isinstance(value, Error):
+                error = value
+            else:
+                stack.extend(value)
+        elif op == OP_CALL_METHOD:
+            arguments = stack[len(stack) - a - 2 :]
+            del stack[len(stack) - a - 2 :]
+            referenced = arguments.pop(1)
+            try:
+                value = call_method(b.location, stack[-1], arguments)
+            finally:
+                for x in referenced:
+                    Reference.unmark_referenced(x)
+            if isinstance(value, Error):
+                error = value
+            elif c and not isinstance(stack[-1], Function):
+                value = copy(value)  # owned result
+            stack[-1] = value
+        elif op == OP_UNARY:
+            value = a.operate(stack[-1])
+            if isinstance(value, Error):
+                error = value
+            stack[-1] = value
+        elif op == OP_AND or op == OP_OR:
+            value = stack[-1]
+            if not isinstance(value, Boolean):
+                error = Error(
+                    b.location,
+                    f"attempted binary {'and' if op == OP_AND else 'or'} operation with left-hand-side of type {quote(typename(value))}",
+                )
+            elif value.data == (op == OP_OR):
+                pc = a  # short circuit
+            else:
+                stack.pop()
+        elif op == OP_LOGICAL:
+            value = stack[-1]
+            if not isinstance(value, Boolean):
+                error = Error(
+                    a.location,
+                    f"attempted binary {b} operation with right-hand-side of type {quote(typename(value))}",
+                )
+        elif op == OP_ENTER:
+            env = Environment(env, a)
+        elif op == OP_LEAVE:
+            env = env.outer  # type: ignore[assignment]
+        elif op == OP_FOR:
+            value = for_loop_state(a, stack.pop(), env)
+            if isinstance(value, Error):
+                error = value
+            else:
+                stack.append(value)
+        elif op == OP_WHILE:
+            stack.append(LoopState(env, None if a.fresh else a.block.environment(env)))
+        elif op == OP_BODY:
+            loop = stack[-1]
+            env = loop.env or a.block.environment(env)
+        elif op == OP_BREAK:
+            del handlers[b:]
+            loop = stack.pop()
+            loop.release()
+            env = loop.outer
+            pc = a
+        elif op == OP_RESULT:
+            result = stack.pop()
+        elif op == OP_CLEAR:
+            result = None
+        elif op == OP_LET_NAME:
+            value = stack.pop()
+            if isinstance(value, Reference):
+                error = Error(
+                    a.location,
+                    f"attempted assignment statement with type reference to {typename(value)}",
+                )
+            else:
+                env.let(a.identifier.name, copy(value), a.identifier.location)
+        elif op == OP_EXEC:
+            value = a.eval(env)
+            if isinstance(value, Error):
+                error = value
+            elif value is not None:
+                vm_unwind(stack, 0)
+                return value
+        elif op == OP_RETURN:
+            value = stack.pop()
+            if isinstance(value, Reference):
+                error = Error(
+                    a.location,
+                    f"attempted return statement with type reference to {typename(value)}",
+                )
+            else:
+                vm_unwind(stack, 0)
+                return Return(value if b else copy(value))
+        elif op == OP_RETURN_NULL:
+            vm_unwind(stack, 0)
+            return Return(null)
+        elif op == OP_RETURN_RESULT:
+            return Return(result if result is not None else null)
+        elif op == OP_CONTROL:
+            vm_unwind(stack, 0)
+            return a
+        elif op == OP_ERROR:
+            value = stack.pop()
+            if isinstance(value, Reference):
+                error = Error(
+                    a.location,
+                    f"attempted error statement with type reference to {typename(value)}",
+                )
+            else:
+                error = Error(a.location, copy(value))
+        elif op == OP_TRY:
+            handlers.append((a, len(stack), env))
+        elif op == OP_END_TRY:
+            handlers.pop()
+            pc = a
+        elif op == OP_CATCH:
+            value = stack.pop()
+            env = a.catch_block.environment(env)
+            if a.catch_identifier is not None:
+                env.let_slot(
+                    a.catch_slot,
+                    a.catch_identifier.name,
+                    copy(value.value),
+                    a.catch_identifier.location,
+                )
+        elif op == OP_END:
+            return None
+        elif op == OP_YIELD:
+            value = stack.pop()
+            if isinstance(value, Reference):
+                error = Error(
+                    a.location,
+                    f"attempted yield statement with type reference to {typename(value)}",
+                )
+            else:
+                try:
+                    yield copy(value)
+                except GeneratorExit:
+                    vm_unwind(stack, 0)
+                    raise
+        else:
+            raise Exception(f"unknown opcode {op}")
+
+        if error is not None:
+            if len(handlers) == 0:
+                vm_unwind(stack, 0)
+                return error
+            (pc, height, env) = handlers.pop()
+            vm_unwind(stack, height)
+            stack.append(error)
+
+
+# Releases the loop states and referenced values of the operand stack above
+# the provided height.
+def vm_unwind(stack: list[Any], height: int) -> None:
+    while len(stack) > height:
+        value = stack.pop()
+        if isinstance(value, LoopState):
+            value.release()
+        elif isinstance(value, list):
+            for x in value:
+                Reference.unmark_referenced(x)
+
+
+# The closure compiler translates each expression and statement of a resolved
+# program into a nested Python closure (selected with --engine=closure). The
+# node fields needed during evaluation are captured as closure variables when
+# the closure is created, removing the per-node attribute lookups and virtual
+# dispatch of eval() from the hot path, and common shapes such as arithmetic
+# with a number literal operand are compiled into specialized closures.
+# Constructs without a dedicated closure are compiled into a closure that
+# evaluates the corresponding AST node with the tree-walking interpreter.
+#
+# Errors produced within compiled closures are propagated by raising an
+# ErrorPropagation exception rather than by returning the error, so that the
+# closure of each node does not need to check the results of its operands.
+# The exception is caught by the closures of try-catch statements, and at the
+# boundaries of compiled programs and function bodies, where the error is
+# returned to the caller (i.e. call(), which extends the trace of the error).
+# Errors returned by the tree-walking interpreter, operations, and calls are
+# raised at the point where the closure receives them.
+ExpressionClosure = Callable[[Environment], Value]
+StatementClosure = Callable[[Environment], Optional[Union[Return, Break, Continue]]]
+
+
+class ErrorPropagation(Exception):
+    def __init__(self, error: Error):
+        super().__init__()
+        self.error = error
 
-    def parse_expression_regexp(self) -> AstExpressionRegexp:
-        token = self._expect_current(TokenKind.REGEXP)
-        assert isinstance(token.value, Regexp)
-        return AstExpressionRegexp(token.location, token.value)
 
-    def parse_expression_regexp_group(self) -> AstExpressionRegexpGroup:
-        token = self._expect_current(TokenKind.REGEXP_GROUP)
-        assert token.group is not None
-        return AstExpressionRegexpGroup(token.location, token.group)
+class ClosureCompiler:
+    @staticmethod
+    def program(program: AstProgram) -> Callable[[Environment], Union[Value, Error]]:
+        statements: list[Tuple[bool, Callable[[Environment], Any]]] = [
+            (
+                (True, ClosureCompiler.expression(x.expression))
+                if isinstance(x, AstStatementExpression)
+                else (False, ClosureCompiler.statement(x))
+            )
+            for x in program.statements
+        ]
 
-    def parse_expression_vector(
-        self, mode: ParseMode = ParseMode.MELLIFERA
-    ) -> AstExpressionVector:
-        def parse_expression():
-            match mode:
-                case ParseMode.MELLIFERA:
-                    return self.parse_expression()
-                case ParseMode.COMB:
-                    return self.parse_comb_expression()
+        def evaluate(env: Environment) -> Union[Value, Error]:
+            result: Optional[Union[Value, ControlFlow]] = None
+            try:
+                for is_expression, statement in statements:
+                    result = statement(env)
+                    if result is None or is_expression:
+                        continue
+                    if isinstance(result, Return):
+                        return result.value
+                    if isinstance(result, Break):
+                        return Error(
+                            result.location, "attempted to break outside of a loop"
+                        )
+                    if isinstance(result, Continue):
+                        return Error(
+                            result.location, "attempted to continue outside of a loop"
+                        )
+            except ErrorPropagation as e:
+                return e.error
+            return result if isinstance(result, Value) else null
 
-        location = self._expect_current(TokenKind.LBRACKET).location
-        elements: list[AstExpression] = list()
-        while not self._check_current(TokenKind.RBRACKET):
-            if len(elements) != 0:
-                self._expect_current(TokenKind.COMMA)
-            if self._check_current(TokenKind.RBRACKET):
-                break
-            elements.append(parse_expression())
-        self._expect_current(TokenKind.RBRACKET)
-        return AstExpressionVector(location, elements)
+        return evaluate
 
-    def parse_expression_map_or_set(
-        self, mode: ParseMode = ParseMode.MELLIFERA
-    ) -> Union[AstExpressionMap, AstExpressionSet]:
-        def parse_expression():
-            match mode:
-                case ParseMode.MELLIFERA:
-                    return self.parse_expression()
-                case ParseMode.COMB:
-                    return self.parse_comb_expression()
+    # Closure body of a function, returning errors raised within the body.
+    @staticmethod
+    def function(block: AstBlock) -> Callable[[Environment], Optional[ControlFlow]]:
+        execute = ClosureCompiler.block(block)
 
-        ParseMapOrSet = enum.Enum("ParseMapOrSet", ["UNKNOWN", "MAP", "SET"])
-        map_or_set = ParseMapOrSet.UNKNOWN
-        if self._check_current(TokenKind.MAP):
-            map_or_set = ParseMapOrSet.MAP
-            location = self.current_token.location
-            self._advance_token()
-            self._expect_current(TokenKind.LBRACE)
-        elif self._check_current(TokenKind.SET):
-            map_or_set = ParseMapOrSet.SET
-            location = self.current_token.location
-            self._advance_token()
-            self._expect_current(TokenKind.LBRACE)
-        else:
-            location = self._expect_current(TokenKind.LBRACE).location
+        def function(env: Environment) -> Optional[ControlFlow]:
+            try:
+                return execute(env)
+            except ErrorPropagation as e:
+                return e.error
 
-        map_elements: list[Tuple[AstExpression, AstExpression]] = list()
-        set_elements: list[AstExpression] = list()
-        while not self._check_current(TokenKind.RBRACE):
-            if len(map_elements) != 0 or len(set_elements) != 0:
-                self._expect_current(TokenKind.COMMA)
-            if self._check_current(TokenKind.RBRACE):
-                break
+        return function
 
-            identifier: Optional[AstExpressionIdentifier] = None
-            if self._check_current(TokenKind.DOT):
-                if map_or_set == ParseMapOrSet.UNKNOWN:
-                    map_or_set = ParseMapOrSet.MAP
-                elif map_or_set == ParseMapOrSet.SET:
-                    raise ParseError(
-                        self.current_token.location,
-                        f"expected expression, found {self.current_token}",
-                    )
-                assert map_or_set == ParseMapOrSet.MAP
-                self._expect_current(TokenKind.DOT)
-                identifier = self.parse_expression_identifier()
-                expression: AstExpression = AstExpressionString(
-                    identifier.location, identifier.name
-                )
-            else:
-                expression = parse_expression()
+    # Closure evaluating the provided node with the tree-walking interpreter,
+    # raising the error produced by the evaluation if any.
+    @staticmethod
+    def fallback(node: AstExpression) -> ExpressionClosure:
+        evaluate = node.eval
 
-            if map_or_set == ParseMapOrSet.UNKNOWN:
-                if self._check_current(TokenKind.COLON) or self._check_current(
-                    TokenKind.ASSIGN
-                ):
-                    map_or_set = ParseMapOrSet.MAP
-                else:
-                    map_or_set = ParseMapOrSet.SET
+        def fallback(env: Environment) -> Value:
+            result = evaluate(env)
+            if isinstance(result, Error):
+                raise ErrorPropagation(result)
+            return result
 
-            assert map_or_set != ParseMapOrSet.UNKNOWN
-            match map_or_set:
-                case ParseMapOrSet.MAP:
-                    if self._check_current(TokenKind.COLON):
-                        if identifier is not None:
-                            raise ParseError(
-                                self.current_token.location,
-                                f"expected .{identifier.name.runes} = VALUE, found .{identifier.name.runes}: VALUE",
-                            )
-                        self._expect_current(TokenKind.COLON)
-                    elif self._check_current(TokenKind.ASSIGN):
-                        if identifier is None:
-                            raise ParseError(
-                                self.current_token.location,
-                                'expected "KEY": VALUE, found "KEY" = VALUE',
-                            )
-                        self._expect_current(TokenKind.ASSIGN)
-                    else:
-                        raise ParseError(
-                            self.current_token.location,
-                            f"expected {TokenKind.COLON} or {TokenKind.ASSIGN}, found {self.current_token}",
-                        )
-                    map_elements.append((expression, parse_expression()))
-                case ParseMapOrSet.SET:
-                    set_elements.append(expression)
+        return fallback
 
-        self._expect_current(TokenKind.RBRACE)
-        match map_or_set:
-            case ParseMapOrSet.UNKNOWN:
-                raise ParseError(location, "ambiguous empty map or set")
-            case ParseMapOrSet.MAP:
-                result = AstExpressionMap(location, map_elements)
-                update_named_functions(result)
+    @staticmethod
+    def expression(node: AstExpression) -> ExpressionClosure:
+        if isinstance(node, AstExpressionIdentifier):
+            return ClosureCompiler.identifier(node)
+        if isinstance(node, Compiler.LITERALS):
+            value = null if isinstance(node, AstExpressionNull) else node.data
+            return lambda env: value
+        if isinstance(node, AstExpressionGrouped):
+            return ClosureCompiler.expression(node.expression)
+        if isinstance(
+            node,
+            (
+                AstExpressionEq,
+                AstExpressionNe,
+                AstExpressionLe,
+                AstExpressionGe,
+                AstExpressionLt,
+                AstExpressionGt,
+                AstExpressionAdd,
+                AstExpressionSub,
+                AstExpressionMul,
+                AstExpressionDiv,
+                AstExpressionRem,
+            ),
+        ):
+            return ClosureCompiler.binary(node)
+        if isinstance(
+            node, (AstExpressionPositive, AstExpressionNegative, AstExpressionNot)
+        ):
+            return ClosureCompiler.unary(node)
+        if isinstance(node, (AstExpressionAnd, AstExpressionOr)):
+            return ClosureCompiler.logical(node)
+        if isinstance(node, AstExpressionFunctionCall) and not any(
+            isinstance(x, AstExpressionMkref) for x in node.arguments
+        ):
+            return ClosureCompiler.function_call(node)
+        return ClosureCompiler.fallback(node)
+
+    @staticmethod
+    def identifier(node: AstExpressionIdentifier) -> ExpressionClosure:
+        slot = node.slot
+        depth = node.depth
+        fallback = ClosureCompiler.fallback(node)
+        if slot is None or node.address is None or len(node.address) != 1:
+            return fallback
+        if depth == 0:
+
+            def local(env: Environment) -> Value:
+                value = env.slots[slot]
+                return value if value is not None else fallback(env)
+
+            return local
+
+        def outer(env: Environment) -> Value:
+            frame = env
+            for _ in range(depth):
+                frame = frame.outer  # type: ignore[assignment]
+            value = frame.slots[slot]
+            return value if value is not None else fallback(env)
+
+        return outer
+
+    @staticmethod
+    def binary(
+        node: Union[
+            AstExpressionEq,
+            AstExpressionNe,
+            AstExpressionLe,
+            AstExpressionGe,
+            AstExpressionLt,
+            AstExpressionGt,
+            AstExpressionAdd,
+            AstExpressionSub,
+            AstExpressionMul,
+            AstExpressionDiv,
+            AstExpressionRem,
+        ],
+        boxed: bool = True,
+    ) -> ExpressionClosure:
+        operate = node.operate
+
+        if type(node) not in NUMBER_OPERATIONS:
+            lhs = ClosureCompiler.expression(node.lhs)
+            rhs = ClosureCompiler.expression(node.rhs)
+
+            def binary(env: Environment) -> Value:
+                lhs_value = lhs(env)
+                result = operate(lhs_value, rhs(env))
+                if isinstance(result, Error):
+                    raise ErrorPropagation(result)
                 return result
-            case ParseMapOrSet.SET:
-                return AstExpressionSet(location, set_elements)
 
-    def parse_expression_function(self) -> AstExpressionFunction:
-        location = self._expect_current(TokenKind.FUNCTION).location
-        self_by_reference = False
-        if self._check_current(TokenKind.MKREF):
-            self._advance_token()
-            self_by_reference = True
-        self._expect_current(TokenKind.LPAREN)
-        parameters: list[AstIdentifier] = list()
-        while not self._check_current(TokenKind.RPAREN):
-            if len(parameters) != 0:
-                self._expect_current(TokenKind.COMMA)
-            parameters.append(self.parse_identifier())
-        self._expect_current(TokenKind.RPAREN)
-        body = self.parse_block()
-        for i in range(len(parameters)):
-            for j in range(i + 1, len(parameters)):
-                if parameters[i].name == parameters[j].name:
-                    raise ParseError(
-                        parameters[j].location,
-                        f"duplicate function parameter {quote(parameters[i].name.runes)}",
+            return binary
+
+        # The generic operation, raising the error produced by the operation
+        # if any.
+        def operation(lhs_value: Value, rhs_value: Value) -> Value:
+            result = operate(lhs_value, rhs_value)
+            if isinstance(result, Error):
+                raise ErrorPropagation(result)
+            return result
+
+        lhs = ClosureCompiler.unboxed(node.lhs)
+        rhs = ClosureCompiler.unboxed(node.rhs)
+        (function, boolean) = NUMBER_OPERATIONS[type(node)]
+        # Unboxed results are produced with float, which returns the float
+        # result of the operation as is.
+        result: Callable[[Any], Any] = float
+        if boxed:
+            result = Boolean.new if boolean else Number.new
+        if isinstance(node.rhs, AstExpressionNumber):
+            # Binary operation with a number literal right hand side, e.g.
+            # `i + 1` or `n < 2`.
+            constant = node.rhs.data
+            data = constant.data
+            identifier = node.lhs
+            if (
+                isinstance(identifier, AstExpressionIdentifier)
+                and identifier.slot is not None
+                and identifier.depth == 0
+                and identifier.address is not None
+                and len(identifier.address) == 1
+            ):
+                slot = identifier.slot
+                fallback = ClosureCompiler.fallback(identifier)
+
+                def local_constant(env: Environment) -> Value:
+                    lhs_value = env.slots[slot]
+                    if type(lhs_value) is Number:
+                        return result(function(lhs_value.data, data))
+                    if lhs_value is None:
+                        lhs_value = fallback(env)
+                    return operation(lhs_value, constant)
+
+                return local_constant
+
+            def constant_rhs(env: Environment) -> Value:
+                lhs_value = lhs(env)
+                if type(lhs_value) is float:
+                    return result(function(lhs_value, data))
+                if type(lhs_value) is Number:
+                    return result(function(lhs_value.data, data))
+                return operation(lhs_value, constant)
+
+            return constant_rhs
+
+        def number(env: Environment) -> Value:
+            lhs_value = lhs(env)
+            rhs_value = rhs(env)
+            lhs_type = type(lhs_value)
+            rhs_type = type(rhs_value)
+            if (lhs_type is float or lhs_type is Number) and (
+                rhs_type is float or rhs_type is Number
+            ):
+                return result(
+                    function(
+                        lhs_value if lhs_type is float else lhs_value.data,
+                        rhs_value if rhs_type is float else rhs_value.data,
                     )
-        if self_by_reference and len(parameters) == 0:
-            raise ParseError(
-                location,
-                "function takes self by reference, but has no parameters",
+                )
+            return operation(
+                Number.new(lhs_value) if lhs_type is float else lhs_value,
+                Number.new(rhs_value) if rhs_type is float else rhs_value,
             )
-        return AstExpressionFunction(
-            location, parameters, body, None, self_by_reference
-        )
 
-    def parse_expression_grouped(self) -> AstExpressionGrouped:
-        location = self._expect_current(TokenKind.LPAREN).location
-        expression = self.parse_expression()
-        self._expect_current(TokenKind.RPAREN)
-        return AstExpressionGrouped(location, expression)
+        return number
 
-    def parse_expression_freeze(self) -> AstExpressionFreeze:
-        location = self._expect_current(TokenKind.FREEZE).location
-        expression = self.parse_expression()
-        return AstExpressionFreeze(location, expression)
+    # Returns a closure evaluating the provided operand of a numeric operation,
+    # where the result of nested arithmetic is produced as a raw Python float
+    # rather than a number value (see NUMBER_OPERATIONS).
+    @staticmethod
+    def unboxed(node: AstExpression) -> Callable[[Environment], Any]:
+        if isinstance(node, AstExpressionGrouped):
+            return ClosureCompiler.unboxed(node.expression)
+        if isinstance(node, AstExpressionNumber):
+            value = float(node.data.data)
+            return lambda env: value
+        if isinstance(
+            node,
+            (
+                AstExpressionAdd,
+                AstExpressionSub,
+                AstExpressionMul,
+                AstExpressionDiv,
+                AstExpressionRem,
+            ),
+        ):
+            return ClosureCompiler.binary(node, boxed=False)
+        if isinstance(node, AstExpressionNegative):
+            return ClosureCompiler.unary(node, boxed=False)
+        return ClosureCompiler.expression(node)
 
-    def parse_expression_type(self) -> AstExpressionType:
-        location = self._expect_current(TokenKind.TYPE).location
+    @staticmethod
+    def unary(
+        node: Union[AstExpressionPositive, AstExpressionNegative, AstExpressionNot],
+        boxed: bool = True,
+    ) -> ExpressionClosure:
+        operate = node.operate
+        if isinstance(node, AstExpressionNegative):
+            operand = ClosureCompiler.unboxed(node.expression)
+            result: Callable[[Any], Any] = Number.new if boxed else float
+
+            def negative(env: Environment) -> Value:
+                value = operand(env)
+                if type(value) is float:
+                    return result(-value)
+                if type(value) is Number:
+                    return result(-float(value.data))
+                value = operate(value)
+                if isinstance(value, Error):
+                    raise ErrorPropagation(value)
+                return value
 
-        extends = None
-        if self._check_current(TokenKind.EXTENDS):
-            self._advance_token()
-            extends = self.parse_expression()
+            return negative
 
-        expression = self.parse_expression()
-        name = (
-            f"type@[{location.file}, line {location.line}]"
-            if location is not None
-            else "anonymous type"
-        )
-        return AstExpressionType(location, String.new(name), extends, expression)
+        expression = ClosureCompiler.expression(node.expression)
 
-    def parse_expression_new(self) -> AstExpressionNew:
-        location = self._expect_current(TokenKind.NEW).location
-        meta = self.parse_expression()
-        expression = self.parse_expression()
-        return AstExpressionNew(location, meta, expression)
+        def unary(env: Environment) -> Value:
+            value = operate(expression(env))
+            if isinstance(value, Error):
+                raise ErrorPropagation(value)
+            return value
 
-    def parse_expression_positive(
-        self, mode: ParseMode = ParseMode.MELLIFERA
-    ) -> AstExpressionPositive:
-        location = self._expect_current(TokenKind.ADD).location
-        match mode:
-            case ParseMode.MELLIFERA:
-                expression = self.parse_expression(Precedence.PREFIX)
-            case ParseMode.COMB:
-                expression = self.parse_comb_expression()
-        return AstExpressionPositive(location, expression)
+        return unary
 
-    def parse_expression_negative(
-        self, mode: ParseMode = ParseMode.MELLIFERA
-    ) -> AstExpressionNegative:
-        location = self._expect_current(TokenKind.SUB).location
-        match mode:
-            case ParseMode.MELLIFERA:
-                expression = self.parse_expression(Precedence.PREFIX)
-            case ParseMode.COMB:
-                expression = self.parse_comb_expression()
-        return AstExpressionNegative(location, expression)
+    @staticmethod
+    def logical(node: Union[AstExpressionAnd, AstExpressionOr]) -> ExpressionClosure:
+        lhs = ClosureCompiler.expression(node.lhs)
+        rhs = ClosureCompiler.expression(node.rhs)
+        location = node.location
+        name = "and" if isinstance(node, AstExpressionAnd) else "or"
+        short_circuit = isinstance(node, AstExpressionOr)
+
+        def logical(env: Environment) -> Value:
+            lhs_value = lhs(env)
+            if not isinstance(lhs_value, Boolean):
+                raise ErrorPropagation(
+                    Error(
+                        location,
+                        f"attempted binary {name} operation with left-hand-side of type {quote(typename(lhs_value))}",
+                    )
+                )
+            if lhs_value.data == short_circuit:
+                return lhs_value
+            rhs_value = rhs(env)
+            if not isinstance(rhs_value, Boolean):
+                raise ErrorPropagation(
+                    Error(
+                        location,
+                        f"attempted binary {name} operation with right-hand-side of type {quote(typename(rhs_value))}",
+                    )
+                )
+            return rhs_value
 
-    def parse_expression_not(self) -> AstExpressionNot:
-        location = self._expect_current(TokenKind.NOT).location
-        expression = self.parse_expression(Precedence.PREFIX)
-        return AstExpressionNot(location, expression)
+        return logical
 
-    def parse_expression_and(self, lhs: AstExpression) -> AstExpressionAnd:
-        location = self._expect_current(TokenKind.AND).location
-        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.AND])
-        return AstExpressionAnd(location, lhs, rhs)
+    @staticmethod
+    def function_call(node: AstExpressionFunctionCall) -> ExpressionClosure:
+        arguments = [ClosureCompiler.expression(x) for x in node.arguments]
+        moves = [x.moved for x in node.arguments]
+        moved = node.moved
+        location = node.location
+        if isinstance(node.function, AstExpressionAccessDot):
+            method = node.method
+
+            def method_call(env: Environment) -> Value:
+                resolved = method(env)
+                if isinstance(resolved, Error):
+                    raise ErrorPropagation(resolved)
+                (function, self_argument, referenced) = resolved
+                try:
+                    values = [self_argument]
+                    for argument, move in zip(arguments, moves):
+                        value = argument(env)
+                        values.append(value if move else copy(value))
+                    result = call_method(location, function, values)
+                    if isinstance(result, Error):
+                        raise ErrorPropagation(result)
+                    if moved and not isinstance(function, Function):
+                        return copy(result)  # owned result
+                    return result
+                finally:
+                    for x in referenced:
+                        Reference.unmark_referenced(x)
 
-    def parse_expression_or(self, lhs: AstExpression) -> AstExpressionOr:
-        location = self._expect_current(TokenKind.OR).location
-        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.OR])
-        return AstExpressionOr(location, lhs, rhs)
+            return method_call
 
-    def parse_expression_eq(self, lhs: AstExpression) -> AstExpressionEq:
-        location = self._expect_current(TokenKind.EQ).location
-        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.EQ])
-        return AstExpressionEq(location, lhs, rhs)
+        callee = ClosureCompiler.expression(node.function)
 
-    def parse_expression_ne(self, lhs: AstExpression) -> AstExpressionNe:
-        location = self._expect_current(TokenKind.NE).location
-        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.NE])
-        return AstExpressionNe(location, lhs, rhs)
+        def function_call(env: Environment) -> Value:
+            function = callee(env)
+            values = list()
+            for argument, move in zip(arguments, moves):
+                value = argument(env)
+                values.append(value if move else copy(value))
+            result = call(location, function, values)
+            if isinstance(result, Error):
+                raise ErrorPropagation(result)
+            if moved and not isinstance(function, Function):
+                return copy(result)  # owned result
+            return result
 
-    def parse_expression_le(self, lhs: AstExpression) -> AstExpressionLe:
-        location = self._expect_current(TokenKind.LE).location
-        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.LE])
-        return AstExpressionLe(location, lhs, rhs)
+        return function_call
 
-    def parse_expression_ge(self, lhs: AstExpression) -> AstExpressionGe:
-        location = self._expect_current(TokenKind.GE).location
-        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.GE])
-        return AstExpressionGe(location, lhs, rhs)
+    @staticmethod
+    def block(block: AstBlock) -> StatementClosure:
+        statements = [ClosureCompiler.statement(x) for x in block.statements]
 
-    def parse_expression_lt(self, lhs: AstExpression) -> AstExpressionLt:
-        location = self._expect_current(TokenKind.LT).location
-        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.LT])
-        return AstExpressionLt(location, lhs, rhs)
+        def execute(env: Environment) -> Optional[Union[Return, Break, Continue]]:
+            for statement in statements:
+                result = statement(env)
+                if result is not None:
+                    return result
+            return None
 
-    def parse_expression_gt(self, lhs: AstExpression) -> AstExpressionGt:
-        location = self._expect_current(TokenKind.GT).location
-        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.GT])
-        return AstExpressionGt(location, lhs, rhs)
+        return execute
 
-    def parse_expression_eq_re(self, lhs: AstExpression) -> AstExpressionEqRe:
-        location = self._expect_current(TokenKind.EQ_RE).location
-        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.EQ_RE])
-        return AstExpressionEqRe(location, lhs, rhs)
+    # Closure executing the provided block within a new lexical scope.
+    @staticmethod
+    def scope(block: AstBlock) -> StatementClosure:
+        execute = ClosureCompiler.block(block)
+        if block.elided:
+            return execute
+        size = block.size
+        return lambda env: execute(Environment(env, size))
 
-    def parse_expression_ne_re(self, lhs: AstExpression) -> AstExpressionNeRe:
-        location = self._expect_current(TokenKind.NE_RE).location
-        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.NE_RE])
-        return AstExpressionNeRe(location, lhs, rhs)
+    @staticmethod
+    def statement(node: AstStatement) -> StatementClosure:
+        if isinstance(node, AstStatementExpression):
+            expression = ClosureCompiler.expression(node.expression)
+
+            def statement_expression(
+                env: Environment,
+            ) -> Optional[Union[Return, Break, Continue]]:
+                expression(env)
+                return None
 
-    def parse_expression_add(self, lhs: AstExpression) -> AstExpressionAdd:
-        location = self._expect_current(TokenKind.ADD).location
-        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.ADD])
-        return AstExpressionAdd(location, lhs, rhs)
+            return statement_expression
+        if isinstance(node, AstStatementLet):
+            return ClosureCompiler.statement_let(node)
+        if isinstance(node, AstStatementAssignment) and isinstance(
+            node.lhs, AstExpressionIdentifier
+        ):
+            return ClosureCompiler.statement_assignment(node, node.lhs)
+        if isinstance(node, AstStatementIfElifElse):
+            return ClosureCompiler.statement_if_elif_else(node)
+        if isinstance(node, AstStatementFor) and not (
+            node.k_is_reference or node.v_is_reference
+        ):
+            return ClosureCompiler.statement_for(node)
+        if isinstance(node, AstStatementWhile):
+            return ClosureCompiler.statement_while(node)
+        if isinstance(node, AstStatementBreak):
+            control: Union[Return, Break, Continue] = Break(node.location)
+            return lambda env: control
+        if isinstance(node, AstStatementContinue):
+            control = Continue(node.location)
+            return lambda env: control
+        if isinstance(node, AstStatementTry):
+            return ClosureCompiler.statement_try(node)
+        if isinstance(node, AstStatementReturn):
+            return ClosureCompiler.statement_return(node)
+        execute = node.eval
+
+        def fallback(env: Environment) -> Optional[Union[Return, Break, Continue]]:
+            result = execute(env)
+            if isinstance(result, Error):
+                raise ErrorPropagation(result)
+            return result
 
-    def parse_expression_sub(self, lhs: AstExpression) -> AstExpressionSub:
-        location = self._expect_current(TokenKind.SUB).location
-        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.SUB])
-        return AstExpressionSub(location, lhs, rhs)
+        return fallback
 
-    def parse_expression_mul(self, lhs: AstExpression) -> AstExpressionMul:
-        location = self._expect_current(TokenKind.MUL).location
-        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.MUL])
-        return AstExpressionMul(location, lhs, rhs)
+    @staticmethod
+    def statement_let(node: AstStatementLet) -> StatementClosure:
+        expression = ClosureCompiler.expression(node.expression)
+        location = node.location
+        slot = node.slot
+        name = node.identifier.name
+        name_location = node.identifier.location
+        moved = node.expression.moved
+
+        def statement_let(env: Environment) -> Optional[Union[Return, Break, Continue]]:
+            result = expression(env)
+            if isinstance(result, Reference):
+                raise ErrorPropagation(
+                    Error(
+                        location,
+                        f"attempted assignment statement with type reference to {typename(result)}",
+                    )
+                )
+            if not moved:
+                result = copy(result)
+            if slot is not None:
+                env.slots[slot] = result
+            else:
+                env.let(name, result, name_location)
+            return None
 
-    def parse_expression_div(self, lhs: AstExpression) -> AstExpressionDiv:
-        location = self._expect_current(TokenKind.DIV).location
-        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.DIV])
-        return AstExpressionDiv(location, lhs, rhs)
+        return statement_let
 
-    def parse_expression_rem(self, lhs: AstExpression) -> AstExpressionRem:
-        location = self._expect_current(TokenKind.REM).location
-        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.REM])
-        return AstExpressionRem(location, lhs, rhs)
+    @staticmethod
+    def statement_assignment(
+        node: AstStatementAssignment, lhs: AstExpressionIdentifier
+    ) -> StatementClosure:
+        rhs = ClosureCompiler.expression(node.rhs)
+        location = node.location
+        address = lhs.address
+        name = lhs.name
+        slot = lhs.slot if address is not None and len(address) == 1 else None
+        depth = lhs.depth
+        moved = node.rhs.moved
+
+        def statement_assignment(
+            env: Environment,
+        ) -> Optional[Union[Return, Break, Continue]]:
+            result = rhs(env)
+            if isinstance(result, Reference):
+                raise ErrorPropagation(
+                    Error(
+                        location,
+                        f"attempted assignment statement with type reference to {result.data.typename()}",
+                    )
+                )
+            if not moved:
+                result = copy(result)
+            if slot is not None:
+                frame = env
+                for _ in range(depth):
+                    frame = frame.outer  # type: ignore[assignment]
+                if frame.slots[slot] is not None:
+                    frame.slots[slot] = result
+                    return None
+            try:
+                env.set_address(address, name, result)
+            except Exception as e:
+                raise ErrorPropagation(Error(location, str(e)))
+            return None
 
-    def parse_expression_function_call(
-        self, lhs: AstExpression
-    ) -> AstExpressionFunctionCall:
-        location = self._expect_current(TokenKind.LPAREN).location
-        arguments: list[AstExpression] = list()
-        while not self._check_current(TokenKind.RPAREN):
-            if len(arguments) != 0:
-                self._expect_current(TokenKind.COMMA)
-            if self._check_current(TokenKind.RPAREN):
-                break
-            expression = self.parse_expression()
-            if self._check_current(TokenKind.MKREF):
-                mkref_location = self._expect_current(TokenKind.MKREF).location
-                expression = AstExpressionMkref(mkref_location, expression)
-            arguments.append(expression)
-        self._expect_current(TokenKind.RPAREN)
-        return AstExpressionFunctionCall(location, lhs, arguments)
+        return statement_assignment
 
-    def parse_expression_access_index(
-        self, lhs: AstExpression
-    ) -> AstExpressionAccessIndex:
-        location = self._expect_current(TokenKind.LBRACKET).location
-        field = self.parse_expression()
-        self._expect_current(TokenKind.RBRACKET)
-        return AstExpressionAccessIndex(location, lhs, field)
+    @staticmethod
+    def statement_if_elif_else(node: AstStatementIfElifElse) -> StatementClosure:
+        conditionals = [
+            (
+                ClosureCompiler.expression(x.condition),
+                ClosureCompiler.scope(x.body),
+                x.location,
+            )
+            for x in node.conditionals
+        ]
+        else_block = (
+            ClosureCompiler.scope(node.else_block)
+            if node.else_block is not None
+            else None
+        )
 
-    def parse_expression_access_scope(
-        self, lhs: AstExpression
-    ) -> AstExpressionAccessScope:
-        location = self._expect_current(TokenKind.SCOPE).location
-        field = self.parse_identifier()
-        return AstExpressionAccessScope(location, lhs, field)
+        def statement_if_elif_else(
+            env: Environment,
+        ) -> Optional[Union[Return, Break, Continue]]:
+            for condition, body, location in conditionals:
+                result = condition(env)
+                if result is true:
+                    return body(env)
+                if result is false:
+                    continue
+                raise ErrorPropagation(
+                    Error(
+                        location,
+                        f"conditional with non-boolean type {quote(typename(result))}",
+                    )
+                )
+            if else_block is not None:
+                return else_block(env)
+            return None
 
-    def parse_expression_access_dot(self, lhs: AstExpression) -> AstExpressionAccessDot:
-        location = self._expect_current(TokenKind.DOT).location
-        field = self.parse_identifier()
-        return AstExpressionAccessDot(location, lhs, field)
+        return statement_if_elif_else
 
-    def parse_expression_deref(self, lhs: AstExpression) -> AstExpressionDeref:
-        location = self._expect_current(TokenKind.DEREF).location
-        return AstExpressionDeref(location, lhs)
+    @staticmethod
+    def statement_for(node: AstStatementFor) -> StatementClosure:
+        collection = ClosureCompiler.expression(node.collection)
+        body = ClosureCompiler.block(node.block)
+        environment = node.block.environment
+        slot_k = node.slot_k
+        slot_v = node.slot_v
+        name_k = node.identifier_k.name
+        name_v = node.identifier_v.name if node.identifier_v is not None else None
+        location_k = node.identifier_k.location
+        location_v = (
+            node.identifier_v.location if node.identifier_v is not None else None
+        )
 
-    def parse_block(self) -> AstBlock:
-        location = self._expect_current(TokenKind.LBRACE).location
-        statements: list[AstStatement] = list()
-        while not self._check_current(TokenKind.RBRACE):
-            statements.append(self.parse_statement())
-        self._expect_current(TokenKind.RBRACE)
-        return AstBlock(location, statements)
+        def statement_for(env: Environment) -> Optional[Union[Return, Break, Continue]]:
+            loop = for_loop_state(node, collection(env), env)
+            if isinstance(loop, Error):
+                raise ErrorPropagation(loop)
+            assert loop.iterator is not None
+            try:
+                for element in loop.iterator:
+                    if isinstance(element, Error):
+                        raise ErrorPropagation(element)
+                    iter_env = loop.env or environment(env)
+                    if name_v is None:
+                        iter_env.let_slot(slot_k, name_k, element, location_k)
+                    else:
+                        iter_env.let_slot(slot_k, name_k, element[0], location_k)
+                        iter_env.let_slot(slot_v, name_v, element[1], location_v)
+                    result = body(iter_env)
+                    if result is None or isinstance(result, Continue):
+                        continue
+                    if isinstance(result, Break):
+                        return None
+                    return result
+                return None
+            finally:
+                loop.release()
 
-    def parse_statement(self) -> AstStatement:
-        if self._check_current(TokenKind.LET):
-            return self.parse_statement_let()
-        if self._check_current(TokenKind.IF):
-            return self.parse_statement_if_elif_else()
-        if self._check_current(TokenKind.FOR):
-            return self.parse_statement_for()
-        if self._check_current(TokenKind.WHILE):
-            return self.parse_statement_while()
-        if self._check_current(TokenKind.BREAK):
-            return self.parse_statement_break()
-        if self._check_current(TokenKind.CONTINUE):
-            return self.parse_statement_continue()
-        if self._check_current(TokenKind.TRY):
-            return self.parse_statement_try()
-        if self._check_current(TokenKind.ERROR):
-            return self.parse_statement_error()
-        if self._check_current(TokenKind.RETURN):
-            return self.parse_statement_return()
-        return self.parse_statement_expression_or_assignment()
+        return statement_for
 
-    def parse_statement_let(self) -> AstStatementLet:
-        location = self._expect_current(TokenKind.LET).location
-        identifier = self.parse_identifier()
-        self._expect_current(TokenKind.ASSIGN)
-        expression = self.parse_expression()
-        self._expect_current(TokenKind.SEMICOLON)
-        if isinstance(expression, AstExpressionFunction):
-            expression.name = identifier.name
-        elif isinstance(expression, AstExpressionType):
-            expression.name = identifier.name
-            if isinstance(expression.expression, AstExpressionMap):
-                update_named_functions(
-                    expression.expression,
-                    identifier.name.bytes + str(TokenKind.SCOPE).encode("utf-8"),
+    @staticmethod
+    def statement_while(node: AstStatementWhile) -> StatementClosure:
+        expression = ClosureCompiler.expression(node.expression)
+        body = ClosureCompiler.block(node.block)
+        environment = node.block.environment
+        fresh = node.fresh
+        location = node.location
+
+        def statement_while(
+            env: Environment,
+        ) -> Optional[Union[Return, Break, Continue]]:
+            loop_env = env if fresh else environment(env)
+            while True:
+                condition = expression(env)
+                if condition is false:
+                    return None
+                if condition is not true:
+                    raise ErrorPropagation(
+                        Error(
+                            location,
+                            f"conditional with non-boolean type {quote(typename(condition))}",
+                        )
+                    )
+                result = body(environment(env) if fresh else loop_env)
+                if result is None or isinstance(result, Continue):
+                    continue
+                if isinstance(result, Break):
+                    return None
+                return result
+
+        return statement_while
+
+    @staticmethod
+    def statement_try(node: AstStatementTry) -> StatementClosure:
+        try_block = ClosureCompiler.scope(node.try_block)
+        catch_block = ClosureCompiler.block(node.catch_block)
+        environment = node.catch_block.environment
+        identifier = node.catch_identifier
+        slot = node.catch_slot
+
+        def statement_try(env: Environment) -> Optional[Union[Return, Break, Continue]]:
+            try:
+                return try_block(env)
+            except ErrorPropagation as e:
+                error = e.error
+            env = environment(env)
+            if identifier is not None:
+                env.let_slot(
+                    slot, identifier.name, copy(error.value), identifier.location
                 )
-        elif isinstance(expression, AstExpressionMap):
-            update_named_functions(
-                expression,
-                identifier.name.bytes + str(TokenKind.SCOPE).encode("utf-8"),
-            )
-        return AstStatementLet(location, identifier, expression)
+            return catch_block(env)
 
-    def parse_statement_if_elif_else(self) -> AstStatementIfElifElse:
-        assert self.current_token.kind == TokenKind.IF
-        location = self.current_token.location
+        return statement_try
 
-        def parse_conditional() -> AstConditional:
-            location = self._advance_token().location
-            condition = self.parse_expression()
-            body = self.parse_block()
-            return AstConditional(location, condition, body)
+    @staticmethod
+    def statement_return(node: AstStatementReturn) -> StatementClosure:
+        if node.expression is None:
+            control = Return(null)
+            return lambda env: control
+        expression = ClosureCompiler.expression(node.expression)
+        location = node.location
+        moved = node.expression.moved
+
+        def statement_return(
+            env: Environment,
+        ) -> Optional[Union[Return, Break, Continue]]:
+            result = expression(env)
+            if isinstance(result, Reference):
+                raise ErrorPropagation(
+                    Error(
+                        location,
+                        f"attempted return statement with type reference to {typename(result)}",
+                    )
+                )
+            return Return(result if moved else copy(result))
 
-        conditionals: list[AstConditional] = list()
-        while self._check_current(
-            TokenKind.ELIF if len(conditionals) else TokenKind.IF
-        ):
-            conditionals.append(parse_conditional())
-        if self._check_current(TokenKind.ELSE):
-            self._expect_current(TokenKind.ELSE)
-            else_block = self.parse_block()
-        else:
-            else_block = None
+        return statement_return
 
-        return AstStatementIfElifElse(location, conditionals, else_block)
 
-    def parse_statement_for(self) -> AstStatementFor:
-        location = self._expect_current(TokenKind.FOR).location
-        identifier_k = self.parse_identifier()
-        k_is_reference = False
-        v_is_reference = False
-        if self._check_current(TokenKind.MKREF):
-            self._expect_current(TokenKind.MKREF)
-            k_is_reference = True
-        identifier_v: Optional[AstIdentifier] = None
-        if self._check_current(TokenKind.COMMA):
-            self._expect_current(TokenKind.COMMA)
-            identifier_v = self.parse_identifier()
-            if self._check_current(TokenKind.MKREF):
-                self._expect_current(TokenKind.MKREF)
-                v_is_reference = True
-        self._expect_current(TokenKind.IN)
-        collection = self.parse_expression()
-        block = self.parse_block()
-        if identifier_v is not None and identifier_k.name == identifier_v.name:
-            raise ParseError(
-                identifier_k.location,
-                f"duplicate iterator name {quote(identifier_k.name.runes)}",
-            )
-        return AstStatementFor(
-            location,
-            identifier_k,
-            identifier_v,
-            k_is_reference,
-            v_is_reference,
-            collection,
-            block,
-        )
+# Execution engines evaluate programs and the bodies of called functions. The
+# tree-walking interpreter is used by default, and an alternate engine may be
+# selected with the --engine flag or a non-empty MELLIFERA_ENGINE environment
+# variable.
+class Engine:
+    def program(self, program: AstProgram, env: Environment) -> Union[Value, Error]:
+        return program.eval(env)
 
-    def parse_statement_while(self) -> AstStatementWhile:
-        location = self._expect_current(TokenKind.WHILE).location
-        expression = self.parse_expression()
-        block = self.parse_block()
-        return AstStatementWhile(location, expression, block)
+    def function(
+        self, function: AstExpressionFunction, env: Environment
+    ) -> Optional[ControlFlow]:
+        return function.body.exec(env)
 
-    def parse_statement_break(self) -> AstStatementBreak:
-        location = self._expect_current(TokenKind.BREAK).location
-        self._expect_current(TokenKind.SEMICOLON)
-        return AstStatementBreak(location)
 
-    def parse_statement_continue(self) -> AstStatementContinue:
-        location = self._expect_current(TokenKind.CONTINUE).location
-        self._expect_current(TokenKind.SEMICOLON)
-        return AstStatementContinue(location)
+class VirtualMachineEngine(Engine):
+    def program(self, program: AstProgram, env: Environment) -> Union[Value, Error]:
+        result = vm_execute(Compiler.program(program), env)
+        if isinstance(result, Return):
+            return result.value
+        if isinstance(result, Break):
+            return Error(result.location, "attempted to break outside of a loop")
+        if isinstance(result, Continue):
+            return Error(result.location, "attempted to continue outside of a loop")
+        assert isinstance(result, Error)
+        return result
 
-    def parse_statement_try(self) -> AstStatementTry:
-        location = self._expect_current(TokenKind.TRY).location
-        try_block = self.parse_block()
-        self._expect_current(TokenKind.CATCH)
-        if self._check_current(TokenKind.IDENTIFIER):
-            catch_identifier = self.parse_identifier()
-        else:
-            catch_identifier = None
-        catch_block = self.parse_block()
-        return AstStatementTry(location, try_block, catch_identifier, catch_block)
+    def function(
+        self, function: AstExpressionFunction, env: Environment
+    ) -> Optional[ControlFlow]:
+        # Function bodies are compiled the first time they are called.
+        if function.compiled is None:
+            function.compiled = Compiler.function(function)
+        return vm_execute(function.compiled, env)
 
-    def parse_statement_error(self) -> AstStatementError:
-        location = self._expect_current(TokenKind.ERROR).location
-        expression = self.parse_expression()
-        self._expect_current(TokenKind.SEMICOLON)
-        return AstStatementError(location, expression)
 
-    def parse_statement_return(self) -> AstStatementReturn:
-        location = self._expect_current(TokenKind.RETURN).location
-        expression: Optional[AstExpression] = None
-        if not self._check_current(TokenKind.SEMICOLON):
-            expression = self.parse_expression()
-        self._expect_current(TokenKind.SEMICOLON)
-        return AstStatementReturn(location, expression)
+class ClosureEngine(Engine):
+    def program(self, program: AstProgram, env: Environment) -> Union[Value, Error]:
+        return ClosureCompiler.program(program)(env)
 
-    def parse_statement_expression_or_assignment(
-        self,
-    ) -> Union[AstStatementExpression, AstStatementAssignment]:
-        expression = self.parse_expression()
-        if not self._check_current(TokenKind.ASSIGN):
-            self._expect_current(TokenKind.SEMICOLON)
-            return AstStatementExpression(expression.location, expression)
-        location = self._expect_current(TokenKind.ASSIGN).location
-        rhs = self.parse_expression()
-        self._expect_current(TokenKind.SEMICOLON)
-        return AstStatementAssignment(location, expression, rhs)
+    def function(
+        self, function: AstExpressionFunction, env: Environment
+    ) -> Optional[ControlFlow]:
+        # Function bodies are compiled the first time they are called.
+        if function.compiled is None:
+            function.compiled = ClosureCompiler.function(function.body)
+        return function.compiled(env)
 
-    def parse_comb(self) -> Value:
-        ast = self.parse_comb_expression()
-        if not self._check_current(TokenKind.EOF):
+
+ENGINES: dict[str, Engine] = {
+    "ast": Engine(),
+    "vm": VirtualMachineEngine(),
+    "closure": ClosureEngine(),
+}
+# Execution engine used to evaluate programs and function bodies.
+engine: Engine = ENGINES["ast"]
+
+
+class Precedence(enum.IntEnum):
+    # fmt: off
+    LOWEST  = enum.auto()
+    OR      = enum.auto()  # or
+    AND     = enum.auto()  # and
+    COMPARE = enum.auto()  # == != <= >= < > =~ !~
+    ADD_SUB = enum.auto()  # + -
+    MUL_DIV = enum.auto()  # * / %
+    PREFIX  = enum.auto()  # +x -x
+    POSTFIX = enum.auto()  # foo(bar, 123) foo[42] .& .*
+    # fmt: on
+
+
+class ParseMode(enum.Enum):
+    MELLIFERA = "mellifera"
+    COMB = "comb"
+
+
+# Mapping of identifier names to their unique string objects. Having a single
+# globally unique string for each identifier allows let and assignment
+# statements to take advantage of fast-path value identity comparision.
+identifier_cache: dict[str, String] = dict()
+
+
+class Parser:
+    ParseNud = Callable[["Parser"], AstExpression]
+    ParseLed = Callable[["Parser", AstExpression], AstExpression]
+
+    class Function:
+        """
+        Parse state of a function expression whose body is being parsed.
+        """
+
+        def __init__(self):
+            # Set when a yield statement is parsed within the function body.
+            self.generator: bool = False
+            # Number of enclosing reference for loops within the function body.
+            self.reference_loops: int = 0
+            # First return statement with a value within the function body.
+            self.return_value: Optional[AstStatementReturn] = None
+
+    PRECEDENCES: dict[TokenKind, Precedence] = {
+        # fmt: off
+        TokenKind.OR:       Precedence.OR,
+        TokenKind.AND:      Precedence.AND,
+        TokenKind.EQ:       Precedence.COMPARE,
+        TokenKind.NE:       Precedence.COMPARE,
+        TokenKind.LE:       Precedence.COMPARE,
+        TokenKind.GE:       Precedence.COMPARE,
+        TokenKind.LT:       Precedence.COMPARE,
+        TokenKind.GT:       Precedence.COMPARE,
+        TokenKind.EQ_RE:    Precedence.COMPARE,
+        TokenKind.NE_RE:    Precedence.COMPARE,
+        TokenKind.ADD:      Precedence.ADD_SUB,
+        TokenKind.SUB:      Precedence.ADD_SUB,
+        TokenKind.MUL:      Precedence.MUL_DIV,
+        TokenKind.DIV:      Precedence.MUL_DIV,
+        TokenKind.REM:      Precedence.MUL_DIV,
+        TokenKind.LPAREN:   Precedence.POSTFIX,
+        TokenKind.LBRACKET: Precedence.POSTFIX,
+        TokenKind.SCOPE:    Precedence.POSTFIX,
+        TokenKind.DOT:      Precedence.POSTFIX,
+        TokenKind.MKREF:    Precedence.POSTFIX,
+        TokenKind.DEREF:    Precedence.POSTFIX,
+        # fmt: on
+    }
+
+    def __init__(self, lexer: Lexer):
+        self.lexer = lexer
+        self.current_token = Token(TokenKind.EOF, "DEFAULT CURRENT TOKEN")
+
+        self._advance_token()
+
+        self.parse_nud_functions: dict[TokenKind, Parser.ParseNud] = dict()
+        self.parse_led_functions: dict[TokenKind, Parser.ParseLed] = dict()
+
+        self._register_nud(TokenKind.IDENTIFIER, Parser.parse_expression_identifier)
+        self._register_nud(TokenKind.TEMPLATE, Parser.parse_expression_template)
+        self._register_nud(TokenKind.NULL, Parser.parse_expression_null)
+        self._register_nud(TokenKind.TRUE, Parser.parse_expression_boolean)
+        self._register_nud(TokenKind.FALSE, Parser.parse_expression_boolean)
+        self._register_nud(TokenKind.NUMBER, Parser.parse_expression_number)
+        self._register_nud(TokenKind.STRING, Parser.parse_expression_string)
+        self._register_nud(TokenKind.REGEXP, Parser.parse_expression_regexp)
+        self._register_nud(TokenKind.REGEXP_GROUP, Parser.parse_expression_regexp_group)
+        self._register_nud(TokenKind.LBRACKET, Parser.parse_expression_vector)
+        self._register_nud(TokenKind.MAP, Parser.parse_expression_map_or_set)
+        self._register_nud(TokenKind.SET, Parser.parse_expression_map_or_set)
+        self._register_nud(TokenKind.LBRACE, Parser.parse_expression_map_or_set)
+        self._register_nud(TokenKind.FUNCTION, Parser.parse_expression_function)
+        self._register_nud(TokenKind.FREEZE, Parser.parse_expression_freeze)
+        self._register_nud(TokenKind.TYPE, Parser.parse_expression_type)
+        self._register_nud(TokenKind.NEW, Parser.parse_expression_new)
+        self._register_nud(TokenKind.LPAREN, Parser.parse_expression_grouped)
+        self._register_nud(TokenKind.ADD, Parser.parse_expression_positive)
+        self._register_nud(TokenKind.SUB, Parser.parse_expression_negative)
+        self._register_nud(TokenKind.NOT, Parser.parse_expression_not)
+
+        self._register_led(TokenKind.AND, Parser.parse_expression_and)
+        self._register_led(TokenKind.OR, Parser.parse_expression_or)
+        self._register_led(TokenKind.EQ, Parser.parse_expression_eq)
+        self._register_led(TokenKind.NE, Parser.parse_expression_ne)
+        self._register_led(TokenKind.LE, Parser.parse_expression_le)
+        self._register_led(TokenKind.GE, Parser.parse_expression_ge)
+        self._register_led(TokenKind.LT, Parser.parse_expression_lt)
+        self._register_led(TokenKind.GT, Parser.parse_expression_gt)
+        self._register_led(TokenKind.EQ_RE, Parser.parse_expression_eq_re)
+        self._register_led(TokenKind.NE_RE, Parser.parse_expression_ne_re)
+        self._register_led(TokenKind.ADD, Parser.parse_expression_add)
+        self._register_led(TokenKind.SUB, Parser.parse_expression_sub)
+        self._register_led(TokenKind.MUL, Parser.parse_expression_mul)
+        self._register_led(TokenKind.DIV, Parser.parse_expression_div)
+        self._register_led(TokenKind.REM, Parser.parse_expression_rem)
+        self._register_led(TokenKind.LPAREN, Parser.parse_expression_function_call)
+        self._register_led(TokenKind.LBRACKET, Parser.parse_expression_access_index)
+        self._register_led(TokenKind.SCOPE, Parser.parse_expression_access_scope)
+        self._register_led(TokenKind.DOT, Parser.parse_expression_access_dot)
+        self._register_led(TokenKind.DEREF, Parser.parse_expression_deref)
+
+        # Function expressions enclosing the current point of parsing.
+        self.functions: list[Parser.Function] = list()
+
+    def _identifier(self, name: str) -> String:
+        if name in identifier_cache:
+            return identifier_cache[name]
+        identifier_cache[name] = String(name)
+        return identifier_cache[name]
+
+    def _register_nud(self, kind: TokenKind, parse: "Parser.ParseNud") -> None:
+        self.parse_nud_functions[kind] = parse
+
+    def _register_led(self, kind: TokenKind, parse: "Parser.ParseLed") -> None:
+        self.parse_led_functions[kind] = parse
+
+    def _advance_token(self) -> Token:
+        current_token = self.current_token
+        self.current_token = self.lexer.next_token()
+        return current_token
+
+    def _check_current(self, kind: TokenKind) -> bool:
+        return self.current_token.kind == kind
+
+    def _expect_current(self, kind: TokenKind) -> Token:
+        current = self.current_token
+        if current.kind != kind:
+            raise ParseError(
+                current.location, f"expected {quote(kind)}, found {quote(current)}"
+            )
+        self._advance_token()
+        return current
+
+    def parse_program(self) -> AstProgram:
+        location = self.current_token.location
+        statements: list[AstStatement] = list()
+        while not self._check_current(TokenKind.EOF):
+            statements.append(self.parse_statement())
+        return AstProgram(location, statements)
+
+    def parse_identifier(self) -> AstIdentifier:
+        token = self._expect_current(TokenKind.IDENTIFIER)
+        return AstIdentifier(token.location, self._identifier(token.literal))
+
+    def parse_expression(
+        self, precedence: Precedence = Precedence.LOWEST
+    ) -> AstExpression:
+        parse_nud = self.parse_nud_functions.get(self.current_token.kind)
+        if parse_nud is None:
             raise ParseError(
                 self.current_token.location,
-                f"expected {TokenKind.EOF}, found {self.current_token}",
+                f"expected expression, found {self.current_token}",
             )
-        result = ast.eval(Environment())
+        expression = parse_nud(self)
+
+        def get_precedence(kind: TokenKind) -> Precedence:
+            return Parser.PRECEDENCES.get(kind, Precedence.LOWEST)
+
+        while precedence < get_precedence(self.current_token.kind):
+            parse_led = self.parse_led_functions.get(self.current_token.kind, None)
+            if parse_led is None:
+                return expression
+            expression = parse_led(self, expression)
+        return expression
+
+    def parse_expression_identifier(self) -> AstExpressionIdentifier:
+        token = self._expect_current(TokenKind.IDENTIFIER)
+        return AstExpressionIdentifier(token.location, self._identifier(token.literal))
+
+    def parse_expression_template(self) -> AstExpressionTemplate:
+        token = self._expect_current(TokenKind.TEMPLATE)
+        assert token.template is not None
+        return AstExpressionTemplate(token.location, token.template)
+
+    def parse_expression_null(self) -> AstExpressionNull:
+        location = self._expect_current(TokenKind.NULL).location
+        return AstExpressionNull(location)
+
+    def parse_expression_boolean(self) -> AstExpressionBoolean:
+        if self._check_current(TokenKind.TRUE):
+            location = self._expect_current(TokenKind.TRUE).location
+            return AstExpressionBoolean(location, Boolean.new(True))
+        if self._check_current(TokenKind.FALSE):
+            location = self._expect_current(TokenKind.FALSE).location
+            return AstExpressionBoolean(location, Boolean.new(False))
+        raise ParseError(
+            self.current_token.location,
+            f"expected boolean, found {self.current_token}",
+        )
+
+    def parse_expression_number(self) -> AstExpressionNumber:
+        token = self._expect_current(TokenKind.NUMBER)
+        assert isinstance(token.value, Number)
+        return AstExpressionNumber(token.location, token.value)
+
+    def parse_expression_string(self) -> AstExpressionString:
+        token = self._expect_current(TokenKind.STRING)
+        assert isinstance(token.value, String)
+        return AstExpressionString(token.location, token.value)
+
+    def parse_expression_regexp(self) -> AstExpressionRegexp:
+        token = self._expect_current(TokenKind.REGEXP)
+        assert isinstance(token.value, Regexp)
+        return AstExpressionRegexp(token.location, token.value)
+
+    def parse_expression_regexp_group(self) -> AstExpressionRegexpGroup:
+        token = self._expect_current(TokenKind.REGEXP_GROUP)
+        assert token.group is not None
+        return AstExpressionRegexpGroup(token.location, token.group)
+
+    def parse_expression_vector(
+        self, mode: ParseMode = ParseMode.MELLIFERA
+    ) -> AstExpressionVector:
+        def parse_expression():
+            match mode:
+                case ParseMode.MELLIFERA:
+                    return self.parse_expression()
+                case ParseMode.COMB:
+                    return self.parse_comb_expression()
+
+        location = self._expect_current(TokenKind.LBRACKET).location
+        elements: list[AstExpression] = list()
+        while not self._check_current(TokenKind.RBRACKET):
+            if len(elements) != 0:
+                self._expect_current(TokenKind.COMMA)
+            if self._check_current(TokenKind.RBRACKET):
+                break
+            elements.append(parse_expression())
+        self._expect_current(TokenKind.RBRACKET)
+        return AstExpressionVector(location, elements)
+
+    def parse_expression_map_or_set(
+        self, mode: ParseMode = ParseMode.MELLIFERA
+    ) -> Union[AstExpressionMap, AstExpressionSet]:
+        def parse_expression():
+            match mode:
+                case ParseMode.MELLIFERA:
+                    return self.parse_expression()
+                case ParseMode.COMB:
+                    return self.parse_comb_expression()
+
+        ParseMapOrSet = enum.Enum("ParseMapOrSet", ["UNKNOWN", "MAP", "SET"])
+        map_or_set = ParseMapOrSet.UNKNOWN
+        if self._check_current(TokenKind.MAP):
+            map_or_set = ParseMapOrSet.MAP
+            location = self.current_token.location
+            self._advance_token()
+            self._expect_current(TokenKind.LBRACE)
+        elif self._check_current(TokenKind.SET):
+            map_or_set = ParseMapOrSet.SET
+            location = self.current_token.location
+            self._advance_token()
+            self._expect_current(TokenKind.LBRACE)
+        else:
+            location = self._expect_current(TokenKind.LBRACE).location
+
+        map_elements: list[Tuple[AstExpression, AstExpression]] = list()
+        set_elements: list[AstExpression] = list()
+        while not self._check_current(TokenKind.RBRACE):
+            if len(map_elements) != 0 or len(set_elements) != 0:
+                self._expect_current(TokenKind.COMMA)
+            if self._check_current(TokenKind.RBRACE):
+                break
+
+            identifier: Optional[AstExpressionIdentifier] = None
+            if self._check_current(TokenKind.DOT):
+                if map_or_set == ParseMapOrSet.UNKNOWN:
+                    map_or_set = ParseMapOrSet.MAP
+                elif map_or_set == ParseMapOrSet.SET:
+                    raise ParseError(
+                        self.current_token.location,
+                        f"expected expression, found {self.current_token}",
+                    )
+                assert map_or_set == ParseMapOrSet.MAP
+                self._expect_current(TokenKind.DOT)
+                identifier = self.parse_expression_identifier()
+                expression: AstExpression = AstExpressionString(
+                    identifier.location, identifier.name
+                )
+            else:
+                expression = parse_expression()
+
+            if map_or_set == ParseMapOrSet.UNKNOWN:
+                if self._check_current(TokenKind.COLON) or self._check_current(
+                    TokenKind.ASSIGN
+                ):
+                    map_or_set = ParseMapOrSet.MAP
+                else:
+                    map_or_set = ParseMapOrSet.SET
+
+            assert map_or_set != ParseMapOrSet.UNKNOWN
+            match map_or_set:
+                case ParseMapOrSet.MAP:
+                    if self._check_current(TokenKind.COLON):
+                        if identifier is not None:
+                            raise ParseError(
+                                self.current_token.location,
+                                f"expected .{identifier.name.runes} = VALUE, found .{identifier.name.runes}: VALUE",
+                            )
+                        self._expect_current(TokenKind.COLON)
+                    elif self._check_current(TokenKind.ASSIGN):
+                        if identifier is None:
+                            raise ParseError(
+                                self.current_token.location,
+                                'expected "KEY": VALUE, found "KEY" = VALUE',
+                            )
+                        self._expect_current(TokenKind.ASSIGN)
+                    else:
+                        raise ParseError(
+                            self.current_token.location,
+                            f"expected {TokenKind.COLON} or {TokenKind.ASSIGN}, found {self.current_token}",
+                        )
+                    map_elements.append((expression, parse_expression()))
+                case ParseMapOrSet.SET:
+                    set_elements.append(expression)
+
+        self._expect_current(TokenKind.RBRACE)
+        match map_or_set:
+            case ParseMapOrSet.UNKNOWN:
+                raise ParseError(location, "ambiguous empty map or set")
+            case ParseMapOrSet.MAP:
+                result = AstExpressionMap(location, map_elements)
+                update_named_functions(result)
+                return result
+            case ParseMapOrSet.SET:
+                return AstExpressionSet(location, set_elements)
+
+    def parse_expression_function(self) -> AstExpressionFunction:
+        location = self._expect_current(TokenKind.FUNCTION).location
+        self_by_reference = False
+        if self._check_current(TokenKind.MKREF):
+            self._advance_token()
+            self_by_reference = True
+        self._expect_current(TokenKind.LPAREN)
+        parameters: list[AstIdentifier] = list()
+        while not self._check_current(TokenKind.RPAREN):
+            if len(parameters) != 0:
+                self._expect_current(TokenKind.COMMA)
+            parameters.append(self.parse_identifier())
+        self._expect_current(TokenKind.RPAREN)
+        self.functions.append(Parser.Function())
+        body = self.parse_block()
+        function = self.functions.pop()
+        if function.generator and function.return_value is not None:
+            raise ParseError(
+                function.return_value.location,
+                "return statement with a value in a generator function",
+            )
+        for i in range(len(parameters)):
+            for j in range(i + 1, len(parameters)):
+                if parameters[i].name == parameters[j].name:
+                    raise ParseError(
+                        parameters[j].location,
+                        f"duplicate function parameter {quote(parameters[i].name.runes)}",
+                    )
+        if self_by_reference and len(parameters) == 0:
+            raise ParseError(
+                location,
+                "function takes self by reference, but has no parameters",
+            )
+        return AstExpressionFunction(
+            location, parameters, body, None, self_by_reference, function.generator
+        )
+
+    def parse_expression_grouped(self) -> AstExpressionGrouped:
+        location = self._expect_current(TokenKind.LPAREN).location
+        expression = self.parse_expression()
+        self._expect_current(TokenKind.RPAREN)
+        return AstExpressionGrouped(location, expression)
+
+    def parse_expression_freeze(self) -> AstExpressionFreeze:
+        location = self._expect_current(TokenKind.FREEZE).location
+        expression = self.parse_expression()
+        return AstExpressionFreeze(location, expression)
+
+    def parse_expression_type(self) -> AstExpressionType:
+        location = self._expect_current(TokenKind.TYPE).location
+
+        extends = None
+        if self._check_current(TokenKind.EXTENDS):
+            self._advance_token()
+            extends = self.parse_expression()
+
+        expression = self.parse_expression()
+        name = (
+            f"type@[{location.file}, line {location.line}]"
+            if location is not None
+            else "anonymous type"
+        )
+        return AstExpressionType(location, String.new(name), extends, expression)
+
+    def parse_expression_new(self) -> AstExpressionNew:
+        location = self._expect_current(TokenKind.NEW).location
+        meta = self.parse_expression()
+        expression = self.parse_expression()
+        return AstExpressionNew(location, meta, expression)
+
+    def parse_expression_positive(
+        self, mode: ParseMode = ParseMode.MELLIFERA
+    ) -> AstExpressionPositive:
+        location = self._expect_current(TokenKind.ADD).location
+        match mode:
+            case ParseMode.MELLIFERA:
+                expression = self.parse_expression(Precedence.PREFIX)
+            case ParseMode.COMB:
+                expression = self.parse_comb_expression()
+        return AstExpressionPositive(location, expression)
+
+    def parse_expression_negative(
+        self, mode: ParseMode = ParseMode.MELLIFERA
+    ) -> AstExpressionNegative:
+        location = self._expect_current(TokenKind.SUB).location
+        match mode:
+            case ParseMode.MELLIFERA:
+                expression = self.parse_expression(Precedence.PREFIX)
+            case ParseMode.COMB:
+                expression = self.parse_comb_expression()
+        return AstExpressionNegative(location, expression)
+
+    def parse_expression_not(self) -> AstExpressionNot:
+        location = self._expect_current(TokenKind.NOT).location
+        expression = self.parse_expression(Precedence.PREFIX)
+        return AstExpressionNot(location, expression)
+
+    def parse_expression_and(self, lhs: AstExpression) -> AstExpressionAnd:
+        location = self._expect_current(TokenKind.AND).location
+        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.AND])
+        return AstExpressionAnd(location, lhs, rhs)
+
+    def parse_expression_or(self, lhs: AstExpression) -> AstExpressionOr:
+        location = self._expect_current(TokenKind.OR).location
+        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.OR])
+        return AstExpressionOr(location, lhs, rhs)
+
+    def parse_expression_eq(self, lhs: AstExpression) -> AstExpressionEq:
+        location = self._expect_current(TokenKind.EQ).location
+        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.EQ])
+        return AstExpressionEq(location, lhs, rhs)
+
+    def parse_expression_ne(self, lhs: AstExpression) -> AstExpressionNe:
+        location = self._expect_current(TokenKind.NE).location
+        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.NE])
+        return AstExpressionNe(location, lhs, rhs)
+
+    def parse_expression_le(self, lhs: AstExpression) -> AstExpressionLe:
+        location = self._expect_current(TokenKind.LE).location
+        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.LE])
+        return AstExpressionLe(location, lhs, rhs)
+
+    def parse_expression_ge(self, lhs: AstExpression) -> AstExpressionGe:
+        location = self._expect_current(TokenKind.GE).location
+        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.GE])
+        return AstExpressionGe(location, lhs, rhs)
+
+    def parse_expression_lt(self, lhs: AstExpression) -> AstExpressionLt:
+        location = self._expect_current(TokenKind.LT).location
+        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.LT])
+        return AstExpressionLt(location, lhs, rhs)
+
+    def parse_expression_gt(self, lhs: AstExpression) -> AstExpressionGt:
+        location = self._expect_current(TokenKind.GT).location
+        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.GT])
+        return AstExpressionGt(location, lhs, rhs)
+
+    def parse_expression_eq_re(self, lhs: AstExpression) -> AstExpressionEqRe:
+        location = self._expect_current(TokenKind.EQ_RE).location
+        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.EQ_RE])
+        return AstExpressionEqRe(location, lhs, rhs)
+
+    def parse_expression_ne_re(self, lhs: AstExpression) -> AstExpressionNeRe:
+        location = self._expect_current(TokenKind.NE_RE).location
+        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.NE_RE])
+        return AstExpressionNeRe(location, lhs, rhs)
+
+    def parse_expression_add(self, lhs: AstExpression) -> AstExpressionAdd:
+        location = self._expect_current(TokenKind.ADD).location
+        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.ADD])
+        return AstExpressionAdd(location, lhs, rhs)
+
+    def parse_expression_sub(self, lhs: AstExpression) -> AstExpressionSub:
+        location = self._expect_current(TokenKind.SUB).location
+        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.SUB])
+        return AstExpressionSub(location, lhs, rhs)
+
+    def parse_expression_mul(self, lhs: AstExpression) -> AstExpressionMul:
+        location = self._expect_current(TokenKind.MUL).location
+        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.MUL])
+        return AstExpressionMul(location, lhs, rhs)
+
+    def parse_expression_div(self, lhs: AstExpression) -> AstExpressionDiv:
+        location = self._expect_current(TokenKind.DIV).location
+        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.DIV])
+        return AstExpressionDiv(location, lhs, rhs)
+
+    def parse_expression_rem(self, lhs: AstExpression) -> AstExpressionRem:
+        location = self._expect_current(TokenKind.REM).location
+        rhs = self.parse_expression(Parser.PRECEDENCES[TokenKind.REM])
+        return AstExpressionRem(location, lhs, rhs)
+
+    def parse_expression_function_call(
+        self, lhs: AstExpression
+    ) -> AstExpressionFunctionCall:
+        location = self._expect_current(TokenKind.LPAREN).location
+        arguments: list[AstExpression] = list()
+        while not self._check_current(TokenKind.RPAREN):
+            if len(arguments) != 0:
+                self._expect_current(TokenKind.COMMA)
+            if self._check_current(TokenKind.RPAREN):
+                break
+            expression = self.parse_expression()
+            if self._check_current(TokenKind.MKREF):
+                mkref_location = self._expect_current(TokenKind.MKREF).location
+                expression = AstExpressionMkref(mkref_location, expression)
+            arguments.append(expression)
+        self._expect_current(TokenKind.RPAREN)
+        return AstExpressionFunctionCall(location, lhs, arguments)
+
+    def parse_expression_access_index(
+        self, lhs: AstExpression
+    ) -> AstExpressionAccessIndex:
+        location = self._expect_current(TokenKind.LBRACKET).location
+        field = self.parse_expression()
+        self._expect_current(TokenKind.RBRACKET)
+        return AstExpressionAccessIndex(location, lhs, field)
+
+    def parse_expression_access_scope(
+        self, lhs: AstExpression
+    ) -> AstExpressionAccessScope:
+        location = self._expect_current(TokenKind.SCOPE).location
+        field = self.parse_identifier()
+        return AstExpressionAccessScope(location, lhs, field)
+
+    def parse_expression_access_dot(self, lhs: AstExpression) -> AstExpressionAccessDot:
+        location = self._expect_current(TokenKind.DOT).location
+        field = self.parse_identifier()
+        return AstExpressionAccessDot(location, lhs, field)
+
+    def parse_expression_deref(self, lhs: AstExpression) -> AstExpressionDeref:
+        location = self._expect_current(TokenKind.DEREF).location
+        return AstExpressionDeref(location, lhs)
+
+    def parse_block(self) -> AstBlock:
+        location = self._expect_current(TokenKind.LBRACE).location
+        statements: list[AstStatement] = list()
+        while not self._check_current(TokenKind.RBRACE):
+            statements.append(self.parse_statement())
+        self._expect_current(TokenKind.RBRACE)
+        return AstBlock(location, statements)
+
+    def parse_statement(self) -> AstStatement:
+        if self._check_current(TokenKind.LET):
+            return self.parse_statement_let()
+        if self._check_current(TokenKind.IF):
+            return self.parse_statement_if_elif_else()
+        if self._check_current(TokenKind.FOR):
+            return self.parse_statement_for()
+        if self._check_current(TokenKind.WHILE):
+            return self.parse_statement_while()
+        if self._check_current(TokenKind.BREAK):
+            return self.parse_statement_break()
+        if self._check_current(TokenKind.CONTINUE):
+            return self.parse_statement_continue()
+        if self._check_current(TokenKind.TRY):
+            return self.parse_statement_try()
+        if self._check_current(TokenKind.ERROR):
+            return self.parse_statement_error()
+        if self._check_current(TokenKind.RETURN):
+            return self.parse_statement_return()
+        if self._check_current(TokenKind.YIELD):
+            return self.parse_statement_yield()
+        return self.parse_statement_expression_or_assignment()
+
+    def parse_statement_let(self) -> AstStatementLet:
+        location = self._expect_current(TokenKind.LET).location
+        identifier = self.parse_identifier()
+        self._expect_current(TokenKind.ASSIGN)
+        expression = self.parse_expression()
+        self._expect_current(TokenKind.SEMICOLON)
+        if isinstance(expression, AstExpressionFunction):
+            expression.name = identifier.name
+        elif isinstance(expression, AstExpressionType):
+            expression.name = identifier.name
+            if isinstance(expression.expression, AstExpressionMap):
+                update_named_functions(
+                    expression.expression,
+                    identifier.name.bytes + str(TokenKind.SCOPE).encode("utf-8"),
+                )
+        elif isinstance(expression, AstExpressionMap):
+            update_named_functions(
+                expression,
+                identifier.name.bytes + str(TokenKind.SCOPE).encode("utf-8"),
+            )
+        return AstStatementLet(location, identifier, expression)
+
+    def parse_statement_if_elif_else(self) -> AstStatementIfElifElse:
+        assert self.current_token.kind == TokenKind.IF
+        location = self.current_token.location
+
+        def parse_conditional() -> AstConditional:
+            location = self._advance_token().location
+            condition = self.parse_expression()
+            body = self.parse_block()
+            return AstConditional(location, condition, body)
+
+        conditionals: list[AstConditional] = list()
+        while self._check_current(
+            TokenKind.ELIF if len(conditionals) else TokenKind.IF
+        ):
+            conditionals.append(parse_conditional())
+        if self._check_current(TokenKind.ELSE):
+            self._expect_current(TokenKind.ELSE)
+            else_block = self.parse_block()
+        else:
+            else_block = None
+
+        return AstStatementIfElifElse(location, conditionals, else_block)
+
+    def parse_statement_for(self) -> AstStatementFor:
+        location = self._expect_current(TokenKind.FOR).location
+        identifier_k = self.parse_identifier()
+        k_is_reference = False
+        v_is_reference = False
+        if self._check_current(TokenKind.MKREF):
+            self._expect_current(TokenKind.MKREF)
+            k_is_reference = True
+        identifier_v: Optional[AstIdentifier] = None
+        if self._check_current(TokenKind.COMMA):
+            self._expect_current(TokenKind.COMMA)
+            identifier_v = self.parse_identifier()
+            if self._check_current(TokenKind.MKREF):
+                self._expect_current(TokenKind.MKREF)
+                v_is_reference = True
+        self._expect_current(TokenKind.IN)
+        collection = self.parse_expression()
+        reference = k_is_reference or v_is_reference
+        if reference and len(self.functions) != 0:
+            self.functions[-1].reference_loops += 1
+        block = self.parse_block()
+        if reference and len(self.functions) != 0:
+            self.functions[-1].reference_loops -= 1
+        if identifier_v is not None and identifier_k.name == identifier_v.name:
+            raise ParseError(
+                identifier_k.location,
+                f"duplicate iterator name {quote(identifier_k.name.runes)}",
+            )
+        return AstStatementFor(
+            location,
+            identifier_k,
+            identifier_v,
+            k_is_reference,
+            v_is_reference,
+            collection,
+            block,
+        )
+
+    def parse_statement_while(self) -> AstStatementWhile:
+        location = self._expect_current(TokenKind.WHILE).location
+        expression = self.parse_expression()
+        block = self.parse_block()
+        return AstStatementWhile(location, expression, block)
+
+    def parse_statement_break(self) -> AstStatementBreak:
+        location = self._expect_current(TokenKind.BREAK).location
+        self._expect_current(TokenKind.SEMICOLON)
+        return AstStatementBreak(location)
+
+    def parse_statement_continue(self) -> AstStatementContinue:
+        location = self._expect_current(TokenKind.CONTINUE).location
+        self._expect_current(TokenKind.SEMICOLON)
+        return AstStatementContinue(location)
+
+    def parse_statement_try(self) -> AstStatementTry:
+        location = self._expect_current(TokenKind.TRY).location
+        try_block = self.parse_block()
+        self._expect_current(TokenKind.CATCH)
+        if self._check_current(TokenKind.IDENTIFIER):
+            catch_identifier = self.parse_identifier()
+        else:
+            catch_identifier = None
+        catch_block = self.parse_block()
+        return AstStatementTry(location, try_block, catch_identifier, catch_block)
+
+    def parse_statement_error(self) -> AstStatementError:
+        location = self._expect_current(TokenKind.ERROR).location
+        expression = self.parse_expression()
+        self._expect_current(TokenKind.SEMICOLON)
+        return AstStatementError(location, expression)
+
+    def parse_statement_return(self) -> AstStatementReturn:
+        location = self._expect_current(TokenKind.RETURN).location
+        expression: Optional[AstExpression] = None
+        if not self._check_current(TokenKind.SEMICOLON):
+            expression = self.parse_expression()
+        self._expect_current(TokenKind.SEMICOLON)
+        statement = AstStatementReturn(location, expression)
+        if expression is not None and len(self.functions) != 0:
+            if self.functions[-1].return_value is None:
+                self.functions[-1].return_value = statement
+        return statement
+
+    def parse_statement_yield(self) -> AstStatementYield:
+        location = self._expect_current(TokenKind.YIELD).location
+        if len(self.functions) == 0:
+            raise ParseError(location, "yield statement outside of a function")
+        if self.functions[-1].reference_loops != 0:
+            raise ParseError(location, "yield statement within a reference for loop")
+        expression = self.parse_expression()
+        self._expect_current(TokenKind.SEMICOLON)
+        self.functions[-1].generator = True
+        return AstStatementYield(location, expression)
+
+    def parse_statement_expression_or_assignment(
+        self,
+    ) -> Union[AstStatementExpression, AstStatementAssignment]:
+        expression = self.parse_expression()
+        if not self._check_current(TokenKind.ASSIGN):
+            self._expect_current(TokenKind.SEMICOLON)
+            return AstStatementExpression(expression.location, expression)
+        location = self._expect_current(TokenKind.ASSIGN).location
+        rhs = self.parse_expression()
+        self._expect_current(TokenKind.SEMICOLON)
+        return AstStatementAssignment(location, expression, rhs)
+
+    def parse_comb(self) -> Value:
+        ast = self.parse_comb_expression()
+        if not self._check_current(TokenKind.EOF):
+            raise ParseError(
+                self.current_token.location,
+                f"expected {TokenKind.EOF}, found {self.current_token}",
+            )
+        result = ast.eval(Environment())
+        if isinstance(result, Error):
+            raise ParseError(result.location, str(result))
+        return result
+
+    def parse_comb_expression(self) -> AstExpression:
+        if self._check_current(TokenKind.NULL):
+            return self.parse_expression_null()
+        if self._check_current(TokenKind.TRUE) or self._check_current(TokenKind.FALSE):
+            return self.parse_expression_boolean()
+        if self._check_current(TokenKind.NUMBER):
+            return self.parse_expression_number()
+        if self._check_current(TokenKind.STRING):
+            return self.parse_expression_string()
+        if self._check_current(TokenKind.LBRACKET):
+            return self.parse_expression_vector(mode=ParseMode.COMB)
+        if (
+            self._check_current(TokenKind.MAP)
+            or self._check_current(TokenKind.SET)
+            or self._check_current(TokenKind.LBRACE)
+        ):
+            return self.parse_expression_map_or_set(mode=ParseMode.COMB)
+        if self._check_current(TokenKind.ADD):
+            return self.parse_expression_positive()
+        if self._check_current(TokenKind.SUB):
+            return self.parse_expression_negative()
+        raise ParseError(
+            self.current_token.location,
+            f"expected expression, found {self.current_token}",
+        )
+
+
+# Reports whether a callable's implicit `self` argument is passed by reference
+# in a function call with a dot access expression as the left hand side of that
+# expression.
+#
+# function(self) { ... }   # pass by value
+# function.&(self) { ... } # pass by reference
+def callable_self_is_passed_by_reference(function: Value) -> bool:
+    if isinstance(function, Function):
+        return function.ast.self_by_reference
+    if isinstance(function, Builtin):
+        return function.self_by_reference
+    return False
+
+
+# Invokes the provided metafunction, passing an implicit copy or reference
+# `self` to the metafunction. Effectively a utility function for the common
+# pattern of calling value.into_string() or a similarly-flavored callable.
+def call_meta_with_self(
+    location: Optional[SourceLocation], metafunction: Value, self: Value
+) -> Union[Value, Error]:
+    if not callable_self_is_passed_by_reference(metafunction):
+        return call(location, metafunction, [copy(self)])
+    result = call(location, metafunction, [Reference.new(self)])
+    Reference.unmark_referenced(self)
+    return result
+
+
+# Produces the elements of an iterator written in Mellifera by repeatedly
+# invoking the `next` metafunction of that iterator with the provided self
+# reference. Stops on end-of-iteration, or after producing any other error.
+def iterate_next(
+    location: Optional[SourceLocation], metafunction: Value, reference: Reference
+) -> Iterator[Union[Value, Error]]:
+    while True:
+        iterated = call(location, metafunction, [reference])
+        if isinstance(iterated, Error):
+            if not isinstance(iterated.value, Null):
+                yield iterated
+            return  # end-of-iteration
+        yield copy(iterated)
+
+
+# Produces copies of the elements of the provided iterator or iterable
+# collection in the order they would be produced by a for loop over the value.
+# Iteration stops after producing an error. The provided value is iterated in
+# place, so callers should provide a copy of any value that must not observe
+# iteration through its `next` metafunction.
+def iterator_elements(value: Value) -> Iterator[Union[Value, Error]]:
+    if isinstance(value, NativeIterator):
+        yield from value.iterate()
+    elif metafunction := value.metafunction(CONST_STRING_NEXT):
+        if not callable_self_is_passed_by_reference(metafunction):
+            yield Error(
+                None,
+                "iterator next must receive self by reference (declared with function.&(self))",
+            )
+            return
+        reference = Reference.new(value)
+        try:
+            yield from iterate_next(None, metafunction, reference)
+        finally:
+            Reference.unmark_referenced(value)
+    elif isinstance(value, Number):
+        try:
+            count = value.as_index()
+        except Exception as e:
+            yield Error(None, str(e))
+            return
+        yield from map(Number.new, range(count))
+    elif isinstance(value, Vector):
+        yield from map(copy, list(value.data))
+    elif isinstance(value, (Map, Set)):
+        yield from map(copy, list(value.data.keys()))
+    else:
+        yield Error(None, f"attempted iteration over type {quote(typename(value))}")
+
+
+# Produces the iterator returned by a call to a generator function. Every
+# traversal of the iterator executes the function body from the beginning
+# within a new environment binding copies of the provided arguments, so copies
+# of an iterator that has not been advanced through a reference are traversed
+# independently. Copies of an iterator that has been advanced continue
+# independently from the position of the copied iterator, sharing the single
+# suspended execution of the function body, which is resumed once for each
+# element regardless of how many copies consume that element (see
+# NativeIterator). Generator function bodies are always executed by the virtual
+# machine, which is able to suspend execution at a yield statement, regardless
+# of the selected execution engine.
+def generator_iterator(
+    location: Optional[SourceLocation],
+    function: Function,
+    arguments: list[Value],
+) -> Union[NativeIterator, Error]:
+    for argument in arguments:
+        if isinstance(argument, Reference):
+            return Error(
+                location,
+                f"attempted to call generator function {function} with argument of type reference to {typename(argument.data)}",
+            )
+    ast = function.ast
+
+    def traverse() -> Iterator[Union[Value, Error]]:
+        global generator_depth
+        env = Environment(function.env, ast.body.size)
+        for i in range(len(ast.parameters)):
+            env.let_slot(
+                i,
+                ast.parameters[i].name,
+                copy(arguments[i]),
+                ast.parameters[i].location,
+            )
+        if ast.compiled is None:
+            ast.compiled = Compiler.function(ast)
+        body = vm_run(ast.compiled, env)
+        result: Optional[ControlFlow]
+        while True:
+            generator_depth += 1
+            try:
+                if generator_depth > MAX_GENERATOR_DEPTH:
+                    body.close()
+                    result = Error(
+                        location,
+                        f"exceeded maximum generator depth of {MAX_GENERATOR_DEPTH}",
+                    )
+                    break
+                value = next(body)
+            except StopIteration as stop:
+                result = stop.value
+                break
+            finally:
+                generator_depth -= 1
+            yield value
+        if result is None or isinstance(result, Return):
+            return  # end-of-iteration
+        if isinstance(result, Break):
+            yield Error(result.location, "attempted to break outside of a loop")
+        elif isinstance(result, Continue):
+            yield Error(result.location, "attempted to continue outside of a loop")
+        else:
+            result.trace.append(Error.TraceElement(location, function))
+            yield result
+
+    return NativeIterator.new(traverse, Vector.new([function, *arguments]))
+
+
+# Invokes the provided function as a method call made using dot access syntax.
+# Calls to unmodified intrinsic builtin metafunctions are executed inline,
+# bypassing the general purpose argument processing of call(). Intrinsics only
+# handle the common case of a call, and defer to call() for everything else,
+# including the construction of errors.
+def call_method(
+    location: Optional[SourceLocation],
+    function: Value,
+    arguments: list[Value],
+) -> Union[Value, Error]:
+    intrinsic = _INTRINSICS.get(type(function))
+    if intrinsic is not None and call_depth < MAX_CALL_DEPTH:
+        result = intrinsic(arguments)
+        if result is not None:
+            return result
+    return call(location, function, arguments)
+
+
+def call(
+    location: Optional[SourceLocation],
+    callable: Value,
+    arguments: list[Value],
+) -> Union[Value, Error]:
+    global call_depth
+    call_depth += 1
+    if call_depth > MAX_CALL_DEPTH:
+        return Error(
+            location,
+            f"exceeded maximum function call depth of {MAX_CALL_DEPTH}",
+        )
+    try:
+        if len(arguments) > 0 and callable_self_is_passed_by_reference(callable):
+            if not isinstance(arguments[0], Reference):
+                return Error(
+                    location,
+                    f"invalid function self argument (expected reference, received {typename(arguments[0])})",
+                )
+
+        if isinstance(callable, Function):
+            if len(arguments) != len(callable.ast.parameters):
+                return Error(
+                    location,
+                    f"invalid function argument count (expected {len(callable.ast.parameters)}, received {len(arguments)})",
+                )
+            if callable.ast.generator:
+                return generator_iterator(location, callable, arguments)
+            env = Environment(callable.env, callable.ast.body.size)
+            for i in range(len(callable.ast.parameters)):
+                env.let_slot(
+                    i,
+                    callable.ast.parameters[i].name,
+                    arguments[i],
+                    callable.ast.parameters[i].location,
+                )
+            result = engine.function(callable.ast, env)
+            if isinstance(result, Return):
+                return result.value
+            if isinstance(result, Break):
+                return Error(result.location, "attempted to break outside of a loop")
+            if isinstance(result, Continue):
+                return Error(result.location, "attempted to continue outside of a loop")
+            if isinstance(result, Error):
+                result.trace.append(Error.TraceElement(location, callable))
+                return result
+            assert result is None
+            return null
+
+        if isinstance(callable, Builtin):
+            try:
+                produced = callable.function(arguments)
+                if isinstance(produced, Value):
+                    return produced
+                if isinstance(produced, Error):
+                    produced.trace.append(Error.TraceElement(location, callable))
+                    return produced
+                # Special cases in which a builtin does not return a mellifera
+                # value or error. If None is returned, likely due to a missing
+                # return statement, automatically return a null value. If a
+                # non-None object is returned, automatically convert that object
+                # into an external value wrapping the object.
+                return null if result is None else External.new(result)
+            except Exception as e:
+                message = f"{e}"
+                if len(message) == 0:
+                    message = f"encountered exception {type(e).__name__}"
+                return Error(None, String.new(message))
+
+        return Error(
+            location,
+            f"attempted to call non-function type {quote(typename(callable))} with value {callable}",
+        )
+    finally:
+        call_depth -= 1
+
+
+# Used to indicate reference arguments when defining builtin functions.
+@dataclass
+class ReferenceType:
+    type: Type[Value]
+
+
+# ReferenceTo(TYPE)
+def ReferenceTo(type: Type[Value]) -> ReferenceType:
+    return ReferenceType(type)
+
+
+# Used to indicate trailing arguments that may be omitted when calling builtin
+# functions. Omitted arguments are passed to the builtin as None.
+@dataclass
+class OptionalArgumentType:
+    type: Type[Value]
+
+
+# OptionalArgument(TYPE)
+def OptionalArgument(type: Type[Value]) -> OptionalArgumentType:
+    return OptionalArgumentType(type)
+
+
+# @builtin("vector::slice", [ReferenceTo(Vector), Number, Number])
+# def builtin_vector_slice(
+#     self: Reference, vector: Vector, bgn: Number, end: Number
+# ) -> Union[Value, Error]: ...
+def builtin(nameof: str, args: Optional[list] = None, self_by_reference: bool = False):
+    def decorator(func: Callable) -> Type[Builtin]:
+        class GeneratedBuiltin(Builtin):
+            name = nameof
+
+            def function(self, arguments: list[Value]) -> Union[Value, Error]:
+                if args is not None:
+                    Builtin.expect_argument_count_between(
+                        arguments,
+                        len(
+                            [x for x in args if not isinstance(x, OptionalArgumentType)]
+                        ),
+                        len(args),
+                    )
+
+                processed_args: list[Optional[Value]] = []
+                for i, arg_type in enumerate(args or []):
+                    try:
+                        # Special case of: OptionalArgument(Type)
+                        if isinstance(arg_type, OptionalArgumentType):
+                            if i >= len(arguments):
+                                processed_args.append(None)
+                                continue
+                            arg_type = arg_type.type
+                        # Special case of: ReferenceTo(Type)
+                        if isinstance(arg_type, ReferenceType):
+                            ref, data = Builtin.typed_argument_reference(
+                                arguments, i, arg_type.type
+                            )
+                            processed_args.extend([ref, data])
+                            continue
+                        # Nominal case of: Type
+                        value = Builtin.typed_argument(arguments, i, arg_type)
+                        processed_args.append(value)
+                    except Exception as e:
+                        return Error(None, str(e))
+
+                return func(*processed_args)
+
+        GeneratedBuiltin.__name__ = f"Builtin_{func.__name__}"
+        GeneratedBuiltin.self_by_reference = self_by_reference
+        return GeneratedBuiltin
+
+    return decorator
+
+
+# Extends the generated class of a builtin of one or two number arguments to
+# also accept array arguments, producing the array of results of the builtin
+# for each element of those arrays (see Array.apply and Array.apply_binary for
+# the provided Python function and NumPy ufunc name). For builtins of two
+# arguments, a number argument is applied to every element of the other array
+# argument.
+def elementwise(
+    function: Optional[Callable[..., Any]], ufunc: Optional[str] = None
+) -> Callable[[Type[Builtin]], Type[Builtin]]:
+    def decorator(cls: Type[Builtin]) -> Type[Builtin]:
+        scalar = cls.function
+
+        def apply(self: Builtin, arguments: list[Value]) -> Union[Value, Error]:
+            if len(arguments) == 1 and isinstance(arguments[0], Array):
+                return arguments[0].apply(
+                    function, ufunc, lambda x: scalar(self, [Number.new(x)])
+                )
+            if len(arguments) == 2:
+                result = Array.apply_binary(
+                    self.name,
+                    arguments[0],
+                    arguments[1],
+                    function,
+                    ufunc,
+                    lambda x, y: scalar(self, [Number.new(x), Number.new(y)]),
+                )
+                if result is not None:
+                    return result
+            return scalar(self, arguments)
+
+        cls.function = apply  # type: ignore[method-assign]
+        return cls
+
+    return decorator
+
+
+# @builtin_from_source("min")
+# def builtin_min():
+#     return """
+#     let min = function(a, b) {
+#         ...
+#     };
+#     return min;
+#     """
+def builtin_from_source(nameof: str):
+    def decorator(func: Callable[[], str]) -> Callable[..., BuiltinFromSource]:
+        class GeneratedBuiltinFromSource(BuiltinFromSource):
+            name = nameof
+
+            @staticmethod
+            def source() -> str:
+                return func()
+
+        GeneratedBuiltinFromSource.__name__ = f"Builtin_{func.__name__}"
+
+        # Factory function that is responsible for actually creating the
+        # builtin from source instance. The factory is given the builtin name
+        # for clarity when debugging.
+        def factory(
+            evaluated: Union[Function, Builtin] = BuiltinImplicitUninitialized(),
+        ) -> BuiltinFromSource:
+            return GeneratedBuiltinFromSource(evaluated=evaluated)
+
+        factory.__name__ = func.__name__
+        return factory
+
+    return decorator
+
+
+@builtin("boolean::init", [Value])
+def builtin_boolean_init(value: Value) -> Union[Value, Error]:
+    if isinstance(value, Boolean):
+        return Boolean.new(value.data)
+    if isinstance(value, Number):
+        underlying = float(value.data)
+        return Boolean.new(not (math.isnan(underlying) or underlying == 0))
+    if isinstance(value, String) and value.bytes == b"true":
+        return Boolean.new(True)
+    if isinstance(value, String) and value.bytes == b"false":
+        return Boolean.new(False)
+    return Error(None, f"cannot convert value {value} to boolean")
+
+
+@builtin("number::init", [Value])
+def builtin_number_init(value: Value) -> Union[Value, Error]:
+    if isinstance(value, Number):
+        return Number.new(float(value.data))
+    if isinstance(value, Boolean):
+        return Number.new(1 if value.data else 0)
+    if isinstance(value, String):
+        try:
+            data = value.runes
+            if data.startswith("+"):
+                sign = +1  # explicitly positive
+                data = data[1:]
+            elif data.startswith("-"):
+                sign = -1  # explicitly negative
+                data = data[1:]
+            else:
+                sign = +1  # implicitly positive
+
+            if data == "Inf":
+                return Number.new(sign * math.inf)
+            if data == "NaN":
+                return Number.new(sign * math.nan)
+
+            if Lexer.RE_NUMBER_HEX.fullmatch(data) is not None:
+                integer = int(data, 16)
+                if integer < MIN_SAFE_INTEGER or integer > MAX_SAFE_INTEGER:
+                    return Error(
+                        None,
+                        f"hexadecimal integer {data} is outside the safe integer range",
+                    )
+                return Number.new(sign * float(integer))
+            if Lexer.RE_NUMBER_DEC.fullmatch(data) is not None:
+                return Number.new(sign * float(data))
+        except ValueError:
+            # Fallthrough to end-of-function error case.
+            pass
+    return Error(None, f"cannot convert value {value} to number")
+
+
+@builtin("number::is_nan", [Number])
+def builtin_number_is_nan(number: Number) -> Union[Value, Error]:
+    return Boolean.new(math.isnan(number.data))
+
+
+@builtin("number::is_inf", [Number])
+def builtin_number_is_inf(number: Number) -> Union[Value, Error]:
+    return Boolean.new(math.isinf(number.data))
+
+
+@builtin("number::is_finite", [Number])
+def builtin_number_is_finite(number: Number) -> Union[Value, Error]:
+    return Boolean.new(math.isfinite(number.data))
+
+
+@builtin("number::is_integer", [Number])
+def builtin_number_is_integer(number: Number) -> Union[Value, Error]:
+    return Boolean.new(float(number.data).is_integer())
+
+
+@builtin("number::fixed", [Number, Number])
+def builtin_number_fixed(number: Number, precision: Number) -> Union[Value, Error]:
+    try:
+        precision_integer = precision.as_safe_integer()
+    except Exception as e:
+        return Error(None, str(e))
+    if precision_integer < 0:
+        return Error(None, f"expected non-negative integer, received {precision}")
+    return Number.new(round(float(number.data), ndigits=precision_integer))
+
+
+@builtin("number::trunc", [Number])
+def builtin_number_trunc(number: Number) -> Union[Value, Error]:
+    if math.isnan(number.data) or math.isinf(number.data):
+        return copy(number)
+    return Number.new(math.trunc(float(number.data)))
+
+
+@builtin("number::round", [Number])
+def builtin_number_round(number: Number) -> Union[Value, Error]:
+    if math.isnan(number.data) or math.isinf(number.data):
+        return copy(number)
+    x = float(number.data)
+    truncated = math.trunc(x)
+    if abs(x - truncated) == 0.5:
+        # Round half way away from zero.
+        return Number.new(truncated + math.copysign(1.0, x))
+    return Number.new(round(x))
+
+
+@builtin("number::floor", [Number])
+def builtin_number_floor(number: Number) -> Union[Value, Error]:
+    if math.isnan(number.data) or math.isinf(number.data):
+        return copy(number)
+    return Number.new(math.floor(float(number.data)))
+
+
+@builtin("number::ceil", [Number])
+def builtin_number_ceil(number: Number) -> Union[Value, Error]:
+    if math.isnan(number.data) or math.isinf(number.data):
+        return copy(number)
+    return Number.new(math.ceil(float(number.data)))
+
+
+# $1 sign (+): Always show sign.
+# $2 altf (#): Alternate form => 0b for binary, 0x for hex with base x, 0X for
+#              hex with base X.
+# $3 zero (0): Pad with zeros up to the provided width.
+# $4 wstr (width): Minimum total width of the output string.
+# $5 prec (precision): Number of displayed digits after the decimal point.
+# $6 base (fdbxX): Digit base => b for binary, x for hex (lower), X for hex
+#                  (upper), d for decimal integer, f for decimal float.
+_NUMBER_FORMAT_REGEXP = re.compile(r"^(\+)?(#)?(0)?(\d*)(\.\d+)?([fdbxX])$")
+# Expected format used for error messages, matching the general shape of the
+# actual format string, but without the captures and anchors visible.
+_NUMBER_FORMAT_EXPECTED = r"\+?#?0?\d*(\.\d+)?[fdbxX]"
+
+
+@builtin("number::format", [Number, String])
+def builtin_number_format(number: Number, fmt: String) -> Union[Value, Error]:
+    m = _NUMBER_FORMAT_REGEXP.fullmatch(fmt.runes)
+    if m is None:
+        return Error(
+            None,
+            f"expected format string matching {_NUMBER_FORMAT_EXPECTED}, received {fmt}",
+        )
+
+    sign = m.group(1) or ""
+    altf = m.group(2) or ""
+    zero = m.group(3) or ""
+    wstr = m.group(4) or ""
+    prec = m.group(5) or ""
+    base = m.group(6)
+
+    if base in ("b", "x", "X"):
+        if prec:
+            ifmt = "binary" if base == "b" else "hexadecimal"
+            return Error(
+                None,
+                f"precision specifier not supported for {ifmt} integer format, received {fmt}",
+            )
+        try:
+            integer = number.as_safe_integer()
+        except Exception as e:
+            return Error(None, str(e))
+        return String.new(format(integer, sign + altf + zero + wstr + base))
+    elif base == "d":
+        if altf:
+            return Error(
+                None,
+                f"# flag not supported for decimal integer format, received {fmt}",
+            )
+        if prec:
+            return Error(
+                None,
+                f"precision specifier not supported for decimal integer format, received {fmt}",
+            )
+        try:
+            integer = number.as_safe_integer()
+        except Exception as e:
+            return Error(None, str(e))
+        return String.new(format(integer, sign + zero + wstr + "d"))
+    elif base == "f":
+        if altf:
+            return Error(
+                None,
+                f"# flag not supported for decimal float format, received {fmt}",
+            )
+        if prec and not math.isnan(number.data) and not math.isinf(number.data):
+            s = format(number.data, f".{int(prec[1:])}f")
+        else:
+            s = str(number)
+        if sign == "+" and not math.isnan(number.data) and not s.startswith("-"):
+            s = "+" + s
+        if wstr:
+            width = int(wstr)
+            if len(s) < width:
+                if (
+                    zero == "0"
+                    and not math.isnan(number.data)
+                    and not math.isinf(number.data)
+                ):
+                    if s[0] in ("+", "-"):
+                        s = s[0] + "0" * (width - len(s)) + s[1:]
+                    else:
+                        s = "0" * (width - len(s)) + s
+                else:
+                    s = " " * (width - len(s)) + s
+        return String.new(s)
+
+    raise Exception("unreachable")
+
+
+@builtin("string::init", [Value])
+def builtin_string_init(value: Value) -> Union[Value, Error]:
+    metafunction = value.metafunction(CONST_STRING_INTO_STRING)
+    if metafunction is not None:
+        result = call_meta_with_self(None, metafunction, value)
         if isinstance(result, Error):
-            raise ParseError(result.location, str(result))
+            return result
+        if not isinstance(result, String):
+            return Error(
+                None,
+                f"metafunction {quote(CONST_STRING_INTO_STRING.runes)} returned {result}",
+            )
         return result
+    if isinstance(value, String):
+        return copy(value)
+    return String.new(str(value))
 
-    def parse_comb_expression(self) -> AstExpression:
-        if self._check_current(TokenKind.NULL):
-            return self.parse_expression_null()
-        if self._check_current(TokenKind.TRUE) or self._check_current(TokenKind.FALSE):
-            return self.parse_expression_boolean()
-        if self._check_current(TokenKind.NUMBER):
-            return self.parse_expression_number()
-        if self._check_current(TokenKind.STRING):
-            return self.parse_expression_string()
-        if self._check_current(TokenKind.LBRACKET):
-            return self.parse_expression_vector(mode=ParseMode.COMB)
-        if (
-            self._check_current(TokenKind.MAP)
-            or self._check_current(TokenKind.SET)
-            or self._check_current(TokenKind.LBRACE)
-        ):
-            return self.parse_expression_map_or_set(mode=ParseMode.COMB)
-        if self._check_current(TokenKind.ADD):
-            return self.parse_expression_positive()
-        if self._check_current(TokenKind.SUB):
-            return self.parse_expression_negative()
-        raise ParseError(
-            self.current_token.location,
-            f"expected expression, found {self.current_token}",
-        )
 
+@builtin("string::bytes", [String])
+def builtin_string_bytes(string: String) -> Union[Value, Error]:
+    return Vector.new([String.new(bytes([byte])) for byte in string.bytes])
 
-# Reports whether a callable's implicit `self` argument is passed by reference
-# in a function call with a dot access expression as the left hand side of that
-# expression.
-#
-# function(self) { ... }   # pass by value
-# function.&(self) { ... } # pass by reference
-def callable_self_is_passed_by_reference(function: Value) -> bool:
-    if isinstance(function, Function):
-        return function.ast.self_by_reference
-    if isinstance(function, Builtin):
-        return function.self_by_reference
-    return False
 
+@builtin("string::runes", [String])
+def builtin_string_runes(string: String) -> Union[Value, Error]:
+    return Vector.new([String.new(rune) for rune in string.runes])
 
-# Invokes the provided metafunction, passing an implicit copy or reference
-# `self` to the metafunction. Effectively a utility function for the common
-# pattern of calling value.into_string() or a similarly-flavored callable.
-def call_meta_with_self(
-    location: Optional[SourceLocation], metafunction: Value, self: Value
-) -> Union[Value, Error]:
-    if not callable_self_is_passed_by_reference(metafunction):
-        return call(location, metafunction, [copy(self)])
-    result = call(location, metafunction, [Reference.new(self)])
-    Reference.unmark_referenced(self)
-    return result
+
+@builtin("string::count", [String])
+def builtin_string_count(string: String) -> Union[Value, Error]:
+    return Number.new(string.size)
 
 
-def call(
-    location: Optional[SourceLocation],
-    callable: Value,
-    arguments: list[Value],
+@builtin("string::is_empty", [String])
+def builtin_string_is_empty(string: String) -> Union[Value, Error]:
+    return Boolean.new(string.size == 0)
+
+
+@builtin("string::contains", [String, String])
+def builtin_string_contains(string: String, target: String) -> Union[Value, Error]:
+    return Boolean.new(target.bytes in string.bytes)
+
+
+@builtin("string::starts_with", [String, String])
+def builtin_string_starts_with(string: String, target: String) -> Union[Value, Error]:
+    return Boolean.new(string.bytes.startswith(target.bytes))
+
+
+@builtin("string::ends_with", [String, String])
+def builtin_string_ends_with(string: String, target: String) -> Union[Value, Error]:
+    return Boolean.new(string.bytes.endswith(target.bytes))
+
+
+@builtin("string::trim", [String])
+def builtin_string_trim(string: String) -> Union[Value, Error]:
+    return String.new(string.bytes.strip())
+
+
+@builtin("string::find", [String, String])
+def builtin_string_find(string: String, target: String) -> Union[Value, Error]:
+    found = string.bytes.find(target.bytes)
+    if found == -1:
+        return null
+    return Number.new(found)
+
+
+@builtin("string::rfind", [String, String])
+def builtin_string_rfind(string: String, target: String) -> Union[Value, Error]:
+    found = string.bytes.rfind(target.bytes)
+    if found == -1:
+        return null
+    return Number.new(found)
+
+
+@builtin("string::slice", [String, Number, Number])
+def builtin_string_slice(
+    string: String, bgn: Number, end: Number
 ) -> Union[Value, Error]:
-    global call_depth
-    call_depth += 1
-    if call_depth > MAX_CALL_DEPTH:
+    try:
+        bgn_index = bgn.as_index()
+    except Exception as e:
         return Error(
-            location,
-            f"exceeded maximum function call depth of {MAX_CALL_DEPTH}",
+            None, f"attempted string::slice with invalid begin index {bgn} ({str(e)})"
+        )
+    if bgn_index > len(string.bytes):
+        return Error(
+            None,
+            f"attempted string::slice with invalid begin index {bgn} (string has a count of {len(string.bytes)})",
         )
+
     try:
-        if len(arguments) > 0 and callable_self_is_passed_by_reference(callable):
-            if not isinstance(arguments[0], Reference):
-                return Error(
-                    location,
-                    f"invalid function self argument (expected reference, received {typename(arguments[0])})",
-                )
+        end_index = end.as_index()
+    except Exception as e:
+        return Error(
+            None, f"attempted string::slice with invalid end index {end} ({str(e)})"
+        )
+    if end_index > len(string.bytes):
+        return Error(
+            None,
+            f"attempted string::slice with invalid end index {end} (string has a count of {len(string.bytes)})",
+        )
 
-        if isinstance(callable, Function):
-            if len(arguments) != len(callable.ast.parameters):
-                return Error(
-                    location,
-                    f"invalid function argument count (expected {len(callable.ast.parameters)}, received {len(arguments)})",
-                )
-            env = Environment(callable.env)
-            for i in range(len(callable.ast.parameters)):
-                env.let(
-                    callable.ast.parameters[i].name,
-                    arguments[i],
-                    callable.ast.parameters[i].location,
-                )
-            result = callable.ast.body.eval(env)
-            if isinstance(result, Return):
-                return result.value
-            if isinstance(result, Break):
-                return Error(result.location, "attempted to break outside of a loop")
-            if isinstance(result, Continue):
-                return Error(result.location, "attempted to continue outside of a loop")
-            if isinstance(result, Error):
-                result.trace.append(Error.TraceElement(location, str(callable)))
-                return result
-            assert result is None
-            return null
+    if end_index < bgn_index:
+        return Error(
+            None,
+            "attempted string::slice with invalid indices (slice end is less than slice begin)",
+        )
+
+    return String.new(string.bytes[bgn_index:end_index])
+
+
+@builtin("string::split", [String, String])
+def builtin_string_split(string: String, target: String) -> Union[Value, Error]:
+    if len(target.bytes) == 0:
+        return Vector.new([String.new(r) for r in string.runes])
+    split = string.bytes.split(target.bytes)
+    return Vector.new([String.new(x) for x in split])
+
+
+@builtin("string::join", [String, Vector])
+def builtin_string_join(string: String, vector: Vector) -> Union[Value, Error]:
+    data: list[bytes] = list()
+    for index, value in enumerate(vector.data):
+        if not isinstance(value, String):
+            return Error(
+                None,
+                f"expected string value for vector element at index {index}, received {typename(value)}",
+            )
+        data.append(value.bytes)
+    return String.new(string.bytes.join(data))
+
+
+@builtin("string::cut", [String, String])
+def builtin_string_cut(string: String, target: String) -> Union[Value, Error]:
+    found = string.bytes.find(target.bytes)
+    if found == -1:
+        return null
+    prefix = String.new(string.bytes[0:found])
+    suffix = String.new(string.bytes[found + len(target.bytes) :])
+    return Map.new(
+        {
+            String.new("prefix"): prefix,
+            String.new("suffix"): suffix,
+        }
+    )
+
+
+@builtin("string::builder", [OptionalArgument(String)])
+def builtin_string_builder(string: Optional[String]) -> Union[Value, Error]:
+    return StringBuilder.new(string)
+
+
+@builtin("string::replace", [String, String, String])
+def builtin_string_replace(
+    string: String, target: String, replacement: String
+) -> Union[Value, Error]:
+    return String.new(string.bytes.replace(target.bytes, replacement.bytes))
+
+
+@builtin("string::to_title", [String])
+def builtin_string_to_title(string: String) -> Union[Value, Error]:
+    return String.new(string.runes.title())
+
+
+@builtin("string::to_upper", [String])
+def builtin_string_to_upper(string: String) -> Union[Value, Error]:
+    return String.new(string.runes.upper())
+
+
+@builtin("string::to_lower", [String])
+def builtin_string_to_lower(string: String) -> Union[Value, Error]:
+    return String.new(string.runes.lower())
+
+
+@builtin("regexp::init", [String])
+def builtin_regexp_init(string: String) -> Union[Value, Error]:
+    return Regexp.new(string.bytes)
 
-        if isinstance(callable, Builtin):
-            try:
-                produced = callable.function(arguments)
-                if isinstance(produced, Value):
-                    return produced
-                if isinstance(produced, Error):
-                    produced.trace.append(Error.TraceElement(location, str(callable)))
-                    return produced
-                # Special cases in which a builtin does not return a mellifera
-                # value or error. If None is returned, likely due to a missing
-                # return statement, automatically return a null value. If a
-                # non-None object is returned, automatically convert that object
-                # into an external value wrapping the object.
-                return null if result is None else External.new(result)
-            except Exception as e:
-                message = f"{e}"
-                if len(message) == 0:
-                    message = f"encountered exception {type(e).__name__}"
-                return Error(None, String.new(message))
 
-        return Error(
-            location,
-            f"attempted to call non-function type {quote(typename(callable))} with value {callable}",
-        )
-    finally:
-        call_depth -= 1
+@builtin("regexp::split", [Regexp, String])
+def builtin_regexp_split(regexp: Regexp, text: String) -> Union[Value, Error]:
+    return Vector.new([String.new(x) for x in regexp.pattern.split(text.bytes)])
 
 
-# Used to indicate reference arguments when defining builtin functions.
-@dataclass
-class ReferenceType:
-    type: Type[Value]
+@builtin("regexp::replace", [Regexp, String, String])
+def builtin_regexp_replace(
+    regexp: Regexp, text: String, replacement: String
+) -> Union[Value, Error]:
+    return String.new(regexp.pattern.sub(replacement.bytes, text.bytes))
 
 
-# ReferenceTo(TYPE)
-def ReferenceTo(type: Type[Value]) -> ReferenceType:
-    return ReferenceType(type)
+@builtin("vector::init", [Value])
+def builtin_vector_init(value: Value) -> Union[Value, Error]:
+    if value.metafunction(CONST_STRING_NEXT):
+        elements: list[Value] = list()
+        for iterated in iterator_elements(value):
+            if isinstance(iterated, Error):
+                return iterated
+            elements.append(iterated)
+        return Vector.new(elements)
+    if isinstance(value, Number):
+        try:
+            integer = value.as_safe_integer()
+        except Exception as e:
+            return Error(None, str(e))
+        return Vector.new([null] * integer)
+    if isinstance(value, Vector):
+        return Vector.new([copy(x) for x in value.data])
+    if isinstance(value, Map):
+        return Vector.new(
+            [Vector.new([copy(k), copy(v)]) for k, v in value.data.items()]
+        )
+    if isinstance(value, Set):
+        return Vector.new([copy(x) for x in value.data])
+    if isinstance(value, (Array, Bitset, Buffer)):
+        return Vector.new(list(value.elements()))
+    return Error(None, f"cannot convert value {value} to vector")
 
 
-# @builtin("vector::slice", [ReferenceTo(Vector), Number, Number])
-# def builtin_vector_slice(
-#     self: Reference, vector: Vector, bgn: Number, end: Number
-# ) -> Union[Value, Error]: ...
-def builtin(nameof: str, args: Optional[list] = None, self_by_reference: bool = False):
-    def decorator(func: Callable) -> Type[Builtin]:
-        class GeneratedBuiltin(Builtin):
-            name = nameof
+@builtin("vector::count", [Vector])
+def builtin_vector_count(vector: Vector) -> Union[Value, Error]:
+    return Number.new(len(vector.data))
 
-            def function(self, arguments: list[Value]) -> Union[Value, Error]:
-                if args is not None:
-                    Builtin.expect_argument_count(arguments, len(args))
 
-                processed_args = []
-                for i, arg_type in enumerate(args or []):
-                    try:
-                        # Special case of: ReferenceTo(Type)
-                        if isinstance(arg_type, ReferenceType):
-                            ref, data = Builtin.typed_argument_reference(
-                                arguments, i, arg_type.type
-                            )
-                            processed_args.extend([ref, data])
-                            continue
-                        # Nominal case of: Type
-                        value = Builtin.typed_argument(arguments, i, arg_type)
-                        processed_args.append(value)
-                    except Exception as e:
-                        return Error(None, str(e))
+@builtin("vector::is_empty", [Vector])
+def builtin_vector_is_empty(vector: Vector) -> Union[Value, Error]:
+    return Boolean.new(len(vector.data) == 0)
 
-                return func(*processed_args)
 
-        GeneratedBuiltin.__name__ = f"Builtin_{func.__name__}"
-        GeneratedBuiltin.self_by_reference = self_by_reference
-        return GeneratedBuiltin
+@builtin("vector::contains", [Vector, Value])
+def builtin_vector_contains(vector: Vector, target: Value) -> Union[Value, Error]:
+    return Boolean.new(target in vector)
 
-    return decorator
 
+@builtin("vector::any", [Vector, Function])
+def builtin_vector_any(vector: Vector, function: Function) -> Union[Value, Error]:
+    for element in vector.data:
+        result = call(None, function, [copy(element)])
+        if isinstance(result, Error):
+            return result
+        if not isinstance(result, Boolean):
+            return Error(
+                None,
+                f"expected function {function} to return a boolean (received {result.typename()} {result})",
+            )
+        if result.data:
+            return Boolean.new(True)
+    return Boolean.new(False)
 
-# @builtin_from_source("min")
-# def builtin_min():
-#     return """
-#     let min = function(a, b) {
-#         ...
-#     };
-#     return min;
-#     """
-def builtin_from_source(nameof: str):
-    def decorator(func: Callable[[], str]) -> Callable[..., BuiltinFromSource]:
-        class GeneratedBuiltinFromSource(BuiltinFromSource):
-            name = nameof
 
-            @staticmethod
-            def source() -> str:
-                return func()
+@builtin("vector::all", [Vector, Function])
+def builtin_vector_all(vector: Vector, function: Function) -> Union[Value, Error]:
+    for element in vector.data:
+        result = call(None, function, [copy(element)])
+        if isinstance(result, Error):
+            return result
+        if not isinstance(result, Boolean):
+            return Error(
+                None,
+                f"expected function {function} to return a boolean (received {result.typename()} {result})",
+            )
+        if not result.data:
+            return Boolean.new(False)
+    return Boolean.new(True)
 
-        GeneratedBuiltinFromSource.__name__ = f"Builtin_{func.__name__}"
 
-        # Factory function that is responsible for actually creating the
-        # builtin from source instance. The factory is given the builtin name
-        # for clarity when debugging.
-        def factory(
-            evaluated: Union[Function, Builtin] = BuiltinImplicitUninitialized(),
-        ) -> BuiltinFromSource:
-            return GeneratedBuiltinFromSource(evaluated=evaluated)
+@builtin("vector::map", [Vector, Function])
+def builtin_vector_map(vector: Vector, function: Function) -> Union[Value, Error]:
+    mapped = []
+    for element in vector.data:
+        result = call(None, function, [copy(element)])
+        if isinstance(result, Error):
+            return result
+        mapped.append(copy(result))
+    return Vector.new(mapped)
 
-        factory.__name__ = func.__name__
-        return factory
 
-    return decorator
+@builtin("vector::filter", [Vector, Function])
+def builtin_vector_filter(vector: Vector, function: Function) -> Union[Value, Error]:
+    filtered = []
+    for element in vector.data:
+        result = call(None, function, [copy(element)])
+        if isinstance(result, Error):
+            return result
+        if not isinstance(result, Boolean):
+            return Error(
+                None,
+                f"expected function {function} to return a boolean (received {result.typename()} {result})",
+            )
+        if result.data:
+            filtered.append(copy(element))
+    return Vector.new(filtered)
 
 
-@builtin("boolean::init", [Value])
-def builtin_boolean_init(value: Value) -> Union[Value, Error]:
-    if isinstance(value, Boolean):
-        return Boolean.new(value.data)
-    if isinstance(value, Number):
-        underlying = float(value.data)
-        return Boolean.new(not (math.isnan(underlying) or underlying == 0))
-    if isinstance(value, String) and value.bytes == b"true":
-        return Boolean.new(True)
-    if isinstance(value, String) and value.bytes == b"false":
-        return Boolean.new(False)
-    return Error(None, f"cannot convert value {value} to boolean")
+@builtin("vector::reduce", [Vector, Function])
+def builtin_vector_reduce(vector: Vector, function: Function) -> Union[Value, Error]:
+    if len(vector.data) == 0:
+        return Error(None, "attempted vector::reduce on an empty vector")
+
+    if len(vector.data) == 1:
+        return copy(vector.data[0])
 
+    accumulator = copy(vector.data[0])
+    for element in vector.data[1:]:
+        result = call(None, function, [copy(accumulator), copy(element)])
+        if isinstance(result, Error):
+            return result
+        accumulator = result
 
-@builtin("number::init", [Value])
-def builtin_number_init(value: Value) -> Union[Value, Error]:
-    if isinstance(value, Number):
-        return Number.new(float(value.data))
-    if isinstance(value, Boolean):
-        return Number.new(1 if value.data else 0)
-    if isinstance(value, String):
-        try:
-            data = value.runes
-            if data.startswith("+"):
-                sign = +1  # explicitly positive
-                data = data[1:]
-            elif data.startswith("-"):
-                sign = -1  # explicitly negative
-                data = data[1:]
-            else:
-                sign = +1  # implicitly positive
+    return copy(accumulator)
 
-            if data == "Inf":
-                return Number.new(sign * math.inf)
-            if data == "NaN":
-                return Number.new(sign * math.nan)
 
-            if Lexer.RE_NUMBER_HEX.fullmatch(data) is not None:
-                integer = int(data, 16)
-                if integer < MIN_SAFE_INTEGER or integer > MAX_SAFE_INTEGER:
-                    return Error(
-                        None,
-                        f"hexadecimal integer {data} is outside the safe integer range",
-                    )
-                return Number.new(sign * float(integer))
-            if Lexer.RE_NUMBER_DEC.fullmatch(data) is not None:
-                return Number.new(sign * float(data))
-        except ValueError:
-            # Fallthrough to end-of-function error case.
-            pass
-    return Error(None, f"cannot convert value {value} to number")
+@builtin("vector::find", [Vector, Value])
+def builtin_vector_find(vector: Vector, target: Value) -> Union[Value, Error]:
+    for index, value in enumerate(vector.data):
+        if value == target:
+            return Number.new(index)
+    return null
 
 
-@builtin("number::is_nan", [Number])
-def builtin_number_is_nan(number: Number) -> Union[Value, Error]:
-    return Boolean.new(math.isnan(number.data))
+@builtin("vector::rfind", [Vector, Value])
+def builtin_vector_rfind(vector: Vector, target: Value) -> Union[Value, Error]:
+    for index, value in reversed(list(enumerate(vector.data))):
+        if value == target:
+            return Number.new(index)
+    return null
 
 
-@builtin("number::is_inf", [Number])
-def builtin_number_is_inf(number: Number) -> Union[Value, Error]:
-    return Boolean.new(math.isinf(number.data))
+@builtin("vector::push", [ReferenceTo(Vector), Value], self_by_reference=True)
+def builtin_vector_push(
+    self: Reference, vector: Vector, value: Value
+) -> Union[Value, Error]:
+    try:
+        vector.push(copy(value))
+    except Exception as e:
+        return Error(None, f"invalid vector::push operation ({e})")
+    return null
 
 
-@builtin("number::is_finite", [Number])
-def builtin_number_is_finite(number: Number) -> Union[Value, Error]:
-    return Boolean.new(math.isfinite(number.data))
+@builtin("vector::pop", [ReferenceTo(Vector)], self_by_reference=True)
+def builtin_vector_pop(self: Reference, vector: Vector) -> Union[Value, Error]:
+    if len(vector.data) == 0:
+        return Error(None, "attempted vector::pop on an empty vector")
+    try:
+        return copy(vector.pop())
+    except Exception as e:
+        return Error(None, f"invalid vector::pop operation ({e})")
 
 
-@builtin("number::is_integer", [Number])
-def builtin_number_is_integer(number: Number) -> Union[Value, Error]:
-    return Boolean.new(float(number.data).is_integer())
+@builtin("vector::insert", [ReferenceTo(Vector), Number, Value], self_by_reference=True)
+def builtin_vector_insert(
+    self: Reference, vector: Vector, index: Number, value: Value
+) -> Union[Value, Error]:
+    try:
+        idx = index.as_index()
+    except Exception as e:
+        return Error(
+            None, f"attempted vector::insert with invalid index {index} ({str(e)})"
+        )
+    if idx > len(vector.data):
+        return Error(
+            None,
+            f"attempted vector::insert with invalid index {index} (vector has a count of {len(vector.data)})",
+        )
+    try:
+        vector.insert(idx, copy(value))
+    except Exception as e:
+        return Error(None, f"invalid vector::insert operation ({str(e)})")
+    return null
 
 
-@builtin("number::fixed", [Number, Number])
-def builtin_number_fixed(number: Number, precision: Number) -> Union[Value, Error]:
+@builtin("vector::remove", [ReferenceTo(Vector), Number], self_by_reference=True)
+def builtin_vector_remove(
+    self: Reference, vector: Vector, index: Number
+) -> Union[Value, Error]:
     try:
-        precision_integer = precision.as_safe_integer()
+        idx = index.as_index()
     except Exception as e:
-        return Error(None, str(e))
-    if precision_integer < 0:
-        return Error(None, f"expected non-negative integer, received {precision}")
-    return Number.new(round(float(number.data), ndigits=precision_integer))
+        return Error(
+            None, f"attempted vector::remove with invalid index {index} ({str(e)})"
+        )
+    if idx >= len(vector.data):
+        return Error(
+            None,
+            f"attempted vector::remove with invalid index {index} (vector has a count of {len(vector.data)})",
+        )
+    try:
+        return copy(vector.remove(idx))
+    except Exception as e:
+        return Error(None, f"invalid vector::remove operation ({str(e)})")
 
 
-@builtin("number::trunc", [Number])
-def builtin_number_trunc(number: Number) -> Union[Value, Error]:
-    if math.isnan(number.data) or math.isinf(number.data):
-        return copy(number)
-    return Number.new(math.trunc(float(number.data)))
+@builtin("vector::slice", [Vector, Number, Number])
+def builtin_vector_slice(
+    vector: Vector, bgn: Number, end: Number
+) -> Union[Value, Error]:
+    try:
+        bgn_index = bgn.as_index()
+    except Exception as e:
+        return Error(
+            None, f"attempted vector::slice with invalid begin index {bgn} ({str(e)})"
+        )
+    if bgn_index > len(vector.data):
+        return Error(
+            None,
+            f"attempted vector::slice with invalid begin index {bgn} (vector has a count of {len(vector.data)})",
+        )
 
+    try:
+        end_index = end.as_index()
+    except Exception as e:
+        return Error(
+            None, f"attempted vector::slice with invalid end index {end} ({str(e)})"
+        )
+    if end_index > len(vector.data):
+        return Error(
+            None,
+            f"attempted vector::slice with invalid end index {end} (vector has a count of {len(vector.data)})",
+        )
 
-@builtin("number::round", [Number])
-def builtin_number_round(number: Number) -> Union[Value, Error]:
-    if math.isnan(number.data) or math.isinf(number.data):
-        return copy(number)
-    x = float(number.data)
-    truncated = math.trunc(x)
-    if abs(x - truncated) == 0.5:
-        # Round half way away from zero.
-        return Number.new(truncated + math.copysign(1.0, x))
-    return Number.new(round(x))
+    if end_index < bgn_index:
+        return Error(
+            None,
+            "attempted vector::slice with invalid indices (slice end is less than slice begin)",
+        )
 
+    if vector.data.refs > 0:
+        # Elements of shared data containing at least one reference may be
+        # modified in place through that reference, so the sliced elements
+        # are copied rather than windowed.
+        return Vector.new(
+            SharedVectorData([copy(x) for x in vector.data[bgn_index:end_index]])
+        )
+    return Vector.new(vector.data.window(bgn_index, end_index))
 
-@builtin("number::floor", [Number])
-def builtin_number_floor(number: Number) -> Union[Value, Error]:
-    if math.isnan(number.data) or math.isinf(number.data):
-        return copy(number)
-    return Number.new(math.floor(float(number.data)))
 
+@builtin("vector::reversed", [Vector])
+def builtin_vector_reversed(vector: Vector) -> Union[Value, Error]:
+    # Copy underlying data as the update will alter all Python objects
+    # holding references to the underlying `SharedVectorData` object.
+    underlying = copy(vector.data)
+    return Vector.new(SharedVectorData(list(reversed(underlying))))
 
-@builtin("number::ceil", [Number])
-def builtin_number_ceil(number: Number) -> Union[Value, Error]:
-    if math.isnan(number.data) or math.isinf(number.data):
-        return copy(number)
-    return Number.new(math.ceil(float(number.data)))
 
+# Exception raised from within a Python sort key to abort the sort when a
+# Mellifera comparison function produces an error.
+class SortAbort(Exception):
+    def __init__(self, error: Error):
+        self.error = error
 
-# $1 sign (+): Always show sign.
-# $2 altf (#): Alternate form => 0b for binary, 0x for hex with base x, 0X for
-#              hex with base X.
-# $3 zero (0): Pad with zeros up to the provided width.
-# $4 wstr (width): Minimum total width of the output string.
-# $5 prec (precision): Number of displayed digits after the decimal point.
-# $6 base (fdbxX): Digit base => b for binary, x for hex (lower), X for hex
-#                  (upper), d for decimal integer, f for decimal float.
-_NUMBER_FORMAT_REGEXP = re.compile(r"^(\+)?(#)?(0)?(\d*)(\.\d+)?([fdbxX])$")
-# Expected format used for error messages, matching the general shape of the
-# actual format string, but without the captures and anchors visible.
-_NUMBER_FORMAT_EXPECTED = r"\+?#?0?\d*(\.\d+)?[fdbxX]"
 
+# Comparison of two values using the semantics of the `<` operator.
+def sort_less(lhs: Value, rhs: Value) -> Union[bool, Error]:
+    if isinstance(lhs, Number) and isinstance(rhs, Number):
+        return float(lhs.data) < float(rhs.data)
+    if isinstance(lhs, String) and isinstance(rhs, String):
+        return lhs.bytes < rhs.bytes
+    return Error(
+        None,
+        f"attempted < operation with types {quote(typename(lhs))} and {quote(typename(rhs))}",
+    )
 
-@builtin("number::format", [Number, String])
-def builtin_number_format(number: Number, fmt: String) -> Union[Value, Error]:
-    m = _NUMBER_FORMAT_REGEXP.fullmatch(fmt.runes)
-    if m is None:
-        return Error(
-            None,
-            f"expected format string matching {_NUMBER_FORMAT_EXPECTED}, received {fmt}",
-        )
 
-    sign = m.group(1) or ""
-    altf = m.group(2) or ""
-    zero = m.group(3) or ""
-    wstr = m.group(4) or ""
-    prec = m.group(5) or ""
-    base = m.group(6)
+# Stable sort of the provided elements ordered by the provided keys using the
+# semantics of the `<` and `>` operators. Keys that are all numbers (excluding
+# NaN) or all strings form a total order and are sorted with Python's builtin
+# sort. All other keys are sorted with a top-down merge sort comparing keys one
+# pair at a time, so that partial orders (NaN) and comparison errors between
+# incompatible keys are handled exactly as the `<` and `>` operators would.
+def sort_by_keys(
+    elements: Sequence[Value], keys: Sequence[Value]
+) -> Union[Vector, Error]:
+    indices = list(range(len(elements)))
+    if all(type(k) is Number and not math.isnan(float(k.data)) for k in keys):
+        indices.sort(key=lambda i: float(keys[i].data))  # type: ignore
+    elif all(type(k) is String for k in keys):
+        indices.sort(key=lambda i: keys[i].bytes)  # type: ignore
+    else:
 
-    if base in ("b", "x", "X"):
-        if prec:
-            ifmt = "binary" if base == "b" else "hexadecimal"
-            return Error(
-                None,
-                f"precision specifier not supported for {ifmt} integer format, received {fmt}",
-            )
-        try:
-            integer = number.as_safe_integer()
-        except Exception as e:
-            return Error(None, str(e))
-        return String.new(format(integer, sign + altf + zero + wstr + base))
-    elif base == "d":
-        if altf:
-            return Error(
-                None,
-                f"# flag not supported for decimal integer format, received {fmt}",
-            )
-        if prec:
-            return Error(
-                None,
-                f"precision specifier not supported for decimal integer format, received {fmt}",
-            )
-        try:
-            integer = number.as_safe_integer()
-        except Exception as e:
-            return Error(None, str(e))
-        return String.new(format(integer, sign + zero + wstr + "d"))
-    elif base == "f":
-        if altf:
-            return Error(
-                None,
-                f"# flag not supported for decimal float format, received {fmt}",
-            )
-        if prec and not math.isnan(number.data) and not math.isinf(number.data):
-            s = format(number.data, f".{int(prec[1:])}f")
-        else:
-            s = str(number)
-        if sign == "+" and not math.isnan(number.data) and not s.startswith("-"):
-            s = "+" + s
-        if wstr:
-            width = int(wstr)
-            if len(s) < width:
+        def merge_sort(x: list[int]) -> Union[list[int], Error]:
+            if len(x) <= 1:
+                return x
+            mid = len(x) // 2
+            lo = merge_sort(x[:mid])
+            if isinstance(lo, Error):
+                return lo
+            hi = merge_sort(x[mid:])
+            if isinstance(hi, Error):
+                return hi
+            result: list[int] = []
+            lo_index = 0
+            hi_index = 0
+            while lo_index < len(lo) and hi_index < len(hi):
+                less = sort_less(keys[lo[lo_index]], keys[hi[hi_index]])
+                if isinstance(less, Error):
+                    return less
+                # When equal, take from the lower half by convention.
                 if (
-                    zero == "0"
-                    and not math.isnan(number.data)
-                    and not math.isinf(number.data)
+                    not less
+                    and sort_less(keys[hi[hi_index]], keys[lo[lo_index]]) is True
                 ):
-                    if s[0] in ("+", "-"):
-                        s = s[0] + "0" * (width - len(s)) + s[1:]
-                    else:
-                        s = "0" * (width - len(s)) + s
-                else:
-                    s = " " * (width - len(s)) + s
-        return String.new(s)
+                    result.append(hi[hi_index])
+                    hi_index += 1
+                    continue
+                result.append(lo[lo_index])
+                lo_index += 1
+            result.extend(lo[lo_index:])
+            result.extend(hi[hi_index:])
+            return result
 
-    raise Exception("unreachable")
+        merged = merge_sort(indices)
+        if isinstance(merged, Error):
+            return merged
+        indices = merged
+    return Vector.new([copy(elements[i]) for i in indices])
 
 
-@builtin("string::init", [Value])
-def builtin_string_init(value: Value) -> Union[Value, Error]:
-    metafunction = value.metafunction(CONST_STRING_INTO_STRING)
-    if metafunction is not None:
-        result = call_meta_with_self(None, metafunction, value)
+@builtin("vector::sorted", [Vector])
+def builtin_vector_sorted(vector: Vector) -> Union[Value, Error]:
+    return sort_by_keys(vector.data, vector.data)
+
+
+@builtin("vector::sorted_by", [Vector, Function])
+def builtin_vector_sorted_by(vector: Vector, compare: Function) -> Union[Value, Error]:
+    def compare_elements(lhs: Value, rhs: Value) -> int:
+        result = call(None, compare, [copy(lhs), copy(rhs)])
         if isinstance(result, Error):
-            return result
-        if not isinstance(result, String):
-            return Error(
-                None,
-                f"metafunction {quote(CONST_STRING_INTO_STRING.runes)} returned {result}",
+            raise SortAbort(result)
+        if not isinstance(result, Number):
+            raise SortAbort(
+                Error(
+                    None,
+                    f"attempted < operation with types {quote(typename(result))} and {quote(Number.typename())}",
+                )
             )
-        return result
-    if isinstance(value, String):
-        return copy(value)
-    return String.new(str(value))
+        return (float(result.data) > 0) - (float(result.data) < 0)
 
+    try:
+        elements = sorted(vector.data, key=functools.cmp_to_key(compare_elements))
+    except SortAbort as abort:
+        return abort.error
+    return Vector.new([copy(x) for x in elements])
 
-@builtin("string::bytes", [String])
-def builtin_string_bytes(string: String) -> Union[Value, Error]:
-    return Vector.new([String.new(bytes([byte])) for byte in string.bytes])
 
+@builtin("vector::sorted_by_key", [Vector, Function])
+def builtin_vector_sorted_by_key(vector: Vector, key: Function) -> Union[Value, Error]:
+    keys: list[Value] = list()
+    for element in vector.data:
+        result = call(None, key, [copy(element)])
+        if isinstance(result, Error):
+            return result
+        keys.append(result)
+    return sort_by_keys(vector.data, keys)
 
-@builtin("string::runes", [String])
-def builtin_string_runes(string: String) -> Union[Value, Error]:
-    return Vector.new([String.new(rune) for rune in string.runes])
 
+@builtin("vector::group_by", [Vector, Function])
+def builtin_vector_group_by(vector: Vector, key: Function) -> Union[Value, Error]:
+    groups = Map.new()
+    for element in vector.data:
+        result = call(None, key, [copy(element)])
+        if isinstance(result, Error):
+            return result
+        group = groups.lookup(result)
+        if group is None:
+            group = Vector.new()
+            try:
+                groups[result] = group
+            except Exception as e:
+                return Error(None, f"invalid vector::group_by operation ({e})")
+        assert isinstance(group, Vector)
+        group.push(copy(element))
+    return groups
 
-@builtin("string::count", [String])
-def builtin_string_count(string: String) -> Union[Value, Error]:
-    return Number.new(len(string.bytes))
 
+@builtin("vector::count_by", [Vector, Function])
+def builtin_vector_count_by(vector: Vector, key: Function) -> Union[Value, Error]:
+    counts = Map.new()
+    for element in vector.data:
+        result = call(None, key, [copy(element)])
+        if isinstance(result, Error):
+            return result
+        count = counts.lookup(result)
+        assert count is None or isinstance(count, Number)
+        try:
+            counts[result] = Number.new(1 if count is None else float(count.data) + 1)
+        except Exception as e:
+            return Error(None, f"invalid vector::count_by operation ({e})")
+    return counts
 
-@builtin("string::is_empty", [String])
-def builtin_string_is_empty(string: String) -> Union[Value, Error]:
-    return Boolean.new(len(string.bytes) == 0)
 
+@builtin("vector::into_iterator", [Vector])
+def builtin_vector_into_iterator(vector: Vector) -> Union[Value, Error]:
+    return NativeIterator.new(lambda: map(copy, list(vector.data)), vector)
 
-@builtin("string::contains", [String, String])
-def builtin_string_contains(string: String, target: String) -> Union[Value, Error]:
-    return Boolean.new(target.bytes in string.bytes)
 
+@builtin("map::count", [Map])
+def builtin_map_count(map: Map) -> Union[Value, Error]:
+    return Number.new(len(map.data))
 
-@builtin("string::starts_with", [String, String])
-def builtin_string_starts_with(string: String, target: String) -> Union[Value, Error]:
-    return Boolean.new(string.bytes.startswith(target.bytes))
 
+@builtin("map::is_empty", [Map])
+def builtin_map_is_empty(map: Map) -> Union[Value, Error]:
+    return Boolean.new(len(map.data) == 0)
 
-@builtin("string::ends_with", [String, String])
-def builtin_string_ends_with(string: String, target: String) -> Union[Value, Error]:
-    return Boolean.new(string.bytes.endswith(target.bytes))
 
+@builtin("map::contains", [Map, Value])
+def builtin_map_contains(map: Map, target: Value) -> Union[Value, Error]:
+    return Boolean.new(target in map)
 
-@builtin("string::trim", [String])
-def builtin_string_trim(string: String) -> Union[Value, Error]:
-    return String.new(string.bytes.strip())
 
+@builtin("map::insert", [ReferenceTo(Map), Value, Value], self_by_reference=True)
+def builtin_map_insert(
+    self: Reference, map: Map, k: Value, v: Value
+) -> Union[Value, Error]:
+    try:
+        map[k] = copy(v)
+    except Exception as e:
+        return Error(None, f"invalid map::insert operation ({str(e)})")
 
-@builtin("string::find", [String, String])
-def builtin_string_find(string: String, target: String) -> Union[Value, Error]:
-    found = string.bytes.find(target.bytes)
-    if found == -1:
-        return null
-    return Number.new(found)
+    return null
 
 
-@builtin("string::rfind", [String, String])
-def builtin_string_rfind(string: String, target: String) -> Union[Value, Error]:
-    found = string.bytes.rfind(target.bytes)
-    if found == -1:
-        return null
-    return Number.new(found)
+@builtin("map::get", [Map, Value, Value])
+def builtin_map_get(map: Map, k: Value, default: Value) -> Union[Value, Error]:
+    value = map.lookup(k)
+    return copy(value) if value is not None else default
 
 
-@builtin("string::slice", [String, Number, Number])
-def builtin_string_slice(
-    string: String, bgn: Number, end: Number
+@builtin(
+    "map::update",
+    [ReferenceTo(Map), Value, Value, Function],
+    self_by_reference=True,
+)
+def builtin_map_update(
+    self: Reference, map: Map, k: Value, default: Value, function: Function
 ) -> Union[Value, Error]:
+    value = map.lookup(k)
+    result = call(None, function, [copy(value) if value is not None else default])
+    if isinstance(result, Error):
+        return result
     try:
-        bgn_index = bgn.as_index()
+        map[k] = copy(result)
     except Exception as e:
-        return Error(
-            None, f"attempted string::slice with invalid begin index {bgn} ({str(e)})"
-        )
-    if bgn_index > len(string.bytes):
+        return Error(None, f"invalid map::update operation ({str(e)})")
+    return null
+
+
+@builtin(
+    "map::increment",
+    [ReferenceTo(Map), Value, OptionalArgument(Number)],
+    self_by_reference=True,
+)
+def builtin_map_increment(
+    self: Reference, map: Map, k: Value, by: Optional[Number]
+) -> Union[Value, Error]:
+    value = map.lookup(k)
+    if value is not None and not isinstance(value, Number):
         return Error(
             None,
-            f"attempted string::slice with invalid begin index {bgn} (string has a count of {len(string.bytes)})",
+            lambda: f"attempted map::increment of non-number value {value} with key {k}",
         )
-
+    count = float(value.data) if value is not None else 0.0
     try:
-        end_index = end.as_index()
+        map[k] = Number.new(count + (float(by.data) if by is not None else 1.0))
     except Exception as e:
-        return Error(
-            None, f"attempted string::slice with invalid end index {end} ({str(e)})"
-        )
-    if end_index > len(string.bytes):
-        return Error(
-            None,
-            f"attempted string::slice with invalid end index {end} (string has a count of {len(string.bytes)})",
-        )
+        return Error(None, f"invalid map::increment operation ({str(e)})")
+    return null
 
-    if end_index < bgn_index:
+
+@builtin("map::remove", [ReferenceTo(Map), Value], self_by_reference=True)
+def builtin_map_remove(self: Reference, map: Map, k: Value) -> Union[Value, Error]:
+    try:
+        value = copy(map[k])
+        del map[k]
+        return value
+    except KeyError:
         return Error(
             None,
-            "attempted string::slice with invalid indices (slice end is less than slice begin)",
+            f"attempted map::remove on a map without key {k}",
         )
-
-    return String.new(string.bytes[bgn_index:end_index])
+    except Exception as e:
+        return Error(None, f"invalid map::remove operation ({str(e)})")
 
 
-@builtin("string::split", [String, String])
-def builtin_string_split(string: String, target: String) -> Union[Value, Error]:
-    if len(target.bytes) == 0:
-        return Vector.new([String.new(r) for r in string.runes])
-    split = string.bytes.split(target.bytes)
-    return Vector.new([String.new(x) for x in split])
+@builtin("map::keys", [Map])
+def builtin_map_keys(map: Map) -> Union[Value, Error]:
+    return Vector.new([copy(k) for k in map.data.keys()])
 
 
-@builtin("string::join", [String, Vector])
-def builtin_string_join(string: String, vector: Vector) -> Union[Value, Error]:
-    data = bytes()
-    for index, value in enumerate(vector.data):
-        if not isinstance(value, String):
-            return Error(
-                None,
-                f"expected string value for vector element at index {index}, received {typename(value)}",
-            )
-        if index != 0:
-            data += string.bytes
-        data += value.bytes
-    return String.new(data)
+@builtin("map::values", [Map])
+def builtin_map_values(map: Map) -> Union[Value, Error]:
+    return Vector.new([copy(v) for v in map.data.values()])
 
 
-@builtin("string::cut", [String, String])
-def builtin_string_cut(string: String, target: String) -> Union[Value, Error]:
-    found = string.bytes.find(target.bytes)
-    if found == -1:
-        return null
-    prefix = String.new(string.bytes[0:found])
-    suffix = String.new(string.bytes[found + len(target.bytes) :])
-    return Map.new(
-        {
-            String.new("prefix"): prefix,
-            String.new("suffix"): suffix,
-        }
+@builtin("map::pairs", [Map])
+def builtin_map_pairs(map: Map) -> Union[Value, Error]:
+    return Vector.new(
+        [
+            Map.new(
+                {
+                    String.new("key"): copy(k),
+                    String.new("value"): copy(v),
+                }
+            )
+            for k, v in map.data.items()
+        ]
     )
 
 
-@builtin("string::replace", [String, String, String])
-def builtin_string_replace(
-    string: String, target: String, replacement: String
-) -> Union[Value, Error]:
-    return String.new(string.bytes.replace(target.bytes, replacement.bytes))
+@builtin("map::union", [Value, Value])
+def builtin_map_union(a: Value, b: Value) -> Union[Value, Error]:
+    if not isinstance(a, Map) or not isinstance(b, Map):
+        return Error(None, f"attempted map::union of values {a} and {b}")
+    data = {copy(k): copy(v) for k, v in a.data.items()}
+    data.update({copy(k): copy(v) for k, v in b.data.items()})
+    return Map.new(data)
 
 
-@builtin("string::to_title", [String])
-def builtin_string_to_title(string: String) -> Union[Value, Error]:
-    return String.new(string.runes.title())
+@builtin("map::merge", [ReferenceTo(Map), Map], self_by_reference=True)
+def builtin_map_merge(self: Reference, map: Map, other: Map) -> Union[Value, Error]:
+    if map.is_immutable():
+        return Error(
+            None,
+            f"invalid map::merge operation (attempted to modify immutable map {map})",
+        )
+    map.cow()
+    map.data.data.update({copy(k): copy(v) for k, v in other.data.items()})
+    return null
 
 
-@builtin("string::to_upper", [String])
-def builtin_string_to_upper(string: String) -> Union[Value, Error]:
-    return String.new(string.runes.upper())
+@builtin("set::count", [Set])
+def builtin_set_count(set: Set) -> Union[Value, Error]:
+    return Number.new(len(set.data))
 
 
-@builtin("string::to_lower", [String])
-def builtin_string_to_lower(string: String) -> Union[Value, Error]:
-    return String.new(string.runes.lower())
+@builtin("set::is_empty", [Set])
+def builtin_set_is_empty(set: Set) -> Union[Value, Error]:
+    return Boolean.new(len(set.data) == 0)
 
 
-@builtin("regexp::init", [String])
-def builtin_regexp_init(string: String) -> Union[Value, Error]:
-    return Regexp.new(string.bytes)
+@builtin("set::contains", [Set, Value])
+def builtin_set_contains(set: Set, target: Value) -> Union[Value, Error]:
+    return Boolean.new(target in set)
 
 
-@builtin("regexp::split", [Regexp, String])
-def builtin_regexp_split(regexp: Regexp, text: String) -> Union[Value, Error]:
-    return Vector.new([String.new(x) for x in regexp.pattern.split(text.bytes)])
+@builtin("set::insert", [ReferenceTo(Set), Value], self_by_reference=True)
+def builtin_set_insert(
+    self: Reference, set: Set, element: Value
+) -> Union[Value, Error]:
+    try:
+        set.insert(copy(element))
+    except Exception as e:
+        return Error(None, f"invalid set::insert operation ({str(e)})")
+    return null
 
 
-@builtin("regexp::replace", [Regexp, String, String])
-def builtin_regexp_replace(
-    regexp: Regexp, text: String, replacement: String
+@builtin("set::remove", [ReferenceTo(Set), Value], self_by_reference=True)
+def builtin_set_remove(
+    self: Reference, set: Set, element: Value
 ) -> Union[Value, Error]:
-    return String.new(regexp.pattern.sub(replacement.bytes, text.bytes))
+    try:
+        set.remove(element)
+        return copy(element)
+    except KeyError:
+        return Error(
+            None,
+            f"attempted set::remove on a set without element {element}",
+        )
+    except Exception as e:
+        return Error(None, f"invalid set::remove operation ({str(e)})")
 
 
-@builtin("vector::init", [Value])
-def builtin_vector_init(value: Value) -> Union[Value, Error]:
-    if metafunction := value.metafunction(CONST_STRING_NEXT):
-        if not callable_self_is_passed_by_reference(metafunction):
-            return Error(
-                None,
-                "iterator next must receive self by reference (declared with function.&(self))",
-            )
-        reference = Reference.new(value)
-        try:
-            elements: list[Value] = list()
-            while True:
-                iterated = call(None, metafunction, [reference])
-                if isinstance(iterated, Error):
-                    if isinstance(iterated.value, Null):
-                        break  # end-of-iteration
-                    return iterated
-                elements.append(iterated)
-            return Vector.new([copy(x) for x in elements])
-        finally:
-            Reference.unmark_referenced(value)
+@builtin("set::union", [Value, Value])
+def builtin_set_union(a: Value, b: Value) -> Union[Value, Error]:
+    if not isinstance(a, Set) or not isinstance(b, Set):
+        return Error(None, f"attempted set::union of values {a} and {b}")
+    data = {copy(k): None for k in a.data.keys()}
+    data.update({copy(k): None for k in b.data.keys() if k not in data})
+    return Set.new(data)
+
+
+@builtin("set::intersection", [Value, Value])
+def builtin_set_intersection(a: Value, b: Value) -> Union[Value, Error]:
+    if not isinstance(a, Set) or not isinstance(b, Set):
+        return Error(None, f"attempted set::intersection of values {a} and {b}")
+    return Set.new({copy(k): None for k in a.data.keys() if k in b.data})
+
+
+@builtin("set::difference", [Value, Value])
+def builtin_set_difference(a: Value, b: Value) -> Union[Value, Error]:
+    if not isinstance(a, Set) or not isinstance(b, Set):
+        return Error(None, f"attempted set::difference of values {a} and {b}")
+    return Set.new({copy(k): None for k in a.data.keys() if k not in b.data})
+
+
+@builtin("set::extend", [ReferenceTo(Set), Set], self_by_reference=True)
+def builtin_set_extend(self: Reference, set: Set, other: Set) -> Union[Value, Error]:
+    if set.is_immutable():
+        return Error(
+            None,
+            f"invalid set::extend operation (attempted to modify immutable set {set})",
+        )
+    set.cow()
+    set.data.data.update({copy(k): None for k in other.data.keys() if k not in set})
+    return null
+
+
+@builtin("array::init", [Value])
+def builtin_array_init(value: Value) -> Union[Value, Error]:
+    if isinstance(value, Array):
+        return Array.new(copy(value.data))
     if isinstance(value, Number):
         try:
             integer = value.as_safe_integer()
         except Exception as e:
             return Error(None, str(e))
-        return Vector.new([null] * integer)
-    if isinstance(value, Vector):
-        return Vector.new([copy(x) for x in value.data])
-    if isinstance(value, Map):
-        return Vector.new(
-            [Vector.new([copy(k), copy(v)]) for k, v in value.data.items()]
-        )
-    if isinstance(value, Set):
-        return Vector.new([copy(x) for x in value.data])
-    return Error(None, f"cannot convert value {value} to vector")
+        return Array.new(itertools.repeat(0.0, integer))
+    elements: Iterable[Union[Value, Error]]
+    if value.metafunction(CONST_STRING_NEXT):
+        elements = iterator_elements(value)
+    elif isinstance(value, Vector):
+        elements = value.data
+    else:
+        return Error(None, f"cannot convert value {value} to array")
+    result = array.array("d")
+    for element in elements:
+        if isinstance(element, Error):
+            return element
+        if not isinstance(element, Number):
+            return Error(
+                None,
+                f"cannot convert value {value} to array (found element of type {typename(element)})",
+            )
+        result.append(float(element.data))
+    return Array.new(result)
 
 
-@builtin("vector::count", [Vector])
-def builtin_vector_count(vector: Vector) -> Union[Value, Error]:
-    return Number.new(len(vector.data))
+@builtin("array::count", [Array])
+def builtin_array_count(array: Array) -> Union[Value, Error]:
+    return Number.new(len(array.data))
 
 
-@builtin("vector::is_empty", [Vector])
-def builtin_vector_is_empty(vector: Vector) -> Union[Value, Error]:
-    return Boolean.new(len(vector.data) == 0)
+@builtin("array::is_empty", [Array])
+def builtin_array_is_empty(array: Array) -> Union[Value, Error]:
+    return Boolean.new(len(array.data) == 0)
+
+
+@builtin("array::contains", [Array, Value])
+def builtin_array_contains(array: Array, target: Value) -> Union[Value, Error]:
+    return Boolean.new(target in array)
+
+
+@builtin("array::push", [ReferenceTo(Array), Value], self_by_reference=True)
+def builtin_array_push(
+    self: Reference, array: Array, value: Value
+) -> Union[Value, Error]:
+    try:
+        array.push(value)
+    except Exception as e:
+        return Error(None, f"invalid array::push operation ({e})")
+    return null
+
+
+@builtin("array::pop", [ReferenceTo(Array)], self_by_reference=True)
+def builtin_array_pop(self: Reference, array: Array) -> Union[Value, Error]:
+    if len(array.data) == 0:
+        return Error(None, "attempted array::pop on an empty array")
+    try:
+        return array.pop()
+    except Exception as e:
+        return Error(None, f"invalid array::pop operation ({e})")
+
+
+# The sum of array elements is computed with math.fsum, producing the correctly
+# rounded sum independent of the order of the elements and of whether NumPy is
+# available.
+def array_sum(elements: Iterable[float]) -> float:
+    try:
+        return math.fsum(elements)
+    except (ValueError, OverflowError):
+        # Infinities of both signs or intermediate overflow.
+        return sum(elements)
+
+
+@builtin("array::sum", [Array])
+def builtin_array_sum(array: Array) -> Union[Value, Error]:
+    return Number.new(array_sum(array.data.data))
+
+
+@builtin("array::mean", [Array])
+def builtin_array_mean(array: Array) -> Union[Value, Error]:
+    if len(array.data) == 0:
+        return Error(None, "attempted array::mean on an empty array")
+    return Number.new(array_sum(array.data.data) / len(array.data))
+
 
+@builtin("array::min", [Array])
+def builtin_array_min(array: Array) -> Union[Value, Error]:
+    if len(array.data) == 0:
+        return Error(None, "attempted array::min on an empty array")
+    numpy = numpy_module()
+    if numpy is not None:
+        return Number.new(float(numpy.min(array.ndarray())))
+    if any(map(math.isnan, array.data.data)):
+        return Number.new(math.nan)
+    return Number.new(min(array.data.data))
 
-@builtin("vector::contains", [Vector, Value])
-def builtin_vector_contains(vector: Vector, target: Value) -> Union[Value, Error]:
-    return Boolean.new(target in vector)
 
+@builtin("array::max", [Array])
+def builtin_array_max(array: Array) -> Union[Value, Error]:
+    if len(array.data) == 0:
+        return Error(None, "attempted array::max on an empty array")
+    numpy = numpy_module()
+    if numpy is not None:
+        return Number.new(float(numpy.max(array.ndarray())))
+    if any(map(math.isnan, array.data.data)):
+        return Number.new(math.nan)
+    return Number.new(max(array.data.data))
 
-@builtin("vector::any", [Vector, Function])
-def builtin_vector_any(vector: Vector, function: Function) -> Union[Value, Error]:
-    for element in vector.data:
-        result = call(None, function, [copy(element)])
-        if isinstance(result, Error):
-            return result
-        if not isinstance(result, Boolean):
-            return Error(
-                None,
-                f"expected function {function} to return a boolean (received {result.typename()} {result})",
-            )
-        if result.data:
-            return Boolean.new(True)
-    return Boolean.new(False)
 
+@builtin("array::select", [Array, Array])
+def builtin_array_select(array: Array, mask: Array) -> Union[Value, Error]:
+    if len(mask.data) != len(array.data):
+        return Error(
+            None,
+            f"attempted array::select with mask of count {len(mask.data)} (array has a count of {len(array.data)})",
+        )
+    if numpy_module() is not None:
+        return Array.from_ndarray(array.ndarray()[mask.ndarray() != 0])
+    return Array.new(itertools.compress(array.data.data, mask.data.data))
 
-@builtin("vector::all", [Vector, Function])
-def builtin_vector_all(vector: Vector, function: Function) -> Union[Value, Error]:
-    for element in vector.data:
-        result = call(None, function, [copy(element)])
-        if isinstance(result, Error):
-            return result
-        if not isinstance(result, Boolean):
-            return Error(
-                None,
-                f"expected function {function} to return a boolean (received {result.typename()} {result})",
-            )
-        if not result.data:
-            return Boolean.new(False)
-    return Boolean.new(True)
 
+@builtin("array::into_vector", [Array])
+def builtin_array_into_vector(array: Array) -> Union[Value, Error]:
+    return Vector.new([Number.new(x) for x in array.data.data])
 
-@builtin("vector::map", [Vector, Function])
-def builtin_vector_map(vector: Vector, function: Function) -> Union[Value, Error]:
-    mapped = []
-    for element in vector.data:
-        result = call(None, function, [copy(element)])
-        if isinstance(result, Error):
-            return result
-        mapped.append(copy(result))
-    return Vector.new(mapped)
 
+@builtin("array::into_iterator", [Array])
+def builtin_array_into_iterator(array: Array) -> Union[Value, Error]:
+    return NativeIterator.new(lambda: map(Number.new, array.data.data), array)
 
-@builtin("vector::filter", [Vector, Function])
-def builtin_vector_filter(vector: Vector, function: Function) -> Union[Value, Error]:
-    filtered = []
-    for element in vector.data:
-        result = call(None, function, [copy(element)])
-        if isinstance(result, Error):
-            return result
-        if not isinstance(result, Boolean):
+
+@builtin("bitset::init", [Value])
+def builtin_bitset_init(value: Value) -> Union[Value, Error]:
+    if isinstance(value, Bitset):
+        return Bitset.new(copy(value.data))
+    if isinstance(value, Number):
+        try:
+            integer = value.as_safe_integer()
+        except Exception as e:
+            return Error(None, str(e))
+        if integer < 0:
+            return Error(None, f"cannot create bitset with negative count {value}")
+        return Bitset.new(SharedBitsetData(integer))
+    if not isinstance(value, Vector):
+        return Error(None, f"cannot convert value {value} to bitset")
+    result = Bitset.new(SharedBitsetData(len(value.data)))
+    for index, element in enumerate(value.data):
+        if not isinstance(element, Boolean):
             return Error(
                 None,
-                f"expected function {function} to return a boolean (received {result.typename()} {result})",
+                f"cannot convert value {value} to bitset (found element of type {typename(element)})",
             )
-        if result.data:
-            filtered.append(copy(element))
-    return Vector.new(filtered)
-
+        if element.data:
+            result.data.data[index >> 3] |= 1 << (index & 7)
+    return result
 
-@builtin("vector::reduce", [Vector, Function])
-def builtin_vector_reduce(vector: Vector, function: Function) -> Union[Value, Error]:
-    if len(vector.data) == 0:
-        return Error(None, "attempted vector::reduce on an empty vector")
 
-    if len(vector.data) == 1:
-        return copy(vector.data[0])
+@builtin("bitset::count", [Bitset])
+def builtin_bitset_count(bitset: Bitset) -> Union[Value, Error]:
+    return Number.new(len(bitset.data))
 
-    accumulator = copy(vector.data[0])
-    for element in vector.data[1:]:
-        result = call(None, function, [copy(accumulator), copy(element)])
-        if isinstance(result, Error):
-            return result
-        accumulator = result
 
-    return copy(accumulator)
+@builtin("bitset::count_ones", [Bitset])
+def builtin_bitset_count_ones(bitset: Bitset) -> Union[Value, Error]:
+    return Number.new(bitset.count_ones())
 
 
-@builtin("vector::find", [Vector, Value])
-def builtin_vector_find(vector: Vector, target: Value) -> Union[Value, Error]:
-    for index, value in enumerate(vector.data):
-        if value == target:
-            return Number.new(index)
-    return null
+# Returns the bits of the provided bitset from begin (inclusive) to end
+# (exclusive) with the provided step as a Python range for the bitset builtin
+# with the provided name.
+def bitset_range(
+    name: str, bitset: Bitset, bgn: Number, end: Number, step: Optional[Number]
+) -> Union[range, Error]:
+    indices: list[int] = []
+    for kind, value in (("begin", bgn), ("end", end), ("step", step)):
+        if value is None:
+            indices.append(1)
+            continue
+        try:
+            indices.append(value.as_index())
+        except Exception as e:
+            return Error(
+                None, f"attempted {name} with invalid {kind} index {value} ({str(e)})"
+            )
+    bgn_index, end_index, step_index = indices
+    if end_index > len(bitset.data):
+        return Error(
+            None,
+            f"attempted {name} with invalid end index {end} (bitset has a count of {len(bitset.data)})",
+        )
+    if end_index < bgn_index:
+        return Error(
+            None,
+            f"attempted {name} with invalid indices (range end is less than range begin)",
+        )
+    if step_index == 0:
+        return Error(None, f"attempted {name} with invalid step {step}")
+    return range(bgn_index, end_index, step_index)
 
 
-@builtin("vector::rfind", [Vector, Value])
-def builtin_vector_rfind(vector: Vector, target: Value) -> Union[Value, Error]:
-    for index, value in reversed(list(enumerate(vector.data))):
-        if value == target:
-            return Number.new(index)
+@builtin(
+    "bitset::set_range",
+    [ReferenceTo(Bitset), Number, Number, OptionalArgument(Number)],
+    self_by_reference=True,
+)
+def builtin_bitset_set_range(
+    self: Reference,
+    bitset: Bitset,
+    bgn: Number,
+    end: Number,
+    step: Optional[Number],
+) -> Union[Value, Error]:
+    selected = bitset_range("bitset::set_range", bitset, bgn, end, step)
+    if isinstance(selected, Error):
+        return selected
+    try:
+        bitset.fill(selected.start, selected.stop, selected.step, True)
+    except Exception as e:
+        return Error(None, f"invalid bitset::set_range operation ({e})")
     return null
 
 
-@builtin("vector::push", [ReferenceTo(Vector), Value], self_by_reference=True)
-def builtin_vector_push(
-    self: Reference, vector: Vector, value: Value
+@builtin(
+    "bitset::clear_range",
+    [ReferenceTo(Bitset), Number, Number, OptionalArgument(Number)],
+    self_by_reference=True,
+)
+def builtin_bitset_clear_range(
+    self: Reference,
+    bitset: Bitset,
+    bgn: Number,
+    end: Number,
+    step: Optional[Number],
 ) -> Union[Value, Error]:
+    selected = bitset_range("bitset::clear_range", bitset, bgn, end, step)
+    if isinstance(selected, Error):
+        return selected
     try:
-        vector.push(copy(value))
+        bitset.fill(selected.start, selected.stop, selected.step, False)
     except Exception as e:
-        return Error(None, f"invalid vector::push operation ({e})")
+        return Error(None, f"invalid bitset::clear_range operation ({e})")
     return null
 
 
-@builtin("vector::pop", [ReferenceTo(Vector)], self_by_reference=True)
-def builtin_vector_pop(self: Reference, vector: Vector) -> Union[Value, Error]:
-    if len(vector.data) == 0:
-        return Error(None, "attempted vector::pop on an empty vector")
-    try:
-        return copy(vector.pop())
-    except Exception as e:
-        return Error(None, f"invalid vector::pop operation ({e})")
+@builtin("bitset::into_vector", [Bitset])
+def builtin_bitset_into_vector(bitset: Bitset) -> Union[Value, Error]:
+    return Vector.new(list(bitset.elements()))
 
 
-@builtin("vector::insert", [ReferenceTo(Vector), Number, Value], self_by_reference=True)
-def builtin_vector_insert(
-    self: Reference, vector: Vector, index: Number, value: Value
+@builtin("bitset::into_iterator", [Bitset])
+def builtin_bitset_into_iterator(bitset: Bitset) -> Union[Value, Error]:
+    return NativeIterator.new(bitset.elements, bitset)
+
+
+@builtin("buffer::init", [Value])
+def builtin_buffer_init(value: Value) -> Union[Value, Error]:
+    if isinstance(value, Buffer):
+        return Buffer.new(copy(value.data))
+    if isinstance(value, String):
+        return Buffer.new(bytearray(value.bytes))
+    if isinstance(value, Number):
+        try:
+            integer = value.as_safe_integer()
+        except Exception as e:
+            return Error(None, str(e))
+        if integer < 0:
+            return Error(None, f"cannot create buffer with negative count {value}")
+        return Buffer.new(bytearray(integer))
+    elements: Iterable[Union[Value, Error]]
+    if value.metafunction(CONST_STRING_NEXT):
+        elements = iterator_elements(value)
+    elif isinstance(value, Vector):
+        elements = value.data
+    else:
+        return Error(None, f"cannot convert value {value} to buffer")
+    result = bytearray()
+    for element in elements:
+        if isinstance(element, Error):
+            return element
+        try:
+            result.append(value_as_byte(element))
+        except Exception as e:
+            return Error(None, f"cannot convert value {value} to buffer ({e})")
+    return Buffer.new(result)
+
+
+@builtin("buffer::count", [Buffer])
+def builtin_buffer_count(buffer: Buffer) -> Union[Value, Error]:
+    return Number.new(len(buffer.data))
+
+
+@builtin("buffer::is_empty", [Buffer])
+def builtin_buffer_is_empty(buffer: Buffer) -> Union[Value, Error]:
+    return Boolean.new(len(buffer.data) == 0)
+
+
+@builtin("buffer::push", [ReferenceTo(Buffer), Value], self_by_reference=True)
+def builtin_buffer_push(
+    self: Reference, buffer: Buffer, value: Value
 ) -> Union[Value, Error]:
     try:
-        idx = index.as_index()
-    except Exception as e:
-        return Error(
-            None, f"attempted vector::insert with invalid index {index} ({str(e)})"
-        )
-    if idx > len(vector.data):
-        return Error(
-            None,
-            f"attempted vector::insert with invalid index {index} (vector has a count of {len(vector.data)})",
-        )
-    try:
-        vector.insert(idx, copy(value))
+        buffer.push(value)
     except Exception as e:
-        return Error(None, f"invalid vector::insert operation ({str(e)})")
+        return Error(None, f"invalid buffer::push operation ({e})")
     return null
 
 
-@builtin("vector::remove", [ReferenceTo(Vector), Number], self_by_reference=True)
-def builtin_vector_remove(
-    self: Reference, vector: Vector, index: Number
-) -> Union[Value, Error]:
+@builtin("buffer::pop", [ReferenceTo(Buffer)], self_by_reference=True)
+def builtin_buffer_pop(self: Reference, buffer: Buffer) -> Union[Value, Error]:
+    if len(buffer.data) == 0:
+        return Error(None, "attempted buffer::pop on an empty buffer")
     try:
-        idx = index.as_index()
+        return buffer.pop()
     except Exception as e:
-        return Error(
-            None, f"attempted vector::remove with invalid index {index} ({str(e)})"
-        )
-    if idx >= len(vector.data):
+        return Error(None, f"invalid buffer::pop operation ({e})")
+
+
+@builtin("buffer::extend", [ReferenceTo(Buffer), Value], self_by_reference=True)
+def builtin_buffer_extend(
+    self: Reference, buffer: Buffer, other: Value
+) -> Union[Value, Error]:
+    if isinstance(other, String):
+        data = other.bytes
+    elif isinstance(other, Buffer):
+        data = bytes(other.data.data)
+    else:
         return Error(
             None,
-            f"attempted vector::remove with invalid index {index} (vector has a count of {len(vector.data)})",
+            f"invalid buffer::extend operation with value of type {typename(other)}",
         )
     try:
-        return copy(vector.remove(idx))
+        buffer.extend(data)
     except Exception as e:
-        return Error(None, f"invalid vector::remove operation ({str(e)})")
+        return Error(None, f"invalid buffer::extend operation ({e})")
+    return null
 
 
-@builtin("vector::slice", [Vector, Number, Number])
-def builtin_vector_slice(
-    vector: Vector, bgn: Number, end: Number
+@builtin("buffer::slice", [Buffer, Number, Number])
+def builtin_buffer_slice(
+    buffer: Buffer, bgn: Number, end: Number
 ) -> Union[Value, Error]:
     try:
         bgn_index = bgn.as_index()
     except Exception as e:
         return Error(
-            None, f"attempted vector::slice with invalid begin index {bgn} ({str(e)})"
+            None, f"attempted buffer::slice with invalid begin index {bgn} ({str(e)})"
         )
-    if bgn_index > len(vector.data):
+    if bgn_index > len(buffer.data):
         return Error(
             None,
-            f"attempted vector::slice with invalid begin index {bgn} (vector has a count of {len(vector.data)})",
+            f"attempted buffer::slice with invalid begin index {bgn} (buffer has a count of {len(buffer.data)})",
         )
 
     try:
         end_index = end.as_index()
     except Exception as e:
         return Error(
-            None, f"attempted vector::slice with invalid end index {end} ({str(e)})"
+            None, f"attempted buffer::slice with invalid end index {end} ({str(e)})"
         )
-    if end_index > len(vector.data):
+    if end_index > len(buffer.data):
         return Error(
             None,
-            f"attempted vector::slice with invalid end index {end} (vector has a count of {len(vector.data)})",
+            f"attempted buffer::slice with invalid end index {end} (buffer has a count of {len(buffer.data)})",
         )
 
     if end_index < bgn_index:
         return Error(
             None,
-            "attempted vector::slice with invalid indices (slice end is less than slice begin)",
+            "attempted buffer::slice with invalid indices (slice end is less than slice begin)",
         )
 
-    # Copy underlying data as the update will alter all Python objects
-    # holding references to the underlying `SharedVectorData` object.
-    underlying = copy(vector.data)
-    return Vector.new(SharedVectorData(underlying[bgn_index:end_index]))
-
-
-@builtin("vector::reversed", [Vector])
-def builtin_vector_reversed(vector: Vector) -> Union[Value, Error]:
-    # Copy underlying data as the update will alter all Python objects
-    # holding references to the underlying `SharedVectorData` object.
-    underlying = copy(vector.data)
-    return Vector.new(SharedVectorData(list(reversed(underlying))))
-
-
-@builtin_from_source("vector::sorted")
-def builtin_vector_sorted():
-    return """
-    let sort = function(x) {
-        if x.count() <= 1 {
-            return x;
-        }
-        let mid = (x.count() / 2).trunc();
-        let lo = sort(x.slice(0, mid));
-        let hi = sort(x.slice(mid, x.count()));
-        let lo_index = 0;
-        let hi_index = 0;
-        let result = [];
-        for _ in x.count() {
-            if lo_index == lo.count() {
-                result.push(hi[hi_index]);
-                hi_index = hi_index + 1;
-                continue;
-            }
-            if hi_index == hi.count() {
-                result.push(lo[lo_index]);
-                lo_index = lo_index + 1;
-                continue;
-            }
-            if lo[lo_index] < hi[hi_index] {
-                result.push(lo[lo_index]);
-                lo_index = lo_index + 1;
-                continue;
-            }
-            if lo[lo_index] > hi[hi_index] {
-                result.push(hi[hi_index]);
-                hi_index = hi_index + 1;
-                continue;
-            }
-            # When equal, take from the lower vector by convention.
-            result.push(lo[lo_index]);
-            lo_index = lo_index + 1;
-        }
-        return result;
-    };
-    return function(self) {
-        if not ty::is_vector(self) {
-            error $"expected vector value for argument 1, received {typename(self)}";
-        }
-        try { return sort(self); } catch err { error err; }
-    };
-    """
-
+    return Buffer.new(buffer.data.data[bgn_index:end_index])
 
-@builtin_from_source("vector::sorted_by")
-def builtin_vector_sorted_by():
-    return """
-    let sort = function(x, compare) {
-        if x.count() <= 1 {
-            return x;
-        }
-        let mid = (x.count() / 2).trunc();
-        let lo = sort(x.slice(0, mid), compare);
-        let hi = sort(x.slice(mid, x.count()), compare);
-        let lo_index = 0;
-        let hi_index = 0;
-        let result = [];
-        for _ in x.count() {
-            if lo_index == lo.count() {
-                result.push(hi[hi_index]);
-                hi_index = hi_index + 1;
-                continue;
-            }
-            if hi_index == hi.count() {
-                result.push(lo[lo_index]);
-                lo_index = lo_index + 1;
-                continue;
-            }
 
-            let cmp = compare(lo[lo_index], hi[hi_index]);
-            if cmp < 0 {
-                result.push(lo[lo_index]);
-                lo_index = lo_index + 1;
-                continue;
-            }
-            if cmp > 0 {
-                result.push(hi[hi_index]);
-                hi_index = hi_index + 1;
-                continue;
-            }
-            # When equal, take from the lower vector by convention.
-            result.push(lo[lo_index]);
-            lo_index = lo_index + 1;
-        }
-        return result;
-    };
-    return function(self, compare) {
-        if not ty::is_vector(self) {
-            error $"expected vector value for argument 1, received {typename(self)}";
-        }
-        try { return sort(self, compare); } catch err { error err; }
-    };
-    """
+@builtin("buffer::find", [Buffer, Value])
+def builtin_buffer_find(buffer: Buffer, target: Value) -> Union[Value, Error]:
+    if isinstance(target, String):
+        found = buffer.data.data.find(target.bytes)
+    elif isinstance(target, Buffer):
+        found = buffer.data.data.find(target.data.data)
+    else:
+        try:
+            found = buffer.data.data.find(value_as_byte(target))
+        except Exception as e:
+            return Error(None, f"invalid buffer::find operation ({e})")
+    if found == -1:
+        return null
+    return Number.new(found)
 
 
-@builtin_from_source("vector::into_iterator")
-def builtin_vector_into_iterator():
-    return """
-    return function(self) {
-        let vector_iterator = type extends iterator {
-            .next = function.&(self) {
-                if self.index >= self.vector.count() {
-                    return iterator::eoi();
-                }
-                let current = self.vector[self.index];
-                self.index = self.index + 1;
-                return current;
-            },
-        };
-        return new vector_iterator {
-            .vector = self,
-            .index = 0,
-        };
-    };
-    """
+@builtin("buffer::into_string", [Buffer])
+def builtin_buffer_into_string(buffer: Buffer) -> Union[Value, Error]:
+    return String.new(bytes(buffer.data.data))
 
 
-@builtin("map::count", [Map])
-def builtin_map_count(map: Map) -> Union[Value, Error]:
-    return Number.new(len(map.data))
+@builtin("buffer::into_vector", [Buffer])
+def builtin_buffer_into_vector(buffer: Buffer) -> Union[Value, Error]:
+    return Vector.new(list(buffer.elements()))
 
 
-@builtin("map::is_empty", [Map])
-def builtin_map_is_empty(map: Map) -> Union[Value, Error]:
-    return Boolean.new(len(map.data) == 0)
+@builtin("buffer::into_iterator", [Buffer])
+def builtin_buffer_into_iterator(buffer: Buffer) -> Union[Value, Error]:
+    return NativeIterator.new(buffer.elements, buffer)
 
 
-@builtin("map::contains", [Map, Value])
-def builtin_map_contains(map: Map, target: Value) -> Union[Value, Error]:
-    return Boolean.new(target in map)
+@builtin("builder::count", [StringBuilder])
+def builtin_builder_count(builder: StringBuilder) -> Union[Value, Error]:
+    return Number.new(builder.data.size)
 
 
-@builtin("map::insert", [ReferenceTo(Map), Value, Value], self_by_reference=True)
-def builtin_map_insert(
-    self: Reference, map: Map, k: Value, v: Value
+@builtin("builder::append", [ReferenceTo(StringBuilder), Value], self_by_reference=True)
+def builtin_builder_append(
+    self: Reference, builder: StringBuilder, value: Value
 ) -> Union[Value, Error]:
+    data = template_bytes(None, value)
+    if isinstance(data, Error):
+        return data
     try:
-        map[k] = copy(v)
-    except Exception as e:
-        return Error(None, f"invalid map::insert operation ({str(e)})")
-
-    return null
-
-
-@builtin("map::remove", [ReferenceTo(Map), Value], self_by_reference=True)
-def builtin_map_remove(self: Reference, map: Map, k: Value) -> Union[Value, Error]:
-    try:
-        value = copy(map[k])
-        del map[k]
-        return value
-    except KeyError:
-        return Error(
-            None,
-            f"attempted map::remove on a map without key {k}",
-        )
+        builder.append(data)
     except Exception as e:
-        return Error(None, f"invalid map::remove operation ({str(e)})")
+        return Error(None, f"invalid builder::append operation ({e})")
+    return null
 
 
-@builtin("map::keys", [Map])
-def builtin_map_keys(map: Map) -> Union[Value, Error]:
-    return Vector.new([copy(k) for k in map.data.keys()])
+@builtin("builder::finish", [StringBuilder])
+def builtin_builder_finish(builder: StringBuilder) -> Union[Value, Error]:
+    return builder.data
 
 
-@builtin("map::values", [Map])
-def builtin_map_values(map: Map) -> Union[Value, Error]:
-    return Vector.new([copy(v) for v in map.data.values()])
+@builtin("iterator::eoi", [])
+def builtin_iterator_eoi() -> Union[Value, Error]:
+    return Error(None, null)  # end-of-iteration
 
 
-@builtin("map::pairs", [Map])
-def builtin_map_pairs(map: Map) -> Union[Value, Error]:
-    return Vector.new(
-        [
-            Map.new(
-                {
-                    String.new("key"): copy(k),
-                    String.new("value"): copy(v),
-                }
+@builtin("iterator::next", [Value], self_by_reference=True)
+def builtin_iterator_next(self: Value) -> Union[Value, Error]:
+    if not isinstance(self, Reference) or not isinstance(self.data, NativeIterator):
+        return Error(None, "unimplemented iterator::next")
+    iterated = self.data.advance()
+    if iterated is None:
+        return Error(None, null)  # end-of-iteration
+    return iterated
+
+
+@builtin("iterator::count", [Value])
+def builtin_iterator_count(self: Value) -> Union[Value, Error]:
+    count = 0
+    for x in iterator_elements(self):
+        if isinstance(x, Error):
+            return x
+        count += 1
+    return Number.new(count)
+
+
+@builtin("iterator::contains", [Value, Value])
+def builtin_iterator_contains(self: Value, value: Value) -> Union[Value, Error]:
+    for x in iterator_elements(self):
+        if isinstance(x, Error):
+            return x
+        if x == value:
+            return Boolean.new(True)
+    return Boolean.new(False)
+
+
+@builtin("iterator::any", [Value, Function])
+def builtin_iterator_any(self: Value, function: Function) -> Union[Value, Error]:
+    for x in iterator_elements(self):
+        if isinstance(x, Error):
+            return x
+        result = call(None, function, [x])
+        if isinstance(result, Error):
+            return result
+        if not isinstance(result, Boolean):
+            return Error(
+                None,
+                f"expected function {function} to return a boolean (received {typename(result)} {result})",
             )
-            for k, v in map.data.items()
-        ]
-    )
+        if result.data:
+            return Boolean.new(True)
+    return Boolean.new(False)
 
 
-@builtin_from_source("map::union")
-def builtin_map_union():
-    return """
-    return function(a, b) {
-        if not ty::is_map(a) or not ty::is_map(b) {
-            error $"attempted map::union of values {repr(a)} and {repr(b)}";
-        }
+@builtin("iterator::all", [Value, Function])
+def builtin_iterator_all(self: Value, function: Function) -> Union[Value, Error]:
+    for x in iterator_elements(self):
+        if isinstance(x, Error):
+            return x
+        result = call(None, function, [x])
+        if isinstance(result, Error):
+            return result
+        if not isinstance(result, Boolean):
+            return Error(
+                None,
+                f"expected function {function} to return a boolean (received {typename(result)} {result})",
+            )
+        if not result.data:
+            return Boolean.new(False)
+    return Boolean.new(True)
 
-        let result = Map{};
-        for k, v in a {
-            map::insert(result.&, k, v);
-        }
-        for k, v in b {
-            map::insert(result.&, k, v);
-        }
-        return result;
-    };
-    """
 
+# Creates a native iterator applying the provided stage to the elements of the
+# provided iterator. Stages added to a native iterator that has not yet been
+# advanced are fused into the existing pipeline of that iterator.
+def iterator_with_stage(self: Value, stage: NativeIterator.Stage) -> NativeIterator:
+    if isinstance(self, NativeIterator) and self.state is None:
+        return NativeIterator.new(self.source, self.origin, self.stages + (stage,))
+    return NativeIterator.new(lambda: iterator_elements(copy(self)), self, (stage,))
 
-@builtin("set::count", [Set])
-def builtin_set_count(set: Set) -> Union[Value, Error]:
-    return Number.new(len(set.data))
 
+@builtin("iterator::map", [Value, Function])
+def builtin_iterator_map(self: Value, function: Function) -> Union[Value, Error]:
+    return iterator_with_stage(self, (False, function))
 
-@builtin("set::is_empty", [Set])
-def builtin_set_is_empty(set: Set) -> Union[Value, Error]:
-    return Boolean.new(len(set.data) == 0)
 
+@builtin("iterator::filter", [Value, Function])
+def builtin_iterator_filter(self: Value, function: Function) -> Union[Value, Error]:
+    return iterator_with_stage(self, (True, function))
 
-@builtin("set::contains", [Set, Value])
-def builtin_set_contains(set: Set, target: Value) -> Union[Value, Error]:
-    return Boolean.new(target in set)
 
+@builtin("iterator::reduce", [Value, Function])
+def builtin_iterator_reduce(self: Value, function: Function) -> Union[Value, Error]:
+    accumulator: Optional[Value] = None
+    for x in iterator_elements(self):
+        if isinstance(x, Error):
+            return x
+        if accumulator is None:
+            accumulator = x
+            continue
+        result = call(None, function, [accumulator, x])
+        if isinstance(result, Error):
+            return result
+        accumulator = result
+    if accumulator is None:
+        return Error(None, "attempted iterator::reduce on an exhausted iterator")
+    return accumulator
 
-@builtin("set::insert", [ReferenceTo(Set), Value], self_by_reference=True)
-def builtin_set_insert(
-    self: Reference, set: Set, element: Value
-) -> Union[Value, Error]:
+
+@builtin("iterator::into_vector", [Value])
+def builtin_iterator_into_vector(self: Value) -> Union[Value, Error]:
+    elements: list[Value] = list()
+    for x in iterator_elements(self):
+        if isinstance(x, Error):
+            return x
+        elements.append(x)
+    return Vector.new(elements)
+
+
+@builtin("iterator::take", [Value, Number])
+def builtin_iterator_take(self: Value, count: Number) -> Union[Value, Error]:
     try:
-        set.insert(copy(element))
+        n = count.as_index()
     except Exception as e:
-        return Error(None, f"invalid set::insert operation ({str(e)})")
-    return null
+        return Error(None, f"attempted iterator::take with invalid count {count} ({e})")
+    return NativeIterator.new(
+        lambda: itertools.islice(iterator_elements(copy(self)), n),
+        Vector.new([self, count]),
+    )
 
 
-@builtin("set::remove", [ReferenceTo(Set), Value], self_by_reference=True)
-def builtin_set_remove(
-    self: Reference, set: Set, element: Value
-) -> Union[Value, Error]:
+@builtin("iterator::skip", [Value, Number])
+def builtin_iterator_skip(self: Value, count: Number) -> Union[Value, Error]:
     try:
-        set.remove(element)
-        return copy(element)
-    except KeyError:
-        return Error(
-            None,
-            f"attempted set::remove on a set without element {element}",
-        )
+        n = count.as_index()
     except Exception as e:
-        return Error(None, f"invalid set::remove operation ({str(e)})")
+        return Error(None, f"attempted iterator::skip with invalid count {count} ({e})")
 
+    def skip() -> Iterator[Union[Value, Error]]:
+        elements = iterator_elements(copy(self))
+        for x in itertools.islice(elements, n):
+            if isinstance(x, Error):
+                yield x
+                return
+        yield from elements
 
-@builtin_from_source("set::union")
-def builtin_set_union():
-    return """
-    return function(a, b) {
-        if not ty::is_set(a) or not ty::is_set(b) {
-            error $"attempted set::union of values {repr(a)} and {repr(b)}";
-        }
+    return NativeIterator.new(skip, Vector.new([self, count]))
 
-        let result = Set{};
-        for x in a {
-            set::insert(result.&, x);
-        }
-        for x in b {
-            set::insert(result.&, x);
-        }
-        return result;
-    };
-    """
 
+@builtin("iterator::enumerate", [Value])
+def builtin_iterator_enumerate(self: Value) -> Union[Value, Error]:
+    def enumerate_() -> Iterator[Union[Value, Error]]:
+        for index, x in enumerate(iterator_elements(copy(self))):
+            if isinstance(x, Error):
+                yield x
+                return
+            yield Vector.new([Number.new(index), x])
 
-@builtin_from_source("set::intersection")
-def builtin_set_intersection():
-    return """
-    return function(a, b) {
-        if not ty::is_set(a) or not ty::is_set(b) {
-            error $"attempted set::intersection of values {repr(a)} and {repr(b)}";
-        }
+    return NativeIterator.new(enumerate_, self)
 
-        let result = Set{};
-        for x in a {
-            if b.contains(x) {
-                set::insert(result.&, x);
-            }
-        }
-        return result;
-    };
-    """
 
+@builtin("iterator::zip", [Value, Value])
+def builtin_iterator_zip(self: Value, other: Value) -> Union[Value, Error]:
+    def zip_() -> Iterator[Union[Value, Error]]:
+        lhs = iterator_elements(copy(self))
+        rhs = iterator_elements(copy(other))
+        for x in lhs:
+            if isinstance(x, Error):
+                yield x
+                return
+            y = next(rhs, None)
+            if y is None:
+                return
+            if isinstance(y, Error):
+                yield y
+                return
+            yield Vector.new([x, y])
 
-@builtin_from_source("set::difference")
-def builtin_set_difference():
-    return """
-    return function(a, b) {
-        if not ty::is_set(a) or not ty::is_set(b) {
-            error $"attempted set::difference of values {repr(a)} and {repr(b)}";
-        }
+    return NativeIterator.new(zip_, Vector.new([self, other]))
 
-        let result = Set{};
-        for x in a {
-            if not b.contains(x) {
-                set::insert(result.&, x);
-            }
-        }
-        return result;
-    };
-    """
+
+@builtin("iterator::chain", [Value, Value])
+def builtin_iterator_chain(self: Value, other: Value) -> Union[Value, Error]:
+    def chain() -> Iterator[Union[Value, Error]]:
+        for x in iterator_elements(copy(self)):
+            yield x
+            if isinstance(x, Error):
+                return
+        yield from iterator_elements(copy(other))
+
+    return NativeIterator.new(chain, Vector.new([self, other]))
+
+
+@builtin("iterator::chunks", [Value, Number])
+def builtin_iterator_chunks(self: Value, size: Number) -> Union[Value, Error]:
+    try:
+        n = size.as_index()
+        if n == 0:
+            raise Exception("chunk size must be greater than zero")
+    except Exception as e:
+        return Error(None, f"attempted iterator::chunks with invalid size {size} ({e})")
+
+    def chunks() -> Iterator[Union[Value, Error]]:
+        chunk: list[Value] = list()
+        for x in iterator_elements(copy(self)):
+            if isinstance(x, Error):
+                yield x
+                return
+            chunk.append(x)
+            if len(chunk) == n:
+                yield Vector.new(chunk)
+                chunk = list()
+        if len(chunk) != 0:
+            yield Vector.new(chunk)
+
+    return NativeIterator.new(chunks, Vector.new([self, size]))
 
 
 @builtin("exit", [Number])
@@ -6742,33 +11810,40 @@ def builtin_eprintln(value: Value) -> Union[Value, Error]:
     return null
 
 
-@builtin_from_source("range")
-def builtin_range():
-    return """
-    let range_iterator = type extends iterator {
-        "init": function(bgn, end) {
-            if end < bgn {
-                error $"end-of-range {repr(end)} is less than beginning-of-range {repr(bgn)}";
-            }
-            return new range_iterator {
-                .cur = bgn,
-                .end = end,
-            };
-        },
-        "next": function.&(self) {
-            if self.cur >= self.end {
-                error null; # end-of-iteration
-            }
-            let result = self.cur;
-            self.cur = self.cur + 1;
-            return result;
-        },
-    };
-    let range = function(bgn, end) {
-        return range_iterator::init(bgn, end);
-    };
-    return range;
-    """
+@builtin("range", [Number, Number, OptionalArgument(Number)])
+def builtin_range(
+    bgn: Number, end: Number, step: Optional[Number]
+) -> Union[Value, Error]:
+    b = float(bgn.data)
+    e = float(end.data)
+    s = 1.0 if step is None else float(step.data)
+    if s == 0 or math.isnan(s):
+        return Error(None, f"invalid range step {step}")
+    if s > 0 and e < b:
+        return Error(None, f"end-of-range {end} is less than beginning-of-range {bgn}")
+    if s < 0 and e > b:
+        return Error(
+            None, f"end-of-range {end} is greater than beginning-of-range {bgn}"
+        )
+    origin = Vector.new([bgn, end, Number.new(s)])
+    if b.is_integer() and s.is_integer() and math.isfinite(e):
+        # Integral ranges are produced directly from a Python range.
+        stop = math.ceil(e) if s > 0 else math.floor(e)
+        integers = range(int(b), stop, int(s))
+        return NativeIterator.new(
+            lambda: map(Number.new, integers), origin, (), _RANGE_ITERATOR_META
+        )
+
+    # Fractional ranges compute each element from its index rather than by
+    # accumulating the step, which would compound rounding error.
+    def numbers() -> Iterator[Union[Value, Error]]:
+        for index in itertools.count():
+            current = b + index * s
+            if current >= e if s > 0 else current <= e:
+                return
+            yield Number.new(current)
+
+    return NativeIterator.new(numbers, origin, (), _RANGE_ITERATOR_META)
 
 
 @builtin_from_source("min")
@@ -6982,6 +12057,10 @@ def json_encode(value: Value):
             )
     if isinstance(value, Vector):
         return list(value.data)
+    if isinstance(value, Array):
+        return [Number.new(x) for x in value.data.data]
+    if isinstance(value, Buffer):
+        return json_encode(String.new(bytes(value.data.data)))
     if isinstance(value, Map):
         map = dict()
         for k, v in value.data.items():
@@ -7025,6 +12104,7 @@ def builtin_math_is_integer(value: Number) -> Union[Value, Error]:
     return Boolean.new(float(value.data).is_integer())
 
 
+@elementwise(None, "sign")
 @builtin("math::sign", [Number])
 def builtin_math_sign(value: Number) -> Union[Value, Error]:
     if float(value.data) > 0:
@@ -7036,11 +12116,13 @@ def builtin_math_sign(value: Number) -> Union[Value, Error]:
     return Number.new(math.nan)
 
 
+@elementwise(math.copysign, "copysign")
 @builtin("math::copy_sign", [Number, Number])
 def builtin_math_copy_sign(value: Number, sign: Number) -> Union[Value, Error]:
     return Number.new(math.copysign(value.data, sign.data))
 
 
+@elementwise(math.trunc, "trunc")
 @builtin("math::trunc", [Number])
 def builtin_math_trunc(value: Number) -> Union[Value, Error]:
     if math.isnan(value.data) or math.isinf(value.data):
@@ -7048,6 +12130,7 @@ def builtin_math_trunc(value: Number) -> Union[Value, Error]:
     return Number.new(math.trunc(float(value.data)))
 
 
+@elementwise(None)
 @builtin("math::round", [Number])
 def builtin_math_round(value: Number) -> Union[Value, Error]:
     if math.isnan(value.data) or math.isinf(value.data):
@@ -7060,6 +12143,7 @@ def builtin_math_round(value: Number) -> Union[Value, Error]:
     return Number.new(round(x))
 
 
+@elementwise(math.floor, "floor")
 @builtin("math::floor", [Number])
 def builtin_math_floor(value: Number) -> Union[Value, Error]:
     if math.isnan(value.data) or math.isinf(value.data):
@@ -7067,6 +12151,7 @@ def builtin_math_floor(value: Number) -> Union[Value, Error]:
     return Number.new(math.floor(float(value.data)))
 
 
+@elementwise(math.ceil, "ceil")
 @builtin("math::ceil", [Number])
 def builtin_math_ceil(value: Number) -> Union[Value, Error]:
     if math.isnan(value.data) or math.isinf(value.data):
@@ -7074,6 +12159,7 @@ def builtin_math_ceil(value: Number) -> Union[Value, Error]:
     return Number.new(math.ceil(float(value.data)))
 
 
+@elementwise(math.fabs, "fabs")
 @builtin("math::abs", [Number])
 def builtin_math_abs(value: Number) -> Union[Value, Error]:
     return Number.new(math.fabs(float(value.data)))
@@ -7106,21 +12192,25 @@ def builtin_math_rem():
     """
 
 
+@elementwise(math.exp, "exp")
 @builtin("math::exp", [Number])
 def builtin_math_exp(value: Number) -> Union[Value, Error]:
     return Number.new(math.exp(float(value.data)))
 
 
+@elementwise(math.exp2, "exp2")
 @builtin("math::exp2", [Number])
 def builtin_math_exp2(value: Number) -> Union[Value, Error]:
     return Number.new(math.exp2(float(value.data)))
 
 
+@elementwise(functools.partial(math.pow, 10))
 @builtin("math::exp10", [Number])
 def builtin_math_exp10(value: Number) -> Union[Value, Error]:
     return Number.new(math.pow(10, float(value.data)))
 
 
+@elementwise(math.log, "log")
 @builtin("math::log", [Number])
 def builtin_math_log(value: Number) -> Union[Value, Error]:
     if float(value) == 0:
@@ -7131,6 +12221,7 @@ def builtin_math_log(value: Number) -> Union[Value, Error]:
         return Number.new(math.nan)
 
 
+@elementwise(math.log2, "log2")
 @builtin("math::log2", [Number])
 def builtin_math_log2(value: Number) -> Union[Value, Error]:
     if float(value) == 0:
@@ -7141,6 +12232,7 @@ def builtin_math_log2(value: Number) -> Union[Value, Error]:
         return Number.new(math.nan)
 
 
+@elementwise(math.log10, "log10")
 @builtin("math::log10", [Number])
 def builtin_math_log10(value: Number) -> Union[Value, Error]:
     if float(value) == 0:
@@ -7151,6 +12243,9 @@ def builtin_math_log10(value: Number) -> Union[Value, Error]:
         return Number.new(math.nan)
 
 
+# NumPy power produces infinities where math.pow raises for a zero base with a
+# negative exponent, so pow is applied elementwise without a NumPy ufunc.
+@elementwise(math.pow)
 @builtin("math::pow", [Number, Number])
 def builtin_math_pow(value: Number, power: Number) -> Union[Value, Error]:
     try:
@@ -7159,6 +12254,7 @@ def builtin_math_pow(value: Number, power: Number) -> Union[Value, Error]:
         return Number.new(math.nan)
 
 
+@elementwise(math.sqrt, "sqrt")
 @builtin("math::sqrt", [Number])
 def builtin_math_sqrt(value: Number) -> Union[Value, Error]:
     try:
@@ -7167,6 +12263,7 @@ def builtin_math_sqrt(value: Number) -> Union[Value, Error]:
         return Number.new(math.nan)
 
 
+@elementwise(math.cbrt, "cbrt")
 @builtin("math::cbrt", [Number])
 def builtin_math_cbrt(value: Number) -> Union[Value, Error]:
     return Number.new(math.cbrt(float(value.data)))
@@ -7200,6 +12297,7 @@ def builtin_math_clamp():
     """
 
 
+@elementwise(math.sin, "sin")
 @builtin("math::sin", [Number])
 def builtin_math_sin(value: Number) -> Union[Value, Error]:
     try:
@@ -7208,6 +12306,7 @@ def builtin_math_sin(value: Number) -> Union[Value, Error]:
         return Number.new(math.nan)
 
 
+@elementwise(math.cos, "cos")
 @builtin("math::cos", [Number])
 def builtin_math_cos(value: Number) -> Union[Value, Error]:
     try:
@@ -7216,6 +12315,7 @@ def builtin_math_cos(value: Number) -> Union[Value, Error]:
         return Number.new(math.nan)
 
 
+@elementwise(math.tan, "tan")
 @builtin("math::tan", [Number])
 def builtin_math_tan(value: Number) -> Union[Value, Error]:
     try:
@@ -7224,6 +12324,7 @@ def builtin_math_tan(value: Number) -> Union[Value, Error]:
         return Number.new(math.nan)
 
 
+@elementwise(math.asin, "arcsin")
 @builtin("math::asin", [Number])
 def builtin_math_asin(value: Number) -> Union[Value, Error]:
     try:
@@ -7232,6 +12333,7 @@ def builtin_math_asin(value: Number) -> Union[Value, Error]:
         return Number.new(math.nan)
 
 
+@elementwise(math.acos, "arccos")
 @builtin("math::acos", [Number])
 def builtin_math_acos(value: Number) -> Union[Value, Error]:
     try:
@@ -7240,36 +12342,43 @@ def builtin_math_acos(value: Number) -> Union[Value, Error]:
         return Number.new(math.nan)
 
 
+@elementwise(math.atan, "arctan")
 @builtin("math::atan", [Number])
 def builtin_math_atan(value: Number) -> Union[Value, Error]:
     return Number.new(math.atan(float(value.data)))
 
 
+@elementwise(math.atan2, "arctan2")
 @builtin("math::atan2", [Number, Number])
 def builtin_math_atan2(y: Number, x: Number) -> Union[Value, Error]:
     return Number.new(math.atan2(float(y.data), float(x.data)))
 
 
+@elementwise(math.sinh, "sinh")
 @builtin("math::sinh", [Number])
 def builtin_math_sinh(value: Number) -> Union[Value, Error]:
     return Number.new(math.sinh(float(value.data)))
 
 
+@elementwise(math.cosh, "cosh")
 @builtin("math::cosh", [Number])
 def builtin_math_cosh(value: Number) -> Union[Value, Error]:
     return Number.new(math.cosh(float(value.data)))
 
 
+@elementwise(math.tanh, "tanh")
 @builtin("math::tanh", [Number])
 def builtin_math_tanh(value: Number) -> Union[Value, Error]:
     return Number.new(math.tanh(float(value.data)))
 
 
+@elementwise(math.asinh, "arcsinh")
 @builtin("math::asinh", [Number])
 def builtin_math_asinh(value: Number) -> Union[Value, Error]:
     return Number.new(math.asinh(float(value.data)))
 
 
+@elementwise(math.acosh, "arccosh")
 @builtin("math::acosh", [Number])
 def builtin_math_acosh(value: Number) -> Union[Value, Error]:
     try:
@@ -7278,6 +12387,7 @@ def builtin_math_acosh(value: Number) -> Union[Value, Error]:
         return Number.new(math.nan)
 
 
+@elementwise(math.atanh, "arctanh")
 @builtin("math::atanh", [Number])
 def builtin_math_atanh(value: Number) -> Union[Value, Error]:
     if float(value).is_integer() and int(value) == +1:
@@ -7418,6 +12528,21 @@ def builtin_ty_is_set(value: Value) -> Union[Value, Error]:
     return Boolean.new(isinstance(value, Set))
 
 
+@builtin("ty::is_array", [Value])
+def builtin_ty_is_array(value: Value) -> Union[Value, Error]:
+    return Boolean.new(isinstance(value, Array))
+
+
+@builtin("ty::is_bitset", [Value])
+def builtin_ty_is_bitset(value: Value) -> Union[Value, Error]:
+    return Boolean.new(isinstance(value, Bitset))
+
+
+@builtin("ty::is_buffer", [Value])
+def builtin_ty_is_buffer(value: Value) -> Union[Value, Error]:
+    return Boolean.new(isinstance(value, Buffer))
+
+
 @builtin("ty::is_reference", [Value])
 def builtin_ty_is_reference(value: Value) -> Union[Value, Error]:
     return Boolean.new(isinstance(value, Reference))
@@ -7527,7 +12652,8 @@ def eval_source(
     lexer = Lexer(source, loc)
     parser = Parser(lexer)
     program = parser.parse_program()
-    return program.eval(env)
+    Resolver().resolve_program(program)
+    return engine.program(program, env)
 
 
 def eval_file(
@@ -7575,8 +12701,13 @@ _NUMBER_META = Map.new_meta(
         String("ceil"): builtin_number_ceil(),
     },
 )
-_NUMBER_META[String("MAX_SAFE_INTEGER")].meta = _NUMBER_META
-_NUMBER_META[String("MIN_SAFE_INTEGER")].meta = _NUMBER_META
+for _number in (
+    _NUMBER_META[String("MAX_SAFE_INTEGER")],
+    _NUMBER_META[String("MIN_SAFE_INTEGER")],
+):
+    assert isinstance(_number, Number)
+    _number.meta = _NUMBER_META
+_NUMBER_BOXES.update({float(x): Number(x, _NUMBER_META) for x in range(-1024, 1025)})
 _STRING_META = Map.new_meta(
     name=String(String.typename()),
     data={
@@ -7595,6 +12726,7 @@ _STRING_META = Map.new_meta(
         String("split"): builtin_string_split(),
         String("join"): builtin_string_join(),
         String("cut"): builtin_string_cut(),
+        String("builder"): builtin_string_builder(),
         String("replace"): builtin_string_replace(),
         String("to_title"): builtin_string_to_title(),
         String("to_upper"): builtin_string_to_upper(),
@@ -7629,11 +12761,12 @@ _VECTOR_META = Map.new_meta(
         String("remove"): builtin_vector_remove(),
         String("slice"): builtin_vector_slice(),
         String("reversed"): builtin_vector_reversed(),
-        String("sorted"): builtin_vector_sorted(BuiltinExplicitUninitialized()),
-        String("sorted_by"): builtin_vector_sorted_by(BuiltinExplicitUninitialized()),
-        String("into_iterator"): builtin_vector_into_iterator(
-            BuiltinExplicitUninitialized()
-        ),
+        String("sorted"): builtin_vector_sorted(),
+        String("sorted_by"): builtin_vector_sorted_by(),
+        String("sorted_by_key"): builtin_vector_sorted_by_key(),
+        String("group_by"): builtin_vector_group_by(),
+        String("count_by"): builtin_vector_count_by(),
+        String("into_iterator"): builtin_vector_into_iterator(),
     },
 )
 _MAP_META = Map.new_meta(
@@ -7642,12 +12775,16 @@ _MAP_META = Map.new_meta(
         String("count"): builtin_map_count(),
         String("is_empty"): builtin_map_is_empty(),
         String("contains"): builtin_map_contains(),
+        String("get"): builtin_map_get(),
+        String("update"): builtin_map_update(),
+        String("increment"): builtin_map_increment(),
         String("insert"): builtin_map_insert(),
         String("remove"): builtin_map_remove(),
         String("keys"): builtin_map_keys(),
         String("values"): builtin_map_values(),
         String("pairs"): builtin_map_pairs(),
-        String("union"): builtin_map_union(BuiltinExplicitUninitialized()),
+        String("union"): builtin_map_union(),
+        String("merge"): builtin_map_merge(),
     },
 )
 _SET_META = Map.new_meta(
@@ -7658,131 +12795,226 @@ _SET_META = Map.new_meta(
         String("contains"): builtin_set_contains(),
         String("insert"): builtin_set_insert(),
         String("remove"): builtin_set_remove(),
-        String("union"): builtin_set_union(BuiltinExplicitUninitialized()),
-        String("intersection"): builtin_set_intersection(
-            BuiltinExplicitUninitialized()
-        ),
-        String("difference"): builtin_set_difference(BuiltinExplicitUninitialized()),
+        String("union"): builtin_set_union(),
+        String("intersection"): builtin_set_intersection(),
+        String("difference"): builtin_set_difference(),
+        String("extend"): builtin_set_extend(),
     },
 )
-_REFERENCE_META = Map.new_meta(name=String(Reference.typename()))
-
-# Null singleton.
-null = Null(meta=None)
-# Boolean singletons.
-true = Boolean(True, _BOOLEAN_META)
-false = Boolean(False, _BOOLEAN_META)
-
-_ITERATOR_SOURCE = """
-let iterator = type {
-    .eoi = function() {
-        error null; # end-of-iteration
-    },
-    .next = function.&(self) {
-        error "unimplemented iterator::next";
-    },
-    .count = function(self) {
-        let count = 0;
-        for _ in self {
-            count = count + 1;
-        }
-        return count;
-    },
-    .contains = function(self, value) {
-        for x in self {
-            if x == value {
-                return true;
-            }
-        }
-        return false;
-    },
-    .any = function(self, func) {
-        for x in self {
-            let result = func(x);
-            if not ty::is_boolean(result) {
-                error $"expected function {func} to return a boolean (received {typename(result)} {repr(result)})";
-            }
-            if result {
-                return true;
-            }
-        }
-        return false;
-    },
-    .all = function(self, func) {
-        for x in self {
-            let result = func(x);
-            if not ty::is_boolean(result) {
-                error $"expected function {func} to return a boolean (received {typename(result)} {repr(result)})";
-            }
-            if not result {
-                return false;
-            }
-        }
-        return true;
-    },
-    .map = function(self, func) {
-        let map_iterator = type extends iterator {
-            .next = function.&(self) {
-                return func(self.base.next());
-            },
-        };
-        return new map_iterator {
-            .base = self,
-        };
+_ARRAY_META = Map.new_meta(
+    name=String(Array.typename()),
+    data={
+        String("init"): builtin_array_init(),
+        String("count"): builtin_array_count(),
+        String("is_empty"): builtin_array_is_empty(),
+        String("contains"): builtin_array_contains(),
+        String("push"): builtin_array_push(),
+        String("pop"): builtin_array_pop(),
+        String("sum"): builtin_array_sum(),
+        String("mean"): builtin_array_mean(),
+        String("min"): builtin_array_min(),
+        String("max"): builtin_array_max(),
+        String("select"): builtin_array_select(),
+        String("into_vector"): builtin_array_into_vector(),
+        String("into_iterator"): builtin_array_into_iterator(),
     },
-    .filter = function(self, func) {
-        let filter_iterator = type extends iterator {
-            .next = function.&(self) {
-                while true {
-                    let current = self.base.next();
-                    let result = func(current);
-                    if not ty::is_boolean(result) {
-                        error $"expected function {func} to return a boolean (received {typename(result)} {repr(result)})";
-                    }
-                    if result {
-                        return current;
-                    }
-                }
-            },
-        };
-        return new filter_iterator {
-            .base = self,
-        };
+)
+_BITSET_META = Map.new_meta(
+    name=String(Bitset.typename()),
+    data={
+        String("init"): builtin_bitset_init(),
+        String("count"): builtin_bitset_count(),
+        String("count_ones"): builtin_bitset_count_ones(),
+        String("set_range"): builtin_bitset_set_range(),
+        String("clear_range"): builtin_bitset_clear_range(),
+        String("into_vector"): builtin_bitset_into_vector(),
+        String("into_iterator"): builtin_bitset_into_iterator(),
     },
-    .reduce = function(self, func) {
-        let accumulator = null;
-        let has_element = false;
-        for x in self {
-            if not has_element {
-                accumulator = x;
-                has_element = true;
-                continue;
-            }
-            accumulator = func(accumulator, x);
-        }
-        if not has_element {
-            error "attempted iterator::reduce on an exhausted iterator";
-        }
-        return accumulator;
+)
+_BUFFER_META = Map.new_meta(
+    name=String(Buffer.typename()),
+    data={
+        String("init"): builtin_buffer_init(),
+        String("count"): builtin_buffer_count(),
+        String("is_empty"): builtin_buffer_is_empty(),
+        String("push"): builtin_buffer_push(),
+        String("pop"): builtin_buffer_pop(),
+        String("extend"): builtin_buffer_extend(),
+        String("slice"): builtin_buffer_slice(),
+        String("find"): builtin_buffer_find(),
+        String("into_string"): builtin_buffer_into_string(),
+        String("into_vector"): builtin_buffer_into_vector(),
+        String("into_iterator"): builtin_buffer_into_iterator(),
     },
-    .into_vector = function(self) {
-        let result = [];
-        for x in self {
-            result.push(x);
-        }
-        return result;
+)
+_BUILDER_META = Map.new_meta(
+    name=String(StringBuilder.typename()),
+    data={
+        String("count"): builtin_builder_count(),
+        String("append"): builtin_builder_append(),
+        String("finish"): builtin_builder_finish(),
+        String("into_string"): builtin_builder_finish(),
     },
-};
-return iterator;
-"""
-_ITERATOR = eval_source(
-    _ITERATOR_SOURCE,
-    Environment(BASE_ENVIRONMENT),
 )
 _ITERATOR_META = Map.new_meta(
-    name=String("iterator"),
-    data=_ITERATOR.data if isinstance(_ITERATOR, Map) else dict(),
+    name=String(NativeIterator.typename()),
+    data={
+        String("eoi"): builtin_iterator_eoi(),
+        String("next"): builtin_iterator_next(),
+        String("count"): builtin_iterator_count(),
+        String("contains"): builtin_iterator_contains(),
+        String("any"): builtin_iterator_any(),
+        String("all"): builtin_iterator_all(),
+        String("map"): builtin_iterator_map(),
+        String("filter"): builtin_iterator_filter(),
+        String("reduce"): builtin_iterator_reduce(),
+        String("into_vector"): builtin_iterator_into_vector(),
+        String("take"): builtin_iterator_take(),
+        String("skip"): builtin_iterator_skip(),
+        String("enumerate"): builtin_iterator_enumerate(),
+        String("zip"): builtin_iterator_zip(),
+        String("chain"): builtin_iterator_chain(),
+        String("chunks"): builtin_iterator_chunks(),
+    },
+)
+# Iterators produced by range share the iterator metafunctions under their own
+# type name.
+_RANGE_ITERATOR_META = Map.new_meta(
+    name=String("range_iterator"),
+    data=_ITERATOR_META.data,
 )
+_REFERENCE_META = Map.new_meta(name=String(Reference.typename()))
+
+
+# Inline implementations of frequently called container metafunctions used by
+# call_method(). Each intrinsic returns None if the provided arguments are not
+# handled by the intrinsic, in which case the builtin is invoked normally.
+def intrinsic_string_count(arguments: list[Value]) -> Optional[Value]:
+    if len(arguments) != 1 or type(arguments[0]) is not String:
+        return None
+    return Number.new(len(arguments[0].bytes))
+
+
+def intrinsic_string_contains(arguments: list[Value]) -> Optional[Value]:
+    if len(arguments) != 2 or type(arguments[0]) is not String:
+        return None
+    if type(arguments[1]) is not String:
+        return None
+    return Boolean.new(arguments[1].bytes in arguments[0].bytes)
+
+
+def intrinsic_container_count(
+    ty: Type[Union[Vector, Map, Set]],
+) -> Callable[[list[Value]], Optional[Value]]:
+    def intrinsic(arguments: list[Value]) -> Optional[Value]:
+        if len(arguments) != 1 or type(arguments[0]) is not ty:
+            return None
+        return Number.new(len(arguments[0].data))  # type: ignore
+
+    return intrinsic
+
+
+def intrinsic_container_contains(
+    ty: Type[Union[Vector, Map, Set]],
+) -> Callable[[list[Value]], Optional[Value]]:
+    def intrinsic(arguments: list[Value]) -> Optional[Value]:
+        if len(arguments) != 2 or type(arguments[0]) is not ty:
+            return None
+        return Boolean.new(arguments[1] in arguments[0])  # type: ignore
+
+    return intrinsic
+
+
+def intrinsic_vector_push(arguments: list[Value]) -> Optional[Value]:
+    if len(arguments) != 2:
+        return None
+    self = arguments[0]
+    if type(self) is not Reference or type(self.data) is not Vector:
+        return None
+    try:
+        self.data.push(copy(arguments[1]))
+    except Exception:
+        return None
+    return null
+
+
+def intrinsic_vector_pop(arguments: list[Value]) -> Optional[Value]:
+    if len(arguments) != 1:
+        return None
+    self = arguments[0]
+    if type(self) is not Reference or type(self.data) is not Vector:
+        return None
+    if len(self.data.data) == 0 or self.data.is_immutable():
+        return None
+    return copy(self.data.pop())
+
+
+def intrinsic_vector_insert(arguments: list[Value]) -> Optional[Value]:
+    if len(arguments) != 3:
+        return None
+    self, index = arguments[0], arguments[1]
+    if type(self) is not Reference or type(self.data) is not Vector:
+        return None
+    if type(index) is not Number:
+        return None
+    try:
+        idx = index.as_index()
+        if idx > len(self.data.data):
+            return None
+        self.data.insert(idx, copy(arguments[2]))
+    except Exception:
+        return None
+    return null
+
+
+def intrinsic_map_insert(arguments: list[Value]) -> Optional[Value]:
+    if len(arguments) != 3:
+        return None
+    self = arguments[0]
+    if type(self) is not Reference or type(self.data) is not Map:
+        return None
+    try:
+        self.data[arguments[1]] = copy(arguments[2])
+    except Exception:
+        return None
+    return null
+
+
+def intrinsic_set_insert(arguments: list[Value]) -> Optional[Value]:
+    if len(arguments) != 2:
+        return None
+    self = arguments[0]
+    if type(self) is not Reference or type(self.data) is not Set:
+        return None
+    try:
+        self.data.insert(copy(arguments[1]))
+    except Exception:
+        return None
+    return null
+
+
+# Mapping from builtin type to the intrinsic implementing that builtin.
+_INTRINSICS: dict[type, Callable[[list[Value]], Optional[Value]]] = {
+    type(_STRING_META[String("count")]): intrinsic_string_count,
+    type(_STRING_META[String("contains")]): intrinsic_string_contains,
+    type(_VECTOR_META[String("count")]): intrinsic_container_count(Vector),
+    type(_VECTOR_META[String("contains")]): intrinsic_container_contains(Vector),
+    type(_VECTOR_META[String("push")]): intrinsic_vector_push,
+    type(_VECTOR_META[String("pop")]): intrinsic_vector_pop,
+    type(_VECTOR_META[String("insert")]): intrinsic_vector_insert,
+    type(_MAP_META[String("count")]): intrinsic_container_count(Map),
+    type(_MAP_META[String("contains")]): intrinsic_container_contains(Map),
+    type(_MAP_META[String("insert")]): intrinsic_map_insert,
+    type(_SET_META[String("count")]): intrinsic_container_count(Set),
+    type(_SET_META[String("contains")]): intrinsic_container_contains(Set),
+    type(_SET_META[String("insert")]): intrinsic_set_insert,
+}
+
+# Null singleton.
+null = Null(meta=None)
+# Boolean singletons.
+true = Boolean(True, _BOOLEAN_META)
+false = Boolean(False, _BOOLEAN_META)
 
 BASE_ENVIRONMENT.let(String.new("boolean"), _BOOLEAN_META)
 BASE_ENVIRONMENT.let(String.new("number"), _NUMBER_META)
@@ -7791,6 +13023,9 @@ BASE_ENVIRONMENT.let(String.new("regexp"), _REGEXP_META)
 BASE_ENVIRONMENT.let(String.new("vector"), _VECTOR_META)
 BASE_ENVIRONMENT.let(String.new("map"), _MAP_META)
 BASE_ENVIRONMENT.let(String.new("set"), _SET_META)
+BASE_ENVIRONMENT.let(String.new("array"), _ARRAY_META)
+BASE_ENVIRONMENT.let(String.new("bitset"), _BITSET_META)
+BASE_ENVIRONMENT.let(String.new("buffer"), _BUFFER_META)
 BASE_ENVIRONMENT.let(String.new("reference"), _REFERENCE_META)
 BASE_ENVIRONMENT.let(String.new("iterator"), _ITERATOR_META)
 BASE_ENVIRONMENT.let(String.new("NaN"), Number.new(float("NaN")))
@@ -7808,10 +13043,7 @@ BASE_ENVIRONMENT.let(String.new("print"), builtin_print())
 BASE_ENVIRONMENT.let(String.new("println"), builtin_println())
 BASE_ENVIRONMENT.let(String.new("eprint"), builtin_eprint())
 BASE_ENVIRONMENT.let(String.new("eprintln"), builtin_eprintln())
-BASE_ENVIRONMENT.let(
-    String.new("range"),
-    builtin_range(BuiltinExplicitUninitialized()),
-)
+BASE_ENVIRONMENT.let(String.new("range"), builtin_range())
 BASE_ENVIRONMENT.let(String.new("min"), builtin_min())
 BASE_ENVIRONMENT.let(String.new("max"), builtin_max())
 BASE_ENVIRONMENT.let(String.new("import"), builtin_import())
@@ -7948,6 +13180,9 @@ BASE_ENVIRONMENT.let(
             String.new("is_vector"): builtin_ty_is_vector(),
             String.new("is_map"): builtin_ty_is_map(),
             String.new("is_set"): builtin_ty_is_set(),
+            String.new("is_array"): builtin_ty_is_array(),
+            String.new("is_bitset"): builtin_ty_is_bitset(),
+            String.new("is_buffer"): builtin_ty_is_buffer(),
             String.new("is_reference"): builtin_ty_is_reference(),
             String.new("is_function"): builtin_ty_is_function(),
         }
@@ -7972,15 +13207,6 @@ def initialize_builtin_from_source(value: Value):
     value.initialize()
 
 
-initialize_builtin_from_source(_VECTOR_META[String("sorted")])
-initialize_builtin_from_source(_VECTOR_META[String("sorted_by")])
-initialize_builtin_from_source(_VECTOR_META[String("into_iterator")])
-initialize_builtin_from_source(_MAP_META[String("union")])
-initialize_builtin_from_source(_SET_META[String("union")])
-initialize_builtin_from_source(_SET_META[String("intersection")])
-initialize_builtin_from_source(_SET_META[String("difference")])
-initialize_builtin_from_source(BASE_ENVIRONMENT.store[String("range")])
-
 # Current depth of the call stack tracked by the call() function.
 call_depth = 0
 # A relatively low function call depth of 512 is used (1) to make error traces
@@ -7992,6 +13218,13 @@ MAX_CALL_DEPTH = 512
 # that recursive calls to eval() methods and the call() function actually reach
 # the max call depth.
 sys.setrecursionlimit(MAX_CALL_DEPTH * 100)
+# Current nesting depth of resumed generator function bodies.
+generator_depth = 0
+# Resuming a suspended generator function body re-enters the Python interpreter
+# from native code, which is bounded by a separate and much smaller recursion
+# limit than calls to Python functions, so generator function bodies may only
+# be nested to a lower depth than function calls.
+MAX_GENERATOR_DEPTH = 128
 
 
 class Repl(code.InteractiveConsole):
@@ -8016,7 +13249,8 @@ class Repl(code.InteractiveConsole):
         # e.g. the else clause of an if-elif-else statement.
         if not (source.endswith("\n") or source.rstrip().endswith(";")):
             return True
-        result = program.eval(self.env)
+        Resolver().resolve_program(program)
+        result = engine.program(program, self.env)
         if isinstance(result, Value) and not isinstance(result, Null):
             print(result)
         if isinstance(result, Error):
@@ -8039,6 +13273,9 @@ options:
   -c, --command     Execute the provided command.
   --dump-tokens     Dump a comb-encoded vector of lexed tokens to stdout.
   --dump-ast        Dump a comb-encoded abstract syntax tree to stdout.
+  --engine=ENGINE   Execute using the provided engine (ast, vm, or closure).
+  --storage=STORAGE Store vectors, maps, and sets using the provided storage
+                    (builtin or persistent).
   -e, --env         Display the Mellifera environment and exit.
   -h, --help        Display this help text and exit.
     """.replace(
@@ -8064,6 +13301,8 @@ def main() -> None:
     argv: list[str] = []  # program arguments
     dump_tokens = False
     dump_ast = False
+    engine_name = os.getenv("MELLIFERA_ENGINE") or "ast"
+    storage_name = os.getenv("MELLIFERA_STORAGE") or "builtin"
     argi = 1
     while argi < len(sys.argv):
         arg = sys.argv[argi]
@@ -8119,6 +13358,18 @@ def main() -> None:
             argi += 1
             continue
 
+        # -engine
+        if m := re.match(r"^-+engine=(.*)$", arg):
+            engine_name = m.group(1)
+            argi += 1
+            continue
+
+        # -storage
+        if m := re.match(r"^-+storage=(.*)$", arg):
+            storage_name = m.group(1)
+            argi += 1
+            continue
+
         # -e, -env
         if m := re.match(r"^-+e(?:nv)?$", arg):
             mfenv(file=sys.stdout)
@@ -8136,6 +13387,19 @@ def main() -> None:
 
         positional()
 
+    if engine_name not in ENGINES:
+        print(f"error: unknown engine {engine_name}", file=sys.stderr)
+        usage(file=sys.stderr)
+        sys.exit(1)
+    global engine
+    engine = ENGINES[engine_name]
+    if storage_name not in ("builtin", "persistent"):
+        print(f"error: unknown storage {storage_name}", file=sys.stderr)
+        usage(file=sys.stderr)
+        sys.exit(1)
+    global persistent_storage
+    persistent_storage = storage_name == "persistent"
+
     env = Environment(BASE_ENVIRONMENT)
     path = os.path.realpath(file) if file is not None else os.path.abspath(__file__)
     env.set(
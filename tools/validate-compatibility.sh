@@ -37,7 +37,9 @@ validate() {
     fi
 }
 
-for f in overview.mf $(find examples tests -name '*.mf' | sort); do
+# Programs within a `py` directory use extensions specific to the Python
+# reference interpreter, and are not expected to be compatible.
+for f in overview.mf $(find examples tests -path '*/py' -prune -o -name '*.mf' -print | sort); do
     validate "${f}"
 done
 